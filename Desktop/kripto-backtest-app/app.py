@@ -3,18 +3,20 @@ import pandas as pd
 import numpy as np
 import json
 import time
-import itertools
-import random
 import threading
 import os
 import logging
+import uuid
 from datetime import datetime
 from stable_baselines3 import PPO
 from market_regime import get_market_regime
 from orchestrator import run_orchestrator_cycle, get_strategy_dna
 from evolution_chamber import run_evolution_cycle
 from utils import get_binance_klines, calculate_fibonacci_levels, analyze_backtest_results
-from indicators import generate_all_indicators
+from indicators import generate_all_indicators, required_indicators
+from backtest_engine import build_param_grid
+from job_queue import ACTIVE_STATUSES, get_job_queue
+from profiling import profiling_requested
 from features import prepare_features
 from ml_model import SignalML
 from signals import generate_signals, filter_signals_with_trend, add_higher_timeframe_trend, backtest_signals
@@ -34,7 +36,6 @@ from utils import (
     get_current_prices, get_fear_and_greed_index, get_btc_dominance
 )
 from trading_env import TradingEnv
-from rl_trainer import train_rl_agent
 
 
 # app.py dosyasının üst kısımlarına ekleyin
@@ -447,7 +448,9 @@ DEFAULTS = {
     'stop_loss_pct_key': 2.0, 'atr_multiplier_key': 2.0, 'move_sl_to_be': True,
     'tp1_pct_key': 5.0, 'tp1_size_key': 50, 'tp2_pct_key': 10.0, 'tp2_size_key': 50,
  'use_stoch': False, 'use_vwap': False, 'stoch_k_period': 14, 'stoch_d_period': 3, 'bb_period': 20, 'bb_std': 2.0,
-    'stoch_buy_level': 20, 'stoch_sell_level': 80, 'use_ma_cross': False, 'ma_fast_period': 20, 'ma_slow_period': 50
+    'stoch_buy_level': 20, 'stoch_sell_level': 80, 'use_ma_cross': False, 'ma_fast_period': 20, 'ma_slow_period': 50,
+    # Profil modu: `streamlit run app.py -- --profile` veya KRIPTO_PROFILE=1 ile açık başlar
+    'profile_mode': profiling_requested(), 'profile_cprofile': True
 }
 for key, value in DEFAULTS.items():
     if key not in st.session_state:
@@ -512,6 +515,14 @@ with st.sidebar.expander("🔧 Diğer Parametreler", expanded=False):
     #rerun_if_changed(use_puzzle_bot_selection, 'puzzle_bot')
     use_puzzle_bot = st.session_state.puzzle_bot
 
+    st.subheader("⏱️ Profil Modu")
+    st.checkbox("Backtest/Optimizasyonu Profille", key='profile_mode',
+                help="Çalıştırmaların süresini aşamalara (veri, göstergeler, sinyaller, MTA, simülasyon, metrikler) "
+                     "göre ayırır ve indirilebilir bir profil dosyası üretir.")
+    if st.session_state.profile_mode:
+        st.checkbox("Fonksiyon Düzeyinde Profil (cProfile)", key='profile_cprofile',
+                    help="Ayrıntılı ama Python döngülerini yavaşlatır; kapalıyken sadece aşama süreleri ölçülür.")
+
     st.subheader("📡 Telegram Bildirimleri")
     use_telegram_selection = st.checkbox("Telegram Bildirimlerini Aç", value=st.session_state.telegram_alerts)
     #rerun_if_changed(use_telegram_selection, 'telegram_alerts')
@@ -782,7 +793,8 @@ def update_price_live(symbol, interval, placeholder, strategy_params):
                 continue
 
             # 2. Adım: Gelen veriyle göstergeleri hesapla
-            df_with_indicators = generate_all_indicators(df_latest, **strategy_params)
+            df_with_indicators = generate_all_indicators(df_latest, required=required_indicators(strategy_params),
+                                                         **strategy_params)
 
             # 3. Adım: Göstergeleri kullanarak sinyalleri üret
             # Önceki tanımsız 'df_temp' hatası giderildi.
@@ -822,7 +834,7 @@ def get_latest_signal(symbol, interval, strategy_params):
     if df is None or df.empty:
         return "Veri Yok"
 
-    df = generate_all_indicators(df, **strategy_params)
+    df = generate_all_indicators(df, required=required_indicators(strategy_params), **strategy_params)
 
     # --- BAŞLANGIÇ: DÜZELTME (Sıralama Değiştirildi) ---
     # ÖNCE sinyalleri üret
@@ -862,7 +874,7 @@ def get_all_latest_signals():
                 latest_signals[key] = "Veri Yok"
                 continue
 
-            df = generate_all_indicators(df, **params)
+            df = generate_all_indicators(df, required=required_indicators(params), **params)
             df = generate_signals(df, **params)
 
             if params.get('use_mta', False):
@@ -877,160 +889,6 @@ def get_all_latest_signals():
     return latest_signals
 
 
-def run_portfolio_backtest(symbols, interval, strategy_params):
-    """
-    Kademeli Kâr Alma ve Stop'u Başa Çekme özelliklerini içeren,
-    gerçekçi backtest fonksiyonu.
-    """
-    all_results = []
-    st.session_state.backtest_data = {}
-    progress_bar = st.progress(0)
-    status_text = st.empty()
-
-    for i, symbol in enumerate(symbols):
-        status_text.text(f"🔍 {symbol} verisi indiriliyor ve strateji uygulanıyor... ({i + 1}/{len(symbols)})")
-        df = get_binance_klines(symbol=symbol, interval=interval, limit=1000)
-        if df is None or df.empty:
-            st.warning(f"{symbol} için veri alınamadı.")
-            continue
-
-        df_higher = None
-        current_use_mta = strategy_params.get('use_mta', False)
-        if current_use_mta:
-            df_higher = get_binance_klines(symbol=symbol, interval=strategy_params['higher_timeframe'], limit=1000)
-            if df_higher is None or df_higher.empty: current_use_mta = False
-
-        df = generate_all_indicators(df, **strategy_params)
-        df = generate_signals(df, **strategy_params)
-
-        if current_use_mta and df_higher is not None:
-            df = add_higher_timeframe_trend(df, df_higher, strategy_params['trend_ema_period'])
-            df = filter_signals_with_trend(df)
-
-        trades = []
-        position, entry_price, entry_time, stop_loss_price, cooldown = None, 0, None, 0, 0
-        position_size = 0
-        tp1_target, tp2_target = 0, 0
-        tp1_hit, tp2_hit = False, False
-
-        for k in range(1, len(df)):
-            if cooldown > 0:
-                cooldown -= 1
-                continue
-
-            prev_row, current_row = df.iloc[k - 1], df.iloc[k]
-            signal, open_price, low_price, high_price = prev_row['Signal'], current_row['Open'], current_row['Low'], \
-                current_row['High']
-            time_idx, current_atr = current_row.name, prev_row.get('ATR', 0)
-
-            if position is not None:
-                exit_price, exit_reason = None, ""
-
-                if (position == 'Long' and low_price <= stop_loss_price) or \
-                        (position == 'Short' and high_price >= stop_loss_price):
-                    exit_price, exit_reason = stop_loss_price, "Stop-Loss"
-
-                else:
-                    if position == 'Long':
-                        if not tp1_hit and high_price >= tp1_target:
-                            size_to_close = position_size * (strategy_params['tp1_size_pct'] / 100.0)
-                            position_size -= size_to_close
-                            ret = ((tp1_target - entry_price) / entry_price * 100) - strategy_params['commission_pct']
-                            trades.append({'Pozisyon': f"Long TP1 ({strategy_params['tp1_size_pct']}%)",
-                                           'Giriş Zamanı': entry_time, 'Çıkış Zamanı': time_idx,
-                                           'Giriş Fiyatı': entry_price, 'Çıkış Fiyatı': tp1_target,
-                                           'Getiri (%)': round(ret, 2)})
-                            tp1_hit = True
-                            if strategy_params['move_sl_to_be']:
-                                stop_loss_price = entry_price
-
-                        if not tp2_hit and high_price >= tp2_target:
-                            size_to_close = position_size * (strategy_params['tp2_size_pct'] / 100.0)
-                            position_size -= size_to_close
-                            ret = ((tp2_target - entry_price) / entry_price * 100) - strategy_params['commission_pct']
-                            trades.append({'Pozisyon': f"Long TP2 ({strategy_params['tp2_size_pct']}%)",
-                                           'Giriş Zamanı': entry_time, 'Çıkış Zamanı': time_idx,
-                                           'Giriş Fiyatı': entry_price, 'Çıkış Fiyatı': tp2_target,
-                                           'Getiri (%)': round(ret, 2)})
-                            tp2_hit = True
-
-                    elif position == 'Short':
-                        if not tp1_hit and low_price <= tp1_target:
-                            size_to_close = position_size * (strategy_params['tp1_size_pct'] / 100.0)
-                            position_size -= size_to_close
-                            ret = ((entry_price - tp1_target) / entry_price * 100) - strategy_params['commission_pct']
-                            trades.append({'Pozisyon': f"Short TP1 ({strategy_params['tp1_size_pct']}%)",
-                                           'Giriş Zamanı': entry_time, 'Çıkış Zamanı': time_idx,
-                                           'Giriş Fiyatı': entry_price, 'Çıkış Fiyatı': tp1_target,
-                                           'Getiri (%)': round(ret, 2)})
-                            tp1_hit = True
-                            if strategy_params['move_sl_to_be']:
-                                stop_loss_price = entry_price
-
-                        if not tp2_hit and low_price <= tp2_target:
-                            size_to_close = position_size * (strategy_params['tp2_size_pct'] / 100.0)
-                            position_size -= size_to_close
-                            ret = ((entry_price - tp2_target) / entry_price * 100) - strategy_params['commission_pct']
-                            trades.append({'Pozisyon': f"Short TP2 ({strategy_params['tp2_size_pct']}%)",
-                                           'Giriş Zamanı': entry_time, 'Çıkış Zamanı': time_idx,
-                                           'Giriş Fiyatı': entry_price, 'Çıkış Fiyatı': tp2_target,
-                                           'Getiri (%)': round(ret, 2)})
-                            tp2_hit = True
-
-                if (position == 'Long' and signal == 'Short') or \
-                        (position == 'Short' and signal == 'Al'):
-                    exit_price, exit_reason = open_price, "Karşıt Sinyal"
-
-                if exit_price is not None or position_size <= 0.01:
-                    if position_size > 0:
-                        ret = ((exit_price - entry_price) / entry_price * 100) if position == 'Long' else (
-                                (entry_price - exit_price) / entry_price * 100)
-                        ret -= strategy_params['commission_pct']
-                        trades.append({'Pozisyon': f"{position} Kalan ({exit_reason})", 'Giriş Zamanı': entry_time,
-                                       'Çıkış Zamanı': time_idx, 'Giriş Fiyatı': entry_price,
-                                       'Çıkış Fiyatı': exit_price, 'Getiri (%)': round(ret, 2)})
-
-                    position, cooldown, position_size = None, strategy_params.get('cooldown_bars', 3), 0
-
-            if position is None:
-                entry_signal = None
-                if signal == 'Al' and strategy_params['signal_direction'] != 'Short':
-                    entry_signal = 'Long'
-                elif signal == 'Short' and strategy_params['signal_direction'] != 'Long':
-                    entry_signal = 'Short'
-
-                if entry_signal:
-                    position, entry_price, entry_time = entry_signal, open_price, time_idx
-                    position_size, tp1_hit, tp2_hit = 1.0, False, False
-
-                    if entry_signal == 'Long':
-                        stop_loss_price = entry_price * (1 - strategy_params['stop_loss_pct'] / 100) if strategy_params[
-                                                                                                            'atr_multiplier'] <= 0 else entry_price - (
-                                current_atr * strategy_params['atr_multiplier'])
-                        tp1_target = entry_price * (1 + strategy_params['tp1_pct'] / 100.0)
-                        tp2_target = entry_price * (1 + strategy_params['tp2_pct'] / 100.0)
-                    else:
-                        stop_loss_price = entry_price * (1 + strategy_params['stop_loss_pct'] / 100) if strategy_params[
-                                                                                                            'atr_multiplier'] <= 0 else entry_price + (
-                                current_atr * strategy_params['atr_multiplier'])
-                        tp1_target = entry_price * (1 - strategy_params['tp1_pct'] / 100.0)
-                        tp2_target = entry_price * (1 - strategy_params['tp2_pct'] / 100.0)
-
-        if trades:
-            trades_df = pd.DataFrame(trades)
-            trades_df['Sembol'] = symbol
-            all_results.append(trades_df)
-
-        st.session_state.backtest_data[symbol] = df
-        progress_bar.progress((i + 1) / len(symbols))
-
-    status_text.success("🚀 Backtest tamamlandı!")
-    if all_results:
-        st.session_state['backtest_results'] = pd.concat(all_results, ignore_index=True).sort_values("Giriş Zamanı")
-    else:
-        st.session_state['backtest_results'] = pd.DataFrame()
-
-
 def apply_selected_params(selected_params):
     st.session_state.rsi_buy_key = int(selected_params['rsi_buy'])
     st.session_state.rsi_sell_key = int(selected_params['rsi_sell'])
@@ -1091,174 +949,127 @@ def live_signal_loop(symbols, interval, params, delay=60):
         time.sleep(delay)
 
 
-def run_portfolio_optimization(symbols, interval, strategy_params):
-    st.info("""
-    Bu bölümde, stratejinizin en iyi performans gösteren parametrelerini bulmak için binlerce kombinasyonu test edebilirsiniz.
-    Lütfen optimize etmek istediğiniz hedefi ve parametrelerin test edileceği aralıkları seçin.
-    """)
-
-    st.subheader("1. Optimizasyon Hedefini Seçin")
-    optimization_target = st.selectbox(
-        "Hangi Metriğe Göre Optimize Edilsin?",
-        options=["Sharpe Oranı (Yıllık)", "Sortino Oranı (Yıllık)", "Calmar Oranı", "Maksimum Düşüş (Drawdown) (%)",
-                 "Toplam Getiri (%)"],
-        index=0,
-        help="Optimizasyon, seçtiğiniz bu metriği maksimize (veya Drawdown için minimize) etmeye çalışacaktır."
-    )
-
-    st.subheader("2. Parametre Test Aralıklarını Belirleyin")
-    param_col1, param_col2 = st.columns(2)
-    with param_col1:
-        st.write("Sinyal Parametreleri")
-        rsi_buy_range = st.slider("RSI Alış Eşiği Aralığı", 0, 50, (25, 35))
-        rsi_sell_range = st.slider("RSI Satış Eşiği Aralığı", 50, 100, (65, 75))
-        adx_thresh_range = st.slider("ADX Eşiği Aralığı", 10, 50, (20, 30))
-    with param_col2:
-        st.write("Risk Yönetimi Parametreleri")
-        atr_multiplier_range = st.slider("ATR Çarpanı Aralığı", 1.0, 5.0, (1.5, 2.5))
-        tp_pct_range = st.slider("Take Profit (%) Aralığı", 1.0, 20.0, (4.0, 8.0))
-
-    st.subheader("3. Optimizasyonu Başlatın")
-
-    if st.button("🚀 Optimizasyonu Başlat", type="primary"):
-        param_grid = {
-            'rsi_buy': range(rsi_buy_range[0], rsi_buy_range[1] + 1, 5),
-            'rsi_sell': range(rsi_sell_range[0], rsi_sell_range[1] + 1, 5),
-            'adx_threshold': range(adx_thresh_range[0], adx_thresh_range[1] + 1, 5),
-            'atr_multiplier': [round(x * 0.5, 1) for x in
-                               range(int(atr_multiplier_range[0] * 2), int(atr_multiplier_range[1] * 2) + 1)],
-            'take_profit_pct': [round(x * 1.0, 1) for x in range(int(tp_pct_range[0]), int(tp_pct_range[1]) + 1)]
-        }
+# Arka plan işlerinin ilerlemesi bu sıklıkla (saniye) yenilenir
+JOB_POLL_SECONDS = 2
 
-        keys, values = zip(*param_grid.items())
-        all_combinations = [dict(zip(keys, v)) for v in itertools.product(*values)]
 
-        max_tests = 200
-        if len(all_combinations) > max_tests:
-            test_combinations = random.sample(all_combinations, max_tests)
-        else:
-            test_combinations = all_combinations
-
-        results_list = []
-        progress_bar = st.progress(0)
-        status_text = st.empty()
-
-        for i, params_to_test in enumerate(test_combinations):
-            current_params = strategy_params.copy()
-            current_params.update(params_to_test)
-            current_params['stop_loss_pct'] = 0
-
-            all_trades = []
-            for symbol in symbols:
-                df = get_binance_klines(symbol=symbol, interval=interval, limit=1000)
-                if df is None or df.empty: continue
-
-                df = generate_all_indicators(df, **current_params)
-                df = generate_signals(df, **current_params)
-                if current_params['use_mta']:
-                    df_higher = get_binance_klines(symbol, current_params['higher_timeframe'], 1000)
-                    if df_higher is not None and not df_higher.empty:
-                        df = add_higher_timeframe_trend(df, df_higher, current_params['trend_ema_period'])
-                        df = filter_signals_with_trend(df)
-
-                trades = []
-                position = None
-                entry_price = 0
-                entry_time = None
-                stop_loss_price = 0
-                cooldown = 0
-
-                for k in range(1, len(df)):
-                    if cooldown > 0:
-                        cooldown -= 1
-                        continue
-
-                    prev_row = df.iloc[k - 1]
-                    current_row = df.iloc[k]
-
-                    signal = prev_row['Signal']
-                    open_price = current_row['Open']
-                    low_price = current_row['Low']
-                    high_price = current_row['High']
-                    time_idx = current_row.name
-                    current_atr = prev_row.get('ATR', 0)
-
-                    if position is not None:
-                        exit_price = None
-                        if current_params.get('use_trailing_stop', False) and current_atr > 0:
-                            if position == 'Long':
-                                new_stop_price = high_price - (current_atr * current_params['atr_multiplier'])
-                                if new_stop_price > stop_loss_price: stop_loss_price = new_stop_price
-                            elif position == 'Short':
-                                new_stop_price = low_price + (current_atr * current_params['atr_multiplier'])
-                                if new_stop_price < stop_loss_price: stop_loss_price = new_stop_price
-
-                        if position == 'Long':
-                            if low_price <= stop_loss_price:
-                                exit_price = stop_loss_price
-                            elif not current_params.get('use_trailing_stop', False) and high_price >= entry_price * (
-                                    1 + current_params['take_profit_pct'] / 100):
-                                exit_price = entry_price * (1 + current_params['take_profit_pct'] / 100)
-                            elif signal == 'Sat':
-                                exit_price = open_price
-
-                        elif position == 'Short':
-                            if high_price >= stop_loss_price:
-                                exit_price = stop_loss_price
-                            elif not current_params.get('use_trailing_stop', False) and low_price <= entry_price * (
-                                    1 - current_params['take_profit_pct'] / 100):
-                                exit_price = entry_price * (1 - current_params['take_profit_pct'] / 100)
-                            elif signal == 'Al':
-                                exit_price = open_price
-
-                        if exit_price is not None:
-                            gross_ret = ((exit_price - entry_price) / entry_price * 100) if position == 'Long' else (
-                                    (entry_price - exit_price) / entry_price * 100)
-
-                            commission_cost = current_params['commission_pct'] * 2
-                            ret = gross_ret - commission_cost
-
-                            trades.append({'Pozisyon': position, 'Giriş Zamanı': entry_time, 'Çıkış Zamanı': time_idx,
-                                           'Giriş Fiyatı': entry_price, 'Çıkış Fiyatı': exit_price,
-                                           'Getiri (%)': round(ret, 2)})
-                            position, cooldown = None, current_params['cooldown_bars']
-
-                    if position is None:
-                        if signal == 'Al' and current_params['signal_direction'] != 'Short':
-                            position, entry_price, entry_time = 'Long', open_price, time_idx
-                            if current_params['atr_multiplier'] > 0 and current_atr > 0:
-                                stop_loss_price = entry_price - (current_atr * current_params['atr_multiplier'])
-                        elif signal == 'Sat' and current_params['signal_direction'] != 'Long':
-                            position, entry_price, entry_time = 'Short', open_price, time_idx
-                            if current_params['atr_multiplier'] > 0 and current_atr > 0:
-                                stop_loss_price = entry_price + (current_atr * current_params['atr_multiplier'])
-
-                if trades:
-                    trades_df = pd.DataFrame(trades)
-                    all_trades.append(trades_df)
-
-            if all_trades:
-                final_trades = pd.concat(all_trades, ignore_index=True).dropna(subset=['Çıkış Zamanı'])
-                if not final_trades.empty:
-                    metrics, _, _ = analyze_backtest_results(final_trades)
-                    result_row = params_to_test.copy()
-                    for key, val in metrics.items():
-                        try:
-                            result_row[key] = float(str(val).replace('%', ''))
-                        except (ValueError, TypeError):
-                            result_row[key] = val
-                    results_list.append(result_row)
-
-            progress_bar.progress((i + 1) / len(test_combinations))
-            status_text.text(f"Test {i + 1}/{len(test_combinations)} tamamlandı.")
-
-        if results_list:
-            results_df = pd.DataFrame(results_list)
-            is_ascending = True if optimization_target == "Maksimum Düşüş (Drawdown) (%)" else False
-            sorted_results = results_df.sort_values(by=optimization_target, ascending=is_ascending).head(10)
-            st.session_state.optimization_results = sorted_results
-
-        status_text.success("✅ Optimizasyon tamamlandı!")
+def submit_job(label, kind, params):
+    """
+    İşi arka plan kuyruğuna ekler ve kimliğini oturumda saklar (hesaplama işçi süreçlerinde yapılır).
+    Profil modu açıksa ölçüm işçide yapılır ve rapor sonuçla birlikte gelir.
+    """
+    if 'strategy_params' in params:
+        # Telegram bilgileri hesaplamada kullanılmaz; kuyruk veritabanına yazılmaz
+        params = dict(params, strategy_params={k: v for k, v in params['strategy_params'].items()
+                                               if k not in ('telegram_token', 'telegram_chat_id')})
+    if st.session_state.get('profile_mode'):
+        params = dict(params, profile={'label': label, 'cprofile': st.session_state.get('profile_cprofile', True)})
+    if 'job_owner' not in st.session_state:
+        st.session_state.job_owner = uuid.uuid4().hex
+    job_id = get_job_queue().submit(kind, params, owner=st.session_state.job_owner)
+    # Sözlükler her oturum için ayrı oluşturulur (DEFAULTS'taki nesneler oturumlar arasında paylaşılır)
+    jobs = dict(st.session_state.get('jobs') or {})
+    jobs[label] = job_id
+    st.session_state.jobs = jobs
+    return job_id
+
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def _poll_job(label, job_id):
+    """Çalışan işin ilerlemesini gösterir; iş bitince sonucun yüklenmesi için sayfayı yeniden çalıştırır."""
+    queue = get_job_queue()
+    job = queue.get(job_id)
+    if job is None or job['status'] not in ACTIVE_STATUSES:
+        st.rerun()
+    if not queue.active_workers():
+        st.warning("⚠️ Çalışan iş işçisi yok. İş, `python job_queue.py worker` ile bir işçi başlatılana kadar "
+                   "kuyrukta bekleyecek.")
+    st.progress(min(max(job['progress'], 0.0), 1.0), text=f"{label}: {job['message'] or ''}")
+    if st.button("⏹️ İptal Et", key=f"cancel_job_{label}"):
+        queue.cancel(job_id)
+
+
+def render_job_status(label, on_result):
+    """
+    Oturumun bu etiketle gönderdiği son işin durumunu gösterir. İş tamamlandığında sonuç bir kez
+    on_result(sonuç) ile oturuma yüklenir; sayfa yenilense veya tarayıcı kapansa da iş işçide devam eder.
+    """
+    job_id = (st.session_state.get('jobs') or {}).get(label)
+    if not job_id:
+        return
+    queue = get_job_queue()
+    job = queue.get(job_id)
+    if job is None:
+        st.warning(f"{label} işi kuyrukta bulunamadı (silinmiş olabilir).")
+        return
+    if job['status'] in ACTIVE_STATUSES:
+        _poll_job(label, job_id)
+        return
+    if job['status'] == 'failed':
+        st.error(f"❌ {label} başarısız oldu: {job['message']}")
+        with st.expander("Hata Ayrıntısı"):
+            st.code(job['error'] or "")
+        return
+    if job['status'] == 'cancelled':
+        st.info(f"⏹️ {label} iptal edildi.")
+        return
+
+    loaded = dict(st.session_state.get('jobs_loaded') or {})
+    if loaded.get(label) == job_id:
+        return
+    result = queue.fetch_result(job_id) or {}
+    on_result(result)
+    if result.get('profile'):
+        reports = dict(st.session_state.get('profile_reports') or {})
+        reports[label] = result['profile']
+        st.session_state.profile_reports = reports
+    for symbol in result.get('missing_symbols', []):
+        st.warning(f"{symbol} için veri alınamadı.")
+    loaded[label] = job_id
+    st.session_state.jobs_loaded = loaded
+    st.success(f"✅ {label} tamamlandı!")
+
+
+def _load_backtest_result(result):
+    st.session_state['backtest_results'] = result.get('trades', pd.DataFrame())
+    st.session_state.backtest_data = result.get('signal_frames', {})
+
+
+def _load_optimization_result(result):
+    results_df = result.get('results')
+    if results_df is not None and not results_df.empty:
+        st.session_state.optimization_results = results_df
+    if result.get('cached'):
+        st.info(f"💾 {result['evaluated']} kombinasyonun {result['cached']} tanesi daha önceki taramalardan alındı, "
+                f"sadece yeniler hesaplandı.")
+
+
+def _load_walk_forward_result(result):
+    st.session_state.walk_forward_results = result
+
+
+def _load_rl_training_result(result):
+    st.success(f"Eğitilmiş model '{result.get('model_name')}' veritabanına kaydedildi.")
+    st.balloons()
+
+
+def render_profile_report(label):
+    """Son profil raporunu aşama dağılımı, en pahalı fonksiyonlar ve indirilebilir .prof dosyası olarak gösterir."""
+    report = st.session_state.get('profile_reports', {}).get(label)
+    if not report:
+        return
+    with st.expander(f"⏱️ Profil Raporu: {label} ({report['wall_time']:.2f} sn)", expanded=True):
+        breakdown = pd.DataFrame(report['breakdown'])
+        st.plotly_chart(px.bar(breakdown, x='Süre (sn)', y='Aşama', orientation='h', text='Pay (%)'),
+                        use_container_width=True)
+        st.dataframe(breakdown, use_container_width=True, hide_index=True)
+        if report['top_functions']:
+            st.caption("En çok süre harcayan fonksiyonlar (kümülatif)")
+            st.code(report['top_functions'])
+            st.download_button("📥 Profil Dosyasını İndir (.prof)", data=report['profile_bytes'],
+                               file_name=f"profil_{label.lower()}_{datetime.now():%Y%m%d_%H%M%S}.prof",
+                               mime="application/octet-stream", key=f"profile_download_{label}",
+                               help="snakeviz veya `python -m pstats` ile açılabilir.")
 
 
 if page == "🔬 Kontrol Merkezi":
@@ -1930,19 +1741,37 @@ if page == "🔬 Kontrol Merkezi":
                 rl_timesteps = st.number_input("Eğitim Adım Sayısı", min_value=1000, max_value=100000, value=25000,
                                                step=1000)
 
+            with st.expander("⚡ Paralel Eğitim Ayarları"):
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    rl_extra_symbols = st.multiselect(
+                        "Ek Eğitim Sembolleri",
+                        options=[s for s in st.session_state.get('symbols_key', ["BTCUSDT"]) if s != rl_symbol],
+                        help="Ajan, seçilen tüm sembollerin geçmiş verisi üzerinde birlikte eğitilir.")
+                with col2:
+                    rl_n_envs = st.number_input("Paralel Ortam Sayısı", min_value=1, max_value=32, value=1, step=1,
+                                                help="1'den büyükse ortamlar ayrı süreçlerde çalışır.")
+                with col3:
+                    rl_episode_length = st.number_input(
+                        "Epizod Uzunluğu (bar, 0 = tüm veri)", min_value=0, max_value=1000, value=0, step=50,
+                        help="Verilirse her epizod verinin rastgele bir noktasından başlar.")
+                rl_batched = st.checkbox(
+                    "Toplu ortam (tek süreç, dizi işlemleri)", value=False,
+                    help="Tüm ortamları ayrı süreçler yerine tek süreçte NumPy ile aynı anda adımlar.")
+
             if st.button("🚀 Ajan Eğitimini Başlat", type="primary"):
-                with st.spinner(
-                        f"Lütfen bekleyin... RL ajanı **{rl_symbol}** verileri üzerinde **{rl_timesteps}** adım boyunca eğitiliyor..."):
-                    # Güncellenmiş fonksiyon çağrısı
-                    train_rl_agent(
-                        symbol=rl_symbol,
-                        interval=rl_interval,
-                        total_timesteps=rl_timesteps,
-                        strategy_params=strategy_params
-                    )
-                st.success("Eğitim başarıyla tamamlandı! Eğitilmiş model veritabanına kaydedildi.")
-                st.balloons()
-                st.rerun()
+                # Eğitim arka plan işçisinde çalışır; sayfa yenilense de devam eder
+                submit_job("RL Eğitimi", 'train_rl', {
+                    'symbol': rl_symbol,
+                    'interval': rl_interval,
+                    'total_timesteps': int(rl_timesteps),
+                    'strategy_params': strategy_params,
+                    'symbols': [rl_symbol] + rl_extra_symbols,
+                    'n_envs': int(rl_n_envs),
+                    'episode_length': int(rl_episode_length) or None,
+                    'batched': rl_batched
+                })
+            render_job_status("RL Eğitimi", _load_rl_training_result)
 
             st.markdown("---")
 
@@ -2087,7 +1916,10 @@ if page == "🧪 Deney Odası":
         
         # Ana Backtest Butonu
         if st.button("🚀 Portföy Backtest Başlat", type="primary"):
-            run_portfolio_backtest(symbols, interval, strategy_params)
+            submit_job("Backtest", 'backtest', {'symbols': symbols, 'interval': interval,
+                                                 'strategy_params': strategy_params})
+        render_job_status("Backtest", _load_backtest_result)
+        render_profile_report("Backtest")
 
         if 'backtest_results' in st.session_state and not st.session_state['backtest_results'].empty:
             portfolio_results = st.session_state['backtest_results'].copy()
@@ -2313,7 +2145,14 @@ if page == "🧪 Deney Odası":
 
         st.subheader("3. Optimizasyonu Başlatın")
         if st.button("🚀 Optimizasyonu Başlat", type="primary"):
-            run_portfolio_optimization(symbols, interval, strategy_params)
+            param_grid = build_param_grid(rsi_buy_range, rsi_sell_range, adx_thresh_range, atr_multiplier_range,
+                                          tp_pct_range)
+            submit_job("Optimizasyon", 'optimization', {
+                'symbols': symbols, 'interval': interval, 'strategy_params': strategy_params,
+                'optimization_target': optimization_target,
+                'param_grid': {key: list(values) for key, values in param_grid.items()}})
+        render_job_status("Optimizasyon", _load_optimization_result)
+        render_profile_report("Optimizasyon")
 
         if 'optimization_results' in st.session_state and not st.session_state.optimization_results.empty:
             st.subheader("🏆 En İyi Parametre Kombinasyonları")
@@ -2340,3 +2179,54 @@ if page == "🧪 Deney Odası":
                 on_click=apply_selected_params,
                 args=(results_df.loc[selected_index],)
             )
+
+        st.markdown("---")
+        st.subheader("5. Walk-Forward (Örneklem Dışı) Doğrulama")
+        st.caption("Veri ardışık eğitim/test pencerelerine bölünür: parametreler her eğitim penceresinde yukarıdaki "
+                   "aralıklarla optimize edilir, seçilen en iyi kombinasyon ardından gelen görülmemiş test "
+                   "penceresinde denenir. Göstergeler tüm geçmiş üzerinde hesaplandığından pencereler ısınmış "
+                   "göstergelerle başlar; eğitim skorları aynı aralıktaki bağımsız optimizasyonla birebir "
+                   "karşılaştırılamaz. Kayıtlı veri (data klasörü) varsa uzun geçmiş kullanılır.")
+        wf_col1, wf_col2, wf_col3, wf_col4 = st.columns(4)
+        with wf_col1:
+            wf_train_bars = st.number_input("Eğitim Penceresi (mum)", min_value=100, max_value=100000, value=500,
+                                            step=50)
+        with wf_col2:
+            wf_test_bars = st.number_input("Test Penceresi (mum)", min_value=20, max_value=50000, value=150, step=10)
+        with wf_col3:
+            wf_data_dir = st.text_input("Kayıtlı Veri Klasörü", value="data")
+        with wf_col4:
+            wf_workers = st.number_input("Paralel Süreç", min_value=1, max_value=os.cpu_count() or 1,
+                                         value=min(4, os.cpu_count() or 1))
+        wf_anchored = st.checkbox("Genişleyen eğitim penceresi (her zaman verinin başından)", value=False)
+
+        if st.button("🪟 Walk-Forward Başlat"):
+            param_grid = build_param_grid(rsi_buy_range, rsi_sell_range, adx_thresh_range, atr_multiplier_range,
+                                          tp_pct_range)
+            submit_job("Walk-Forward", 'walk_forward', {
+                'symbols': symbols, 'interval': interval, 'strategy_params': strategy_params,
+                'optimization_target': optimization_target,
+                'param_grid': {key: list(values) for key, values in param_grid.items()},
+                'train_bars': int(wf_train_bars), 'test_bars': int(wf_test_bars), 'anchored': wf_anchored,
+                'data_dir': wf_data_dir, 'workers': int(wf_workers)})
+        render_job_status("Walk-Forward", _load_walk_forward_result)
+        render_profile_report("Walk-Forward")
+
+        wf_results = st.session_state.get('walk_forward_results')
+        if wf_results and not wf_results['windows'].empty:
+            oos_metrics = wf_results['oos_metrics']
+            m1, m2, m3, m4 = st.columns(4)
+            m1.metric("Örneklem Dışı Getiri", f"{oos_metrics.get('Toplam Getiri (%)', 0):.2f}%")
+            m2.metric("Örneklem Dışı Sharpe", f"{oos_metrics.get('Sharpe Oranı (Yıllık)', 0):.2f}")
+            m3.metric("Maksimum Düşüş", f"{oos_metrics.get('Maksimum Düşüş (Drawdown) (%)', 0):.2f}%")
+            m4.metric("İşlem Sayısı", oos_metrics.get('Toplam İşlem', 0))
+
+            windows_df = wf_results['windows']
+            target_cols = [f"Eğitim {optimization_target}", f"Test {optimization_target}"]
+            if all(col in windows_df.columns for col in target_cols):
+                chart_df = windows_df.melt(id_vars='Pencere', value_vars=target_cols, var_name='Dilim',
+                                           value_name=optimization_target)
+                st.plotly_chart(px.bar(chart_df, x='Pencere', y=optimization_target, color='Dilim', barmode='group',
+                                       title="Pencere Bazında Eğitim ve Test Sonuçları"),
+                                use_container_width=True)
+            st.dataframe(windows_df, use_container_width=True, hide_index=True)
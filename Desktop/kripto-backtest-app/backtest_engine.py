@@ -0,0 +1,410 @@
+# backtest_engine.py (Arayüzden Bağımsız Backtest ve Optimizasyon Çekirdeği)
+#
+# app.py'deki portföy backtest'i ve parametre optimizasyonu bu fonksiyonları kullanır; Streamlit'e
+# bağımlı olmadıkları için komut satırından ve benchmark paketinden (benchmarks/) de çalıştırılabilirler.
+
+import itertools
+import random
+
+import pandas as pd
+
+from indicators import generate_all_indicators, required_indicators
+from optimization_store import sweep_context
+from profiling import stage
+from signals import generate_signals, add_higher_timeframe_trend, filter_signals_with_trend
+from utils import analyze_backtest_results, get_binance_klines
+
+# Optimizasyonda test edilecek en fazla kombinasyon sayısı (fazlası rastgele örneklenir)
+MAX_OPTIMIZATION_TESTS = 200
+
+# Arayüzün (app.py DEFAULTS) varsayılanlarıyla aynı strateji parametreleri; JSON'da eksik olan anahtarlar buradan gelir
+DEFAULT_STRATEGY_PARAMS = {
+    'sma': 50, 'ema': 20, 'bb_period': 20, 'bb_std': 2.0,
+    'use_rsi': True, 'rsi_period': 14, 'rsi_buy': 30, 'rsi_sell': 70,
+    'use_macd': True, 'macd_fast': 12, 'macd_slow': 26, 'macd_signal': 9,
+    'use_bb': False, 'use_adx': False, 'adx_period': 14, 'adx_threshold': 25,
+    'use_stoch': False, 'stoch_k_period': 14, 'stoch_d_period': 3, 'stoch_buy_level': 20, 'stoch_sell_level': 80,
+    'use_vwap': False, 'use_ma_cross': False, 'ma_fast_period': 20, 'ma_slow_period': 50,
+    'stop_loss_pct': 0, 'atr_multiplier': 2.0, 'cooldown_bars': 3, 'signal_mode': 'or', 'signal_direction': 'Both',
+    'commission_pct': 0.1, 'tp1_pct': 5.0, 'tp1_size_pct': 50, 'tp2_pct': 10.0, 'tp2_size_pct': 50,
+    'move_sl_to_be': True, 'take_profit_pct': 5.0, 'use_puzzle_bot': False, 'use_ml': False,
+    'use_mta': True, 'higher_timeframe': '4h', 'trend_ema_period': 50, 'telegram_enabled': False,
+}
+
+# Eski config.json dosyalarında signal_mode alanına arayüzdeki yön etiketi yazılmış olabilir
+_DIRECTION_LABELS = {"Long Only": "Long", "Short Only": "Short", "Long & Short": "Both"}
+
+
+def resolve_strategy_params(params):
+    """
+    JSON'dan okunan strateji parametrelerini varsayılanlarla tamamlar.
+    Eski formattaki yön etiketleri ("Long & Short" vb.) signal_direction'a taşınır, signal_mode 'or' olur.
+    """
+    resolved = dict(DEFAULT_STRATEGY_PARAMS)
+    resolved.update(params or {})
+    if resolved.get('signal_mode') in _DIRECTION_LABELS:
+        if 'signal_direction' not in (params or {}):
+            resolved['signal_direction'] = _DIRECTION_LABELS[resolved['signal_mode']]
+        resolved['signal_mode'] = 'or'
+    if not resolved.get('use_mta'):
+        resolved['higher_timeframe'] = None
+    return resolved
+
+
+def prepare_signals(df, params, df_higher=None, required=None):
+    """
+    Göstergeleri ve sinyalleri üretir; use_mta açıksa ve üst zaman dilimi verisi varsa trend filtresini uygular.
+    required verilmezse sadece stratejinin kullandığı göstergeler hesaplanır.
+    """
+    if required is None:
+        required = required_indicators(params)
+    with stage('indicators'):
+        df = generate_all_indicators(df, required=required, **params)
+    with stage('signals'):
+        df = generate_signals(df, **params)
+    if params.get('use_mta', False) and df_higher is not None and not df_higher.empty:
+        with stage('mta_merge'):
+            df = add_higher_timeframe_trend(df, df_higher, params['trend_ema_period'])
+            df = filter_signals_with_trend(df)
+    return df
+
+
+def simulate_backtest_trades(df, strategy_params):
+    """
+    Kademeli Kâr Alma (TP1/TP2) ve Stop'u Başa Çekme özelliklerini içeren bar bar simülasyon.
+    Sinyal bir önceki barda üretilir, işlem bu barın açılışında yapılır. Dönüş: işlem sözlükleri listesi.
+    """
+    trades = []
+    position, entry_price, entry_time, stop_loss_price, cooldown = None, 0, None, 0, 0
+    position_size = 0
+    tp1_target, tp2_target = 0, 0
+    tp1_hit, tp2_hit = False, False
+
+    for k in range(1, len(df)):
+        if cooldown > 0:
+            cooldown -= 1
+            continue
+
+        prev_row, current_row = df.iloc[k - 1], df.iloc[k]
+        signal, open_price, low_price, high_price = prev_row['Signal'], current_row['Open'], current_row['Low'], \
+            current_row['High']
+        time_idx, current_atr = current_row.name, prev_row.get('ATR', 0)
+
+        if position is not None:
+            exit_price, exit_reason = None, ""
+
+            if (position == 'Long' and low_price <= stop_loss_price) or \
+                    (position == 'Short' and high_price >= stop_loss_price):
+                exit_price, exit_reason = stop_loss_price, "Stop-Loss"
+
+            else:
+                if position == 'Long':
+                    if not tp1_hit and high_price >= tp1_target:
+                        size_to_close = position_size * (strategy_params['tp1_size_pct'] / 100.0)
+                        position_size -= size_to_close
+                        ret = ((tp1_target - entry_price) / entry_price * 100) - strategy_params['commission_pct']
+                        trades.append({'Pozisyon': f"Long TP1 ({strategy_params['tp1_size_pct']}%)",
+                                       'Giriş Zamanı': entry_time, 'Çıkış Zamanı': time_idx,
+                                       'Giriş Fiyatı': entry_price, 'Çıkış Fiyatı': tp1_target,
+                                       'Getiri (%)': round(ret, 2)})
+                        tp1_hit = True
+                        if strategy_params['move_sl_to_be']:
+                            stop_loss_price = entry_price
+
+                    if not tp2_hit and high_price >= tp2_target:
+                        size_to_close = position_size * (strategy_params['tp2_size_pct'] / 100.0)
+                        position_size -= size_to_close
+                        ret = ((tp2_target - entry_price) / entry_price * 100) - strategy_params['commission_pct']
+                        trades.append({'Pozisyon': f"Long TP2 ({strategy_params['tp2_size_pct']}%)",
+                                       'Giriş Zamanı': entry_time, 'Çıkış Zamanı': time_idx,
+                                       'Giriş Fiyatı': entry_price, 'Çıkış Fiyatı': tp2_target,
+                                       'Getiri (%)': round(ret, 2)})
+                        tp2_hit = True
+
+                elif position == 'Short':
+                    if not tp1_hit and low_price <= tp1_target:
+                        size_to_close = position_size * (strategy_params['tp1_size_pct'] / 100.0)
+                        position_size -= size_to_close
+                        ret = ((entry_price - tp1_target) / entry_price * 100) - strategy_params['commission_pct']
+                        trades.append({'Pozisyon': f"Short TP1 ({strategy_params['tp1_size_pct']}%)",
+                                       'Giriş Zamanı': entry_time, 'Çıkış Zamanı': time_idx,
+                                       'Giriş Fiyatı': entry_price, 'Çıkış Fiyatı': tp1_target,
+                                       'Getiri (%)': round(ret, 2)})
+                        tp1_hit = True
+                        if strategy_params['move_sl_to_be']:
+                            stop_loss_price = entry_price
+
+                    if not tp2_hit and low_price <= tp2_target:
+                        size_to_close = position_size * (strategy_params['tp2_size_pct'] / 100.0)
+                        position_size -= size_to_close
+                        ret = ((entry_price - tp2_target) / entry_price * 100) - strategy_params['commission_pct']
+                        trades.append({'Pozisyon': f"Short TP2 ({strategy_params['tp2_size_pct']}%)",
+                                       'Giriş Zamanı': entry_time, 'Çıkış Zamanı': time_idx,
+                                       'Giriş Fiyatı': entry_price, 'Çıkış Fiyatı': tp2_target,
+                                       'Getiri (%)': round(ret, 2)})
+                        tp2_hit = True
+
+            if (position == 'Long' and signal == 'Short') or \
+                    (position == 'Short' and signal == 'Al'):
+                exit_price, exit_reason = open_price, "Karşıt Sinyal"
+
+            if exit_price is not None or position_size <= 0.01:
+                if position_size > 0:
+                    ret = ((exit_price - entry_price) / entry_price * 100) if position == 'Long' else (
+                            (entry_price - exit_price) / entry_price * 100)
+                    ret -= strategy_params['commission_pct']
+                    trades.append({'Pozisyon': f"{position} Kalan ({exit_reason})", 'Giriş Zamanı': entry_time,
+                                   'Çıkış Zamanı': time_idx, 'Giriş Fiyatı': entry_price,
+                                   'Çıkış Fiyatı': exit_price, 'Getiri (%)': round(ret, 2)})
+
+                position, cooldown, position_size = None, strategy_params.get('cooldown_bars', 3), 0
+
+        if position is None:
+            entry_signal = None
+            if signal == 'Al' and strategy_params['signal_direction'] != 'Short':
+                entry_signal = 'Long'
+            elif signal == 'Short' and strategy_params['signal_direction'] != 'Long':
+                entry_signal = 'Short'
+
+            if entry_signal:
+                position, entry_price, entry_time = entry_signal, open_price, time_idx
+                position_size, tp1_hit, tp2_hit = 1.0, False, False
+
+                if entry_signal == 'Long':
+                    stop_loss_price = entry_price * (1 - strategy_params['stop_loss_pct'] / 100) if strategy_params[
+                                                                                                        'atr_multiplier'] <= 0 else entry_price - (
+                            current_atr * strategy_params['atr_multiplier'])
+                    tp1_target = entry_price * (1 + strategy_params['tp1_pct'] / 100.0)
+                    tp2_target = entry_price * (1 + strategy_params['tp2_pct'] / 100.0)
+                else:
+                    stop_loss_price = entry_price * (1 + strategy_params['stop_loss_pct'] / 100) if strategy_params[
+                                                                                                        'atr_multiplier'] <= 0 else entry_price + (
+                            current_atr * strategy_params['atr_multiplier'])
+                    tp1_target = entry_price * (1 - strategy_params['tp1_pct'] / 100.0)
+                    tp2_target = entry_price * (1 - strategy_params['tp2_pct'] / 100.0)
+
+    return trades
+
+
+def simulate_optimization_trades(df, current_params):
+    """
+    Optimizasyonda kullanılan sade simülasyon: tek hedef (take_profit_pct), ATR stop-loss ve isteğe bağlı
+    iz süren stop. Dönüş: işlem sözlükleri listesi.
+    """
+    trades = []
+    position = None
+    entry_price = 0
+    entry_time = None
+    stop_loss_price = 0
+    cooldown = 0
+
+    for k in range(1, len(df)):
+        if cooldown > 0:
+            cooldown -= 1
+            continue
+
+        prev_row = df.iloc[k - 1]
+        current_row = df.iloc[k]
+
+        signal = prev_row['Signal']
+        open_price = current_row['Open']
+        low_price = current_row['Low']
+        high_price = current_row['High']
+        time_idx = current_row.name
+        current_atr = prev_row.get('ATR', 0)
+
+        if position is not None:
+            exit_price = None
+            if current_params.get('use_trailing_stop', False) and current_atr > 0:
+                if position == 'Long':
+                    new_stop_price = high_price - (current_atr * current_params['atr_multiplier'])
+                    if new_stop_price > stop_loss_price: stop_loss_price = new_stop_price
+                elif position == 'Short':
+                    new_stop_price = low_price + (current_atr * current_params['atr_multiplier'])
+                    if new_stop_price < stop_loss_price: stop_loss_price = new_stop_price
+
+            if position == 'Long':
+                if low_price <= stop_loss_price:
+                    exit_price = stop_loss_price
+                elif not current_params.get('use_trailing_stop', False) and high_price >= entry_price * (
+                        1 + current_params['take_profit_pct'] / 100):
+                    exit_price = entry_price * (1 + current_params['take_profit_pct'] / 100)
+                elif signal == 'Sat':
+                    exit_price = open_price
+
+            elif position == 'Short':
+                if high_price >= stop_loss_price:
+                    exit_price = stop_loss_price
+                elif not current_params.get('use_trailing_stop', False) and low_price <= entry_price * (
+                        1 - current_params['take_profit_pct'] / 100):
+                    exit_price = entry_price * (1 - current_params['take_profit_pct'] / 100)
+                elif signal == 'Al':
+                    exit_price = open_price
+
+            if exit_price is not None:
+                gross_ret = ((exit_price - entry_price) / entry_price * 100) if position == 'Long' else (
+                        (entry_price - exit_price) / entry_price * 100)
+
+                commission_cost = current_params['commission_pct'] * 2
+                ret = gross_ret - commission_cost
+
+                trades.append({'Pozisyon': position, 'Giriş Zamanı': entry_time, 'Çıkış Zamanı': time_idx,
+                               'Giriş Fiyatı': entry_price, 'Çıkış Fiyatı': exit_price,
+                               'Getiri (%)': round(ret, 2)})
+                position, cooldown = None, current_params['cooldown_bars']
+
+        if position is None:
+            if signal == 'Al' and current_params['signal_direction'] != 'Short':
+                position, entry_price, entry_time = 'Long', open_price, time_idx
+                if current_params['atr_multiplier'] > 0 and current_atr > 0:
+                    stop_loss_price = entry_price - (current_atr * current_params['atr_multiplier'])
+            elif signal == 'Sat' and current_params['signal_direction'] != 'Long':
+                position, entry_price, entry_time = 'Short', open_price, time_idx
+                if current_params['atr_multiplier'] > 0 and current_atr > 0:
+                    stop_loss_price = entry_price + (current_atr * current_params['atr_multiplier'])
+
+    return trades
+
+
+def fetch_frames(symbols, interval, strategy_params, limit=1000, progress=None):
+    """
+    Semboller için Binance'ten mum verisini (use_mta açıksa üst zaman dilimini de) indirir.
+    progress(i, toplam, sembol) verilirse her sembolden önce çağrılır.
+    Dönüş: ({sembol: DataFrame}, {sembol: üst zaman dilimi DataFrame}, [veri alınamayan semboller])
+    """
+    frames, higher_frames, missing = {}, {}, []
+    for i, symbol in enumerate(symbols):
+        if progress:
+            progress(i + 1, len(symbols), symbol)
+        with stage('data_fetch'):
+            df = get_binance_klines(symbol=symbol, interval=interval, limit=limit)
+        if df is None or df.empty:
+            missing.append(symbol)
+            continue
+        frames[symbol] = df
+        if strategy_params.get('use_mta', False):
+            with stage('data_fetch'):
+                higher_frames[symbol] = get_binance_klines(symbol=symbol, interval=strategy_params['higher_timeframe'],
+                                                           limit=limit)
+    return frames, higher_frames, missing
+
+
+def run_backtest(frames, strategy_params, higher_frames=None, required=None, progress=None):
+    """
+    Portföy backtest'i: her sembol için sinyalleri üretir ve simüle eder.
+    frames: {sembol: OHLCV DataFrame}, higher_frames: {sembol: üst zaman dilimi DataFrame} (MTA için).
+    progress(i, toplam, sembol) verilirse her sembolden sonra çağrılır.
+    Dönüş: (tüm işlemler DataFrame'i, {sembol: sinyalli DataFrame})
+    """
+    higher_frames = higher_frames or {}
+    all_results = []
+    signal_frames = {}
+    for i, (symbol, df) in enumerate(frames.items()):
+        df = prepare_signals(df, strategy_params, higher_frames.get(symbol), required)
+        with stage('simulation'):
+            trades = simulate_backtest_trades(df, strategy_params)
+        if trades:
+            trades_df = pd.DataFrame(trades)
+            trades_df['Sembol'] = symbol
+            all_results.append(trades_df)
+        signal_frames[symbol] = df
+        if progress:
+            progress(i + 1, len(frames), symbol)
+    if all_results:
+        return pd.concat(all_results, ignore_index=True).sort_values("Giriş Zamanı"), signal_frames
+    return pd.DataFrame(), signal_frames
+
+
+def build_param_grid(rsi_buy_range, rsi_sell_range, adx_thresh_range, atr_multiplier_range, tp_pct_range):
+    """Arayüzdeki aralık seçimlerinden optimizasyon parametre ızgarasını oluşturur."""
+    return {
+        'rsi_buy': range(rsi_buy_range[0], rsi_buy_range[1] + 1, 5),
+        'rsi_sell': range(rsi_sell_range[0], rsi_sell_range[1] + 1, 5),
+        'adx_threshold': range(adx_thresh_range[0], adx_thresh_range[1] + 1, 5),
+        'atr_multiplier': [round(x * 0.5, 1) for x in
+                           range(int(atr_multiplier_range[0] * 2), int(atr_multiplier_range[1] * 2) + 1)],
+        'take_profit_pct': [round(x * 1.0, 1) for x in range(int(tp_pct_range[0]), int(tp_pct_range[1]) + 1)]
+    }
+
+
+def sample_combinations(param_grid, max_tests=MAX_OPTIMIZATION_TESTS, rng=random):
+    """Izgaradaki tüm kombinasyonları üretir; max_tests'ten fazlaysa rastgele örnekler."""
+    keys, values = zip(*param_grid.items())
+    all_combinations = [dict(zip(keys, v)) for v in itertools.product(*values)]
+    if len(all_combinations) > max_tests:
+        return rng.sample(all_combinations, max_tests)
+    return all_combinations
+
+
+def evaluate_combination(frames, strategy_params, params_to_test, higher_frames=None):
+    """Tek bir parametre kombinasyonunu tüm sembollerde test eder; metrik satırını (veya işlem yoksa None) döndürür."""
+    higher_frames = higher_frames or {}
+    current_params = strategy_params.copy()
+    current_params.update(params_to_test)
+    current_params['stop_loss_pct'] = 0
+
+    all_trades = []
+    for symbol, df in frames.items():
+        df = prepare_signals(df, current_params, higher_frames.get(symbol))
+        with stage('simulation'):
+            trades = simulate_optimization_trades(df, current_params)
+        if trades:
+            all_trades.append(pd.DataFrame(trades))
+
+    if not all_trades:
+        return None
+    return metrics_row(params_to_test, pd.concat(all_trades, ignore_index=True))
+
+
+def metrics_row(params_to_test, trades):
+    """Kapanmış işlemlerin metriklerini kombinasyon parametreleriyle tek satırda birleştirir (işlem yoksa None)."""
+    final_trades = trades.dropna(subset=['Çıkış Zamanı'])
+    if final_trades.empty:
+        return None
+    with stage('metrics'):
+        metrics, _, _ = analyze_backtest_results(final_trades)
+    result_row = params_to_test.copy()
+    for key, val in metrics.items():
+        try:
+            result_row[key] = float(str(val).replace('%', ''))
+        except (ValueError, TypeError):
+            result_row[key] = val
+    return result_row
+
+
+def run_optimization(frames, strategy_params, combinations, higher_frames=None, progress=None, store=None):
+    """
+    Kombinasyonları sırayla test eder. Veri bir kez verilir (kombinasyon başına yeniden indirilmez).
+    store (OptimizationStore) verilirse aynı veri ve sabit parametrelerle daha önce değerlendirilmiş kombinasyonlar
+    depodan okunur, yeniler hesaplandıkça depoya yazılır (yarıda kalan tarama kaldığı yerden devam eder).
+    progress(i, toplam) verilirse her kombinasyondan sonra çağrılır. Dönüş: sonuç DataFrame'i (sırasız).
+    """
+    cached, pending = {}, list(enumerate(combinations))
+    if store is not None:
+        tested = set().union(*(params.keys() for params in combinations)) if combinations else set()
+        context, fingerprint, base_params = sweep_context(frames, strategy_params, tested, higher_frames)
+        store.register_context(context, fingerprint, frames.keys(), base_params)
+        cached, pending = store.split_evaluated(context, combinations)
+        if progress and cached:
+            progress(len(cached), len(combinations))
+
+    rows = {index: row for index, row in cached.items() if row is not None}
+    for done, (index, params_to_test) in enumerate(pending, start=len(cached) + 1):
+        row = evaluate_combination(frames, strategy_params, params_to_test, higher_frames)
+        if store is not None:
+            store.record(context, fingerprint, params_to_test, row)
+        if row is not None:
+            rows[index] = row
+        if progress:
+            progress(done, len(combinations))
+    results_df = pd.DataFrame([rows[index] for index in sorted(rows)])
+    results_df.attrs['cached'] = len(cached)
+    return results_df
+
+
+def rank_results(results_df, optimization_target, top=10):
+    """Sonuçları hedef metriğe göre sıralar (Drawdown için küçükten büyüğe)."""
+    if results_df.empty:
+        return results_df
+    is_ascending = True if optimization_target == "Maksimum Düşüş (Drawdown) (%)" else False
+    return results_df.sort_values(by=optimization_target, ascending=is_ascending).head(top)
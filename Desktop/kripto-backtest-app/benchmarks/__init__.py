@@ -0,0 +1,5 @@
+# benchmarks (Gösterge / Backtest Performans Ölçümleri)
+#
+# Uygulama klasöründen çalıştırılır:
+#   python -m benchmarks.run --output benchmarks/results/yeni.json
+#   python -m benchmarks.compare benchmarks/results/onceki.json benchmarks/results/yeni.json
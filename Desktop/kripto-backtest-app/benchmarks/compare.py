@@ -0,0 +1,67 @@
+# benchmarks/compare.py (Ölçüm Sonuçlarını Karşılaştırma / Regresyon Kontrolü)
+#
+#   python -m benchmarks.compare benchmarks/results/onceki.json benchmarks/results/yeni.json --threshold 0.15
+# Herhangi bir ölçüm eşikten fazla yavaşladıysa çıkış kodu 1 olur (dağıtım öncesi kontrol için).
+
+import argparse
+import json
+import sys
+
+# Karşılaştırılan metrikler (hepsinde küçük değer daha iyidir)
+METRICS = ['min_s', 'latency_p99_ms']
+
+
+def load_results(path):
+    with open(path, encoding='utf-8') as f:
+        report = json.load(f)
+    return report.get('meta', {}), {(r['case'], r['bars']): r for r in report.get('results', [])}
+
+
+def compare(baseline, current, threshold=0.10):
+    """
+    Ortak (durum, mum sayısı) çiftlerini karşılaştırır.
+    Dönüş: [(durum, mum, metrik, önceki, yeni, oran, regresyon_mu)] listesi.
+    """
+    rows = []
+    for key in sorted(set(baseline) & set(current)):
+        for metric in METRICS:
+            old, new = baseline[key].get(metric), current[key].get(metric)
+            if old is None or new is None:
+                continue
+            ratio = new / old if old else float('inf') if new else 1.0
+            rows.append((key[0], key[1], metric, old, new, ratio, ratio > 1 + threshold))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="İki ölçüm sonucunu karşılaştırır")
+    parser.add_argument('baseline', help="Referans sonuç dosyası")
+    parser.add_argument('current', help="Yeni sonuç dosyası")
+    parser.add_argument('--threshold', type=float, default=0.10, help="İzin verilen yavaşlama oranı (0.10 = %%10)")
+    args = parser.parse_args(argv)
+
+    base_meta, baseline = load_results(args.baseline)
+    cur_meta, current = load_results(args.current)
+    print(f"Referans: {base_meta.get('git_commit')} ({base_meta.get('created_at')}), "
+          f"yeni: {cur_meta.get('git_commit')} ({cur_meta.get('created_at')})")
+    if base_meta.get('machine') != cur_meta.get('machine') or base_meta.get('versions') != cur_meta.get('versions'):
+        print("⚠️ Sonuçlar farklı makine veya paket sürümlerinde alınmış; karşılaştırma yanıltıcı olabilir.")
+
+    rows = compare(baseline, current, args.threshold)
+    if not rows:
+        print("Ortak ölçüm bulunamadı.")
+        return 0
+    for case, bars, metric, old, new, ratio, regressed in rows:
+        mark = "❌" if regressed else ("🚀" if ratio < 1 - args.threshold else "  ")
+        print(f"{mark} {case:<26} {bars:>9,} {metric:<15} {old:>12.6g} -> {new:>12.6g}  x{ratio:.2f}")
+
+    regressions = [r for r in rows if r[6]]
+    if regressions:
+        print(f"❌ {len(regressions)} ölçümde eşikten (%{args.threshold * 100:.0f}) fazla yavaşlama var.")
+        return 1
+    print("✅ Regresyon yok.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
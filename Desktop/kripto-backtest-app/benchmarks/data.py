@@ -0,0 +1,46 @@
+# benchmarks/data.py (Ölçümler İçin Sentetik ve Kayıtlı OHLCV Verisi)
+
+import numpy as np
+import pandas as pd
+
+from kline_store import interval_to_timedelta, load_klines
+
+
+def synthetic_ohlcv(n_bars, interval='1h', seed=0):
+    """Geometrik rastgele yürüyüşle üretilen, tekrarlanabilir OHLCV verisi (ağ erişimi gerektirmez)."""
+    rng = np.random.default_rng(seed)
+    index = pd.date_range('2020-01-01', periods=n_bars, freq=interval_to_timedelta(interval))
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n_bars)))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    spread = np.abs(rng.normal(0, 0.004, n_bars)) * close
+    return pd.DataFrame({
+        'Open': open_, 'High': np.maximum(open_, close) + spread, 'Low': np.minimum(open_, close) - spread,
+        'Close': close, 'Volume': rng.uniform(100, 1000, n_bars)
+    }, index=index)
+
+
+def recorded_ohlcv(path, n_bars):
+    """
+    Kaydedilmiş veriden (kline_store formatı) son n_bars mumu döndürür.
+    Kayıt daha kısaysa fiyat yolu oranlarla uç uca eklenerek uzatılır; zaman damgaları ileri kaydırılır.
+    """
+    df = load_klines(path)
+    if len(df) >= n_bars:
+        return df.iloc[-n_bars:]
+    step = df.index[-1] - df.index[-2] if len(df) > 1 else pd.Timedelta(hours=1)
+    pieces, scale, offset = [], 1.0, pd.Timedelta(0)
+    while sum(len(p) for p in pieces) < n_bars:
+        piece = df.copy()
+        piece[['Open', 'High', 'Low', 'Close']] *= scale
+        piece.index = piece.index + offset
+        pieces.append(piece)
+        scale = piece['Close'].iloc[-1] / df['Close'].iloc[0]
+        offset = piece.index[-1] + step - df.index[0]
+    return pd.concat(pieces).iloc[:n_bars]
+
+
+def load_dataset(n_bars, source='synthetic', interval='1h', seed=0):
+    """source: 'synthetic' ya da kayıtlı veri dosyasının yolu."""
+    if source == 'synthetic':
+        return synthetic_ohlcv(n_bars, interval, seed)
+    return recorded_ohlcv(source, n_bars)
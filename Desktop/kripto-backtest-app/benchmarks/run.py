@@ -0,0 +1,235 @@
+# benchmarks/run.py (Sıcak Yol Performans Ölçümleri)
+#
+# Göstergeler, sinyaller, Puzzle stratejisi, backtest simülasyonu, optimizasyon taraması, RL ortamı adımı ve
+# canlı işçinin mesaj gecikmesi farklı mum sayılarında ölçülür; sonuçlar JSON olarak kaydedilir.
+# Ağ erişimi gerekmez. Örnek:
+#   python -m benchmarks.run --bars 1000 10000 --output benchmarks/results/yeni.json
+#   python -m benchmarks.run --full                  # 1M mum dahil (durum sınırları geçerli kalır)
+#   python -m benchmarks.run --data data/BTCUSDT_1h.parquet --cases backtest_loop
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.data import load_dataset
+
+DEFAULT_BARS = [1_000, 10_000, 100_000]
+FULL_BARS = [1_000, 10_000, 100_000, 1_000_000]
+
+# Ölçümlerde kullanılan strateji: RSI + MACD (OR), ATR stop-loss ve kademeli kâr alma
+BENCH_PARAMS = {
+    'sma': 50, 'ema': 20, 'bb_period': 20, 'bb_std': 2.0,
+    'use_rsi': True, 'rsi_period': 14, 'rsi_buy': 40, 'rsi_sell': 60,
+    'use_macd': True, 'macd_fast': 12, 'macd_slow': 26, 'macd_signal': 9,
+    'use_bb': False, 'use_adx': False, 'adx_period': 14, 'adx_threshold': 25,
+    'use_stoch': False, 'stoch_k_period': 14, 'stoch_d_period': 3, 'stoch_buy_level': 20, 'stoch_sell_level': 80,
+    'use_vwap': False, 'use_ma_cross': False, 'ma_fast_period': 20, 'ma_slow_period': 50,
+    'stop_loss_pct': 0, 'atr_multiplier': 2.0, 'cooldown_bars': 3, 'signal_mode': 'or',
+    'signal_direction': 'Both', 'commission_pct': 0.1,
+    'tp1_pct': 1.0, 'tp1_size_pct': 50, 'tp2_pct': 2.5, 'tp2_size_pct': 50, 'move_sl_to_be': True,
+    'take_profit_pct': 4.0, 'use_puzzle_bot': False, 'use_ml': False, 'use_mta': False,
+    'higher_timeframe': None, 'trend_ema_period': 50, 'telegram_enabled': False,
+}
+
+PUZZLE_CONFIG = {
+    'indicators': ['RSI', 'MACD', 'Bollinger', 'ADX'],
+    'weights': {'RSI': 0.25, 'MACD': 0.25, 'Bollinger': 0.25, 'ADX': 0.25},
+    'thresholds': {'RSI': {'buy': 30, 'sell': 70}, 'MACD': {}, 'Bollinger': {}, 'ADX': {'min': 20}},
+    'signal_mode': 'Long & Short',
+    'min_score': 0.5,
+}
+
+# Optimizasyon taramasında denenen kombinasyon sayısı
+SWEEP_COMBINATIONS = 5
+
+
+# --- Ölçüm durumları: prepare(df) -> (ölçülecek fonksiyon, ek bilgi sözlüğü) ---
+def _prepare_indicators(df):
+    from indicators import generate_all_indicators
+    return lambda: generate_all_indicators(df, **BENCH_PARAMS), {}
+
+
+def _prepare_signals(df):
+    from indicators import generate_all_indicators
+    from signals import generate_signals
+    frame = generate_all_indicators(df, **BENCH_PARAMS)
+    return lambda: generate_signals(frame, **BENCH_PARAMS), {}
+
+
+def _prepare_puzzle(df):
+    from indicators import generate_all_indicators
+    from puzzle_strategy import PuzzleStrategy
+    frame = generate_all_indicators(df, **BENCH_PARAMS)
+    strategy = PuzzleStrategy(PUZZLE_CONFIG)
+    return lambda: strategy.generate(frame), {}
+
+
+def _prepare_backtest_loop(df):
+    from backtest_engine import prepare_signals, simulate_backtest_trades
+    frame = prepare_signals(df, BENCH_PARAMS)
+    return lambda: simulate_backtest_trades(frame, BENCH_PARAMS), {}
+
+
+def _prepare_optimization(df):
+    from backtest_engine import build_param_grid, run_optimization, sample_combinations
+    grid = build_param_grid((25, 35), (65, 75), (20, 30), (1.5, 2.5), (4.0, 8.0))
+    combinations = sample_combinations(grid, max_tests=SWEEP_COMBINATIONS, rng=random.Random(0))
+    frames = {'BENCHUSDT': df}
+    return lambda: run_optimization(frames, BENCH_PARAMS, combinations), {'combinations': len(combinations)}
+
+
+def _prepare_env_step(df):
+    from trading_env import TradingEnv
+    env = TradingEnv(df, strategy_params=BENCH_PARAMS)
+    steps = env._n_steps - 1
+    actions = np.random.default_rng(0).integers(0, 3, steps)
+
+    def run():
+        env.reset(seed=0)
+        for action in actions:
+            _, _, done, _, _ = env.step(int(action))
+            if done:
+                env.reset()
+
+    return run, {'steps': int(steps)}
+
+
+def _prepare_on_message(df):
+    from replay import replay_strategies
+    frames = {'BENCHUSDT': df}
+    config = {'id': 'bench', 'name': 'Bench', 'symbols': list(frames), 'interval': '1h',
+              'strategy_params': BENCH_PARAMS, 'status': 'running', 'orchestrator_status': 'active',
+              'is_trading_enabled': True, 'rl_model_id': None}
+    extra = {}
+
+    def run():
+        stats, _, _ = replay_strategies([config], frames, '1h')
+        # Her tekrarda mesaj başına gecikme dağılımı güncellenir (son çalıştırmanınki kaydedilir)
+        extra.update({k: v for k, v in stats.items() if k.startswith('latency_')})
+        extra['messages'] = stats.get('messages')
+
+    return run, extra
+
+
+# ad -> (hazırlık fonksiyonu, varsayılan en fazla mum sayısı)
+CASES = {
+    'generate_all_indicators': (_prepare_indicators, 1_000_000),
+    'generate_signals': (_prepare_signals, 1_000_000),
+    'puzzle_generate': (_prepare_puzzle, 100_000),
+    'backtest_loop': (_prepare_backtest_loop, 100_000),
+    'optimization_sweep': (_prepare_optimization, 10_000),
+    'trading_env_step': (_prepare_env_step, 100_000),
+    # Canlı işçi sabit uzunlukta (201 mum) tampon kullandığı için mesaj gecikmesi geçmiş uzunluğundan bağımsızdır
+    'on_message': (_prepare_on_message, 2_000),
+}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _meta(args):
+    versions = {'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__}
+    try:
+        import numba
+        versions['numba'] = numba.__version__
+    except ImportError:
+        versions['numba'] = None
+    return {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'git_commit': _git_commit(),
+        'machine': platform.node(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'versions': versions,
+        'data': args.data,
+        'repeat': args.repeat,
+    }
+
+
+def run_case(name, df, repeat):
+    """Bir durumu hazırlar (süreye dahil değil) ve `repeat` kez çalıştırır; en iyi ve medyan süreyi döndürür."""
+    prepare, _ = CASES[name]
+    # Ölçülen kod yolları konsola yazabilir (ör. TradingEnv sütun listesi); çıktı bastırılır
+    with contextlib.redirect_stdout(io.StringIO()):
+        run, extra = prepare(df)
+        durations = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            durations.append(time.perf_counter() - start)
+    best = min(durations)
+    return {
+        'case': name,
+        'bars': len(df),
+        'min_s': round(best, 6),
+        'median_s': round(statistics.median(durations), 6),
+        'per_bar_us': round(best / len(df) * 1e6, 4),
+        **extra,
+    }
+
+
+def run_benchmarks(cases, bar_counts, data='synthetic', repeat=3, no_limit=False):
+    import native_indicators
+
+    # JIT derlemesi ilk ölçüme yansımasın
+    native_indicators.warmup()
+    results = []
+    for bars in bar_counts:
+        df = load_dataset(bars, data)
+        for name in cases:
+            if not no_limit and bars > CASES[name][1]:
+                continue
+            result = run_case(name, df, repeat)
+            results.append(result)
+            print(f"  {name:<26} {bars:>9,} mum  en iyi {result['min_s'] * 1000:10.2f} ms  "
+                  f"({result['per_bar_us']:.3f} µs/mum)", flush=True)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gösterge/backtest performans ölçümleri")
+    parser.add_argument('--cases', nargs='*', default=list(CASES), choices=list(CASES))
+    parser.add_argument('--bars', nargs='*', type=int, help="Mum sayıları (varsayılan: 1k 10k 100k)")
+    parser.add_argument('--full', action='store_true', help="1M mum dahil tüm boyutlar")
+    parser.add_argument('--no-limit', action='store_true', help="Durum başına en fazla mum sınırlarını kaldır")
+    parser.add_argument('--data', default='synthetic', help="'synthetic' ya da kayıtlı veri dosyası (parquet/csv)")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help="Sonuç dosyası (varsayılan: benchmarks/results/<zaman>.json)")
+    args = parser.parse_args(argv)
+
+    # Canlı işçinin kayıtları ve Streamlit'in arayüz dışı uyarıları ölçülen süreye ve konsola karışmasın
+    logging.disable(logging.WARNING)
+    bar_counts = args.bars or (FULL_BARS if args.full else DEFAULT_BARS)
+    output = args.output or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results',
+                                         f"{datetime.now():%Y%m%d-%H%M%S}.json")
+
+    print(f"⏱️ Ölçümler başlıyor: {len(args.cases)} durum, mum sayıları {bar_counts}")
+    results = run_benchmarks(args.cases, bar_counts, args.data, args.repeat, args.no_limit)
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({'meta': _meta(args), 'results': results}, f, indent=2, ensure_ascii=False)
+    print(f"✅ Sonuçlar kaydedildi: {output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
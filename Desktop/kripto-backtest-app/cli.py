@@ -0,0 +1,362 @@
+# cli.py (Arayüzsüz Backtest ve Optimizasyon Komut Satırı Aracı)
+#
+# Arayüzdeki portföy backtest'i ve parametre optimizasyonu, kayıtlı mum verisi (kline_store) üzerinde Streamlit
+# olmadan çalıştırılır; sonuçlar Parquet/CSV ve JSON olarak kaydedilir. Sunucuda cron ile büyük taramalar için:
+#   python cli.py backtest --params config.json --data-dir data --output-dir results/bt
+#   python cli.py optimize --params config.json --symbols BTCUSDT ETHUSDT --workers 8 --max-tests 500
+#   python cli.py optimize --params params.json --grid grid.json --target "Calmar Oranı" --format csv
+#   python cli.py walkforward --params config.json --train-bars 2000 --test-bars 500 --workers 4
+# Optimizasyonda değerlendirilen kombinasyonlar optimization_store'a yazılır; aynı komut yeniden çalıştırıldığında
+# (veya ızgara genişletildiğinde) sadece yeni kombinasyonlar hesaplanır.
+# --params tam bir config.json (strategy_params, symbols, interval) veya sadece parametre sözlüğü olabilir.
+
+import argparse
+import contextlib
+import json
+import logging
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from backtest_engine import (MAX_OPTIMIZATION_TESTS, build_param_grid, evaluate_combination, rank_results,
+                             resolve_strategy_params, run_backtest, sample_combinations)
+from kline_store import load_stored_frames
+from optimization_store import DEFAULT_STORE_PATH, OptimizationStore, sweep_context
+from walk_forward import run_walk_forward
+from utils import analyze_backtest_results
+
+OPTIMIZATION_TARGETS = ["Sharpe Oranı (Yıllık)", "Sortino Oranı (Yıllık)", "Calmar Oranı",
+                        "Maksimum Düşüş (Drawdown) (%)", "Toplam Getiri (%)"]
+
+# Optimizasyonda bir işçiye tek seferde verilen en fazla kombinasyon sayısı
+MAX_CHUNK_SIZE = 8
+
+# İşçi süreçlerinde bir kez kurulan veri ve parametreler (her görevde yeniden gönderilmez)
+_WORKER_STATE = {}
+
+
+# --- Girdi / çıktı ---
+def load_params_file(path):
+    """
+    Parametre JSON'unu okur. Dönüş: (strateji parametreleri, dosyadaki semboller veya None, zaman dilimi veya None).
+    """
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    if 'strategy_params' in data:
+        return data['strategy_params'], data.get('symbols'), data.get('interval')
+    return data, None, None
+
+
+def save_table(df, path, fmt):
+    """Tabloyu Parquet veya CSV olarak kaydeder; Parquet desteği yoksa CSV'ye düşer. Kaydedilen yolu döndürür."""
+    path = f"{path}.{fmt}"
+    if fmt == 'parquet':
+        try:
+            df.to_parquet(path, index=False)
+            return path
+        except ImportError:
+            path = path[:-len('.parquet')] + '.csv'
+            print(f"UYARI: Parquet desteği (pyarrow) bulunamadı, tablo CSV olarak kaydediliyor: {path}")
+    df.to_csv(path, index=False)
+    return path
+
+
+def _json_default(value):
+    if isinstance(value, (np.integer, np.floating, np.bool_)):
+        return value.item()
+    if isinstance(value, (pd.Timestamp, datetime)):
+        return value.isoformat()
+    if isinstance(value, range):
+        return list(value)
+    return str(value)
+
+
+def save_json(data, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False, default=_json_default)
+    return path
+
+
+def _clean_metrics(metrics):
+    """Metrikleri JSON'a uygun hale getirir (sonsuz/NaN değerler None olur)."""
+    cleaned = {}
+    for key, value in metrics.items():
+        if isinstance(value, (float, np.floating)) and not math.isfinite(value):
+            value = None
+        cleaned[key] = value
+    return cleaned
+
+
+# --- İşçi süreçleri ---
+def _init_worker(frames, higher_frames, strategy_params, verbose):
+    _WORKER_STATE.update(frames=frames, higher_frames=higher_frames, strategy_params=strategy_params)
+    if not verbose:
+        # Gösterge/sinyal fonksiyonlarının konsol çıktıları ve Streamlit uyarıları bastırılır
+        logging.disable(logging.WARNING)
+        sys.stdout = open(os.devnull, 'w')
+
+
+def _backtest_symbol(symbol):
+    state = _WORKER_STATE
+    trades, _ = run_backtest({symbol: state['frames'][symbol]}, state['strategy_params'], state['higher_frames'])
+    return symbol, trades
+
+
+def _evaluate_chunk(chunk):
+    state = _WORKER_STATE
+    return [(index, evaluate_combination(state['frames'], state['strategy_params'], params, state['higher_frames']))
+            for index, params in chunk]
+
+
+def _run_tasks(func, tasks, frames, higher_frames, strategy_params, workers, verbose, on_done):
+    """
+    Görevleri işçi süreçlerinde (workers > 1) veya aynı süreçte çalıştırır; her sonuç için on_done(sonuç) çağrılır.
+    Aynı süreçte çalışma profil modunun aşama sürelerini toplayabilmesi için gereklidir.
+    """
+    if workers <= 1:
+        _WORKER_STATE.update(frames=frames, higher_frames=higher_frames, strategy_params=strategy_params)
+        with open(os.devnull, 'w') as devnull:
+            for task in tasks:
+                with contextlib.redirect_stdout(sys.stdout if verbose else devnull):
+                    result = func(task)
+                on_done(result)
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(frames, higher_frames, strategy_params, verbose)) as executor:
+        futures = [executor.submit(func, task) for task in tasks]
+        for future in as_completed(futures):
+            on_done(future.result())
+
+
+# --- Komutlar ---
+def run_backtest_command(args, frames, higher_frames, strategy_params):
+    trades_by_symbol = {}
+
+    def _done(result):
+        symbol, trades = result
+        trades_by_symbol[symbol] = trades
+        print(f"  ⚙️ {symbol}: {len(trades)} işlem ({len(trades_by_symbol)}/{len(frames)})", flush=True)
+
+    _run_tasks(_backtest_symbol, list(frames), frames, higher_frames, strategy_params, args.workers, args.verbose,
+               _done)
+
+    # Semboller sırasıyla birleştirilir; sonuç işçi sayısından bağımsızdır
+    parts = [trades_by_symbol[s] for s in frames if not trades_by_symbol[s].empty]
+    if not parts:
+        print("⚠️ Hiç işlem oluşmadı.")
+        return {'trades': 0}
+    trades = pd.concat(parts, ignore_index=True).sort_values("Giriş Zamanı", kind='stable')
+    # Arayüzdeki gibi metrikler kapanmış işlemler üzerinden hesaplanır
+    closed = trades.dropna(subset=['Çıkış Zamanı'])
+    symbol_rows = [{'Sembol': symbol, **analyze_backtest_results(closed[closed['Sembol'] == symbol])[0]}
+                   for symbol in frames]
+
+    metrics, _, _ = analyze_backtest_results(closed)
+    written = [save_table(trades, os.path.join(args.output_dir, 'trades'), args.format),
+               save_table(pd.DataFrame(symbol_rows), os.path.join(args.output_dir, 'symbol_metrics'), args.format)]
+    summary = {'trades': len(trades), 'metrics': _clean_metrics(metrics)}
+    for key, value in metrics.items():
+        print(f"  {key:<32} {value:.4f}" if isinstance(value, float) else f"  {key:<32} {value}")
+    return dict(summary, files=written)
+
+
+def optimization_grid(args):
+    """Optimizasyon ızgarası: --grid JSON dosyası ({parametre: [değerler]}) ya da aralık seçenekleri."""
+    if args.grid:
+        with open(args.grid, encoding='utf-8') as f:
+            return {key: list(values) for key, values in json.load(f).items()}
+    return build_param_grid(tuple(args.rsi_buy), tuple(args.rsi_sell), tuple(args.adx_threshold),
+                            tuple(args.atr_multiplier), tuple(args.tp_pct))
+
+
+def run_optimize_command(args, frames, higher_frames, strategy_params):
+    grid = optimization_grid(args)
+    combinations = sample_combinations(grid, max_tests=args.max_tests, rng=random.Random(args.seed))
+
+    # Depoda aynı veri ve sabit parametrelerle değerlendirilmiş kombinasyonlar tekrar hesaplanmaz
+    store = None if args.no_store else OptimizationStore(args.store)
+    rows, pending = {}, list(enumerate(combinations))
+    if store is not None:
+        context, fingerprint, base_params = sweep_context(frames, strategy_params, set(grid), higher_frames)
+        store.register_context(context, fingerprint, frames.keys(), base_params)
+        cached, pending = store.split_evaluated(context, combinations)
+        rows = {index: row for index, row in cached.items() if row is not None}
+        print(f"💾 {len(cached)} kombinasyon depodan alındı ({args.store}).", flush=True)
+
+    # Her işçiye birkaç küçük paket düşecek şekilde bölünür (yük dengesi ve ilerleme bildirimi için); paketler
+    # küçük tutulur, kesintide en fazla bir paketlik sonuç kaybolur
+    chunk_size = max(1, min(MAX_CHUNK_SIZE, math.ceil(len(pending) / (max(args.workers, 1) * 4))))
+    chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+    print(f"🔬 {len(pending)}/{len(combinations)} kombinasyon test edilecek ({len(chunks)} paket, "
+          f"{args.workers} işçi)", flush=True)
+
+    done = [len(combinations) - len(pending)]
+
+    def _done(results):
+        for index, row in results:
+            done[0] += 1
+            # Sonuçlar geldikçe depoya yazılır; yarıda kesilen tarama kaldığı yerden devam eder
+            if store is not None:
+                store.record(context, fingerprint, combinations[index], row)
+            if row is not None:
+                rows[index] = row
+        print(f"  Test {done[0]}/{len(combinations)} tamamlandı.", flush=True)
+
+    _run_tasks(_evaluate_chunk, chunks, frames, higher_frames, strategy_params, args.workers, args.verbose, _done)
+
+    if not rows:
+        print("⚠️ Hiçbir kombinasyonda işlem oluşmadı.")
+        return {'combinations': len(combinations), 'results': 0}
+    # Kombinasyon sırasıyla birleştirilir; sıralama (rank_results) sonucu işçi sayısından bağımsızdır
+    results_df = pd.DataFrame([rows[i] for i in sorted(rows)])
+    ranked = rank_results(results_df, args.target, top=len(results_df))
+    written = [save_table(ranked, os.path.join(args.output_dir, 'optimization_results'), args.format)]
+    best = ranked.head(args.top)
+    print(best.to_string(index=False))
+    return {'combinations': len(combinations), 'computed': len(pending), 'results': len(results_df),
+            'target': args.target, 'best': [_clean_metrics(row) for row in best.to_dict('records')],
+            'files': written}
+
+
+def run_walkforward_command(args, frames, higher_frames, strategy_params):
+    combinations = sample_combinations(optimization_grid(args), max_tests=args.max_tests,
+                                       rng=random.Random(args.seed))
+    print(f"🪟 {len(combinations)} kombinasyon, eğitim {args.train_bars} / test {args.test_bars} mum", flush=True)
+    table, oos_trades, oos_metrics = run_walk_forward(
+        frames, strategy_params, combinations, args.train_bars, args.test_bars, args.step_bars, args.anchored,
+        higher_frames, args.target, args.workers,
+        progress=lambda done, total: print(f"  Pencere {done}/{total} tamamlandı.", flush=True),
+        verbose=args.verbose)
+
+    written = [save_table(table, os.path.join(args.output_dir, 'walk_forward_windows'), args.format)]
+    if not oos_trades.empty:
+        written.append(save_table(oos_trades, os.path.join(args.output_dir, 'oos_trades'), args.format))
+    print(table.to_string(index=False))
+    print("📊 Örneklem dışı (tüm test pencereleri birlikte):")
+    for key, value in oos_metrics.items():
+        print(f"  {key:<32} {value:.4f}" if isinstance(value, float) else f"  {key:<32} {value}")
+    return {'combinations': len(combinations), 'windows': len(table), 'target': args.target,
+            'oos_trades': len(oos_trades), 'oos_metrics': _clean_metrics(oos_metrics), 'files': written}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Arayüzsüz backtest / optimizasyon (kayıtlı mum verisi üzerinde)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--params', required=True, help="config.json veya strateji parametreleri JSON dosyası")
+    common.add_argument('--symbols', nargs='*', help="Semboller (varsayılan: parametre dosyasındaki liste)")
+    common.add_argument('--interval', help="Zaman dilimi (varsayılan: parametre dosyasındaki, yoksa 1h)")
+    common.add_argument('--data-dir', default='data', help="Kayıtlı veri klasörü (SEMBOL_ZAMAN.parquet|csv)")
+    common.add_argument('--data', nargs='*', default=[], help="SEMBOL=dosya.parquet|csv çiftleri")
+    common.add_argument('--bars', type=int, help="Her sembolün son N mumu kullanılır (varsayılan: tümü)")
+    common.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Paralel süreç sayısı")
+    common.add_argument('--output-dir', help="Sonuç klasörü (varsayılan: results/<komut>-<zaman>)")
+    common.add_argument('--format', choices=['parquet', 'csv'], default='parquet')
+    common.add_argument('--profile', action='store_true',
+                        help="Aşama sürelerini ve cProfile çıktısını kaydet (tek süreçte çalışır)")
+    common.add_argument('--verbose', action='store_true', help="Gösterge/sinyal konsol çıktılarını göster")
+
+    subparsers.add_parser('backtest', parents=[common], help="Portföy backtest'i")
+
+    # Parametre taraması yapan komutların (optimize, walkforward) ortak seçenekleri
+    sweep = argparse.ArgumentParser(add_help=False)
+    sweep.add_argument('--target', default=OPTIMIZATION_TARGETS[0], choices=OPTIMIZATION_TARGETS)
+    sweep.add_argument('--grid', help="Izgara JSON dosyası ({parametre: [değerler]}); verilirse aralıklar yok sayılır")
+    sweep.add_argument('--rsi-buy', nargs=2, type=int, default=[25, 35], metavar=('MIN', 'MAX'))
+    sweep.add_argument('--rsi-sell', nargs=2, type=int, default=[65, 75], metavar=('MIN', 'MAX'))
+    sweep.add_argument('--adx-threshold', nargs=2, type=int, default=[20, 30], metavar=('MIN', 'MAX'))
+    sweep.add_argument('--atr-multiplier', nargs=2, type=float, default=[1.5, 2.5], metavar=('MIN', 'MAX'))
+    sweep.add_argument('--tp-pct', nargs=2, type=float, default=[4.0, 8.0], metavar=('MIN', 'MAX'))
+    sweep.add_argument('--max-tests', type=int, default=MAX_OPTIMIZATION_TESTS,
+                       help="En fazla kombinasyon (fazlası rastgele örneklenir)")
+    sweep.add_argument('--seed', type=int, default=0, help="Kombinasyon örneklemesi için tohum")
+
+    optimize = subparsers.add_parser('optimize', parents=[common, sweep], help="Parametre optimizasyonu")
+    optimize.add_argument('--top', type=int, default=10, help="Özette gösterilecek en iyi sonuç sayısı")
+    optimize.add_argument('--store', default=DEFAULT_STORE_PATH,
+                          help="Değerlendirilmiş kombinasyonların kalıcı deposu (SQLite)")
+    optimize.add_argument('--no-store', action='store_true', help="Depoyu kullanma (tüm kombinasyonları hesapla)")
+
+    walkforward = subparsers.add_parser('walkforward', parents=[common, sweep],
+                                        help="Kayan pencereli walk-forward (örneklem dışı) doğrulama")
+    walkforward.add_argument('--train-bars', type=int, required=True, help="Eğitim penceresi uzunluğu (mum)")
+    walkforward.add_argument('--test-bars', type=int, required=True, help="Test penceresi uzunluğu (mum)")
+    walkforward.add_argument('--step-bars', type=int, help="Pencere kaydırma adımı (varsayılan: test uzunluğu)")
+    walkforward.add_argument('--anchored', action='store_true', help="Eğitim her zaman verinin başından başlasın")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not args.verbose:
+        # Streamlit'in arayüz dışı uyarıları (utils içe aktarılırken) cron çıktısına karışmasın
+        logging.disable(logging.WARNING)
+
+    raw_params, file_symbols, file_interval = load_params_file(args.params)
+    strategy_params = resolve_strategy_params(raw_params)
+    paths = dict(item.split('=', 1) for item in args.data)
+    symbols = args.symbols or (list(paths) if paths else None) or file_symbols
+    interval = args.interval or file_interval or '1h'
+    if not symbols:
+        parser.error("Sembol listesi bulunamadı (--symbols, --data veya config.json'daki symbols).")
+
+    frames, higher_frames, missing = load_stored_frames(symbols, interval, args.data_dir,
+                                                        strategy_params.get('higher_timeframe'), paths, args.bars)
+    for symbol in missing:
+        print(f"⚠️ {symbol} ({interval}) için kayıtlı veri yok, atlanıyor.")
+    if not frames:
+        print(f"❌ Hiç veri yüklenemedi ({args.data_dir}).")
+        return 1
+    if strategy_params.get('use_mta') and len(higher_frames) < len(frames):
+        print(f"⚠️ {len(frames) - len(higher_frames)} sembol için üst zaman dilimi "
+              f"({strategy_params['higher_timeframe']}) verisi yok; bu sembollerde trend filtresi uygulanmaz.")
+
+    args.output_dir = args.output_dir or os.path.join('results', f"{args.command}-{datetime.now():%Y%m%d-%H%M%S}")
+    os.makedirs(args.output_dir, exist_ok=True)
+    if args.profile:
+        args.workers = 1
+
+    command = {'backtest': run_backtest_command, 'optimize': run_optimize_command,
+               'walkforward': run_walkforward_command}[args.command]
+    print(f"🚀 {args.command}: {len(frames)} sembol, {interval}, {args.workers} işçi -> {args.output_dir}", flush=True)
+    started = time.perf_counter()
+    try:
+        if args.profile:
+            import profiling
+            with profiling.ProfileSession(args.command) as session:
+                summary = command(args, frames, higher_frames, strategy_params)
+            with open(os.path.join(args.output_dir, 'profile.prof'), 'wb') as f:
+                f.write(session.profile_bytes())
+            print(pd.DataFrame(session.breakdown()).to_string(index=False))
+        else:
+            summary = command(args, frames, higher_frames, strategy_params)
+    except ValueError as e:
+        # Ör. veri walk-forward pencereleri için yetersiz
+        print(f"❌ {e}")
+        return 1
+
+    save_json({
+        'command': args.command,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'duration_s': round(time.perf_counter() - started, 3),
+        'interval': interval,
+        'symbols': {s: {'bars': len(df), 'start': df.index[0], 'end': df.index[-1]} for s, df in frames.items()},
+        'missing_symbols': missing,
+        'strategy_params': strategy_params,
+        **summary,
+    }, os.path.join(args.output_dir, 'summary.json'))
+    print(f"✅ Sonuçlar kaydedildi: {args.output_dir}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -288,6 +288,36 @@ def get_rl_model_by_id(model_id):
         cursor.close()
         conn.close()
 
+def get_rl_model_fingerprint(model_id):
+    """
+    Bir RL modelinin içerik özetini (SHA-256) döndürür.
+    Özet veritabanında hesaplanır; model verisinin (LONGBLOB) tamamı ağ üzerinden çekilmez.
+    """
+    conn = get_connection()
+    if conn is None:
+        return None
+
+    try:
+        cursor = conn.cursor(dictionary=True)
+
+        # Önce ID ile dene
+        cursor.execute("SELECT SHA2(model_data, 256) AS fingerprint FROM rl_models WHERE id = %s", (model_id,))
+        result = cursor.fetchone()
+
+        if not result:
+            # Name ile dene
+            cursor.execute("SELECT SHA2(model_data, 256) AS fingerprint FROM rl_models WHERE name = %s", (str(model_id),))
+            result = cursor.fetchone()
+
+        return result['fingerprint'] if result else None
+
+    except Exception as e:
+        print(f"--- [HATA] RL Modeli özeti alınamadı: {e} ---")
+        return None
+    finally:
+        cursor.close()
+        conn.close()
+
 @st.cache_data(ttl=15)
 def get_all_rl_models_info():
     """Tüm RL modellerinin bilgilerini listeler."""
@@ -676,8 +706,11 @@ def issue_manual_action(strategy_id, symbol, action):
         cursor.close()
         conn.close()
 
-def get_and_clear_pending_actions(strategy_id):
-    """Bekleyen manuel işlemleri alır ve tamamlandı olarak işaretler."""
+def get_and_clear_pending_actions(strategy_id, symbols=None):
+    """
+    Bekleyen manuel işlemleri alır ve tamamlandı olarak işaretler.
+    symbols verilirse sadece bu sembollerin işlemleri alınır (parçalı/shard çalışmada her işçi kendi sembolleri için).
+    """
     conn = get_connection()
     if conn is None:
         return []
@@ -686,11 +719,18 @@ def get_and_clear_pending_actions(strategy_id):
         cursor = conn.cursor(dictionary=True)
         
         # Bekleyen işlemleri al
-        cursor.execute("""
+        query = """
             SELECT id, symbol, action
             FROM manual_actions
             WHERE strategy_id = %s AND status = 'pending'
-        """, (strategy_id,))
+        """
+        query_params = [strategy_id]
+        if symbols is not None:
+            if not symbols:
+                return []
+            query += f" AND symbol IN ({', '.join(['%s'] * len(symbols))})"
+            query_params.extend(symbols)
+        cursor.execute(query, tuple(query_params))
         
         results = cursor.fetchall()
         actions = []
@@ -0,0 +1,287 @@
+# feature_hub.py (Stratejiler Arası Paylaşılan Mum Tamponu ve Gösterge Hesaplama)
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+import native_indicators as nt
+from indicators import COLUMN_GROUP, required_groups
+
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+# Canlı işçide sembol başına tutulan mum sayısı (multi_worker ile aynı)
+BUFFER_LENGTH = 201
+
+# generate_all_indicators ile aynı varsayılan parametreler
+INDICATOR_DEFAULTS = {
+    'ma_fast_period': 20, 'ma_slow_period': 50, 'sma': 50, 'ema': 20,
+    'bb_period': 20, 'bb_std': 2.0, 'rsi_period': 14,
+    'macd_fast': 12, 'macd_slow': 26, 'macd_signal': 9,
+    'adx_period': 14, 'stoch_k_period': 14, 'stoch_d_period': 3,
+}
+
+
+# --- Tekil gösterge hesaplamaları: (tür, parametreler...) -> {rol: dizi} (yerel NumPy/Numba çekirdekleri) ---
+def _compute_sma(df, length):
+    return {'value': nt.sma(df['Close'].to_numpy(), length)}
+
+
+def _compute_ema(df, length):
+    return {'value': nt.ema(df['Close'].to_numpy(), length)}
+
+
+def _compute_bbands(df, length, std):
+    lower, mid, upper = nt.bbands(df['Close'].to_numpy(), length, std)
+    return {'lower': lower, 'mid': mid, 'upper': upper}
+
+
+def _compute_rsi(df, length):
+    return {'value': nt.rsi(df['Close'].to_numpy(), length)}
+
+
+def _compute_macd(df, fast, slow, signal):
+    macd, signal_line, _ = nt.macd(df['Close'].to_numpy(), fast, slow, signal)
+    return {'macd': macd, 'signal': signal_line}
+
+
+def _compute_adx(df, length):
+    return {'value': nt.adx(df['High'].to_numpy(), df['Low'].to_numpy(), df['Close'].to_numpy(), length)[0]}
+
+
+def _compute_stoch(df, k, d):
+    stoch_k, stoch_d = nt.stoch(df['High'].to_numpy(), df['Low'].to_numpy(), df['Close'].to_numpy(), k, d)
+    return {'k': stoch_k, 'd': stoch_d}
+
+
+def _compute_vwap(df):
+    try:
+        return {'value': nt.vwap(df['High'].to_numpy(), df['Low'].to_numpy(), df['Close'].to_numpy(),
+                                 df['Volume'].to_numpy(), nt.period_keys(df.index))}
+    except Exception:
+        return {'value': None}  # generate_all_indicators ile aynı: sütun pd.NA olur
+
+
+def _compute_atr(df, length):
+    return {'value': nt.atr(df['High'].to_numpy(), df['Low'].to_numpy(), df['Close'].to_numpy(), length)}
+
+
+_COMPUTE = {
+    'sma': _compute_sma, 'ema': _compute_ema, 'bbands': _compute_bbands, 'rsi': _compute_rsi,
+    'macd': _compute_macd, 'adx': _compute_adx, 'stoch': _compute_stoch, 'vwap': _compute_vwap,
+    'atr': _compute_atr,
+}
+
+
+def indicator_plan(params=None, required=None):
+    """
+    Strateji parametrelerinden (sütun, gösterge anahtarı, çıktı rolü) listesini üretir.
+    Sıra ve sütun adları generate_all_indicators ile aynıdır; aynı anahtarlı göstergeler bir kez hesaplanır.
+    required verilirse sadece istenen sütunların grupları plana girer (bkz. indicators.required_indicators).
+    """
+    groups = required_groups(required)
+    p = dict(INDICATOR_DEFAULTS)
+    p.update({k: v for k, v in (params or {}).items() if k in INDICATOR_DEFAULTS})
+    bbands = ('bbands', p['bb_period'], p['bb_std'])
+    macd = ('macd', p['macd_fast'], p['macd_slow'], p['macd_signal'])
+    stoch = ('stoch', p['stoch_k_period'], p['stoch_d_period'])
+    plan = [
+        ('SMA_fast', ('sma', p['ma_fast_period']), 'value'),
+        ('SMA_slow', ('sma', p['ma_slow_period']), 'value'),
+        ('SMA', ('sma', p['sma']), 'value'),
+        ('EMA', ('ema', p['ema']), 'value'),
+        ('bb_lband', bbands, 'lower'),
+        ('bb_mband', bbands, 'mid'),
+        ('bb_hband', bbands, 'upper'),
+        ('RSI', ('rsi', p['rsi_period']), 'value'),
+        ('MACD', macd, 'macd'),
+        ('MACD_signal', macd, 'signal'),
+        ('ADX', ('adx', p['adx_period']), 'value'),
+        ('Stoch_k', stoch, 'k'),
+        ('Stoch_d', stoch, 'd'),
+        ('VWAP', ('vwap',), 'value'),
+        ('ATR', ('atr', 14), 'value'),
+    ]
+    return [entry for entry in plan if COLUMN_GROUP[entry[0]] in groups]
+
+
+def compute_indicator(key, df):
+    """Tek bir göstergeyi hesaplar; çıktılar salt okunur numpy dizileri olarak döner (None: sütun pd.NA)."""
+    outputs = _COMPUTE[key[0]](df, *key[1:])
+    for array in outputs.values():
+        if array is not None:
+            array.flags.writeable = False
+    return outputs
+
+
+class _SymbolFeatures:
+    """Bir (sembol, zaman dilimi) için paylaşılan mum tamponu ve o tampon sürümüne ait gösterge önbelleği."""
+
+    def __init__(self, df):
+        self.df = df
+        self.version = 0
+        self.cache = {}
+        self.subscribers = 0
+        self.lock = threading.Lock()
+
+
+class FeatureHub:
+    """
+    Aynı (sembol, zaman dilimi) verisini izleyen stratejiler için tek mum tamponu ve gösterge grafiği.
+
+    - Kapanan mum tampona bir kez eklenir; aynı mumu bildiren diğer stratejiler için işlem yapılmaz.
+    - Her farklı gösterge (tür + parametreler) her mumda bir kez hesaplanır; aynı periyotları kullanan
+      stratejiler aynı salt okunur dizileri alır. Mum başına maliyet strateji sayısıyla değil,
+      farklı gösterge sayısıyla artar.
+    """
+
+    def __init__(self, buffer_length=BUFFER_LENGTH):
+        self.buffer_length = buffer_length
+        self._symbols = {}
+        self._lock = threading.Lock()
+        self.stats = {'computed': 0, 'reused': 0, 'candles': 0, 'duplicate_candles': 0, 'stale_candles': 0}
+
+    def subscribe(self, symbol, interval, initial_df):
+        """
+        Sembolü izlemeye başlar ve paylaşılan mum tamponunu döndürür.
+        Tampon zaten varsa (başka strateji izliyorsa) mevcut tampon kullanılır; initial_df sadece ilk abonede alınır.
+        """
+        with self._lock:
+            features = self._symbols.get((symbol, interval))
+            if features is None:
+                df = initial_df[OHLCV_COLUMNS].iloc[-self.buffer_length:]
+                features = self._symbols[(symbol, interval)] = _SymbolFeatures(df)
+            features.subscribers += 1
+            return features.df
+
+    def unsubscribe(self, symbol, interval):
+        with self._lock:
+            features = self._symbols.get((symbol, interval))
+            if features is None:
+                return
+            features.subscribers -= 1
+            if features.subscribers <= 0:
+                del self._symbols[(symbol, interval)]
+
+    def apply_kline(self, symbol, interval, kline):
+        """
+        Kapanan mumu paylaşılan tampona uygular ve güncel tamponu döndürür.
+        Aynı zaman damgalı mum aynı değerlerle tekrar gelirse tampon değişmez (diğer stratejilerin bildirimi).
+        Son mumdan eski (sırası bozuk) mumlar yok sayılır. Sembol izlenmiyorsa (abonelik bitmiş, geç gelen mesaj)
+        None döner.
+        """
+        features = self._symbols.get((symbol, interval))
+        if features is None:
+            return None
+        timestamp = pd.to_datetime(kline['t'], unit='ms')
+        row = [float(kline['o']), float(kline['h']), float(kline['l']), float(kline['c']), float(kline['v'])]
+        with features.lock:
+            df = features.df
+            if not df.empty and timestamp < df.index[-1]:
+                self.stats['stale_candles'] += 1
+                return df
+            if not df.empty and timestamp == df.index[-1]:
+                if df.iloc[-1].tolist() == row:
+                    self.stats['duplicate_candles'] += 1
+                    return df
+                # Tampon paylaşıldığı için yerinde değiştirilmez; yeni nesne oluşturulur
+                df = df.copy()
+                df.iloc[-1] = row
+            else:
+                df = pd.concat([df, pd.DataFrame([dict(zip(OHLCV_COLUMNS, row))], index=[timestamp])])
+            if len(df) > self.buffer_length:
+                df = df.iloc[1:]
+            features.df = df
+            features.version += 1
+            features.cache = {}
+            self.stats['candles'] += 1
+            return df
+
+    def indicator_arrays(self, symbol, interval, params=None, required=None):
+        """Stratejinin göstergelerini {sütun: salt okunur dizi} olarak döndürür (eksik gösterge sütunu yoktur)."""
+        features = self._symbols[(symbol, interval)]
+        with features.lock:
+            df = features.df
+            columns = {}
+            for column, key, role in indicator_plan(params, required):
+                outputs = features.cache.get(key)
+                if outputs is None:
+                    outputs = features.cache[key] = compute_indicator(key, df)
+                    self.stats['computed'] += 1
+                else:
+                    self.stats['reused'] += 1
+                if role in outputs:
+                    columns[column] = outputs[role]
+            return df, columns
+
+    def indicator_frame(self, symbol, interval, params=None, required=None):
+        """
+        generate_all_indicators(tampon, required=required, **params) ile aynı DataFrame'i döndürür;
+        göstergeler paylaşılan önbellekten gelir. Dönen DataFrame stratejiye aittir
+        (sinyal fonksiyonları üzerine sütun ekleyebilir).
+        """
+        df, columns = self.indicator_arrays(symbol, interval, params, required)
+        frame = df.copy()
+        for column, values in columns.items():
+            frame[column] = pd.NA if values is None else values
+        return frame
+
+
+_hub = None
+_hub_lock = threading.Lock()
+
+
+def get_feature_hub():
+    """Süreç genelinde paylaşılan gösterge merkezini döndürür."""
+    global _hub
+    with _hub_lock:
+        if _hub is None:
+            _hub = FeatureHub()
+        return _hub
+
+
+if __name__ == '__main__':
+    import time
+
+    from indicators import generate_all_indicators, required_indicators
+
+    rng = np.random.default_rng(0)
+    n = 260
+    index = pd.date_range('2024-01-01', periods=n, freq='1h')
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    data = pd.DataFrame({'Open': close * (1 + rng.normal(0, 0.001, n)), 'High': close * 1.004,
+                         'Low': close * 0.996, 'Close': close, 'Volume': rng.uniform(10, 100, n)}, index=index)
+
+    # 10 strateji: 8'i varsayılan periyotlarda RSI+MACD, 2'si farklı ayarlarda ve ATR stop-loss ile
+    strategies = [{'use_rsi': True, 'use_macd': True} for _ in range(8)] + [
+        {'use_rsi': True, 'rsi_period': 7, 'atr_multiplier': 2.0},
+        {'use_macd': True, 'use_adx': True, 'macd_fast': 8, 'macd_slow': 21}]
+    hub = FeatureHub()
+    for _ in strategies:
+        hub.subscribe('BTCUSDT', '1h', data.iloc[:200])
+
+    shared_time = separate_time = 0.0
+    for i in range(200, n):
+        row = data.iloc[i]
+        kline = {'t': int(index[i].value // 10 ** 6), 'o': row['Open'], 'h': row['High'], 'l': row['Low'],
+                 'c': row['Close'], 'v': row['Volume']}
+        start = time.perf_counter()
+        frames = []
+        for params in strategies:
+            buffer = hub.apply_kline('BTCUSDT', '1h', kline)
+            frames.append(hub.indicator_frame('BTCUSDT', '1h', params, required_indicators(params)))
+        shared_time += time.perf_counter() - start
+
+        # Eski yol: her strateji tüm göstergeleri kendisi hesaplar
+        start = time.perf_counter()
+        for params in strategies:
+            generate_all_indicators(buffer, **params)
+        separate_time += time.perf_counter() - start
+
+        for frame, params in zip(frames, strategies):
+            reference = generate_all_indicators(buffer, required=required_indicators(params), **params)
+            pd.testing.assert_frame_equal(frame, reference)
+
+    candles = n - 200
+    print(f"Her strateji ayrı hesaplarsa: {separate_time / candles * 1000:.1f} ms/mum, "
+          f"paylaşılan: {shared_time / candles * 1000:.1f} ms/mum")
+    print(f"İstatistik: {hub.stats}")
@@ -1,7 +1,84 @@
 
-import pandas_ta as ta
 import pandas as pd
 
+import native_indicators as nt
+
+# Her grup tek bir hesaplamayla üretilen sütunlardır; bir sütun istenirse grubun tamamı hesaplanır
+INDICATOR_GROUPS = {
+    'ma_cross': ['SMA_fast', 'SMA_slow'],
+    'sma': ['SMA'],
+    'ema': ['EMA'],
+    'bbands': ['bb_lband', 'bb_mband', 'bb_hband'],
+    'rsi': ['RSI'],
+    'macd': ['MACD', 'MACD_signal'],
+    'adx': ['ADX'],
+    'stoch': ['Stoch_k', 'Stoch_d'],
+    'vwap': ['VWAP'],
+    'atr': ['ATR'],
+}
+COLUMN_GROUP = {column: group for group, columns in INDICATOR_GROUPS.items() for column in columns}
+
+# Standart sinyal mantığında (signals.generate_signals) her bayrağın okuduğu sütunlar
+SIGNAL_FLAG_COLUMNS = {
+    'use_rsi': ['RSI'],
+    'use_macd': ['MACD', 'MACD_signal'],
+    'use_bb': ['bb_lband', 'bb_hband'],
+    'use_adx': ['ADX'],
+    'use_stoch': ['Stoch_k'],
+    'use_vwap': ['VWAP'],
+    'use_ma_cross': ['SMA_fast', 'SMA_slow'],
+}
+# Puzzle Bot'un 'indicators' listesindeki adların okuduğu sütunlar
+PUZZLE_INDICATOR_COLUMNS = {
+    'RSI': ['RSI'],
+    'MACD': ['MACD', 'MACD_signal'],
+    'Bollinger': ['bb_lband', 'bb_hband'],
+    'ADX': ['ADX'],
+}
+# Puzzle Bot'a yapılandırma verilmezse signals.generate_signals bu göstergeleri kullanır
+DEFAULT_PUZZLE_INDICATORS = ['RSI', 'MACD']
+# Grafik seçenekleri (plots.plot_chart); RSI paneli her zaman çizilir
+CHART_OPTION_COLUMNS = {
+    'show_sma': ['SMA'],
+    'show_ema': ['EMA'],
+    'show_bbands': ['bb_lband', 'bb_hband'],
+}
+CHART_BASE_COLUMNS = ['RSI']
+
+
+def required_indicators(params=None, chart_options=None):
+    """
+    Strateji parametrelerinin (ve verilirse grafik seçeneklerinin) gerçekten okuduğu gösterge sütunlarını döndürür.
+    generate_all_indicators(..., required=...) ile sadece bunlar hesaplanır.
+    """
+    params = params or {}
+    required = set()
+    if params.get('use_puzzle_bot', False):
+        puzzle_config = params.get('puzzle_config') or {}
+        for name in puzzle_config.get('indicators', DEFAULT_PUZZLE_INDICATORS):
+            required.update(PUZZLE_INDICATOR_COLUMNS.get(name, []))
+    else:
+        for flag, columns in SIGNAL_FLAG_COLUMNS.items():
+            if params.get(flag, False):
+                required.update(columns)
+    # ATR sadece ATR tabanlı stop-loss veya iz süren stop için gerekir
+    if (params.get('atr_multiplier') or 0) > 0 or params.get('use_trailing_stop', False):
+        required.add('ATR')
+    if chart_options is not None:
+        required.update(CHART_BASE_COLUMNS)
+        for option, columns in CHART_OPTION_COLUMNS.items():
+            if chart_options.get(option):
+                required.update(columns)
+    return required
+
+
+def required_groups(required=None):
+    """İstenen sütunların ait olduğu gösterge grupları (None: hepsi)."""
+    if required is None:
+        return set(INDICATOR_GROUPS)
+    return {COLUMN_GROUP[column] for column in required if column in COLUMN_GROUP}
+
+
 def generate_all_indicators(
         df,
         # --- YENİ EKLENEN SATIRLAR ---
@@ -19,55 +96,53 @@ def generate_all_indicators(
         adx_period=14,
         stoch_k_period=14,
         stoch_d_period=3,
+        required=None,
         **kwargs
 ):
     """
-    Tüm teknik göstergeleri hesaplar ve DataFrame'e ekler.
+    Teknik göstergeleri hesaplar ve DataFrame'e ekler.
+    required: hesaplanacak sütunlar (bkz. required_indicators); None ise tüm göstergeler hesaplanır.
     """
     df_copy = df.copy()
+    groups = required_groups(required)
+    # Hesaplamalar pandas_ta ile aynı formülleri uygulayan yerel (NumPy/Numba) çekirdeklerle yapılır
+    high, low, close = df_copy['High'].to_numpy(), df_copy['Low'].to_numpy(), df_copy['Close'].to_numpy()
 
     # --- YENİ: MA Kesişimi için Hızlı ve Yavaş Ortalamalar ---
-    df_copy['SMA_fast'] = ta.sma(df_copy['Close'], length=ma_fast_period)
-    df_copy['SMA_slow'] = ta.sma(df_copy['Close'], length=ma_slow_period)
+    if 'ma_cross' in groups:
+        df_copy['SMA_fast'] = nt.sma(close, ma_fast_period)
+        df_copy['SMA_slow'] = nt.sma(close, ma_slow_period)
     # --- EKLENECEK KISIM SONU ---
 
     # Grafikleme için tekil SMA ve EMA (Mevcut yapı korunuyor)
-    df_copy['SMA'] = ta.sma(df_copy['Close'], length=sma)
-    df_copy['EMA'] = ta.ema(df_copy['Close'], length=ema)
+    if 'sma' in groups:
+        df_copy['SMA'] = nt.sma(close, sma)
+    if 'ema' in groups:
+        df_copy['EMA'] = nt.ema(close, ema)
 
     # Bollinger Bantları
-    bbands = ta.bbands(df_copy['Close'], length=bb_period, std=bb_std)
-    if bbands is not None and not bbands.empty and len(bbands.columns) >= 3:
-        df_copy['bb_lband'] = bbands.iloc[:, 0]
-        df_copy['bb_mband'] = bbands.iloc[:, 1]
-        df_copy['bb_hband'] = bbands.iloc[:, 2]
+    if 'bbands' in groups:
+        df_copy['bb_lband'], df_copy['bb_mband'], df_copy['bb_hband'] = nt.bbands(close, bb_period, bb_std)
 
     # Diğer göstergeler (değişiklik yok)
-    df_copy['RSI'] = ta.rsi(df_copy['Close'], length=rsi_period)
-    macd = ta.macd(df_copy['Close'], fast=macd_fast, slow=macd_slow, signal=macd_signal)
-    if macd is not None and not macd.empty:
-        macd_col = next((col for col in macd.columns if col.startswith('MACD_')), None)
-        macds_col = next((col for col in macd.columns if col.startswith('MACDs_')), None)
-        if macd_col: df_copy['MACD'] = macd[macd_col]
-        if macds_col: df_copy['MACD_signal'] = macd[macds_col]
-
-    adx = ta.adx(df_copy['High'], df_copy['Low'], df_copy['Close'], length=adx_period)
-    if adx is not None and not adx.empty:
-        adx_col = next((col for col in adx.columns if col.startswith('ADX_')), None)
-        if adx_col: df_copy['ADX'] = adx[adx_col]
-
-    stoch = ta.stoch(df_copy['High'], df_copy['Low'], df_copy['Close'], k=stoch_k_period, d=stoch_d_period)
-    if stoch is not None and not stoch.empty:
-        stoch_k_col = next((col for col in stoch.columns if col.startswith('STOCHk_')), None)
-        stoch_d_col = next((col for col in stoch.columns if col.startswith('STOCHd_')), None)
-        if stoch_k_col: df_copy['Stoch_k'] = stoch[stoch_k_col]
-        if stoch_d_col: df_copy['Stoch_d'] = stoch[stoch_d_col]
-
-    try:
-        df_copy['VWAP'] = ta.vwap(df_copy['High'], df_copy['Low'], df_copy['Close'], df_copy['Volume'])
-    except Exception:
-        df_copy['VWAP'] = pd.NA
-
-    df_copy['ATR'] = ta.atr(df_copy['High'], df_copy['Low'], df_copy['Close'], length=14)
+    if 'rsi' in groups:
+        df_copy['RSI'] = nt.rsi(close, rsi_period)
+    if 'macd' in groups:
+        df_copy['MACD'], df_copy['MACD_signal'], _ = nt.macd(close, macd_fast, macd_slow, macd_signal)
+
+    if 'adx' in groups:
+        df_copy['ADX'] = nt.adx(high, low, close, adx_period)[0]
+
+    if 'stoch' in groups:
+        df_copy['Stoch_k'], df_copy['Stoch_d'] = nt.stoch(high, low, close, stoch_k_period, stoch_d_period)
+
+    if 'vwap' in groups:
+        try:
+            df_copy['VWAP'] = nt.vwap(high, low, close, df_copy['Volume'].to_numpy(), nt.period_keys(df_copy.index))
+        except Exception:
+            df_copy['VWAP'] = pd.NA
+
+    if 'atr' in groups:
+        df_copy['ATR'] = nt.atr(high, low, close, 14)
 
     return df_copy
\ No newline at end of file
@@ -0,0 +1,511 @@
+# job_queue.py (Uzun Süren Arayüz İşleri İçin Kalıcı İş Kuyruğu ve İşçi Süreçleri)
+#
+# Backtest, optimizasyon, walk-forward ve RL eğitimi Streamlit isteği içinde çalışmaz: arayüz işi SQLite kuyruğuna ekler,
+# ayrı işçi süreçleri işi alıp çalıştırır, ilerlemeyi ve sonucu veritabanına yazar. Arayüz iş kimliğiyle
+# ilerlemeyi sorgular ve sonucu alır; tarayıcı kapansa da iş devam eder, birden fazla kullanıcı aynı işçileri paylaşır.
+#   python job_queue.py worker --processes 2      # işçileri başlat
+#   python job_queue.py list                       # son işleri listele
+#   python job_queue.py cancel <iş_kimliği>
+# Kuyruk dosyası varsayılan olarak uygulama klasöründeki jobs.db'dir (KRIPTO_JOBS_DB ile değiştirilebilir).
+
+import argparse
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import pickle
+import signal
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+from profiling import ProfileSession
+
+DEFAULT_DB_PATH = os.environ.get('KRIPTO_JOBS_DB') or os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                                    'jobs.db')
+# İşçi bu süre boyunca canlılık bildirmezse çalıştırdığı iş yeniden kuyruğa alınır (süreç çökmüş sayılır)
+STALE_AFTER = 120
+HEARTBEAT_INTERVAL = 15
+# Çöken işçi nedeniyle yeniden kuyruğa alınan bir iş en fazla bu kadar denenir
+MAX_ATTEMPTS = 2
+# İlerleme en fazla bu sıklıkta veritabanına yazılır (saniye)
+PROGRESS_WRITE_INTERVAL = 0.5
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    params TEXT NOT NULL,
+    dedup_key TEXT NOT NULL,
+    owner TEXT,
+    progress REAL NOT NULL DEFAULT 0,
+    message TEXT,
+    result BLOB,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    heartbeat_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_dedup ON jobs (dedup_key, status);
+CREATE TABLE IF NOT EXISTS workers (
+    id TEXT PRIMARY KEY,
+    host TEXT,
+    pid INTEGER,
+    current_job TEXT,
+    started_at REAL,
+    heartbeat_at REAL
+);
+"""
+
+# Sonuç hariç iş satırı sütunları (listelemede büyük sonuç nesneleri okunmaz)
+_JOB_COLUMNS = ("id, kind, status, params, owner, progress, message, error, attempts, cancel_requested, worker, "
+                "created_at, started_at, finished_at, heartbeat_at")
+
+
+class JobCancelled(Exception):
+    """İş kullanıcı tarafından iptal edildiğinde ilerleme bildirimi sırasında yükseltilir."""
+
+
+def dedup_key(kind, params):
+    """Aynı türde ve aynı parametreli işler için sabit anahtar (sayfa yeniden çalıştığında iş tekrarlanmasın)."""
+    payload = json.dumps({'kind': kind, 'params': params}, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class JobQueue:
+    """
+    SQLite tabanlı kalıcı iş kuyruğu. Her işlem kendi bağlantısını açar; böylece aynı nesne Streamlit
+    iş parçacıklarından ve işçi süreçlerinden güvenle kullanılabilir (WAL kipi eşzamanlı okumaya izin verir).
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        with self._connection() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        conn = self._connect()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _row_to_job(row):
+        job = dict(row)
+        job['params'] = json.loads(job['params'])
+        job.pop('result', None)
+        return job
+
+    # --- Arayüz tarafı ---
+    def submit(self, kind, params, owner=None):
+        """
+        İşi kuyruğa ekler ve iş kimliğini döndürür. Aynı parametreli iş zaten bekliyor veya çalışıyorsa
+        yeni iş açılmaz, mevcut işin kimliği döndürülür.
+        """
+        if kind not in JOB_HANDLERS:
+            raise ValueError(f"Bilinmeyen iş türü: {kind}")
+        key = dedup_key(kind, params)
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT id FROM jobs WHERE dedup_key = ? AND status IN ('queued', 'running') "
+                               "ORDER BY created_at LIMIT 1", (key,)).fetchone()
+            if row is not None:
+                conn.execute("COMMIT")
+                return row['id']
+            job_id = uuid.uuid4().hex
+            conn.execute("INSERT INTO jobs (id, kind, status, params, dedup_key, owner, message, created_at) "
+                         "VALUES (?, ?, 'queued', ?, ?, ?, ?, ?)",
+                         (job_id, kind, json.dumps(params, ensure_ascii=False, default=str), key, owner,
+                          "Sırada bekliyor...", time.time()))
+            conn.execute("COMMIT")
+            return job_id
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def get(self, job_id):
+        """İşin durumunu (sonuç hariç) sözlük olarak döndürür; iş yoksa None."""
+        with self._connection() as conn:
+            row = conn.execute(f"SELECT {_JOB_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row is not None else None
+
+    def fetch_result(self, job_id):
+        """Tamamlanmış işin sonuç nesnesini döndürür (tamamlanmamışsa None)."""
+        with self._connection() as conn:
+            row = conn.execute("SELECT result FROM jobs WHERE id = ? AND status = 'done'", (job_id,)).fetchone()
+        if row is None or row['result'] is None:
+            return None
+        return pickle.loads(row['result'])
+
+    def list_jobs(self, owner=None, limit=20):
+        query = f"SELECT {_JOB_COLUMNS} FROM jobs"
+        args = []
+        if owner is not None:
+            query += " WHERE owner = ?"
+            args.append(owner)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        args.append(limit)
+        with self._connection() as conn:
+            return [self._row_to_job(row) for row in conn.execute(query, args).fetchall()]
+
+    def cancel(self, job_id):
+        """Bekleyen işi hemen iptal eder; çalışan işe iptal isteği bırakır (işçi bir sonraki ilerlemede durur)."""
+        with self._connection() as conn:
+            conn.execute("UPDATE jobs SET status = 'cancelled', finished_at = ?, message = 'İptal edildi.' "
+                         "WHERE id = ? AND status = 'queued'", (time.time(), job_id))
+            conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = 'running'", (job_id,))
+
+    def active_workers(self, within=STALE_AFTER):
+        """Son `within` saniyede canlılık bildiren işçiler."""
+        with self._connection() as conn:
+            rows = conn.execute("SELECT * FROM workers WHERE heartbeat_at >= ? ORDER BY started_at",
+                                (time.time() - within,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def purge(self, older_than_days=7):
+        """Belirtilen günden eski bitmiş işleri (sonuçlarıyla birlikte) siler; silinen iş sayısını döndürür."""
+        cutoff = time.time() - older_than_days * 86400
+        with self._connection() as conn:
+            cursor = conn.execute("DELETE FROM jobs WHERE status IN ('done', 'failed', 'cancelled') "
+                                  "AND finished_at < ?", (cutoff,))
+            conn.execute("DELETE FROM workers WHERE heartbeat_at < ?", (cutoff,))
+            return cursor.rowcount
+
+    # --- İşçi tarafı ---
+    def claim(self, worker_id):
+        """
+        Sıradaki işi atomik olarak alır ve 'running' yapar; iş yoksa None döndürür.
+        Önce canlılık bildirmeyi bırakmış işçilerin işleri yeniden kuyruğa alınır (veya deneme hakkı bittiyse başarısız olur).
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("UPDATE jobs SET status = 'failed', finished_at = ?, "
+                         "error = 'İşçi süreci yanıt vermeyi bıraktı (deneme hakkı doldu).' "
+                         "WHERE status = 'running' AND heartbeat_at < ? AND attempts >= ?",
+                         (now, now - STALE_AFTER, MAX_ATTEMPTS))
+            conn.execute("UPDATE jobs SET status = 'queued', worker = NULL, message = 'Yeniden kuyruğa alındı...' "
+                         "WHERE status = 'running' AND heartbeat_at < ?", (now - STALE_AFTER,))
+            row = conn.execute(f"SELECT {_JOB_COLUMNS} FROM jobs WHERE status = 'queued' "
+                               "ORDER BY created_at LIMIT 1").fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute("UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, started_at = ?, "
+                         "heartbeat_at = ?, progress = 0, message = 'Başlatıldı...' WHERE id = ?",
+                         (worker_id, now, now, row['id']))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return self.get(row['id'])
+
+    def update_progress(self, job_id, progress=None, message=None):
+        """İlerlemeyi yazar, canlılığı tazeler ve iptal istenip istenmediğini döndürür."""
+        with self._connection() as conn:
+            conn.execute("UPDATE jobs SET progress = COALESCE(?, progress), message = COALESCE(?, message), "
+                         "heartbeat_at = ? WHERE id = ?", (progress, message, time.time(), job_id))
+            row = conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row['cancel_requested'])
+
+    def finish(self, job_id, worker_id, status, result=None, error=None, message=None):
+        """
+        İşin sonucunu yazar; iş hâlâ bu işçide 'running' durumundaysa True döner.
+        Canlılık süresi aşıldığı için yeniden kuyruğa alınıp başka işçiye geçmiş (veya başarısız sayılmış) işe
+        eski işçi sonuç yazamaz; aksi halde iki işçinin sonuçları birbirinin üzerine yazılırdı.
+        """
+        blob = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL) if result is not None else None
+        with self._connection() as conn:
+            cursor = conn.execute("UPDATE jobs SET status = ?, result = ?, error = ?, message = COALESCE(?, message), "
+                                  "progress = CASE WHEN ? = 'done' THEN 1 ELSE progress END, finished_at = ? "
+                                  "WHERE id = ? AND worker = ? AND status = 'running'",
+                                  (status, blob, error, message, status, time.time(), job_id, worker_id))
+        if cursor.rowcount == 0:
+            logging.warning(f"⚠️ [{worker_id}] {job_id} işinin sonucu yazılmadı: iş artık bu işçide çalışmıyor "
+                            f"(yeniden kuyruğa alınmış veya sonlandırılmış).")
+            return False
+        return True
+
+    def worker_heartbeat(self, worker_id, current_job=None, started_at=None):
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute("INSERT INTO workers (id, host, pid, current_job, started_at, heartbeat_at) "
+                         "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(id) DO UPDATE SET "
+                         "current_job = excluded.current_job, heartbeat_at = excluded.heartbeat_at",
+                         (worker_id, socket.gethostname(), os.getpid(), current_job, started_at or now, now))
+            if current_job:
+                conn.execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND status = 'running'",
+                             (now, current_job))
+
+    def remove_worker(self, worker_id):
+        with self._connection() as conn:
+            conn.execute("DELETE FROM workers WHERE id = ?", (worker_id,))
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """Süreç genelinde paylaşılan varsayılan kuyruğu döndürür."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue()
+        return _queue
+
+
+# --- İş türleri: handler(params, report) -> sonuç nesnesi; report(oran, mesaj) ilerleme bildirir ---
+def _backtest_job(params, report):
+    from backtest_engine import fetch_frames, run_backtest
+    from indicators import CHART_OPTION_COLUMNS, required_indicators
+
+    strategy_params = params['strategy_params']
+    frames, higher_frames, missing = fetch_frames(
+        params['symbols'], params['interval'], strategy_params,
+        progress=lambda i, n, symbol: report(0.3 * (i - 1) / n, f"🔍 {symbol} verisi indiriliyor... ({i}/{n})"))
+    # Sonuçlar grafikte de gösterildiği için çizilebilen tüm göstergeler hesaplanır
+    required = required_indicators(strategy_params, chart_options=dict.fromkeys(CHART_OPTION_COLUMNS, True))
+    trades, signal_frames = run_backtest(
+        frames, strategy_params, higher_frames, required,
+        progress=lambda i, n, symbol: report(0.3 + 0.7 * i / n, f"⚙️ {symbol} için strateji uygulanıyor... ({i}/{n})"))
+    return {'trades': trades, 'signal_frames': signal_frames, 'missing_symbols': missing}
+
+
+def _optimization_job(params, report):
+    import random
+
+    from backtest_engine import fetch_frames, rank_results, run_optimization, sample_combinations
+    from optimization_store import get_optimization_store
+
+    strategy_params = params['strategy_params']
+    combinations = sample_combinations(params['param_grid'], rng=random.Random(params.get('seed')))
+    frames, higher_frames, missing = fetch_frames(
+        params['symbols'], params['interval'], strategy_params,
+        progress=lambda i, n, symbol: report(0.1 * (i - 1) / n, f"🔍 {symbol} verisi indiriliyor... ({i}/{n})"))
+    # Aynı veriyle daha önce değerlendirilmiş kombinasyonlar depodan okunur; yarıda kalan tarama devam eder
+    store = get_optimization_store() if params.get('use_store', True) else None
+    results_df = run_optimization(frames, strategy_params, combinations, higher_frames,
+                                  progress=lambda i, n: report(0.1 + 0.9 * i / n, f"Test {i}/{n} tamamlandı."),
+                                  store=store)
+    return {'results': rank_results(results_df, params['optimization_target']), 'evaluated': len(combinations),
+            'cached': results_df.attrs.get('cached', 0), 'missing_symbols': missing}
+
+
+def _walk_forward_job(params, report):
+    import random
+
+    from backtest_engine import fetch_frames, sample_combinations
+    from kline_store import load_stored_frames
+    from walk_forward import run_walk_forward
+
+    strategy_params = params['strategy_params']
+    higher_timeframe = strategy_params.get('higher_timeframe') if strategy_params.get('use_mta') else None
+    # Uzun geçmiş için önce kayıtlı veri (kline_store) kullanılır; kaydı olmayan semboller Binance'ten indirilir
+    report(0, "🔍 Veri yükleniyor...")
+    frames, higher_frames, missing = load_stored_frames(params['symbols'], params['interval'],
+                                                        params.get('data_dir') or 'data', higher_timeframe)
+    if missing:
+        fetched, fetched_higher, missing = fetch_frames(missing, params['interval'], strategy_params)
+        frames.update(fetched)
+        higher_frames.update(fetched_higher)
+    combinations = sample_combinations(params['param_grid'], rng=random.Random(params.get('seed')))
+    table, oos_trades, oos_metrics = run_walk_forward(
+        frames, strategy_params, combinations, params['train_bars'], params['test_bars'], params.get('step_bars'),
+        params.get('anchored', False), higher_frames, params['optimization_target'], params.get('workers', 1),
+        progress=lambda i, n: report(0.05 + 0.95 * i / n, f"🪟 Pencere {i}/{n} tamamlandı."))
+    return {'windows': table, 'oos_trades': oos_trades, 'oos_metrics': oos_metrics,
+            'bars': {symbol: len(df) for symbol, df in frames.items()}, 'missing_symbols': missing}
+
+
+def _train_rl_job(params, report):
+    from rl_trainer import train_rl_agent
+
+    model_name = train_rl_agent(**params, progress=lambda done, total: report(
+        done / total, f"🤖 Eğitim adımı {done:,}/{total:,}"))
+    if model_name is None:
+        raise RuntimeError("Eğitim tamamlanamadı (veri indirilemedi veya model kaydedilemedi).")
+    return {'model_name': model_name}
+
+
+JOB_HANDLERS = {
+    'backtest': _backtest_job,
+    'optimization': _optimization_job,
+    'walk_forward': _walk_forward_job,
+    'train_rl': _train_rl_job,
+}
+
+
+def run_job(queue, job, worker_id):
+    """Alınmış bir işi çalıştırır ve sonucunu (veya hatasını) kuyruğa yazar."""
+    job_id = job['id']
+    params = dict(job['params'])
+    profile = params.pop('profile', None)
+    last_write = [0.0]
+
+    def report(progress, message=None):
+        now = time.monotonic()
+        if now - last_write[0] < PROGRESS_WRITE_INTERVAL and progress < 1:
+            return
+        last_write[0] = now
+        if queue.update_progress(job_id, round(float(progress), 4), message):
+            raise JobCancelled()
+
+    logging.info(f"▶️ [{worker_id}] İş başladı: {job['kind']} ({job_id})")
+    try:
+        handler = JOB_HANDLERS[job['kind']]
+        if profile:
+            # Profil modu arayüzde açıksa ölçüm işçide yapılır; rapor sonuçla birlikte döner
+            with ProfileSession(profile['label'], use_cprofile=profile.get('cprofile', True)) as session:
+                result = handler(params, report)
+            result['profile'] = session.report()
+        else:
+            result = handler(params, report)
+    except JobCancelled:
+        queue.finish(job_id, worker_id, 'cancelled', message="İptal edildi.")
+        logging.info(f"⏹️ [{worker_id}] İş iptal edildi: {job_id}")
+        return
+    except Exception as e:
+        queue.finish(job_id, worker_id, 'failed', error=f"{e}\n{traceback.format_exc()}", message=f"Hata: {e}")
+        logging.error(f"❌ [{worker_id}] İş başarısız: {job_id}: {e}")
+        return
+    if queue.finish(job_id, worker_id, 'done', result=result, message="Tamamlandı."):
+        logging.info(f"✅ [{worker_id}] İş tamamlandı: {job['kind']} ({job_id})")
+
+
+def run_worker(db_path=DEFAULT_DB_PATH, poll_interval=1.0, max_jobs=None):
+    """
+    Tek işçi döngüsü: kuyruktan iş alır ve çalıştırır. SIGTERM/SIGINT ile mevcut iş bittikten sonra durur.
+    max_jobs verilirse o kadar iş çalıştırıldıktan sonra çıkar.
+    """
+    queue = JobQueue(db_path)
+    worker_id = f"{socket.gethostname()}-{os.getpid()}"
+    started_at = time.time()
+    state = {'job': None, 'stop': False}
+
+    def _stop(signum, frame):
+        state['stop'] = True
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    # Uzun adımlarda (ör. tek sembolün simülasyonu) ilerleme bildirilmese de iş canlı görünsün
+    heartbeat_stop = threading.Event()
+
+    def _heartbeat():
+        while not heartbeat_stop.wait(HEARTBEAT_INTERVAL):
+            try:
+                queue.worker_heartbeat(worker_id, state['job'], started_at)
+            except sqlite3.Error as e:
+                logging.warning(f"İşçi canlılık bildirimi yazılamadı: {e}")
+
+    threading.Thread(target=_heartbeat, daemon=True).start()
+    logging.info(f"👷 İşçi başladı: {worker_id} ({db_path})")
+    completed = 0
+    try:
+        while not state['stop'] and (max_jobs is None or completed < max_jobs):
+            queue.worker_heartbeat(worker_id, None, started_at)
+            job = queue.claim(worker_id)
+            if job is None:
+                time.sleep(poll_interval)
+                continue
+            state['job'] = job['id']
+            queue.worker_heartbeat(worker_id, job['id'], started_at)
+            run_job(queue, job, worker_id)
+            state['job'] = None
+            completed += 1
+    finally:
+        heartbeat_stop.set()
+        queue.remove_worker(worker_id)
+        logging.info(f"👋 İşçi durdu: {worker_id}")
+
+
+def _worker_main(db_path, poll_interval):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    run_worker(db_path, poll_interval)
+
+
+def run_worker_pool(processes, db_path=DEFAULT_DB_PATH, poll_interval=1.0):
+    """`processes` adet işçi sürecini başlatır; kapanış sinyali tüm işçilere iletilir."""
+    if processes <= 1:
+        _worker_main(db_path, poll_interval)
+        return
+    workers = [multiprocessing.Process(target=_worker_main, args=(db_path, poll_interval), daemon=False)
+               for _ in range(processes)]
+    for process in workers:
+        process.start()
+
+    def _forward(signum, frame):
+        for process in workers:
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, _forward)
+    signal.signal(signal.SIGINT, _forward)
+    for process in workers:
+        process.join()
+
+
+def _format_job(job):
+    created = datetime.fromtimestamp(job['created_at']).strftime('%Y-%m-%d %H:%M:%S')
+    return (f"{job['id']}  {job['kind']:<13} {job['status']:<10} %{job['progress'] * 100:5.1f}  {created}  "
+            f"{job['message'] or ''}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Arka plan iş kuyruğu (backtest / optimizasyon / walk-forward / RL eğitimi)")
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help="Kuyruk veritabanı (SQLite)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    worker_parser = subparsers.add_parser('worker', help="İşçi süreçlerini başlat")
+    worker_parser.add_argument('--processes', type=int, default=1, help="Paralel işçi süreci sayısı")
+    worker_parser.add_argument('--poll-interval', type=float, default=1.0)
+    list_parser = subparsers.add_parser('list', help="Son işleri listele")
+    list_parser.add_argument('--limit', type=int, default=20)
+    cancel_parser = subparsers.add_parser('cancel', help="İşi iptal et")
+    cancel_parser.add_argument('job_id')
+    purge_parser = subparsers.add_parser('purge', help="Eski bitmiş işleri sil")
+    purge_parser.add_argument('--days', type=float, default=7)
+    args = parser.parse_args()
+
+    if args.command == 'worker':
+        run_worker_pool(args.processes, args.db, args.poll_interval)
+    elif args.command == 'list':
+        queue = JobQueue(args.db)
+        workers = queue.active_workers()
+        print(f"Aktif işçi: {len(workers)}")
+        for job in queue.list_jobs(limit=args.limit):
+            print(_format_job(job))
+    elif args.command == 'cancel':
+        JobQueue(args.db).cancel(args.job_id)
+        print(f"İptal isteği gönderildi: {args.job_id}")
+    elif args.command == 'purge':
+        print(f"{JobQueue(args.db).purge(args.days)} iş silindi.")
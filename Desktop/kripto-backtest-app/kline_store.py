@@ -0,0 +1,119 @@
+# kline_store.py (Mum Verilerini Diske Kaydetme / Diskten Okuma)
+
+import os
+
+import pandas as pd
+
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# Binance zaman dilimi -> pandas süre ifadesi
+_INTERVAL_UNITS = {'m': 'min', 'h': 'h', 'd': 'D', 'w': 'W'}
+
+
+def interval_to_timedelta(interval: str) -> pd.Timedelta:
+    """'15m', '1h', '4h', '1d' gibi Binance zaman dilimlerini pd.Timedelta'ya çevirir."""
+    return pd.Timedelta(interval_to_rule(interval))
+
+
+def interval_to_rule(interval: str) -> str:
+    """Binance zaman dilimini pandas resample kuralına çevirir (ör. '15m' -> '15min')."""
+    unit = interval[-1]
+    if unit not in _INTERVAL_UNITS:
+        raise ValueError(f"Desteklenmeyen zaman dilimi: {interval}")
+    return f"{int(interval[:-1])}{_INTERVAL_UNITS[unit]}"
+
+
+def kline_path(directory: str, symbol: str, interval: str, fmt: str = 'parquet') -> str:
+    """Bir sembol/zaman dilimi için standart dosya yolunu döndürür (ör. data/BTCUSDT_1h.parquet)."""
+    return os.path.join(directory, f"{symbol}_{interval}.{fmt}")
+
+
+def save_klines(df: pd.DataFrame, path: str) -> str:
+    """
+    OHLCV verisini uzantıya göre Parquet veya CSV olarak kaydeder.
+    Parquet için pyarrow (veya fastparquet) gerekir; yoksa aynı isimle CSV'ye yazılır.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    data = df[OHLCV_COLUMNS].copy()
+    data.index.name = 'timestamp'
+    if path.endswith('.parquet'):
+        try:
+            data.to_parquet(path)
+            return path
+        except ImportError:
+            path = path[:-len('.parquet')] + '.csv'
+            print(f"UYARI: Parquet desteği (pyarrow) bulunamadı, veri CSV olarak kaydediliyor: {path}")
+    data.to_csv(path)
+    return path
+
+
+def load_klines(path: str) -> pd.DataFrame:
+    """Kaydedilmiş OHLCV verisini okur; zaman damgası indeksli, float sütunlu DataFrame döndürür."""
+    if path.endswith('.parquet'):
+        df = pd.read_parquet(path)
+    else:
+        df = pd.read_csv(path, index_col=0)
+    df.index = pd.to_datetime(df.index)
+    df.index.name = 'timestamp'
+    return df[OHLCV_COLUMNS].astype(float).sort_index()
+
+
+def resample_klines(df: pd.DataFrame, interval: str) -> pd.DataFrame:
+    """Alt zaman dilimi verisinden üst zaman dilimi mumları üretir (ör. 1h -> 4h)."""
+    rule = interval_to_rule(interval)
+    resampled = df.resample(rule, label='left', closed='left').agg(
+        {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'})
+    return resampled.dropna()
+
+
+def find_klines(directory: str, symbol: str, interval: str):
+    """Kayıtlı veri dosyasını bulur (önce Parquet, sonra CSV); yoksa None döndürür."""
+    for fmt in ('parquet', 'csv'):
+        path = kline_path(directory, symbol, interval, fmt)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def load_stored_frames(symbols, interval: str, directory: str = 'data', higher_timeframe: str = None,
+                       paths: dict = None, bars: int = None):
+    """
+    Semboller için kayıtlı mum verisini yükler (ağ erişimi gerekmez).
+    paths: {sembol: dosya} verilen semboller için standart yol yerine bu dosyalar okunur.
+    higher_timeframe verilirse üst zaman dilimi verisi kayıtlı dosyasından, yoksa ana veriden yeniden örneklenerek üretilir.
+    bars verilirse her sembolün son `bars` mumu kullanılır.
+    Dönüş: ({sembol: DataFrame}, {sembol: üst zaman dilimi DataFrame}, [bulunamayan semboller])
+    """
+    paths = paths or {}
+    frames, higher_frames, missing = {}, {}, []
+    for symbol in symbols:
+        path = paths.get(symbol) or find_klines(directory, symbol, interval)
+        if path is None:
+            missing.append(symbol)
+            continue
+        df = load_klines(path)
+        if bars:
+            df = df.iloc[-bars:]
+        frames[symbol] = df
+        if not higher_timeframe:
+            continue
+        higher_path = None if symbol in paths else find_klines(directory, symbol, higher_timeframe)
+        if higher_path is not None:
+            df_higher = load_klines(higher_path)
+            higher_frames[symbol] = df_higher[df_higher.index <= df.index[-1]]
+        elif interval_to_timedelta(higher_timeframe) > interval_to_timedelta(interval):
+            higher_frames[symbol] = resample_klines(df, higher_timeframe)
+    return frames, higher_frames, missing
+
+
+def download_klines(symbol: str, interval: str, limit: int = 1000, directory: str = 'data', fmt: str = 'parquet'):
+    """Binance'ten mum verisini indirir ve diske kaydeder; kaydedilen dosya yolunu döndürür."""
+    from utils import get_binance_klines
+
+    df = get_binance_klines(symbol=symbol, interval=interval, limit=limit)
+    if df is None or df.empty:
+        print(f"HATA: {symbol} ({interval}) için veri indirilemedi.")
+        return None
+    path = save_klines(df, kline_path(directory, symbol, interval, fmt))
+    print(f"✅ {symbol} ({interval}) için {len(df)} mum kaydedildi: {path}")
+    return path
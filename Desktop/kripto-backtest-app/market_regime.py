@@ -1,7 +1,8 @@
 # market_regime.py
 
 import pandas as pd
-import pandas_ta as ta
+
+import native_indicators as nt
 
 # Projemizin kendi modüllerini import ediyoruz
 from utils import get_fear_and_greed_index, get_binance_klines
@@ -12,8 +13,8 @@ def analyze_volatility(df: pd.DataFrame):
     Piyasadaki volatiliteyi Bollinger Bant Genişliği (BBW) kullanarak analiz eder.
     BBW = (Üst Bant - Alt Bant) / Orta Bant
     """
-    bbands = ta.bbands(df['Close'], length=20, std=2)
-    bbw = (bbands['BBU_20_2.0'] - bbands['BBL_20_2.0']) / bbands['BBM_20_2.0']
+    lower, mid, upper = nt.bbands(df['Close'].to_numpy(), length=20, std=2)
+    bbw = pd.Series((upper - lower) / mid, index=df.index)
 
     # Son 100 periyottaki BBW değerlerine göre eşik belirleyelim
     low_threshold = bbw.rolling(window=100).quantile(0.25).iloc[-1]
@@ -33,8 +34,8 @@ def analyze_trend(df: pd.DataFrame):
     """
     Piyasadaki trendin gücünü ADX (Average Directional Index) kullanarak analiz eder.
     """
-    adx = ta.adx(df['High'], df['Low'], df['Close'], length=14)
-    current_adx = adx[f'ADX_14'].iloc[-1]
+    adx = nt.adx(df['High'].to_numpy(), df['Low'].to_numpy(), df['Close'].to_numpy(), length=14)[0]
+    current_adx = adx[-1]
 
     if current_adx < 20:
         return "TRENDSİZ PİYASA"
@@ -0,0 +1,323 @@
+# metrics.py (Canlı İşçi Gecikme Ölçümleri ve Prometheus / Anlık Görüntü Dışa Aktarımı)
+#
+# Aşama süreleri (parse, tampon güncelleme, göstergeler, sinyaller, MTA verisi, veritabanı yazımı, emir REST,
+# Telegram) strateji/sembol etiketleriyle HDR tarzı histogramlarda tutulur; sayaçlar (WebSocket mesajları) ve
+# kuyruk derinlikleri (göstergeler) ile birlikte Prometheus metin formatında HTTP'den veya periyodik JSON dosyasıyla
+# dışa aktarılır. Harici bağımlılık yoktur.
+
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Histogram hassasiyeti: her ikinin kuvveti aralığı bu kadar eşit alt kovaya bölünür (göreli hata ≤ 1/16)
+SUB_BUCKET_BITS = 4
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+# Dışa aktarılan yüzdelikler
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+METRIC_PREFIX = 'kripto_worker'
+
+
+class LatencyHistogram:
+    """
+    HDR tarzı log-doğrusal gecikme histogramı (mikrosaniye çözünürlük).
+    Kayıt sabit sürelidir; bellek kullanımı değer aralığının logaritmasıyla sınırlıdır (100 sn için ~400 kova).
+    """
+
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.counts = []
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    @staticmethod
+    def _index(micros):
+        if micros < SUB_BUCKETS:
+            return micros
+        shift = micros.bit_length() - 1 - SUB_BUCKET_BITS
+        return (shift + 1) * SUB_BUCKETS + (micros >> shift) - SUB_BUCKETS
+
+    @staticmethod
+    def _upper_bound(index):
+        """Kovanın (hariç) üst sınırı, mikrosaniye."""
+        if index < SUB_BUCKETS:
+            return index + 1
+        exponent, sub = divmod(index, SUB_BUCKETS)
+        return (SUB_BUCKETS + sub + 1) << (exponent - 1)
+
+    def record(self, seconds):
+        index = self._index(max(0, int(seconds * 1e6)))
+        counts = self.counts
+        if index >= len(counts):
+            counts.extend([0] * (index + 1 - len(counts)))
+        counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q):
+        """q (0-1) yüzdeliğini saniye olarak döndürür (kovanın üst sınırı, en büyük değerle sınırlı)."""
+        if not self.count:
+            return 0.0
+        target = max(1, int(q * self.count + 0.5))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                return min(self._upper_bound(index) / 1e6, self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'sum_s': round(self.total, 6),
+            'mean_ms': round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            'max_ms': round(self.max * 1000, 3),
+            **{f"p{q * 100:g}_ms": round(self.percentile(q) * 1000, 3) for q in QUANTILES},
+        }
+
+
+def _label_text(labels):
+    if not labels:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in labels)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + '}'
+
+
+class MetricsRegistry:
+    """
+    Süreç genelindeki ölçüm kaydı.
+    - observe / timer: aşama süreleri (stage + strateji/sembol etiketleri) -> LatencyHistogram
+    - inc: sayaçlar (ör. WebSocket mesajları); oranlar Prometheus'ta rate() ile, anlık görüntüde farktan hesaplanır
+    - register_gauge: okuma anında değerlendirilen göstergeler (ör. kuyruk derinlikleri)
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._histograms = {}  # (stage, strateji, sembol) -> LatencyHistogram
+        self._counters = {}  # (ad, etiketler) -> değer
+        self._gauges = {}  # ad -> (açıklama, fonksiyon)
+        self.started_at = time.time()
+
+    def observe(self, stage, seconds, strategy='', symbol=''):
+        if not self.enabled:
+            return
+        key = (stage, str(strategy), str(symbol))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = LatencyHistogram()
+            histogram.record(seconds)
+
+    @contextmanager
+    def timer(self, stage, strategy='', symbol=''):
+        """Bloğun süresini aşama histogramına ekler (istisna olsa bile)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start, strategy, symbol)
+
+    def inc(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def register_gauge(self, name, func, help_text=''):
+        """func() sayı ya da {etiket_değeri: sayı} sözlüğü döndürebilir (sözlükte etiket adı 'name'dir)."""
+        with self._lock:
+            self._gauges[name] = (help_text, func)
+
+    def _gauge_values(self):
+        with self._lock:
+            gauges = list(self._gauges.items())
+        values = {}
+        for name, (_, func) in gauges:
+            try:
+                values[name] = func()
+            except Exception as e:
+                logging.debug(f"Gösterge okunamadı ({name}): {e}")
+        return values
+
+    def snapshot(self):
+        """Tüm ölçümlerin JSON'a uygun anlık görüntüsü."""
+        with self._lock:
+            histograms = [{'stage': stage, 'strategy': strategy, 'symbol': symbol, **h.summary()}
+                          for (stage, strategy, symbol), h in sorted(self._histograms.items())]
+            counters = [{'name': name, 'labels': dict(labels), 'value': value}
+                        for (name, labels), value in sorted(self._counters.items())]
+        return {
+            'timestamp': time.time(),
+            'uptime_s': round(time.time() - self.started_at, 1),
+            'latency': histograms,
+            'counters': counters,
+            'gauges': self._gauge_values(),
+        }
+
+    def render_prometheus(self):
+        """Prometheus metin formatı (0.0.4). Gecikmeler summary olarak (yüzdelik + _sum/_count) verilir."""
+        lines = []
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+
+        name = f"{METRIC_PREFIX}_stage_latency_seconds"
+        lines += [f"# HELP {name} Aşama süreleri (strateji/sembol bazında).", f"# TYPE {name} summary"]
+        max_lines = []
+        for (stage, strategy, symbol), h in histograms:
+            labels = [('stage', stage), ('strategy', strategy), ('symbol', symbol)]
+            for q in QUANTILES:
+                lines.append(f"{name}{_label_text(labels + [('quantile', q)])} {h.percentile(q):.6f}")
+            lines.append(f"{name}_sum{_label_text(labels)} {h.total:.6f}")
+            lines.append(f"{name}_count{_label_text(labels)} {h.count}")
+            max_lines.append(f"{name}_max{_label_text(labels)} {h.max:.6f}")
+        if max_lines:
+            lines += [f"# TYPE {name}_max gauge"] + max_lines
+
+        declared = set()
+        for (counter, labels), value in counters:
+            full = f"{METRIC_PREFIX}_{counter}_total"
+            if full not in declared:
+                declared.add(full)
+                lines.append(f"# TYPE {full} counter")
+            lines.append(f"{full}{_label_text(labels)} {value}")
+
+        with self._lock:
+            helps = {gauge: help_text for gauge, (help_text, _) in self._gauges.items()}
+        for gauge, value in self._gauge_values().items():
+            full = f"{METRIC_PREFIX}_{gauge}"
+            if helps.get(gauge):
+                lines.append(f"# HELP {full} {helps[gauge]}")
+            lines.append(f"# TYPE {full} gauge")
+            if isinstance(value, dict):
+                lines += [f"{full}{_label_text([('name', k)])} {v}" for k, v in sorted(value.items())]
+            else:
+                lines.append(f"{full} {value}")
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = None
+
+    def do_GET(self):
+        if self.path.startswith('/metrics.json'):
+            body = json.dumps(self.registry.snapshot(), ensure_ascii=False).encode('utf-8')
+            content_type = 'application/json'
+        elif self.path.startswith('/metrics'):
+            body = self.registry.render_prometheus().encode('utf-8')
+            content_type = 'text/plain; version=0.0.4; charset=utf-8'
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Her kazıma (scrape) isteği günlüğe yazılmaz
+
+
+def start_metrics_server(port, registry=None, host='0.0.0.0'):
+    """/metrics (Prometheus) ve /metrics.json uç noktalarını arka plan iş parçacığında sunar."""
+    handler = type('MetricsHandler', (_MetricsHandler,), {'registry': registry or get_metrics()})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    logging.info(f"📊 Ölçüm uç noktası: http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+
+class SnapshotWriter:
+    """Ölçümlerin anlık görüntüsünü periyodik olarak JSON dosyasına yazar; sayaç oranları (1/sn) eklenir."""
+
+    def __init__(self, path, interval=15.0, registry=None):
+        self.path = path
+        self.interval = interval
+        self.registry = registry or get_metrics()
+        self._previous = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="metrics-snapshot", daemon=True)
+        self._thread.start()
+        logging.info(f"📊 Ölçümler {self.interval:g} sn arayla dosyaya yazılacak: {self.path}")
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self.write()
+
+    def write(self):
+        snapshot = self.registry.snapshot()
+        previous, self._previous = self._previous, snapshot
+        if previous is not None:
+            elapsed = snapshot['timestamp'] - previous['timestamp']
+            before = {(c['name'], tuple(sorted(c['labels'].items()))): c['value'] for c in previous['counters']}
+            for counter in snapshot['counters']:
+                old = before.get((counter['name'], tuple(sorted(counter['labels'].items()))), 0)
+                counter['rate_per_s'] = round((counter['value'] - old) / elapsed, 3) if elapsed > 0 else None
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, indent=2, ensure_ascii=False)
+        os.replace(temp_path, self.path)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.write()
+            except Exception as e:
+                logging.error(f"HATA: Ölçüm anlık görüntüsü yazılamadı: {e}")
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics():
+    """Süreç genelinde paylaşılan ölçüm kaydını döndürür."""
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = MetricsRegistry()
+        return _metrics
+
+
+if __name__ == '__main__':
+    import random
+
+    registry = MetricsRegistry()
+    exact = []
+    for _ in range(100_000):
+        value = random.lognormvariate(-6, 1.0)  # ~2.5 ms medyan
+        exact.append(value)
+        registry.observe('indicators', value, 'demo', 'BTCUSDT')
+    exact.sort()
+    h = registry._histograms[('indicators', 'demo', 'BTCUSDT')]
+    for q in QUANTILES:
+        true = exact[int(q * len(exact)) - 1]
+        print(f"p{q * 100:g}: histogram {h.percentile(q) * 1000:.3f} ms, gerçek {true * 1000:.3f} ms "
+              f"(hata {abs(h.percentile(q) - true) / true:.1%})")
+
+    start = time.perf_counter()
+    for _ in range(100_000):
+        registry.observe('parse', 0.0001, 'demo', 'BTCUSDT')
+    print(f"Kayıt maliyeti: {(time.perf_counter() - start) / 100_000 * 1e6:.2f} µs")
+    registry.inc('ws_messages', symbol='BTCUSDT', kind='closed')
+    registry.register_gauge('queue_depth', lambda: {'telegram': 3, 'position_writer': 0})
+    print(registry.render_prometheus()[:800])
@@ -9,23 +9,29 @@ import sys
 import signal
 import logging
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from stable_baselines3 import PPO
 import numpy as np
-from trade_executor import set_futures_leverage_and_margin, place_futures_order, get_open_position_amount, \
-    get_symbol_info, place_futures_stop_market_order, place_futures_take_profit_order
+import trade_executor
+from trade_executor import start_exchange_info_refresher
 
 from utils import get_binance_klines
-from indicators import generate_all_indicators
+from feature_hub import get_feature_hub
+import native_indicators
+from indicators import required_indicators
 
 from signals import generate_signals, add_higher_timeframe_trend, filter_signals_with_trend
-from telegram_alert import send_telegram_message
+from telegram_alert import send_telegram_message_async, get_telegram_dispatcher
+import database
 from database import (
-    initialize_db, get_all_strategies, update_position,
-    get_positions_for_strategy, log_alarm_db,
-    get_and_clear_pending_actions,get_rl_model_by_id
+    initialize_db, get_all_strategies
 )
-from trading_env import TradingEnv
+from rl_observation import ObservationBuilder
+from rl_registry import acquire_rl_model, release_rl_model
+from order_manager import get_order_submitter
+from position_book import PositionBook, get_position_writer
+from metrics import get_metrics, start_metrics_server, SnapshotWriter
+from user_stream import get_user_data_stream
 
 # --- Loglama Yapılandırması ---
 logging.basicConfig(level=logging.INFO,
@@ -43,18 +49,36 @@ except Exception:
     LOCK_FILE = "multi_worker.lock"
 
 
-def create_lock_file():
-    if os.path.exists(LOCK_FILE):
+def shard_lock_file(shard_id):
+    """Parça (shard) işçisinin kendi kilit dosyası; aynı parçanın iki kopyası çalışamaz."""
+    return LOCK_FILE.replace("multi_worker.lock", f"multi_worker.shard-{shard_id}.lock")
+
+
+def _lock_owner_alive(lock_file):
+    """Kilit dosyasındaki süreç hâlâ çalışıyor mu? (çöken süreçten kalan kilit yeniden başlatmayı engellemesin)"""
+    try:
+        with open(lock_file) as f:
+            pid = int(f.read().strip())
+        os.kill(pid, 0)
+    except (OSError, ValueError):
+        return False
+    return True
+
+
+def create_lock_file(lock_file=None):
+    lock_file = lock_file or LOCK_FILE
+    if os.path.exists(lock_file) and _lock_owner_alive(lock_file):
         return False
-    with open(LOCK_FILE, "w") as f:
+    with open(lock_file, "w") as f:
         f.write(str(os.getpid()))
     return True
 
 
-def remove_lock_file():
-    if os.path.exists(LOCK_FILE):
+def remove_lock_file(lock_file=None):
+    lock_file = lock_file or LOCK_FILE
+    if os.path.exists(lock_file):
         try:
-            os.remove(LOCK_FILE)
+            os.remove(lock_file)
             logging.info("✅ Kilit dosyası başarıyla kaldırıldı.")
         except OSError as e:
             logging.warning(f"⚠️ Kilit dosyası kaldırılamadı: {e}")
@@ -65,41 +89,221 @@ def graceful_shutdown(signum, frame):
     sys.exit(0)
 
 
+# --- Yapılandırma Farkı Sınıflandırması ---
+# Karşılaştırmada dikkate alınmayan alanlar (sadece zaman damgası değişikliği yeniden başlatma tetiklemez)
+IGNORED_CONFIG_KEYS = {'created_at', 'updated_at'}
+# Değiştiğinde çalışan stratejinin tamamen yeniden başlatılmasını gerektiren alanlar
+RESTART_CONFIG_KEYS = {'interval'}
+
+
+# --- Mum İçi SL/TP Kapanışları ---
+# Kapanış emirleri (REST) ve veritabanı güncellemeleri WebSocket iş parçacığını bekletmesin diye bu havuzda yürütülür
+CLOSE_WORKERS = 8
+_close_pool = None
+_close_pool_lock = threading.Lock()
+_closes_in_flight = 0  # havuza verilmiş, henüz bitmemiş kapanış sayısı
+
+
+def get_close_pool():
+    """Tüm stratejilerin paylaştığı pozisyon kapatma iş parçacığı havuzunu döndürür."""
+    global _close_pool
+    with _close_pool_lock:
+        if _close_pool is None:
+            _close_pool = ThreadPoolExecutor(max_workers=CLOSE_WORKERS, thread_name_prefix="position-closer")
+        return _close_pool
+
+
+def close_queue_depth():
+    """Kapatma havuzunda bekleyen veya yürütülmekte olan kapanış sayısı."""
+    with _close_pool_lock:
+        return _closes_in_flight
+
+
+def _close_started():
+    global _closes_in_flight
+    with _close_pool_lock:
+        _closes_in_flight += 1
+
+
+def _close_finished():
+    global _closes_in_flight
+    with _close_pool_lock:
+        _closes_in_flight -= 1
+
+
+def register_worker_gauges(running_strategies, executor=None):
+    """Kuyruk derinliklerini ve çalışan iş yükü sayılarını ölçüm kaydına (okuma anında hesaplanan) gösterge ekler."""
+    metrics = get_metrics()
+    metrics.register_gauge('queue_depth', lambda: {
+        'telegram': get_telegram_dispatcher().pending(),
+        'position_writer': get_position_writer().pending(),
+        'close_pool': close_queue_depth(),
+        'bracket_orders': get_order_submitter(executor or trade_executor).queue_depth(),
+    }, "Arka plan kuyruklarında bekleyen iş sayısı.")
+    metrics.register_gauge('running_strategies', lambda: len(running_strategies), "Çalışan strateji sayısı.")
+    metrics.register_gauge('subscribed_symbols',
+                           lambda: sum(len(r._hub_symbols) for r in list(running_strategies.values())),
+                           "Stratejilerin izlediği (strateji, sembol) akış sayısı.")
+
+
+def shutdown_runners(running_strategies, timeout=10):
+    """
+    Çalışan stratejileri durdurur ve kuyrukta bekleyen pozisyon yazımlarının (TP1, kapanış vb.) veritabanına
+    ulaşmasını bekler. Aksi halde yeniden başlatmada eski pozisyonlar yüklenir (TP1 iki kez işlenebilir).
+    """
+    for runner in list(running_strategies.values()):
+        try:
+            runner.stop()
+        except Exception as e:
+            logging.error(f"HATA: '{runner.name}' durdurulurken hata: {e}")
+    running_strategies.clear()
+    if not get_position_writer().flush(timeout=timeout):
+        logging.error(f"❌ HATA: Bekleyen pozisyon kayıtları {timeout} sn içinde yazılamadı "
+                      f"({get_position_writer().pending()} kayıt).")
+        return False
+    return True
+
+
+def is_closed_kline_message(message):
+    """Ham kline mesajının kapanmış bir mumu mu yoksa mum içi güncellemeyi mi taşıdığını JSON çözmeden anlar."""
+    return '"x":true' in message or '"x": true' in message
+
+
+def parse_strategy_params(raw_params):
+    """Strateji parametrelerini (metin veya sözlük) her zaman sözlük olarak döndürür."""
+    if isinstance(raw_params, str):
+        try:
+            return json.loads(raw_params)
+        except json.JSONDecodeError:
+            return {}
+    return raw_params or {}
+
+
+def classify_config_change(old_config, new_config):
+    """
+    Çalışan bir stratejinin yapılandırması ile veritabanındaki yeni hali arasındaki farkı sınıflandırır.
+
+    Dönüş değeri:
+        {
+            'action': 'none' | 'hot' | 'restart',
+            'changed_keys': değişen üst seviye alanlar,
+            'changed_params': değişen strategy_params anahtarları,
+            'added_symbols': yeni eklenen semboller,
+            'removed_symbols': çıkarılan semboller
+        }
+
+    'hot' değişiklikler (eşikler, TP/SL, telegram ayarları, durum bayrakları, RL modeli ve sembol
+    ekleme/çıkarma) çalışan stratejiye yerinde uygulanır. 'restart' sadece zaman dilimi gibi
+    tüm veri akışlarını geçersiz kılan değişikliklerde döner.
+    """
+    keys = (set(old_config) | set(new_config)) - IGNORED_CONFIG_KEYS
+    changed_keys = set()
+    for key in keys:
+        old_value, new_value = old_config.get(key), new_config.get(key)
+        if key == 'strategy_params':
+            old_value, new_value = parse_strategy_params(old_value), parse_strategy_params(new_value)
+        elif key == 'symbols':
+            # Veritabanı sembolleri set üzerinden kaydettiği için sıra değişikliği fark sayılmaz
+            old_value, new_value = set(old_value or []), set(new_value or [])
+        if old_value != new_value:
+            changed_keys.add(key)
+
+    old_params = parse_strategy_params(old_config.get('strategy_params', {}))
+    new_params = parse_strategy_params(new_config.get('strategy_params', {}))
+    changed_params = {k for k in set(old_params) | set(new_params) if old_params.get(k) != new_params.get(k)}
+
+    old_symbols = list(old_config.get('symbols') or [])
+    new_symbols = list(new_config.get('symbols') or [])
+    diff = {
+        'action': 'none',
+        'changed_keys': sorted(changed_keys),
+        'changed_params': sorted(changed_params),
+        'added_symbols': [s for s in new_symbols if s not in old_symbols],
+        'removed_symbols': [s for s in old_symbols if s not in new_symbols]
+    }
+
+    if changed_keys & RESTART_CONFIG_KEYS:
+        diff['action'] = 'restart'
+    elif changed_keys:
+        diff['action'] = 'hot'
+    return diff
+
+
 class StrategyRunner:
-    def __init__(self, strategy_config):
+    def __init__(self, strategy_config, executor=None, store=None, kline_source=None, account_stream=None,
+                 shard=None, feature_hub=None):
         self.config = strategy_config
+        # Parçalı çalışmada bu runner stratejinin sadece bu parçaya düşen sembollerini yürütür
+        self.shard = shard
+        # Emirlerin gönderileceği borsa: varsayılan canlı Binance, istenirse yerel simülasyon (paper_exchange)
+        self.executor = executor or trade_executor
+        self.paper_trading = getattr(self.executor, 'is_simulated', False)
+        # Pozisyon/alarm kayıtları (varsayılan: veritabanı) ve mum verisi kaynağı (varsayılan: Binance REST);
+        # tekrar oynatma (replay.py) bunların yerine bellek içi kayıt ve geçmiş veri kaynağı verir.
+        self.store = store or database
+        self.kline_source = kline_source or get_binance_klines
+        # Aynı (sembol, zaman dilimi) izleyen stratejiler mum tamponunu ve gösterge hesaplarını paylaşır
+        self.feature_hub = feature_hub or get_feature_hub()
+        self._hub_symbols = set()
+        # Aşama süreleri ve mesaj sayaçları (metrics.py; Prometheus uç noktası veya anlık görüntü dosyası)
+        self.metrics = get_metrics()
+        # Ayarlanırsa gelen ham WebSocket mesajları kaydedilir (replay.MessageRecorder)
+        self.message_recorder = None
+        self._stream = True
         self.id = strategy_config['id']
         self.name = strategy_config['name']
-        self.symbols = strategy_config['symbols']
+        self.symbols = list(strategy_config['symbols'])
         self.interval = strategy_config['interval']
         self.last_prices = {}
-        self.symbols_to_track = strategy_config['symbols']
-        raw_params = strategy_config.get('strategy_params', {})
-        if isinstance(raw_params, str):
-            try:
-                self.params = json.loads(raw_params)
-            except json.JSONDecodeError:
-                self.params = {}
-        else:
-            self.params = raw_params
+        self.symbols_to_track = self.symbols
+        self.params = parse_strategy_params(strategy_config.get('strategy_params', {}))
 
+        # Sembol başına veri tamponu, gözlem üreticisi ve son sinyal
         self.portfolio_data = {}
+        # Açık pozisyonların yetkili kaydı: okumalar bellekten, yazımlar arka planda kayıt katmanına
+        self.positions = PositionBook(self.id, self.store)
+        # Kullanıcı veri akışı (canlı: listenKey WebSocket, simülasyon: yerel akış) borsadaki pozisyonları bildirir;
+        # akış eşitken kapanışlarda borsaya REST ile miktar sorulmaz. Borsada kapanan pozisyonlar burada işaretlenir.
+        self.account_stream = account_stream or get_user_data_stream(self.executor)
+        self.account_stream.add_position_listener(self._on_exchange_position)
+        self._exchange_flat = set()
         self.ws_threads = {}
+        self.ws_apps = {}
         self._stop_event = threading.Event()
+        self._symbol_stop_events = {}
         self.position_locks = {symbol: threading.Lock() for symbol in self.symbols}
+        # Açık pozisyonların tetik tablosu: sembol -> (long_mu, sl, tp1, tp2); mum içi güncellemeler sadece buna bakar
+        self._triggers = {}
+        # Kapanış emri havuzda bekleyen semboller (aynı tetik için ikinci kez emir gönderilmez)
+        self._closing = set()
+        # None ise kapanışlar aynı iş parçacığında yürütülür (ör. replay.py ile deterministik tekrar oynatma)
+        self._close_pool = None
+
+        # Giriş + SL/TP emirlerini gönderen, kaldıraç durumunu hatırlayan paylaşımlı bileşen
+        self.order_submitter = get_order_submitter(self.executor)
 
         # --- YENİ: RL Modelini Veritabanından Yükleme ---
         self.rl_model = None
+        self._load_rl_model()
+
+        self._load_positions()
+
+    def _load_rl_model(self):
+        """Stratejiye bağlı RL modelini (varsa) süreç genelindeki paylaşımlı model önbelleğinden alır."""
+        self._release_rl_model()
+        # Model değiştiğinde gözlem üreticileri güncel veriden yeniden kurulsun
+        for symbol_data in self.portfolio_data.values():
+            symbol_data['obs_builder'] = None
         # Stratejiye bağlı modelin ID'sini al
         rl_model_id = self.config.get('rl_model_id')
         if rl_model_id:
             try:
-                logging.info(f"🤖 RL AJANI VERİTABANINDAN YÜKLENİYOR ({self.name}): Model ID = {rl_model_id}")
-                # Modeli veritabanından byte olarak çek
-                model_buffer = get_rl_model_by_id(rl_model_id)
-                if model_buffer:
-                    # Gelen byte verisinden modeli yükle
-                    self.rl_model = PPO.load(model_buffer)
+                logging.info(f"🤖 RL AJANI YÜKLENİYOR ({self.name}): Model ID = {rl_model_id}")
+                # Aynı modeli kullanan diğer stratejilerle ağırlıkları paylaş
+                self.rl_model = acquire_rl_model(rl_model_id)
+                if self.rl_model:
+                    for symbol in self._symbol_stop_events:
+                        self.rl_model.register(self.interval, (self.id, symbol))
                     logging.info(f"✅ RL Ajanı (ID: {rl_model_id}) başarıyla yüklendi: '{self.name}'")
                 else:
                     logging.error(f"❌ HATA ({self.name}): Veritabanında RL Ajanı (ID: {rl_model_id}) bulunamadı.")
@@ -107,81 +311,184 @@ class StrategyRunner:
                 logging.error(f"❌ KRİTİK HATA ({self.name}): RL Ajanı (ID: {rl_model_id}) yüklenemedi: {e}")
                 self.rl_model = None
 
-        self._load_positions()
+    def _release_rl_model(self):
+        if self.rl_model:
+            for symbol in self._symbol_stop_events:
+                self.rl_model.unregister(self.interval, (self.id, symbol))
+            release_rl_model(self.rl_model)
+        self.rl_model = None
 
     def _load_positions(self):
         try:
-            # Veritabanından pozisyonları tam detaylarıyla yükle
-            loaded_positions = get_positions_for_strategy(self.id)
-            for symbol, pos_data in loaded_positions.items():
-                # Başlangıçta hafızayı doldur
-                self.portfolio_data[symbol] = {
-                    'position': pos_data.get('position'),
-                    'entry_price': pos_data.get('entry_price', 0),
-                    'df': self.portfolio_data.get(symbol, {}).get('df'),  # Mevcut DataFrame'i koru
-                    'last_signal': None
-                }
+            # Veritabanından pozisyonları tam detaylarıyla (SL/TP seviyeleri dahil) yükle; sonrası bellekten okunur.
+            # Sadece bu runner'a (parçalı çalışmada bu parçaya) düşen sembollerin pozisyonları yönetilir.
+            self.positions.load(self.symbols)
+            for symbol in self.positions.symbols():
+                self._refresh_triggers(symbol)
             logging.info(f"BİLGİ ({self.name}): Veritabanından başlangıç pozisyonları yüklendi.")
         except Exception as e:
             logging.error(f"HATA ({self.name}): Veritabanından pozisyonlar okunurken hata: {e}")
-            self.portfolio_data = {}
 
-    def start(self):
+    def start(self, stream=True):
+        """
+        Stratejiyi başlatır. stream=False ise yalnızca başlangıç verisi yüklenir; WebSocket ve manuel
+        komut iş parçacıkları açılmaz (mesajlar dışarıdan, ör. replay.ReplayDriver ile verilir).
+        """
         logging.info(f"✅ Strateji BAŞLATILIYOR: '{self.name}' (ID: {self.id})")
-        action_checker_thread = threading.Thread(target=self._check_manual_actions, daemon=True)
-        action_checker_thread.start()
+        self._stream = stream
+        if stream:
+            self._close_pool = get_close_pool()
+            action_checker_thread = threading.Thread(target=self._check_manual_actions, daemon=True)
+            action_checker_thread.start()
         for symbol in self.symbols:
+            self._start_symbol(symbol)
+
+    def _start_symbol(self, symbol):
+        """Tek bir sembol için başlangıç verisini çeker ve WebSocket akışını başlatır."""
+        try:
+            initial_df = self.kline_source(symbol, self.interval, limit=200)
+            if initial_df is None or initial_df.empty:
+                logging.warning(f"HATA ({self.name}): {symbol} için başlangıç verisi alınamadı. Atlanıyor.")
+                return
+            if symbol not in self.portfolio_data:
+                self.portfolio_data[symbol] = {'last_signal': None}
+            if symbol not in self._hub_symbols:
+                initial_df = self.feature_hub.subscribe(symbol, self.interval, initial_df)
+                self._hub_symbols.add(symbol)
+            self.portfolio_data[symbol]['df'] = initial_df
+            self.portfolio_data[symbol]['obs_builder'] = None
+            self._symbol_stop_events[symbol] = threading.Event()
+            if self.rl_model:
+                self.rl_model.register(self.interval, (self.id, symbol))
+            if not self._stream:
+                return
+            ws_thread = threading.Thread(target=self._run_websocket, args=(symbol,), daemon=True)
+            self.ws_threads[symbol] = ws_thread
+            ws_thread.start()
+            time.sleep(0.5)
+        except Exception as e:
+            logging.critical(f"KRİTİK HATA ({self.name}): {symbol} başlatılırken sorun: {e}")
+
+    def _stop_symbol(self, symbol):
+        """Tek bir sembolün WebSocket akışını diğer sembollere dokunmadan kapatır."""
+        stop_event = self._symbol_stop_events.pop(symbol, None)
+        if stop_event:
+            stop_event.set()
+        if self.rl_model:
+            self.rl_model.unregister(self.interval, (self.id, symbol))
+        if symbol in self._hub_symbols:
+            self._hub_symbols.discard(symbol)
+            self.feature_hub.unsubscribe(symbol, self.interval)
+        ws = self.ws_apps.pop(symbol, None)
+        if ws:
             try:
-                initial_df = get_binance_klines(symbol, self.interval, limit=200)
-                if initial_df is None or initial_df.empty:
-                    logging.warning(f"HATA ({self.name}): {symbol} için başlangıç verisi alınamadı. Atlanıyor.")
-                    continue
-                if symbol not in self.portfolio_data:
-                    self.portfolio_data[symbol] = {
-                        'position': None, 'entry_price': 0, 'stop_loss_price': 0,
-                        'tp1_price': 0, 'tp2_price': 0, 'tp1_hit': False, 'tp2_hit': False,
-                        'last_signal': None
-                    }
-                self.portfolio_data[symbol]['df'] = initial_df
-                ws_thread = threading.Thread(target=self._run_websocket, args=(symbol,), daemon=True)
-                self.ws_threads[symbol] = ws_thread
-                ws_thread.start()
-                time.sleep(0.5)
+                ws.close()
             except Exception as e:
-                logging.critical(f"KRİTİK HATA ({self.name}): {symbol} başlatılırken sorun: {e}")
+                logging.warning(f"UYARI ({self.name}): {symbol} WebSocket bağlantısı kapatılamadı: {e}")
+        self.ws_threads.pop(symbol, None)
 
     def stop(self):
         logging.info(f"🛑 Strateji DURDURULUYOR: '{self.name}' (ID: {self.id})")
         self._stop_event.set()
+        for symbol in list(self._symbol_stop_events.keys()):
+            self._stop_symbol(symbol)
+        self._release_rl_model()
+        self.account_stream.remove_position_listener(self._on_exchange_position)
+        self.positions.flush(timeout=10)
+
+    def apply_config(self, new_config, diff=None):
+        """
+        Yeniden başlatma gerektirmeyen yapılandırma değişikliklerini çalışan stratejiye yerinde uygular.
+        Parametre değişiklikleri bir sonraki mumdan itibaren geçerli olur; mevcut akışlar, pozisyonlar ve
+        veri tamponları korunur. Yeni semboller için sadece yeni akışlar açılır.
+        """
+        if diff is None:
+            diff = classify_config_change(self.config, new_config)
+        if diff['action'] == 'none':
+            self.config = new_config
+            return
+
+        old_rl_model_id = self.config.get('rl_model_id')
+        self.config = new_config
+        self.name = new_config.get('name', self.name)
+        self.params = parse_strategy_params(new_config.get('strategy_params', {}))
+
+        if new_config.get('rl_model_id') != old_rl_model_id:
+            self._load_rl_model()
+
+        for symbol in diff['removed_symbols']:
+            logging.info(f"➖ SEMBOL ÇIKARILDI ({self.name}): {symbol} akışı durduruluyor.")
+            self._stop_symbol(symbol)
+            self.portfolio_data.pop(symbol, None)
+            self.positions.forget(symbol)
+            self._triggers.pop(symbol, None)
+            self.last_prices.pop(symbol, None)
+
+        # Sembol listesini tek atamada değiştir (WebSocket thread'leri eski listeyi güvenle okuyabilir)
+        self.symbols = list(new_config.get('symbols') or [])
+        self.symbols_to_track = self.symbols
+
+        for symbol in diff['added_symbols']:
+            logging.info(f"➕ YENİ SEMBOL ({self.name}): {symbol} için akış başlatılıyor.")
+            self.position_locks.setdefault(symbol, threading.Lock())
+            # Sembol başka bir parçadan bu parçaya geçmiş olabilir; kayıtlı pozisyonu devralınır
+            try:
+                self.positions.adopt(symbol)
+                self._refresh_triggers(symbol)
+            except Exception as e:
+                logging.error(f"HATA ({self.name}): {symbol} pozisyonu veritabanından okunamadı: {e}")
+            if not self._stop_event.is_set():
+                self._start_symbol(symbol)
+
+        logging.info(f"♻️ YERİNDE GÜNCELLEME ({self.name}): Alanlar={diff['changed_keys']}, "
+                     f"Parametreler={diff['changed_params']}")
 
     # multi_worker.py içindeki _close_position fonksiyonunu bununla değiştirin
 
+    def _is_trading_enabled(self, config=None):
+        """Emirler borsaya gönderilecek mi? Simüle borsada canlı işlem yolu her zaman çalıştırılır."""
+        return self.paper_trading or (config or self.config).get('is_trading_enabled', False)
+
     def _close_position(self, symbol: str, close_price: float, reason: str, size_pct_to_close: float = 100.0):
         """
         Pozisyonun belirtilen yüzdesini kapatır ve durumu doğru bir şekilde günceller.
         size_pct_to_close: 1.0 ile 100.0 arasında bir değer.
         """
-        symbol_data = self.portfolio_data.get(symbol, {})
-        current_position = symbol_data.get('position')
-        entry_price = symbol_data.get('entry_price', 0)
-        if not current_position:
+        if not self.positions.position(symbol):
             return
 
         with self.position_locks[symbol]:
-            is_trading_enabled = self.config.get('is_trading_enabled', False)
+            # Kilit beklenirken pozisyon başka bir kapanışla kapanmış olabilir; durumu kilit içinde yeniden oku
+            record = self.positions.get(symbol)
+            current_position = record.get('position')
+            entry_price = record.get('entry_price', 0)
+            if not current_position:
+                return
+            is_trading_enabled = self._is_trading_enabled()
 
             # --- POZİSYON KAPATMA EMİRLERİ (SADECE CANLI İŞLEM AÇIKSA) ---
             if is_trading_enabled:
-                total_quantity = get_open_position_amount(symbol)
+                total_quantity = None
+                if self.account_stream.synced:
+                    total_quantity = record.get('quantity')
+                    if total_quantity is None:  # ör. yeniden başlatma sonrası veritabanından yüklenen pozisyon
+                        total_quantity = abs(self.account_stream.position_amount(symbol) or 0.0)
+                if total_quantity is None:
+                    # Kullanıcı veri akışı yok veya eşit değil: borsadaki miktar REST ile okunur
+                    total_quantity = self.executor.get_open_position_amount(symbol)
                 if total_quantity > 0:
                     quantity_to_close = total_quantity * (size_pct_to_close / 100.0)
-                    symbol_info = get_symbol_info(symbol)
+                    symbol_info = self.executor.get_symbol_info(symbol)
                     if symbol_info:
                         quantity_precision = int(symbol_info['quantityPrecision'])
                         quantity_to_close = round(quantity_to_close, quantity_precision)
                     if quantity_to_close > 0:
                         close_side = 'SELL' if current_position == 'Long' else 'BUY'
-                        place_futures_order(symbol, close_side, quantity_to_close)
+                        with self.metrics.timer('order_close', self.id, symbol):
+                            order = self.executor.place_futures_order(symbol, close_side, quantity_to_close)
+                        if order:
+                            total_quantity = max(total_quantity - quantity_to_close, 0.0)
+                self.positions.set_quantity(symbol, total_quantity)
 
             # --- POZİSYONUN DAHLİ DURUMUNU GÜNCELLE (HER ZAMAN) ---
             # Kar/Zarar (P&L) hesaplaması ve loglama
@@ -190,41 +497,118 @@ class StrategyRunner:
             log_reason = f"{reason} ({size_pct_to_close}%)"
             self.notify_and_log(symbol, log_reason, close_price, pnl)
 
-            # Hafızayı ve veritabanı durumunu güncelle
+            # Defteri güncelle (veritabanına arka planda yazılır)
             if size_pct_to_close >= 100.0:
                 self._reset_position_state(symbol)
-            else:
-                # --- DÜZELTİLMİŞ GÜNCELLEME MANTIĞI ---
-                # Stale (eski) veri kullanmamak için pozisyonun en güncel halini veritabanından çek
-                current_state_from_db = get_positions_for_strategy(self.id).get(symbol, {})
-                if not current_state_from_db:  # Güvenlik kontrolü
-                    current_state_from_db = self.portfolio_data.get(symbol, {})
-
-                new_tp1_hit = current_state_from_db.get('tp1_hit', False)
-                new_tp2_hit = current_state_from_db.get('tp2_hit', False)
-
-                if "Take-Profit 1" in reason:
-                    new_tp1_hit = True
-                elif "Take-Profit 2" in reason:
-                    new_tp2_hit = True
-
-                # Veritabanını yeni bayraklarla güncelle
-                update_position(self.id, symbol, current_state_from_db.get('position'), current_state_from_db.get('entry_price'),
-                                sl_price=current_state_from_db.get('stop_loss_price'),
-                                tp1_price=current_state_from_db.get('tp1_price'),
-                                tp2_price=current_state_from_db.get('tp2_price'),
-                                tp1_hit=new_tp1_hit,
-                                tp2_hit=new_tp2_hit)
-
-                # Yerel hafızayı da senkronize et (isteğe bağlı ama iyi bir pratik)
-                if symbol in self.portfolio_data:
-                    self.portfolio_data[symbol]['tp1_hit'] = new_tp1_hit
-                    self.portfolio_data[symbol]['tp2_hit'] = new_tp2_hit
+            elif "Take-Profit 1" in reason:
+                self.positions.mark_take_profit(symbol, tp1_hit=True)
+            elif "Take-Profit 2" in reason:
+                self.positions.mark_take_profit(symbol, tp2_hit=True)
+            self._refresh_triggers(symbol)
+
+    def _on_exchange_position(self, symbol, amount, entry_price):
+        """
+        Kullanıcı veri akışındaki pozisyon bildirimini deftere işler. Pozisyon borsada kapandıysa (ör. borsadaki
+        SL/TP emri doldu) sembol işaretlenir; kapanış bir sonraki fiyat güncellemesinde kaydedilir.
+        """
+        if symbol not in self.symbols or not self._is_trading_enabled():
+            return
+        if self.positions.reconcile(symbol, amount) == 'flat':
+            self._exchange_flat.add(symbol)
+
+    def _handle_exchange_close(self, symbol, last_price):
+        """Borsada kapanmış ama defterde açık görünen pozisyonu (emir göndermeden) kapatır ve bildirir."""
+        self._exchange_flat.discard(symbol)
+        if not self.positions.position(symbol) or symbol in self._closing:
+            return
+        fill = self.account_stream.last_fill(symbol) or {}
+        if fill.get('type') == 'STOP_MARKET':
+            reason = "Stop-Loss (Borsa)"
+        elif fill.get('type') == 'TAKE_PROFIT_MARKET':
+            reason = "Take-Profit (Borsa)"
+        else:
+            reason = "Borsada Kapandı"
+        logging.info(f"BİLGİ ({self.name}): {symbol} pozisyonu borsada kapandı ({reason}), defter güncelleniyor.")
+        self._submit_close(symbol, fill.get('price') or last_price, reason)
+
+    def _refresh_triggers(self, symbol):
+        """Sembolün SL/TP seviyelerini mum içi kontrol için float olarak önceden hesaplar (0 = tetik yok)."""
+        record = self.positions.get(symbol)
+        position = record.get('position')
+        if not position:
+            self._triggers.pop(symbol, None)
+            return
+        tp1_hit = record.get('tp1_hit', False)
+        sl = float(record.get('stop_loss_price') or 0)
+        tp1 = 0.0 if tp1_hit else float(record.get('tp1_price') or 0)
+        # TP2 sadece TP1 gerçekleştikten sonra devreye girer
+        tp2 = float(record.get('tp2_price') or 0) if tp1_hit and not record.get('tp2_hit', False) else 0.0
+        self._triggers[symbol] = (position == 'Long', sl, tp1, tp2)
+
+    def _check_triggers(self, symbol, high_price, low_price):
+        """
+        Mum içi en yüksek/en düşük fiyatı tetik tablosuyla karşılaştırır; tetiklenen kapanışı havuza verir.
+        Stop-Loss tetiklendiyse True döner.
+        """
+        trigger = self._triggers.get(symbol)
+        if trigger is None or symbol in self._closing:
+            return False
+        is_long, sl, tp1, tp2 = trigger
+        if is_long:
+            if sl and low_price <= sl:
+                self._submit_close(symbol, sl, "Stop-Loss")
+                return True
+            if tp1 and high_price >= tp1:
+                self._submit_close(symbol, tp1, "Take-Profit 1", self.params.get('tp1_size_pct', 50))
+            elif tp2 and high_price >= tp2:
+                self._submit_close(symbol, tp2, "Take-Profit 2", 100)
+        else:
+            if sl and high_price >= sl:
+                self._submit_close(symbol, sl, "Stop-Loss")
+                return True
+            if tp1 and low_price <= tp1:
+                self._submit_close(symbol, tp1, "Take-Profit 1", self.params.get('tp1_size_pct', 50))
+            elif tp2 and low_price <= tp2:
+                self._submit_close(symbol, tp2, "Take-Profit 2", 100)
+        return False
+
+    def _submit_close(self, symbol, close_price, reason, size_pct_to_close=100.0):
+        """
+        Pozisyon kapanışını (borsa emri + veritabanı) kapatma havuzunda başlatır; WebSocket iş parçacığı beklemez.
+        Aynı sembolde kapanış sürerken gelen tetikler yok sayılır; mum içi en yüksek/en düşük değerler birikimli
+        olduğundan kapanış bittikten sonraki ilk güncelleme kalan seviyeleri yine yakalar.
+        """
+        if self._close_pool is None:
+            self._close_position(symbol, close_price, reason, size_pct_to_close)
+            return
+        self._closing.add(symbol)
+
+        def run_close():
+            try:
+                self._close_position(symbol, close_price, reason, size_pct_to_close)
+            except Exception as e:
+                logging.error(f"HATA ({self.name}): {symbol} pozisyonu kapatılırken sorun ({reason}): {e}")
+                logging.error(traceback.format_exc())
+            finally:
+                self._closing.discard(symbol)
+                _close_finished()
+
+        _close_started()
+        try:
+            self._close_pool.submit(run_close)
+        except BaseException:
+            self._closing.discard(symbol)
+            _close_finished()
+            raise
 
     def _check_manual_actions(self):
         while not self._stop_event.is_set():
             try:
-                actions = get_and_clear_pending_actions(self.id)
+                if self.shard is None:
+                    actions = self.store.get_and_clear_pending_actions(self.id)
+                else:
+                    # Diğer parçaların sembollerine ait komutlara dokunulmaz
+                    actions = self.store.get_and_clear_pending_actions(self.id, symbols=list(self.symbols))
                 for action in actions:
                     if action['action'] == 'CLOSE_POSITION':
                         symbol_to_close = action['symbol']
@@ -241,12 +625,12 @@ class StrategyRunner:
             """
             Manuel kapatma emrini işler.
             """
-            if not self.portfolio_data.get(symbol, {}).get('position'):
+            if not self.positions.position(symbol):
                 logging.info(f"BİLGİ ({self.name}): {symbol} için kapatılacak aktif pozisyon bulunamadı.")
                 return
             try:
                 # Fiyat verisini alırken boş DataFrame kontrolü ekle
-                df_latest = get_binance_klines(symbol, self.interval, limit=1)
+                df_latest = self.kline_source(symbol, self.interval, limit=1)
                 if df_latest.empty:
                     logging.error(f"HATA ({self.name}): Manuel kapatma için {symbol} anlık fiyatı alınamadı: Boş veri.")
                     return
@@ -258,7 +642,12 @@ class StrategyRunner:
 
     def _run_websocket(self, symbol):
         stream_url = f"wss://stream.binance.com:9443/ws/{symbol.lower()}@kline_{self.interval}"
-        while not self._stop_event.is_set():
+        symbol_stop_event = self._symbol_stop_events.get(symbol) or threading.Event()
+
+        def should_stop():
+            return self._stop_event.is_set() or symbol_stop_event.is_set()
+
+        while not should_stop():
             try:
                 ws = websocket.WebSocketApp(
                     stream_url,
@@ -268,114 +657,53 @@ class StrategyRunner:
                     on_close=lambda ws, code, msg: logging.warning(
                         f"🔌 Bağlantı kapandı: {symbol} ({self.name}). Yeniden bağlanılıyor...")
                 )
+                self.ws_apps[symbol] = ws
                 ws.run_forever(ping_interval=60, ping_timeout=10)
             except Exception as e:
                 logging.critical(f"KRİTİK WebSocket Hatası ({symbol}, {self.name}): {e}")
-            if not self._stop_event.is_set():
+            if not should_stop():
                 time.sleep(10)
 
 
     def _reset_position_state(self, symbol):
-        # Hafızadaki durumu sıfırla
-        if symbol in self.portfolio_data:
-            self.portfolio_data[symbol]['position'] = None
-            self.portfolio_data[symbol]['entry_price'] = 0
-            self.portfolio_data[symbol]['stop_loss_price'] = 0
-            self.portfolio_data[symbol]['tp1_price'] = 0
-            self.portfolio_data[symbol]['tp2_price'] = 0
-            self.portfolio_data[symbol]['tp1_hit'] = False
-            self.portfolio_data[symbol]['tp2_hit'] = False
-
-        # Veritabanındaki pozisyonu temizle
-        update_position(self.id, symbol, None, 0, 0, 0, 0, False, False)
+        # Defterdeki pozisyonu sil (veritabanındaki kayıt arka planda temizlenir)
+        self.positions.close(symbol)
+        self._triggers.pop(symbol, None)
 
     def _on_message(self, ws, message, symbol):
         """WebSocket'ten gelen mesajları işler."""
+        if self.message_recorder is not None:
+            self.message_recorder.record(symbol, message)
+        received = time.perf_counter()
+        closed = False
         try:
-            json_message = json.loads(message)
-            if 'k' in json_message:
-                kline = json_message['k']
-                symbol = kline['s']
-                is_closed = kline['x']
-
-                # Sadece ilgili stratejinin sembollerini dinle
-                if symbol not in self.symbols:
-                    return
-
-                high_price = float(kline['h'])
-                low_price = float(kline['l'])
-                close_price = float(kline['c'])
-
-                # Log için son fiyatı kaydet
-                self.last_prices[symbol] = close_price
-
-                # --- Mevcut açık pozisyonlar için SL/TP kontrolü ---
-
-                symbol_data = self.portfolio_data.get(symbol)
-
-                if symbol_data and symbol_data.get('position'):
-                    pos_type = symbol_data.get('position')
-                    sl_price = symbol_data.get('stop_loss_price')
-                    tp1_price = symbol_data.get('tp1_price')
-                    tp2_price = symbol_data.get('tp2_price')
-
-                    # LONG Pozisyon için kontrol
-                    if pos_type == 'Long':
-                        # Stop-Loss kontrolü (Değişiklik yok)
-                        if sl_price and low_price <= sl_price:
-                            self._close_position(symbol, sl_price, "Stop-Loss")
-                            return
-
-                        # Take-Profit 1 kontrolü (Değişiklik yok)
-                        if tp1_price and not symbol_data.get('tp1_hit', False) and high_price >= tp1_price:
-                            tp1_size_pct = self.params.get('tp1_size_pct', 50)
-                            self._close_position(symbol, tp1_price, "Take-Profit 1", size_pct_to_close=tp1_size_pct)
-
-                        # Take-Profit 2 kontrolü 'elif' ile daha güvenli hale getirildi
-                        elif tp2_price and symbol_data.get('tp1_hit', False) and not symbol_data.get('tp2_hit',
-                                                                                                     False) and high_price >= tp2_price:
-                            self._close_position(symbol, tp2_price, "Take-Profit 2", size_pct_to_close=100)
-
-                        # SHORT Pozisyon için kontrol (Aynı mantık)
-                    elif pos_type == 'Short':
-                        # Stop-Loss kontrolü (Değişiklik yok)
-                        if sl_price and high_price >= sl_price:
-                            self._close_position(symbol, sl_price, "Stop-Loss")
-                            return
-
-                        # Take-Profit 1 kontrolü (Değişiklik yok)
-                        if tp1_price and not symbol_data.get('tp1_hit', False) and low_price <= tp1_price:
-                            tp1_size_pct = self.params.get('tp1_size_pct', 50)
-                            self._close_position(symbol, tp1_price, "Take-Profit 1", size_pct_to_close=tp1_size_pct)
-
-                        # Take-Profit 2 kontrolü 'elif' ile daha güvenli hale getirildi
-                        elif tp2_price and symbol_data.get('tp1_hit', False) and not symbol_data.get('tp2_hit',
-                                                                                                     False) and low_price <= tp2_price:
-                            self._close_position(symbol, tp2_price, "Take-Profit 2", size_pct_to_close=100)
-
-            # Mum kapanışındaki sinyal mantığı (değişiklik yok)
-            is_kline_closed = kline.get('x', False)
-            if not is_kline_closed:
+            # --- Mum içi güncelleme (hızlı yol): açık pozisyon yoksa JSON bile çözülmez ---
+            if not is_closed_kline_message(message):
+                self.metrics.inc('ws_messages', symbol=symbol, kind='tick')
+                if symbol in self._triggers or symbol in self._exchange_flat or self.paper_trading:
+                    self._on_tick(json.loads(message).get('k'))
                 return
 
-            # ... (fonksiyonun geri kalanı aynı)
-            df = self.portfolio_data[symbol]['df']
-            kline_timestamp = pd.to_datetime(kline['t'], unit='ms')
-
-            if not df.empty and kline_timestamp <= df.index[-1]:
-                df.iloc[-1] = [float(kline['o']), float(kline['h']), float(kline['l']), float(kline['c']),
-                               float(kline['v'])]
-            else:
-                new_kline_df = pd.DataFrame(
-                    [{'Open': float(kline['o']), 'High': float(kline['h']), 'Low': float(kline['l']),
-                      'Close': float(kline['c']), 'Volume': float(kline['v'])}],
-                    index=[kline_timestamp]
-                )
-                df = pd.concat([df, new_kline_df])
+            closed = True
+            self.metrics.inc('ws_messages', symbol=symbol, kind='closed')
+            kline = json.loads(message).get('k')
+            self.metrics.observe('parse', time.perf_counter() - received, self.id, symbol)
+            # Sadece ilgili stratejinin sembollerini dinle
+            if not kline or kline['s'] not in self.symbols:
+                return
+            symbol = kline['s']
 
-            if len(df) > 201:
-                df = df.iloc[1:]
+            # Kapanan mumda da SL/TP kontrolü yapılır; Stop-Loss tetiklendiyse sinyal üretilmez
+            if self._on_tick(kline):
+                return
 
+            # Mum paylaşılan tampona eklenir; aynı sembolü izleyen diğer stratejiler aynı mumu tekrar eklemez
+            kline_timestamp = pd.to_datetime(kline['t'], unit='ms')
+            with self.metrics.timer('buffer_update', self.id, symbol):
+                df = self.feature_hub.apply_kline(symbol, self.interval, kline)
+            # Sembol bu arada bırakıldıysa veya mum sırası bozuk (tampondaki son mumdan eski) geldiyse işlenmez
+            if df is None or kline_timestamp < df.index[-1]:
+                return
             self.portfolio_data[symbol]['df'] = df
 
             # --- YENİ: Sinyal Üretme Mantığı ---
@@ -385,27 +713,34 @@ class StrategyRunner:
             # EĞER RL MODELİ ATANMIŞSA, KARARI AJANA BIRAK
             if self.rl_model:
                 try:
-                    # 1. Gözlem verisini hazırla (trading_env.py'deki mantıkla aynı)
-                    temp_env = TradingEnv(df)  # Veriyi hazırlamak için geçici bir env oluştur
-                    obs_df = temp_env.df
+                    # 1. Gözlem verisini hazırla (trading_env.py ile aynı özellik tanımları, son bardan artımlı)
+                    obs_builder = self.portfolio_data[symbol].get('obs_builder')
+                    if obs_builder is None:
+                        obs_builder = ObservationBuilder(window=201).seed(df)
+                        self.portfolio_data[symbol]['obs_builder'] = obs_builder
+                    else:
+                        obs_builder.update(kline_timestamp, kline['o'], kline['h'], kline['l'], kline['c'], kline['v'])
 
                     # Son adıma ait gözlemi al
-                    last_obs_series = obs_df.iloc[-1]
+                    last_obs_values = obs_builder.observation()
 
                     # Ortamdaki ek bilgileri ekle (bakiye, pozisyon, giriş fiyatı)
                     # Canlı işlemde bakiye takibi karmaşık olacağından, şimdilik temsili değerler kullanıyoruz.
                     # Asıl önemli olan piyasa verisidir.
-                    current_position_state = 1 if self.portfolio_data.get(symbol, {}).get('position') == 'Long' else 0
-                    entry_price = self.portfolio_data.get(symbol, {}).get('entry_price', 0)
+                    current_position_state = 1 if self.positions.position(symbol) == 'Long' else 0
+                    entry_price = self.positions.get(symbol).get('entry_price', 0)
                     pnl = 0 if entry_price == 0 else (price - entry_price) / entry_price
 
                     additional_info = np.array([10000, current_position_state, entry_price, pnl], dtype=np.float32)
 
                     # Gözlemi oluştur
-                    obs = np.concatenate((last_obs_series.values.astype(np.float32), additional_info))
+                    obs = np.concatenate((last_obs_values, additional_info))
 
-                    # 2. Modelden tahmin al
-                    action, _ = self.rl_model.predict(obs, deterministic=True)
+                    # 2. Modelden tahmin al (aynı mum sınırındaki diğer sembollerle tek seferde)
+                    with self.metrics.timer('rl_predict', self.id, symbol):
+                        action, _ = self.rl_model.predict(obs, deterministic=True,
+                                                          interval=self.interval, boundary=kline['t'],
+                                                          participant=(self.id, symbol))
 
                     # 3. Aksiyonu sinyale çevir
                     if action == 1:
@@ -424,11 +759,15 @@ class StrategyRunner:
             # EĞER RL MODELİ YOKSA, STANDART İNDİKATÖR MANTIĞINI KULLAN
             else:
 
-                # 1. Göstergeleri hesapla
-                df_indicators = generate_all_indicators(df, **self.params)
+                # 1. Göstergeleri al: sadece stratejinin kullandıkları, her biri bu mumda bir kez hesaplanır
+                #    ve aynı sembolü izleyen stratejiler arasında paylaşılır
+                with self.metrics.timer('indicators', self.id, symbol):
+                    df_indicators = self.feature_hub.indicator_frame(symbol, self.interval, self.params,
+                                                                     required_indicators(self.params))
 
                 # 2. Ham sinyalleri üret
-                df_signals = generate_signals(df_indicators, **self.params)
+                with self.metrics.timer('signals', self.id, symbol):
+                    df_signals = generate_signals(df_indicators, **self.params)
 
                 # ================== DÜZELTME BAŞLANGICI ==================
                 # 3. MTA (Çoklu Zaman Dilimi) Filtresini Uygula
@@ -437,7 +776,8 @@ class StrategyRunner:
                     trend_ema = self.params.get('trend_ema_period', 50)
 
                     # Üst zaman dilimi verisini çek
-                    df_higher = get_binance_klines(symbol, higher_tf, limit=1000)
+                    with self.metrics.timer('mta_fetch', self.id, symbol):
+                        df_higher = self.kline_source(symbol, higher_tf, limit=1000)
 
                     if df_higher is not None and not df_higher.empty:
                         # Trendi hesapla ve alt zaman dilimine ekle
@@ -460,7 +800,7 @@ class StrategyRunner:
                 raw_signal = last_row['Signal']
                 price = last_row['Close']
 
-                current_position = self.portfolio_data.get(symbol, {}).get('position')
+                current_position = self.positions.position(symbol)
                 last_signal = self.portfolio_data.get(symbol, {}).get('last_signal')
 
                 # --- YENİ KONTROL ---
@@ -470,14 +810,14 @@ class StrategyRunner:
 
                 if (current_position == 'Long' and raw_signal == 'Short') or \
                         (current_position == 'Short' and raw_signal == 'Al'):
-                    self._close_position(symbol, price, "Karşıt Sinyal", size_pct_to_close=100.0)
+                    self._submit_close(symbol, price, "Karşıt Sinyal", size_pct_to_close=100.0)
                     self.portfolio_data[symbol]['last_signal'] = raw_signal  # Pozisyon kapanınca son sinyali güncelle
 
                 elif current_position is None:
                     if self.position_locks[symbol].acquire(blocking=False):
                         try:
-                            if self.portfolio_data.get(symbol, {}).get('position') is None:
-                                self.config = next((s for s in get_all_strategies() if s['id'] == self.id), self.config)
+                            if self.positions.position(symbol) is None:
+                                self.config = next((s for s in self.store.get_all_strategies() if s['id'] == self.id), self.config)
                                 if self.config.get('status') == 'running' and self.config.get(
                                         'orchestrator_status') == 'active':
                                     new_pos = None
@@ -497,12 +837,37 @@ class StrategyRunner:
         except Exception as e:
             logging.error(f"KRİTİK HATA ({symbol}, {self.name}): Mesaj işlenirken sorun: {e}")
             logging.error(traceback.format_exc())
+        finally:
+            if closed:
+                # Mesajın gelişinden emir gönderimi dahil tüm işlemin bitişine kadar geçen süre
+                self.metrics.observe('candle_total', time.perf_counter() - received, self.id, symbol)
+
+    def _on_tick(self, kline):
+        """Fiyat güncellemesini işler: son fiyat, simüle borsa eşleştirmesi ve SL/TP tetik kontrolü."""
+        if not kline or kline['s'] not in self.symbols:
+            return False
+        symbol = kline['s']
+        high_price = float(kline['h'])
+        low_price = float(kline['l'])
+
+        # Log için son fiyatı kaydet
+        self.last_prices[symbol] = float(kline['c'])
+
+        # Simüle borsada bekleyen emirler gelen fiyatla eşleştirilir
+        if self.paper_trading:
+            self.executor.on_kline(symbol, kline)
+
+        stop_loss_hit = self._check_triggers(symbol, high_price, low_price)
+        # Seviyelere yerel fiyatla ulaşılmadan borsada kapanan pozisyon (ör. vadeli/spot fiyat farkı)
+        if symbol in self._exchange_flat:
+            self._handle_exchange_close(symbol, self.last_prices[symbol])
+        return stop_loss_hit
 
     # multi_worker.py içine yerleştirilecek YENİ ve GÜVENLİ _open_new_position fonksiyonu
 
     def _open_new_position(self, symbol, new_pos, entry_price, df_with_indicators):
         # Veritabanından en güncel strateji yapılandırmasını al
-        current_strategy_config = next((s for s in get_all_strategies() if s['id'] == self.id), self.config)
+        current_strategy_config = next((s for s in self.store.get_all_strategies() if s['id'] == self.id), self.config)
         params_from_db = current_strategy_config.get('strategy_params', {})
 
         # Eğer parametreler yanlışlıkla metin (string) olarak gelirse, onu JSON'a çevir.
@@ -521,18 +886,12 @@ class StrategyRunner:
         # Risk seviyelerini (SL/TP) GÜVENLİ parametrelerle hesapla
         sl, tp1, tp2 = self._calculate_risk_levels(df_with_indicators, symbol, new_pos, entry_price)
 
-        # Önce hafızadaki durumu güncelle
-        self.portfolio_data[symbol].update({
-            'position': new_pos, 'entry_price': entry_price,
-            'stop_loss_price': sl, 'tp1_price': tp1, 'tp2_price': tp2,
-            'tp1_hit': False, 'tp2_hit': False
-        })
-
-        # Veritabanına doğru hesaplanmış SL/TP değerlerini kaydet
-        update_position(self.id, symbol, new_pos, entry_price, sl, tp1, tp2, False, False)
+        # Önce defteri güncelle (doğru hesaplanmış SL/TP değerleri veritabanına arka planda kaydedilir)
+        self.positions.open(symbol, new_pos, entry_price, sl, tp1, tp2)
+        self._refresh_triggers(symbol)
         self.notify_new_position(symbol, new_pos, entry_price, sl, tp1, tp2)
 
-        is_trading_enabled = current_strategy_config.get('is_trading_enabled', False)
+        is_trading_enabled = self._is_trading_enabled(current_strategy_config)
         if is_trading_enabled:
             leverage = self.params.get('leverage', 5)
             trade_amount_usdt = self.params.get('trade_amount_usdt', 10.0)
@@ -540,7 +899,7 @@ class StrategyRunner:
             if entry_price <= 0:
                 logging.error(f"HATA ({self.name}): Geçersiz giriş fiyatı ({entry_price}). İşlem atlanıyor.")
                 return
-            symbol_info = get_symbol_info(symbol)
+            symbol_info = self.executor.get_symbol_info(symbol)
             if not symbol_info:
                 logging.error(f"HATA ({self.name}): {symbol} için işlem kuralları alınamadı. İşlem atlanıyor.")
                 return
@@ -551,39 +910,27 @@ class StrategyRunner:
                 logging.warning(
                     f"UYARI ({self.name}): Hesaplanan işlem miktarı ({quantity_to_trade}) sıfırdan küçük. İşlem atlanıyor.")
                 return
-            leverage_set = set_futures_leverage_and_margin(symbol, leverage, margin_type=margin_type)
-            if not leverage_set:
-                logging.error(f"HATA ({self.name}): Kaldıraç veya marjin tipi ayarlanamadığı için pozisyon açılmıyor.")
-                return
             order_side = 'BUY' if new_pos == 'Long' else 'SELL'
             sl, tp1, tp2 = self._calculate_risk_levels(df_with_indicators, symbol, new_pos, entry_price)
 
-            order_result = place_futures_order(symbol, order_side, quantity_to_trade)
-            if order_result:
+            # Kaldıraç (gerekirse), ana emir ve ardından SL/TP emirleri tek seferde/eşzamanlı gönderilir
+            order_started = time.perf_counter()
+            bracket = self.order_submitter.submit(
+                symbol, order_side, quantity_to_trade,
+                stop_loss_price=sl,
+                take_profits=[(tp1, self.params.get('tp1_size_pct', 50)), (tp2, self.params.get('tp2_size_pct', 50))],
+                quantity_precision=quantity_precision,
+                leverage=leverage, margin_type=margin_type
+            )
+            self.metrics.observe('order_submit', time.perf_counter() - order_started, self.id, symbol)
+            if bracket['entry']:
+                self.positions.set_quantity(symbol, bracket['quantity'])
                 logging.info(
-                    f"BİLGİ ({self.name}): Ana {new_pos} pozisyonu başarıyla açıldı. Şartlı emirler gönderiliyor...")
-
-                # --- YENİ EKLENECEK KISIM: TP ve SL emirlerini gönder ---
-                tp_side = 'SELL' if new_pos == 'Long' else 'BUY'
-                sl_side = 'SELL' if new_pos == 'Long' else 'BUY'
-
-                # SL emrini tüm pozisyon için gönder
-                if sl > 0:
-                    place_futures_stop_market_order(symbol, sl_side, quantity_to_trade, sl)
-
-                # TP1 ve TP2 emirlerini parsiyel olarak gönder
-                if tp1 > 0:
-                    tp1_size = self.params.get('tp1_size_pct', 50) / 100.0
-                    tp1_quantity = round(quantity_to_trade * tp1_size, quantity_precision)
-                    if tp1_quantity > 0:
-                        place_futures_take_profit_order(symbol, tp_side, tp1_quantity, tp1)
-
-                if tp2 > 0:
-                    tp2_size = self.params.get('tp2_size_pct', 50) / 100.0
-                    tp2_quantity = round(quantity_to_trade * tp2_size, quantity_precision)
-                    if tp2_quantity > 0:
-                        place_futures_take_profit_order(symbol, tp_side, tp2_quantity, tp2)
-
+                    f"BİLGİ ({self.name}): Ana {new_pos} pozisyonu ve şartlı emirler gönderildi ({bracket['elapsed'] * 1000:.0f} ms).")
+                for error in bracket['errors']:
+                    logging.error(f"HATA ({self.name}): {symbol} şartlı emir: {error}")
+            elif not bracket['leverage_ok']:
+                logging.error(f"HATA ({self.name}): Kaldıraç veya marjin tipi ayarlanamadığı için pozisyon açılmıyor.")
             else:
                 logging.error(
                     f"HATA ({self.name}): {symbol} için {order_side} emri Binance'e gönderilemedi. Pozisyon veritabanında 'paper trade' olarak kalacak.")
@@ -654,18 +1001,19 @@ class StrategyRunner:
                    f"💰 *Kapanış Fiyatı:* `{price:.7f} USDT`{pnl_text}")
 
         logging.info(f"!!! {message} !!!")
-        log_alarm_db(self.id, symbol, f"{status_text} ({self.name})", price)
+        with self.metrics.timer('alarm_db', self.id, symbol):
+            self.store.log_alarm_db(self.id, symbol, f"{status_text} ({self.name})", price)
 
         if self.params.get("telegram_enabled", False):
             token = self.params.get("telegram_token")
             chat_id = self.params.get("telegram_chat_id")
             if token and chat_id:
-                send_telegram_message(message, token, chat_id)
+                send_telegram_message_async(message, token, chat_id)
 
     # --- TAMAMEN DÜZELTİLMİŞ BİLDİRİM FONKSİYONU ---
     def notify_new_position(self, symbol, signal_type, entry_price, stop_loss_price, tp1_price, tp2_price):
         """Sinyal ve pozisyon bildirimlerini SL/TP bilgisiyle oluşturur ve gönderir."""
-        is_trading_enabled = self.config.get('is_trading_enabled', False)
+        is_trading_enabled = self._is_trading_enabled()
 
         # tp1_text ve tp2_text değişkenlerini burada tanımlıyoruz
         stop_text = f"`{stop_loss_price:.6f}$`" if stop_loss_price > 0 else "`Yok`"
@@ -690,29 +1038,56 @@ class StrategyRunner:
                    f"🎯 *Kar Al 2:* {tp2_text}")
 
         logging.info("--- YENİ SİNYAL/POZİSYON ---\n" + message + "\n-----------------------------")
-        log_alarm_db(self.id, symbol, log_message, entry_price)
+        with self.metrics.timer('alarm_db', self.id, symbol):
+            self.store.log_alarm_db(self.id, symbol, log_message, entry_price)
 
         if self.params.get("telegram_enabled", False):
             token = self.params.get("telegram_token")
             chat_id = self.params.get("telegram_chat_id")
             if token and chat_id:
-                send_telegram_message(message, token, chat_id)
+                send_telegram_message_async(message, token, chat_id)
 
 
-def main_manager():
-    logging.info("🚀 Çoklu Strateji Yöneticisi (Multi-Worker) Başlatıldı.")
+def main_manager(executor=None, shard=None):
+    """
+    Veritabanındaki stratejileri izler ve çalıştırır.
+    shard (shard_supervisor.ShardAssignment) verilirse sadece bu parçaya düşen (strateji, sembol) iş yükleri yürütülür.
+    """
+    logging.info("🚀 Çoklu Strateji Yöneticisi (Multi-Worker) Başlatıldı." + (f" Parça: {shard}" if shard else ""))
     initialize_db()
+    # Gösterge çekirdekleri ilk mumdan önce derlenir (veya disk önbelleğinden yüklenir)
+    logging.info(f"⚙️ Yerel gösterge çekirdekleri hazır ({native_indicators.warmup():.2f} sn).")
+    if executor is None:
+        # Borsa bilgisi (hassasiyet/lot kuralları) emir anında değil, arka planda periyodik olarak yenilenir
+        start_exchange_info_refresher()
+        # Pozisyon ve emir durumu kullanıcı veri akışından izlenir (kapanışlarda REST sorgusu gerekmez)
+        get_user_data_stream().start()
+    else:
+        logging.info("📝 KAĞIT ÜZERİNDE İŞLEM: Emirler yerel simüle borsaya gönderilecek.")
     running_strategies = {}
+    register_worker_gauges(running_strategies, executor)
+    try:
+        _manage_strategies(running_strategies, executor, shard)
+    finally:
+        # SIGTERM/SIGINT (sys.exit) dahil her çıkışta pozisyon kayıtları kalıcı hale getirilir
+        shutdown_runners(running_strategies)
+
+
+def _manage_strategies(running_strategies, executor=None, shard=None):
+    """Veritabanındaki strateji listesini 5 saniyede bir çalışan stratejilerle eşitler (süresiz döngü)."""
     while True:
         try:
             strategies_in_db = get_all_strategies()
+            if shard is not None:
+                # Her strateji bu parçaya düşen sembollerle sınırlanır; sembolü düşmeyen strateji burada çalışmaz
+                strategies_in_db = [c for c in (shard.filter_config(s) for s in strategies_in_db) if c]
             db_strategy_map = {s['id']: s for s in strategies_in_db}
             db_ids = set(db_strategy_map.keys())
             running_ids = set(running_strategies.keys())
             for strategy_id in (db_ids - running_ids):
                 strategy_config = db_strategy_map[strategy_id]
                 logging.info(f"✅ YENİ STRATEJİ BULUNDU: '{strategy_config['name']}'. Başlatılıyor...")
-                runner = StrategyRunner(strategy_config)
+                runner = StrategyRunner(strategy_config, executor=executor, shard=shard)
                 running_strategies[runner.id] = runner
                 runner.start()
             for strategy_id in (running_ids - db_ids):
@@ -722,12 +1097,19 @@ def main_manager():
             for strategy_id in running_ids.intersection(db_ids):
                 runner = running_strategies[strategy_id]
                 db_config = db_strategy_map[strategy_id]
-                if runner.config != db_config:
+                diff = classify_config_change(runner.config, db_config)
+                if diff['action'] == 'restart':
                     logging.info(f"🔄 GÜNCELLENMİŞ STRATEJİ: '{runner.name}'. Yeni ayarlarla yeniden başlatılıyor...")
                     runner.stop()
-                    new_runner = StrategyRunner(db_config)
+                    new_runner = StrategyRunner(db_config, executor=executor, shard=shard)
                     running_strategies[strategy_id] = new_runner
                     new_runner.start()
+                elif diff['action'] == 'hot':
+                    logging.info(f"♻️ GÜNCELLENMİŞ STRATEJİ: '{runner.name}'. Değişiklikler yerinde uygulanıyor...")
+                    runner.apply_config(db_config, diff)
+                else:
+                    # Sadece zaman damgası gibi önemsiz alanlar değişti; en güncel kaydı sakla
+                    runner.config = db_config
         except Exception as e:
             logging.error(f"HATA: Yönetici döngüsünde beklenmedik bir hata oluştu: {e}")
             logging.error(traceback.format_exc())
@@ -735,13 +1117,104 @@ def main_manager():
 
 
 if __name__ == "__main__":
-    if not create_lock_file():
-        logging.error("❌ HATA: multi_worker.py zaten çalışıyor. Yeni bir kopya başlatılamadı.")
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Çoklu strateji yöneticisi")
+    parser.add_argument('--paper', action='store_true',
+                        help="Emirleri Binance yerine yerel simüle borsaya gönder (kağıt üzerinde işlem)")
+    parser.add_argument('--paper-balance', type=float, default=10000.0, help="Simüle borsa başlangıç bakiyesi (USDT)")
+    parser.add_argument('--paper-slippage-bps', type=float, default=2.0, help="Simüle kayma (baz puan)")
+    parser.add_argument('--paper-latency', type=float, default=0.0, help="Simüle API gecikmesi (saniye)")
+    parser.add_argument('--paper-volume-participation', type=float, default=None,
+                        help="Bir mumda dolabilecek azami hacim oranı (kısmi dolum için, ör. 0.05)")
+    parser.add_argument('--supervisor', action='store_true',
+                        help="İş yüklerini --workers adet parça işçisine dağıtan yönetici süreci olarak çalış")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="Bu makinede çalıştırılacak parça işçisi sayısı (--supervisor ile)")
+    parser.add_argument('--shard', type=int, default=None, help="Bu sürecin parça numarası (0'dan başlar)")
+    parser.add_argument('--shard-count', type=int, default=None,
+                        help="Tüm makinelerdeki toplam parça sayısı (varsayılan: --workers)")
+    parser.add_argument('--shard-offset', type=int, default=0,
+                        help="Bu makinenin ilk parça numarası (birden fazla makinede, ör. 2. makine için 4)")
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help="Prometheus ölçüm uç noktası portu (/metrics); parça işçileri port + parça numarasını kullanır")
+    parser.add_argument('--metrics-file', default=None,
+                        help="Ölçümlerin periyodik olarak yazılacağı JSON dosyası (parçalarda -shard<N> eki alır)")
+    parser.add_argument('--metrics-interval', type=float, default=15.0, help="Ölçüm dosyası yazma aralığı (saniye)")
+    args = parser.parse_args()
+
+    if args.supervisor:
+        from shard_supervisor import ShardSupervisor
+
+        if not create_lock_file():
+            logging.error("❌ HATA: multi_worker.py zaten çalışıyor. Yeni bir kopya başlatılamadı.")
+            sys.exit(1)
+        # Parça işçilerine simülasyon ayarları aynen aktarılır
+        passthrough = []
+        if args.paper:
+            passthrough = ['--paper', '--paper-balance', str(args.paper_balance),
+                           '--paper-slippage-bps', str(args.paper_slippage_bps), '--paper-latency', str(args.paper_latency)]
+            if args.paper_volume_participation is not None:
+                passthrough += ['--paper-volume-participation', str(args.paper_volume_participation)]
+        if args.metrics_port is not None:
+            passthrough += ['--metrics-port', str(args.metrics_port)]
+        if args.metrics_file:
+            passthrough += ['--metrics-file', args.metrics_file, '--metrics-interval', str(args.metrics_interval)]
+        supervisor = ShardSupervisor(args.workers, shard_count=args.shard_count, shard_offset=args.shard_offset,
+                                     worker_args=passthrough)
+        signal.signal(signal.SIGTERM, graceful_shutdown)
+        signal.signal(signal.SIGINT, graceful_shutdown)
+        try:
+            supervisor.run()
+        finally:
+            remove_lock_file()
+        sys.exit(0)
+
+    shard = None
+    lock_file = LOCK_FILE
+    if args.shard is not None:
+        from shard_supervisor import ShardAssignment
+
+        shard = ShardAssignment(args.shard, args.shard_count or 1)
+        lock_file = shard_lock_file(args.shard)
+        # Aynı günlük dosyasına yazan parçalar ayırt edilebilsin
+        for handler in logging.getLogger().handlers:
+            handler.setFormatter(logging.Formatter(
+                f'%(asctime)s - {shard} - %(threadName)s - %(levelname)s - %(message)s'))
+
+    paper_exchange = None
+    if args.paper:
+        from paper_exchange import SimulatedFuturesExchange
+        paper_exchange = SimulatedFuturesExchange(initial_balance=args.paper_balance,
+                                                  slippage_bps=args.paper_slippage_bps, latency=args.paper_latency,
+                                                  max_volume_participation=args.paper_volume_participation)
+
+    if not create_lock_file(lock_file):
+        logging.error(f"❌ HATA: multi_worker.py {'(' + str(shard) + ') ' if shard else ''}zaten çalışıyor. "
+                      f"Yeni bir kopya başlatılamadı.")
         sys.exit(1)
     signal.signal(signal.SIGTERM, graceful_shutdown)
     signal.signal(signal.SIGINT, graceful_shutdown)
+
+    shard_number = args.shard if args.shard is not None else 0
+    if args.metrics_port is not None:
+        start_metrics_server(args.metrics_port + shard_number)
+    snapshot_writer = None
+    if args.metrics_file:
+        metrics_file = args.metrics_file
+        if shard is not None:
+            root, ext = os.path.splitext(metrics_file)
+            metrics_file = f"{root}-shard{args.shard}{ext}"
+        snapshot_writer = SnapshotWriter(metrics_file, interval=args.metrics_interval).start()
     try:
-        main_manager()
+        main_manager(executor=paper_exchange, shard=shard)
     finally:
-        remove_lock_file()
-        logging.info("Temizlik yapıldı ve script sonlandı.")
\ No newline at end of file
+        # Kuyrukta bekleyen bildirimlerin gönderilmesi için kısa bir süre tanınır
+        get_telegram_dispatcher().flush(timeout=5)
+        get_position_writer().flush(timeout=10)
+        if snapshot_writer is not None:
+            snapshot_writer.stop()
+        if paper_exchange is not None:
+            logging.info(f"📝 SİMÜLASYON ÖZETİ: {paper_exchange.summary()}")
+        remove_lock_file(lock_file)
+        logging.info("Temizlik yapıldı ve script sonlandı.")
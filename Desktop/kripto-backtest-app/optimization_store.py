@@ -0,0 +1,193 @@
+# optimization_store.py (Kalıcı ve Devam Ettirilebilir Optimizasyon Sonuç Deposu)
+#
+# Optimizasyonda denenen her parametre kombinasyonu, metrikleriyle birlikte SQLite'a yazılır. Anahtar;
+# verinin parmak izi (semboller, mumlar), sabit strateji parametreleri ve denenen kombinasyondur. Aynı veri ve
+# ayarlarla yeniden başlatılan, yarıda kalmış veya genişletilmiş taramalarda sadece yeni kombinasyonlar hesaplanır.
+# Depo dosyası varsayılan olarak uygulama klasöründeki optimization_store.db'dir (KRIPTO_OPT_STORE ile değiştirilebilir).
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+DEFAULT_STORE_PATH = os.environ.get('KRIPTO_OPT_STORE') or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'optimization_store.db')
+
+# Simülasyon veya metrik hesaplaması sonuçları değiştirecek şekilde güncellenirse artırılmalıdır
+# (eski kayıtlar yeni taramalarda kullanılmaz)
+RESULTS_VERSION = 1
+
+# Sonuçları etkilemeyen parametreler parmak izine katılmaz
+_IGNORED_PARAMS = {'telegram_enabled', 'telegram_token', 'telegram_chat_id'}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS evaluations (
+    context TEXT NOT NULL,
+    params_key TEXT NOT NULL,
+    params TEXT NOT NULL,
+    result TEXT,
+    data_fingerprint TEXT NOT NULL,
+    evaluated_at REAL NOT NULL,
+    PRIMARY KEY (context, params_key)
+);
+CREATE TABLE IF NOT EXISTS contexts (
+    context TEXT PRIMARY KEY,
+    data_fingerprint TEXT NOT NULL,
+    symbols TEXT NOT NULL,
+    base_params TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+
+def _normalize(value):
+    # 30 ile 30.0 aynı kombinasyon sayılsın
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return value
+    return float(value)
+
+
+def params_key(params):
+    """Kombinasyonun sıralamadan ve sayı tipinden (int/float) bağımsız anahtarı."""
+    return json.dumps({k: _normalize(v) for k, v in params.items()}, sort_keys=True, ensure_ascii=False,
+                      default=str)
+
+
+def frame_fingerprint(df):
+    """OHLCV verisinin içerik özeti (zaman damgaları dahil)."""
+    if df is None or df.empty:
+        return 'empty'
+    columns = [c for c in ('Open', 'High', 'Low', 'Close', 'Volume') if c in df.columns]
+    hashed = pd.util.hash_pandas_object(df[columns], index=True).values
+    return hashlib.sha256(hashed.tobytes()).hexdigest()
+
+
+def data_fingerprint(frames, higher_frames=None):
+    """Tüm sembollerin (ve varsa üst zaman dilimi verisinin) birleşik parmak izi."""
+    higher_frames = higher_frames or {}
+    digest = hashlib.sha256()
+    for symbol in sorted(frames):
+        digest.update(f"{symbol}:{frame_fingerprint(frames[symbol])}".encode('utf-8'))
+        if symbol in higher_frames:
+            digest.update(f"{symbol}@higher:{frame_fingerprint(higher_frames[symbol])}".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def sweep_context(frames, strategy_params, tested_params, higher_frames=None):
+    """
+    Bir taramanın bağlam anahtarı: veri parmak izi + taranmayan (sabit) strateji parametreleri.
+    Dönüş: (bağlam anahtarı, veri parmak izi, sabit parametreler)
+    """
+    fingerprint = data_fingerprint(frames, higher_frames)
+    base_params = {k: v for k, v in strategy_params.items() if k not in tested_params and k not in _IGNORED_PARAMS}
+    payload = json.dumps({'version': RESULTS_VERSION, 'data': fingerprint, 'params': params_key(base_params)},
+                         sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest(), fingerprint, base_params
+
+
+class OptimizationStore:
+    """
+    Değerlendirilmiş kombinasyonların kalıcı deposu. Her sonuç ayrı işlemle yazılır; süreç çökse bile o ana
+    kadar hesaplananlar kaybolmaz. Her işlem kendi bağlantısını açar (iş parçacıkları ve süreçler arasında güvenli).
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = path
+        with self._connection() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connection(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            yield conn
+        finally:
+            conn.close()
+
+    def register_context(self, context, fingerprint, symbols, base_params):
+        with self._connection() as conn:
+            conn.execute("INSERT OR IGNORE INTO contexts (context, data_fingerprint, symbols, base_params, created_at) "
+                         "VALUES (?, ?, ?, ?, ?)",
+                         (context, fingerprint, json.dumps(sorted(symbols)),
+                          json.dumps(base_params, sort_keys=True, ensure_ascii=False, default=str), time.time()))
+
+    def split_evaluated(self, context, combinations):
+        """
+        Kombinasyonları depoda olanlar ve olmayanlar olarak ayırır.
+        Dönüş: ({sıra: sonuç satırı veya işlem yoksa None}, [(sıra, kombinasyon)] hesaplanacaklar)
+        """
+        keys = [params_key(params) for params in combinations]
+        stored = {}
+        with self._connection() as conn:
+            # SQLite parametre sınırına takılmamak için parçalar halinde sorgulanır
+            unique_keys = list(dict.fromkeys(keys))
+            for start in range(0, len(unique_keys), 500):
+                chunk = unique_keys[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                for key, result in conn.execute(f"SELECT params_key, result FROM evaluations WHERE context = ? "
+                                                f"AND params_key IN ({placeholders})", [context] + chunk):
+                    stored[key] = json.loads(result) if result is not None else None
+        cached, pending = {}, []
+        for index, (key, params) in enumerate(zip(keys, combinations)):
+            if key in stored:
+                cached[index] = stored[key]
+            else:
+                pending.append((index, params))
+        return cached, pending
+
+    def record(self, context, fingerprint, params, result_row):
+        """Tek bir kombinasyonun sonucunu (işlem yoksa None) kaydeder."""
+        result = json.dumps(result_row, ensure_ascii=False, default=float) if result_row is not None else None
+        with self._connection() as conn:
+            conn.execute("INSERT OR REPLACE INTO evaluations (context, params_key, params, result, data_fingerprint, "
+                         "evaluated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                         (context, params_key(params), json.dumps(params, ensure_ascii=False, default=float), result,
+                          fingerprint, time.time()))
+
+    def results(self, context):
+        """Bir bağlamda değerlendirilmiş ve işlem üretmiş tüm kombinasyonların sonuç tablosu."""
+        with self._connection() as conn:
+            rows = conn.execute("SELECT result FROM evaluations WHERE context = ? AND result IS NOT NULL "
+                                "ORDER BY evaluated_at", (context,)).fetchall()
+        return pd.DataFrame([json.loads(row[0]) for row in rows])
+
+    def summary(self):
+        """Bağlam başına kayıtlı kombinasyon sayıları (en yeni önce)."""
+        with self._connection() as conn:
+            rows = conn.execute("SELECT c.context, c.symbols, c.created_at, COUNT(e.params_key), "
+                                "MAX(e.evaluated_at) FROM contexts c LEFT JOIN evaluations e ON e.context = c.context "
+                                "GROUP BY c.context ORDER BY c.created_at DESC").fetchall()
+        return [{'context': context, 'symbols': json.loads(symbols), 'created_at': created_at, 'evaluated': count,
+                 'last_evaluated_at': last} for context, symbols, created_at, count, last in rows]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_optimization_store():
+    """Süreç genelinde paylaşılan varsayılan depoyu döndürür."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = OptimizationStore()
+        return _store
+
+
+if __name__ == '__main__':
+    import argparse
+    from datetime import datetime
+
+    parser = argparse.ArgumentParser(description="Optimizasyon sonuç deposu özeti")
+    parser.add_argument('--store', default=DEFAULT_STORE_PATH)
+    args = parser.parse_args()
+    for item in OptimizationStore(args.store).summary():
+        created = datetime.fromtimestamp(item['created_at']).strftime('%Y-%m-%d %H:%M:%S')
+        print(f"{item['context'][:12]}  {created}  {item['evaluated']:>6} kombinasyon  {', '.join(item['symbols'])}")
@@ -0,0 +1,298 @@
+# order_manager.py (Giriş + Koruma Emirlerinin (SL/TP) Hızlı Gönderimi)
+
+import logging
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import trade_executor
+from user_stream import get_user_data_stream
+
+# Koruma emirlerini paralel göndermek için kullanılan iş parçacığı sayısı
+DEFAULT_MAX_WORKERS = 4
+# Kısmi dolan giriş emirlerinin akıştan gelen son durumları için tutulan emir sayısı (yanıt/olay yarışı için)
+RECENT_ENTRY_UPDATES = 256
+
+
+def _filled_quantity(order, requested_quantity):
+    """Giriş emrinin gerçekleşen miktarını döndürür; yanıt bunu içermiyorsa istenen miktarı kullanır."""
+    try:
+        executed = float(order.get('executedQty', 0) or 0)
+    except (TypeError, ValueError):
+        executed = 0.0
+    return executed if executed > 0 else requested_quantity
+
+
+class BracketOrderSubmitter:
+    """
+    Piyasa giriş emrini ve ardından pozisyonu koruyan stop-market / take-profit-market emirlerini gönderir.
+
+    - Sembol başına kaldıraç ve marjin tipi hatırlanır; değişmedikçe borsaya tekrar istek atılmaz.
+    - Giriş gerçekleştikten sonra koruma emirleri tek bir toplu istekle (batchOrders) veya bu uç nokta
+      kullanılamıyorsa eşzamanlı olarak gönderilir; böylece korumalı pozisyona tek bir gidiş-dönüşte ulaşılır.
+    - Giriş kısmi dolarsa koruma emirleri dolan miktar için gönderilir; `account_stream` (user_stream) verilmişse
+      girişin sonraki dolumlarında eklenen miktar için ek SL/TP emirleri gönderilir (koruma hep dolan miktarı örter).
+    - `executor`, trade_executor ile aynı fonksiyonları sunan herhangi bir nesne olabilir (ör. yerel sahte borsa).
+    """
+
+    def __init__(self, executor=trade_executor, max_workers=DEFAULT_MAX_WORKERS, use_batch_endpoint=True,
+                 account_stream=None):
+        self.executor = executor
+        self.use_batch_endpoint = use_batch_endpoint
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bracket-orders")
+        self._leverage_state = {}  # sembol -> (kaldıraç, marjin tipi)
+        self._lock = threading.Lock()
+        self._in_flight = 0  # havuza verilmiş, henüz bitmemiş iş sayısı
+        # Kısmi dolmuş giriş emri ID -> koruma ayarları ve korunan miktar
+        self._open_entries = {}
+        self._recent_entry_updates = OrderedDict()  # giriş emri ID -> (dolan miktar, durum)
+        self.account_stream = account_stream
+        if account_stream is not None:
+            account_stream.add_order_listener(self._on_order_update)
+
+    def queue_depth(self):
+        """Havuzda bekleyen veya yürütülmekte olan koruma emri işlerinin sayısı."""
+        with self._lock:
+            return self._in_flight
+
+    def _run_in_pool(self, fn, *args):
+        """İşi havuza verir; bitene kadar `queue_depth` sayacında tutulur."""
+        with self._lock:
+            self._in_flight += 1
+        try:
+            future = self._pool.submit(fn, *args)
+        except BaseException:
+            self._task_done(None)
+            raise
+        future.add_done_callback(self._task_done)
+        return future
+
+    def _task_done(self, _future):
+        with self._lock:
+            self._in_flight -= 1
+
+    def ensure_leverage(self, symbol, leverage, margin_type='ISOLATED'):
+        """Kaldıraç/marjin tipi daha önce aynı değerlere ayarlanmadıysa borsada ayarlar."""
+        desired = (int(leverage), margin_type)
+        with self._lock:
+            if self._leverage_state.get(symbol) == desired:
+                return True
+        if not self.executor.set_futures_leverage_and_margin(symbol, int(leverage), margin_type=margin_type):
+            return False
+        with self._lock:
+            self._leverage_state[symbol] = desired
+        return True
+
+    def forget_leverage(self, symbol=None):
+        """Hatırlanan kaldıraç durumunu siler (ör. hesap elle değiştirildiğinde)."""
+        with self._lock:
+            if symbol is None:
+                self._leverage_state.clear()
+            else:
+                self._leverage_state.pop(symbol, None)
+
+    def submit(self, symbol, side, quantity, stop_loss_price=0, take_profits=(), quantity_precision=None,
+               leverage=None, margin_type='ISOLATED'):
+        """
+        Giriş emrini ve koruma emirlerini gönderir.
+        take_profits: [(tetik_fiyatı, pozisyonun_yüzdesi), ...]
+        Dönen sözlük: {'entry', 'quantity', 'stop_loss', 'take_profits', 'leverage_ok', 'errors', 'elapsed'}
+        """
+        started = time.perf_counter()
+        result = {'entry': None, 'quantity': 0.0, 'stop_loss': None, 'take_profits': [], 'leverage_ok': True,
+                  'errors': [], 'elapsed': 0.0}
+
+        if leverage is not None and not self.ensure_leverage(symbol, leverage, margin_type):
+            result['leverage_ok'] = False
+            result['errors'].append("Kaldıraç veya marjin tipi ayarlanamadı.")
+            return result
+
+        entry = self.executor.place_futures_order(symbol, side, quantity)
+        if not entry:
+            result['errors'].append("Giriş emri gönderilemedi.")
+            return result
+        result['entry'] = entry
+        filled = _filled_quantity(entry, quantity)
+        result['quantity'] = filled
+
+        bracket = {'symbol': symbol, 'exit_side': 'SELL' if side == 'BUY' else 'BUY',
+                   'stop_loss_price': stop_loss_price, 'take_profits': list(take_profits),
+                   'quantity_precision': quantity_precision, 'covered': filled}
+        protective = _protective_orders(bracket, filled)
+        if entry.get('status') == 'PARTIALLY_FILLED':
+            self._track_entry(entry.get('orderId'), bracket)
+
+        for order, placed in zip(protective, self._submit_protective(protective)):
+            if not placed:
+                result['errors'].append(f"{order['type']} @ {order['stopPrice']} gönderilemedi.")
+            if order['type'] == 'STOP_MARKET':
+                result['stop_loss'] = placed
+            else:
+                result['take_profits'].append(placed)
+
+        result['elapsed'] = time.perf_counter() - started
+        logging.info(f"⏱️ KORUMALI POZİSYON ({symbol}): Giriş + {len(protective)} koruma emri "
+                     f"{result['elapsed'] * 1000:.0f} ms içinde gönderildi.")
+        return result
+
+    def _track_entry(self, order_id, bracket):
+        """Kısmi dolan girişi izlemeye alır; yanıt gelmeden akıştan gelmiş dolumlar hemen örtülür."""
+        if self.account_stream is None or order_id is None:
+            logging.warning(f"UYARI ({bracket['symbol']}): Giriş emri kısmi doldu ancak emir akışı yok; koruma "
+                            f"emirleri sadece dolan {bracket['covered']} için gönderildi.")
+            return
+        with self._lock:
+            self._open_entries[order_id] = bracket
+            latest = self._recent_entry_updates.get(order_id)
+        if latest:
+            self._on_order_update({'order_id': order_id, 'executed_quantity': latest[0], 'status': latest[1],
+                                   'type': 'MARKET'})
+
+    def _on_order_update(self, order):
+        """Kullanıcı veri akışı emir bildirimi: izlenen girişin yeni dolumları için ek koruma emri gönderir."""
+        if order.get('type') != 'MARKET':
+            return
+        order_id = order['order_id']
+        with self._lock:
+            self._recent_entry_updates[order_id] = (order['executed_quantity'], order['status'])
+            self._recent_entry_updates.move_to_end(order_id)
+            while len(self._recent_entry_updates) > RECENT_ENTRY_UPDATES:
+                self._recent_entry_updates.popitem(last=False)
+            bracket = self._open_entries.get(order_id)
+            if bracket is None:
+                return
+            if order['status'] != 'PARTIALLY_FILLED':
+                del self._open_entries[order_id]
+            delta = order['executed_quantity'] - bracket['covered']
+            if delta <= 0:
+                return
+            bracket['covered'] = order['executed_quantity']
+        # Bildirim borsanın/akışın iş parçacığında gelir; emirler orada beklemeden havuzda gönderilir
+        self._run_in_pool(self._top_up, bracket, delta)
+
+    def _top_up(self, bracket, delta):
+        orders = _protective_orders(bracket, delta)
+        placed = self._submit_protective(orders, parallel=False)
+        failed = [order for order, result in zip(orders, placed) if not result]
+        logging.info(f"🛡️ KORUMA EKLENDİ ({bracket['symbol']}): Girişin yeni dolan {delta} miktarı için "
+                     f"{len(orders) - len(failed)}/{len(orders)} koruma emri gönderildi.")
+        for order in failed:
+            logging.error(f"HATA ({bracket['symbol']}): Ek {order['type']} @ {order['stopPrice']} gönderilemedi.")
+
+    def _submit_protective(self, orders, parallel=True):
+        """Koruma emirlerini toplu istekle veya eşzamanlı olarak gönderir; sıra korunarak sonuç listesi döner."""
+        if not orders:
+            return []
+        batch_fn = getattr(self.executor, 'place_futures_batch_orders', None)
+        if self.use_batch_endpoint and batch_fn is not None and 1 < len(orders) <= 5:
+            results = batch_fn(orders)
+            if results is not None:
+                return [r if r and 'orderId' in r else None for r in results]
+            logging.warning("UYARI: Toplu emir gönderilemedi, koruma emirleri tek tek (eşzamanlı) deneniyor.")
+
+        if not parallel:
+            return [self._place_single(order) for order in orders]
+        futures = [self._run_in_pool(self._place_single, order) for order in orders]
+        return [f.result() for f in futures]
+
+    def _place_single(self, order):
+        if order['type'] == 'STOP_MARKET':
+            return self.executor.place_futures_stop_market_order(order['symbol'], order['side'], order['quantity'],
+                                                                 order['stopPrice'])
+        return self.executor.place_futures_take_profit_order(order['symbol'], order['side'], order['quantity'],
+                                                             order['stopPrice'])
+
+
+def _protective_orders(bracket, quantity):
+    """Verilen miktarı örten SL ve kademeli TP emirlerinin listesi."""
+    precision = bracket['quantity_precision']
+    protective = []
+    stop_loss_price = bracket['stop_loss_price']
+    if stop_loss_price and stop_loss_price > 0:
+        sl_quantity = round(quantity, precision) if precision is not None else quantity
+        if sl_quantity > 0:
+            protective.append({'symbol': bracket['symbol'], 'side': bracket['exit_side'], 'type': 'STOP_MARKET',
+                               'quantity': sl_quantity, 'stopPrice': stop_loss_price, 'timeInForce': 'GTC'})
+    for tp_price, size_pct in bracket['take_profits']:
+        tp_quantity = quantity * size_pct / 100.0
+        if precision is not None:
+            tp_quantity = round(tp_quantity, precision)
+        if tp_price and tp_price > 0 and tp_quantity > 0:
+            protective.append({'symbol': bracket['symbol'], 'side': bracket['exit_side'],
+                               'type': 'TAKE_PROFIT_MARKET', 'quantity': tp_quantity, 'stopPrice': tp_price,
+                               'timeInForce': 'GTC'})
+    return protective
+
+
+# Borsa (executor) -> paylaşılan emir göndericisi. Borsa nesnesi zayıf referansla tutulur: her kağıt üzerinde
+# işlem / tekrar oynatma borsası bittiğinde göndericisi (ve iş parçacığı havuzu) da serbest kalır.
+_submitters = weakref.WeakKeyDictionary()
+_submitters_lock = threading.Lock()
+
+
+def get_order_submitter(executor=trade_executor):
+    """Verilen borsa için (varsayılan: canlı trade_executor) süreç genelinde paylaşılan emir göndericisini döndürür."""
+    with _submitters_lock:
+        submitter = _submitters.get(executor)
+        if submitter is None:
+            # Gönderici borsayı güçlü referansla tutarsa sözlükteki kayıt hiç silinmez
+            submitter = BracketOrderSubmitter(executor=weakref.proxy(executor),
+                                              account_stream=get_user_data_stream(executor))
+            _submitters[executor] = submitter
+        return submitter
+
+
+if __name__ == '__main__':
+    # Yerel sahte borsa ile kıyaslama: her REST çağrısı sabit bir gecikme ile yanıtlanır
+    class _MockExchange:
+        def __init__(self, latency=0.05):
+            self.latency = latency
+            self.calls = 0
+            self._lock = threading.Lock()
+
+        def _call(self, payload):
+            with self._lock:
+                self.calls += 1
+                order_id = self.calls
+            time.sleep(self.latency)
+            return dict(payload, orderId=order_id, status='FILLED')
+
+        def set_futures_leverage_and_margin(self, symbol, leverage, margin_type='ISOLATED'):
+            self._call({})
+            self._call({})
+            return True
+
+        def place_futures_order(self, symbol, side, quantity):
+            return self._call({'symbol': symbol, 'side': side, 'executedQty': str(quantity)})
+
+        def place_futures_stop_market_order(self, symbol, side, quantity, stop_price):
+            return self._call({'symbol': symbol, 'type': 'STOP_MARKET'})
+
+        def place_futures_take_profit_order(self, symbol, side, quantity, stop_price):
+            return self._call({'symbol': symbol, 'type': 'TAKE_PROFIT_MARKET'})
+
+        def place_futures_batch_orders(self, orders):
+            self._call({})
+            return [dict(order, orderId=i) for i, order in enumerate(orders)]
+
+    mock = _MockExchange()
+    start = time.perf_counter()
+    mock.set_futures_leverage_and_margin('BTCUSDT', 5)
+    mock.place_futures_order('BTCUSDT', 'BUY', 0.01)
+    mock.place_futures_stop_market_order('BTCUSDT', 'SELL', 0.01, 95000)
+    mock.place_futures_take_profit_order('BTCUSDT', 'SELL', 0.005, 105000)
+    mock.place_futures_take_profit_order('BTCUSDT', 'SELL', 0.005, 110000)
+    print(f"Sıralı gönderim: {(time.perf_counter() - start) * 1000:.0f} ms, {mock.calls} istek")
+
+    for use_batch in (True, False):
+        mock = _MockExchange()
+        submitter = BracketOrderSubmitter(executor=mock, use_batch_endpoint=use_batch)
+        for attempt in range(2):
+            mock.calls = 0
+            result = submitter.submit('BTCUSDT', 'BUY', 0.01, stop_loss_price=95000,
+                                      take_profits=[(105000, 50), (110000, 50)], quantity_precision=3, leverage=5)
+            assert not result['errors'] and result['stop_loss'] and all(result['take_profits'])
+            label = "toplu" if use_batch else "eşzamanlı"
+            print(f"Bracket ({label}, {attempt + 1}. emir): {result['elapsed'] * 1000:.0f} ms, {mock.calls} istek")
@@ -0,0 +1,385 @@
+# paper_exchange.py (Yerel Simüle Vadeli İşlemler Borsası - Kağıt Üzerinde İşlem Motoru)
+
+import logging
+import threading
+import time
+
+# Varsayılan sembol kuralları (gerçek borsa bilgisi yoksa)
+DEFAULT_QUANTITY_PRECISION = 3
+DEFAULT_PRICE_PRECISION = 2
+
+
+class SimulatedFuturesExchange:
+    """
+    trade_executor ile aynı fonksiyonları sunan, süreç içi vadeli işlemler borsası.
+
+    - Piyasa (MARKET), STOP_MARKET ve TAKE_PROFIT_MARKET emirleri
+    - Sembol başına pozisyon miktarı, ortalama giriş fiyatı, kaldıraç ve marjin tipi
+    - Kayma (slippage), komisyon, isteğe bağlı API gecikmesi ve hacme bağlı kısmi dolum
+    - Emirler, `on_kline` / `on_bar` ile beslenen (canlı veya tekrar oynatılan) mum verisine göre eşleşir
+
+    Şartlı emirler pozisyonu azaltan (reduce-only) emirler gibi davranır: pozisyon kapandığında
+    aynı sembolün bekleyen şartlı emirleri iptal edilir.
+    """
+
+    is_simulated = True
+
+    def __init__(self, initial_balance=10000.0, taker_fee=0.0004, slippage_bps=2.0, latency=0.0,
+                 max_volume_participation=None, quantity_precision=DEFAULT_QUANTITY_PRECISION,
+                 price_precision=DEFAULT_PRICE_PRECISION, symbol_info=None):
+        self.initial_balance = float(initial_balance)
+        self.balance = float(initial_balance)
+        self.taker_fee = taker_fee
+        self.slippage_bps = slippage_bps
+        self.latency = latency
+        self.max_volume_participation = max_volume_participation
+        self.quantity_precision = quantity_precision
+        self.price_precision = price_precision
+        self._symbol_info = dict(symbol_info or {})
+
+        self._lock = threading.RLock()
+        self._prices = {}  # sembol -> son fiyat
+        self._kline_start = {}  # sembol -> işlenen son mumun açılış zamanı
+        self._liquidity = {}  # sembol -> bu mumda kalan dolum kapasitesi
+        self._positions = {}  # sembol -> {'amount', 'entry_price', 'leverage', 'margin_type'}
+        self._orders = {}  # emir ID -> çalışan emir (kısmi dolmuş piyasa emri veya şartlı emir)
+        self._next_order_id = 1
+        self.fills = []
+        self.realized_pnl = 0.0
+        self.fees_paid = 0.0
+        self.api_calls = 0
+        self._user_data_listeners = []  # fn(olay): Binance kullanıcı veri akışı biçiminde olaylar
+
+    # ------------------------------------------------------------------
+    # trade_executor ile aynı arayüz
+    # ------------------------------------------------------------------
+    def set_futures_leverage_and_margin(self, symbol: str, leverage: int, margin_type: str = 'ISOLATED'):
+        self._simulate_latency()
+        with self._lock:
+            position = self._position(symbol)
+            position['leverage'] = int(leverage)
+            position['margin_type'] = margin_type
+        return True
+
+    def get_open_position_amount(self, symbol: str):
+        self._simulate_latency()
+        with self._lock:
+            return abs(self._position(symbol)['amount'])
+
+    def place_futures_order(self, symbol: str, side: str, quantity: float):
+        self._simulate_latency()
+        with self._lock:
+            price = self._prices.get(symbol)
+            if price is None:
+                logging.error(f"SİMÜLASYON EMİR HATASI: {symbol} için fiyat bilgisi yok, {side} emri reddedildi.")
+                return None
+            order = self._new_order(symbol, side, 'MARKET', quantity)
+            self._fill_market(order, price)
+            if order['status'] != 'FILLED':
+                self._orders[order['orderId']] = order
+            logging.info(f"SİMÜLASYON EMİR: {symbol} | Taraf: {side} | Miktar: {quantity} | "
+                         f"Dolan: {order['executedQty']} @ {order['avgPrice']} | Emir ID: {order['orderId']}")
+            return self._order_response(order)
+
+    def place_futures_stop_market_order(self, symbol: str, side: str, quantity: float, stop_price: float):
+        return self._place_conditional(symbol, side, 'STOP_MARKET', quantity, stop_price)
+
+    def place_futures_take_profit_order(self, symbol: str, side: str, quantity: float, stop_price: float):
+        return self._place_conditional(symbol, side, 'TAKE_PROFIT_MARKET', quantity, stop_price)
+
+    def place_futures_batch_orders(self, orders: list):
+        self._simulate_latency()
+        results = []
+        for order in orders:
+            placed = self._place_conditional(order['symbol'], order['side'], order['type'], float(order['quantity']),
+                                             float(order['stopPrice']), simulate_latency=False)
+            results.append(placed or {'code': -1, 'msg': 'Simülasyon emri reddedildi.'})
+        return results
+
+    def get_symbol_info(self, symbol: str):
+        return self._symbol_info.get(symbol) or {
+            'symbol': symbol,
+            'quantityPrecision': self.quantity_precision,
+            'pricePrecision': self.price_precision,
+            'filters': [
+                {'filterType': 'LOT_SIZE', 'stepSize': str(10 ** -self.quantity_precision)},
+                {'filterType': 'PRICE_FILTER', 'tickSize': str(10 ** -self.price_precision)},
+            ]
+        }
+
+    def get_symbol_filters(self, symbol: str):
+        return {f['filterType']: f for f in self.get_symbol_info(symbol).get('filters', [])}
+
+    # ------------------------------------------------------------------
+    # Piyasa verisi ve eşleştirme
+    # ------------------------------------------------------------------
+    def on_kline(self, symbol: str, kline: dict):
+        """
+        Binance WebSocket kline mesajını ('k' alanı) işler. Bir mumun ilk mesajında mumun tüm
+        aralığı (açılış/en yüksek/en düşük), sonraki mesajlarda bir önceki fiyattan yeni fiyata
+        kadar olan aralık eşleştirmede kullanılır.
+        """
+        close = float(kline['c'])
+        with self._lock:
+            if self._kline_start.get(symbol) != kline['t']:
+                self._kline_start[symbol] = kline['t']
+                self._start_bar(symbol, float(kline['v']))
+                self._match(symbol, float(kline['o']), float(kline['h']), float(kline['l']), close)
+            else:
+                previous = self._prices.get(symbol, close)
+                self._match(symbol, previous, max(previous, close), min(previous, close), close)
+
+    def on_bar(self, symbol: str, open_price: float, high: float, low: float, close: float, volume: float = 0.0):
+        """Tamamlanmış bir OHLCV barını (ör. geçmiş veriden tekrar oynatma) işler."""
+        with self._lock:
+            self._kline_start.pop(symbol, None)
+            self._start_bar(symbol, volume)
+            self._match(symbol, open_price, high, low, close)
+
+    def set_price(self, symbol: str, price: float):
+        with self._lock:
+            self._prices[symbol] = float(price)
+
+    def add_user_data_listener(self, callback):
+        """
+        Emir ve pozisyon değişikliklerinde çağrılacak fonksiyonu kaydeder. Olaylar Binance vadeli işlemler
+        kullanıcı veri akışıyla aynı biçimdedir (ORDER_TRADE_UPDATE, ACCOUNT_UPDATE); user_stream.py bunları işler.
+        """
+        with self._lock:
+            self._user_data_listeners.append(callback)
+
+    def remove_user_data_listener(self, callback):
+        with self._lock:
+            if callback in self._user_data_listeners:
+                self._user_data_listeners.remove(callback)
+
+    # ------------------------------------------------------------------
+    # Raporlama
+    # ------------------------------------------------------------------
+    def get_position(self, symbol: str):
+        with self._lock:
+            return dict(self._position(symbol))
+
+    def open_orders(self, symbol: str = None):
+        with self._lock:
+            return [self._order_response(o) for o in self._orders.values() if symbol in (None, o['symbol'])]
+
+    def summary(self):
+        """Toplam bakiye, gerçekleşen/gerçekleşmemiş kâr ve işlem sayılarını döndürür."""
+        with self._lock:
+            unrealized = sum(
+                (self._prices.get(sym, p['entry_price']) - p['entry_price']) * p['amount']
+                for sym, p in self._positions.items() if p['amount']
+            )
+            return {
+                'balance': round(self.balance, 4),
+                'realized_pnl': round(self.realized_pnl, 4),
+                'unrealized_pnl': round(unrealized, 4),
+                'fees_paid': round(self.fees_paid, 4),
+                'fills': len(self.fills),
+                'open_orders': len(self._orders),
+                'open_positions': sum(1 for p in self._positions.values() if p['amount']),
+                'api_calls': self.api_calls,
+            }
+
+    # ------------------------------------------------------------------
+    # İç yardımcılar
+    # ------------------------------------------------------------------
+    def _simulate_latency(self):
+        self.api_calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _position(self, symbol):
+        return self._positions.setdefault(symbol, {'amount': 0.0, 'entry_price': 0.0, 'leverage': 1,
+                                                   'margin_type': 'ISOLATED'})
+
+    def _new_order(self, symbol, side, order_type, quantity, stop_price=0.0):
+        order = {'orderId': self._next_order_id, 'symbol': symbol, 'side': side, 'type': order_type,
+                 'origQty': float(quantity), 'executedQty': 0.0, 'avgPrice': 0.0, 'stopPrice': float(stop_price),
+                 'status': 'NEW', 'updateTime': int(time.time() * 1000)}
+        self._next_order_id += 1
+        return order
+
+    def _order_response(self, order):
+        response = dict(order)
+        for key in ('origQty', 'executedQty', 'avgPrice', 'stopPrice'):
+            response[key] = str(order[key])
+        return response
+
+    def _place_conditional(self, symbol, side, order_type, quantity, stop_price, simulate_latency=True):
+        if simulate_latency:
+            self._simulate_latency()
+        with self._lock:
+            if quantity <= 0 or stop_price <= 0:
+                return None
+            order = self._new_order(symbol, side, order_type, quantity, stop_price)
+            self._orders[order['orderId']] = order
+            self._emit_order_update(order, 'NEW')
+            logging.info(f"SİMÜLASYON {order_type}: {symbol} | Taraf: {side} | Miktar: {quantity} | "
+                         f"Tetik: {stop_price} | Emir ID: {order['orderId']}")
+            return self._order_response(order)
+
+    def _start_bar(self, symbol, volume):
+        if self.max_volume_participation:
+            self._liquidity[symbol] = volume * self.max_volume_participation
+
+    def _slipped(self, side, price):
+        adjustment = self.slippage_bps / 10000.0
+        return price * (1 + adjustment) if side == 'BUY' else price * (1 - adjustment)
+
+    def _fill_market(self, order, price):
+        """Piyasa emrini (varsa hacim sınırına kadar) doldurur."""
+        remaining = order['origQty'] - order['executedQty']
+        quantity = remaining
+        if self.max_volume_participation and order['symbol'] in self._liquidity:
+            quantity = min(remaining, self._liquidity[order['symbol']])
+            self._liquidity[order['symbol']] -= quantity
+        quantity = round(quantity, self.quantity_precision)
+        if quantity <= 0:
+            return
+        fill_price = self._slipped(order['side'], price)
+        self._record_fill(order, quantity, fill_price)
+        order['status'] = 'FILLED' if order['executedQty'] >= order['origQty'] - 1e-12 else 'PARTIALLY_FILLED'
+        self._emit_fill(order, quantity, fill_price)
+
+    def _record_fill(self, order, quantity, price):
+        executed = order['executedQty']
+        order['avgPrice'] = (order['avgPrice'] * executed + price * quantity) / (executed + quantity)
+        order['executedQty'] = round(executed + quantity, 12)
+        order['updateTime'] = int(time.time() * 1000)
+        self._apply_fill(order['symbol'], order['side'], quantity, price)
+        self.fills.append({'orderId': order['orderId'], 'symbol': order['symbol'], 'side': order['side'],
+                           'type': order['type'], 'quantity': quantity, 'price': price,
+                           'time': order['updateTime']})
+
+    def _apply_fill(self, symbol, side, quantity, price):
+        """Dolumu pozisyona uygular: ortalama maliyet, gerçekleşen kâr/zarar ve komisyon."""
+        position = self._position(symbol)
+        signed = quantity if side == 'BUY' else -quantity
+        amount = position['amount']
+        fee = quantity * price * self.taker_fee
+        self.fees_paid += fee
+        self.balance -= fee
+
+        if amount == 0 or (amount > 0) == (signed > 0):
+            new_amount = amount + signed
+            position['entry_price'] = (position['entry_price'] * abs(amount) + price * quantity) / abs(new_amount)
+            position['amount'] = new_amount
+            return
+
+        closed = min(abs(amount), quantity)
+        pnl = (price - position['entry_price']) * closed * (1 if amount > 0 else -1)
+        self.realized_pnl += pnl
+        self.balance += pnl
+        new_amount = round(amount + signed, 12)
+        if new_amount == 0:
+            position['amount'], position['entry_price'] = 0.0, 0.0
+            self._cancel_conditional(symbol)
+        elif (new_amount > 0) != (amount > 0):
+            # Pozisyon ters yöne döndü; kalan miktar yeni fiyattan açılır
+            position['amount'], position['entry_price'] = new_amount, price
+        else:
+            position['amount'] = new_amount
+
+    def _emit(self, event):
+        for callback in list(self._user_data_listeners):
+            try:
+                callback(event)
+            except Exception as e:
+                logging.error(f"HATA: Simüle borsa olayı işlenemedi ({event.get('e')}): {e}")
+
+    def _emit_order_update(self, order, execution_type, last_quantity=0.0, last_price=0.0):
+        if not self._user_data_listeners:
+            return
+        self._emit({'e': 'ORDER_TRADE_UPDATE', 'E': int(time.time() * 1000), 'o': {
+            's': order['symbol'], 'S': order['side'], 'o': order['type'], 'q': str(order['origQty']),
+            'sp': str(order['stopPrice']), 'x': execution_type, 'X': order['status'], 'i': order['orderId'],
+            'l': str(last_quantity), 'z': str(order['executedQty']), 'L': str(last_price),
+            'ap': str(order['avgPrice']), 'R': order['type'] != 'MARKET'}})
+
+    def _emit_fill(self, order, quantity, price):
+        """Dolum sonrası emir (TRADE) ve pozisyon (ACCOUNT_UPDATE) olaylarını yayınlar."""
+        if not self._user_data_listeners:
+            return
+        self._emit_order_update(order, 'TRADE', quantity, price)
+        position = self._positions[order['symbol']]
+        self._emit({'e': 'ACCOUNT_UPDATE', 'E': int(time.time() * 1000), 'a': {
+            'm': 'ORDER', 'B': [{'a': 'USDT', 'wb': str(self.balance)}],
+            'P': [{'s': order['symbol'], 'pa': str(position['amount']), 'ep': str(position['entry_price']),
+                   'ps': 'BOTH'}]}})
+
+    def _cancel_conditional(self, symbol):
+        for order_id in [oid for oid, o in self._orders.items() if o['symbol'] == symbol and o['type'] != 'MARKET']:
+            self._orders[order_id]['status'] = 'CANCELED'
+            self._emit_order_update(self._orders.pop(order_id), 'CANCELED')
+
+    def _match(self, symbol, open_price, high, low, close):
+        """Bekleyen emirleri verilen fiyat aralığına göre eşleştirir."""
+        # Önce kısmi dolmuş piyasa emirleri (bir önceki kapanıştan devam eder)
+        for order in [o for o in self._orders.values() if o['symbol'] == symbol and o['type'] == 'MARKET']:
+            self._fill_market(order, open_price)
+            if order['status'] == 'FILLED':
+                del self._orders[order['orderId']]
+
+        # Aynı barda hem SL hem TP tetiklenirse temkinli davranılarak önce stop emirleri işlenir
+        conditional = sorted((o for o in self._orders.values() if o['symbol'] == symbol and o['type'] != 'MARKET'),
+                             key=lambda o: (o['type'] != 'STOP_MARKET', o['orderId']))
+        for order in conditional:
+            if order['orderId'] not in self._orders:
+                continue  # pozisyon kapandığı için iptal edildi
+            trigger = order['stopPrice']
+            selling = order['side'] == 'SELL'
+            if order['type'] == 'STOP_MARKET':
+                triggered = low <= trigger if selling else high >= trigger
+                gapped = open_price < trigger if selling else open_price > trigger
+            else:
+                triggered = high >= trigger if selling else low <= trigger
+                gapped = open_price > trigger if selling else open_price < trigger
+            if not triggered:
+                continue
+
+            position = self._position(symbol)['amount']
+            reducible = abs(position) if (position > 0) == selling and position != 0 else 0.0
+            quantity = min(order['origQty'], reducible)
+            del self._orders[order['orderId']]
+            if quantity <= 0:
+                order['status'] = 'EXPIRED'
+                self._emit_order_update(order, 'EXPIRED')
+                continue
+            execution_price = self._slipped(order['side'], open_price if gapped else trigger)
+            self._record_fill(order, quantity, execution_price)
+            order['status'] = 'FILLED'
+            self._emit_fill(order, quantity, execution_price)
+            logging.info(f"SİMÜLASYON TETİKLENDİ: {symbol} {order['type']} | Miktar: {quantity} @ {order['avgPrice']:.6f}")
+
+        self._prices[symbol] = close
+
+
+if __name__ == '__main__':
+    import numpy as np
+
+    from order_manager import BracketOrderSubmitter
+
+    logging.basicConfig(level=logging.WARNING)
+
+    # Basit senaryo: rastgele yürüyüş fiyatında Long pozisyon, SL/TP emirleri barlarla eşleşir
+    exchange = SimulatedFuturesExchange(slippage_bps=3, max_volume_participation=0.05)
+    submitter = BracketOrderSubmitter(executor=exchange)
+    rng = np.random.default_rng(3)
+    price = 100.0
+    exchange.on_bar('BTCUSDT', price, price, price, price, volume=50)
+
+    result = submitter.submit('BTCUSDT', 'BUY', 5.0, stop_loss_price=95.0, take_profits=[(104, 50), (108, 50)],
+                              quantity_precision=3, leverage=5)
+    print(f"Giriş: {result['entry']['status']} (dolan {result['quantity']}), koruma emirleri: "
+          f"{len(result['take_profits']) + (1 if result['stop_loss'] else 0)}")
+
+    for _ in range(200):
+        open_price = price
+        price = max(1.0, price * (1 + rng.normal(0, 0.01)))
+        high, low = max(open_price, price) * 1.003, min(open_price, price) * 0.997
+        exchange.on_bar('BTCUSDT', open_price, high, low, price, volume=float(rng.uniform(20, 80)))
+
+    print("Pozisyon:", exchange.get_position('BTCUSDT'))
+    print("Özet:", exchange.summary())
@@ -0,0 +1,285 @@
+# position_book.py (Strateji Başına Bellek İçi Pozisyon Defteri ve Arka Plan Kaydı)
+
+import logging
+import threading
+import time
+
+from metrics import get_metrics
+
+# Bir pozisyon kaydının alanları ve varsayılan değerleri
+# quantity: borsadaki açık miktar; None ise bilinmiyor (ör. canlı işlem kapalı veya yeniden başlatma sonrası)
+EMPTY_POSITION = {
+    'position': None, 'entry_price': 0, 'stop_loss_price': 0, 'tp1_price': 0, 'tp2_price': 0,
+    'tp1_hit': False, 'tp2_hit': False, 'quantity': None
+}
+
+# Veritabanı yazımı başarısız olursa en fazla bu kadar tekrar denenir
+WRITE_RETRIES = 3
+WRITE_RETRY_DELAY = 1.0
+
+
+class PositionWriter:
+    """
+    Pozisyon değişikliklerini arka plandaki tek bir iş parçacığıyla kayıt katmanına (veritabanı) yazar.
+    Aynı pozisyonun henüz yazılmamış eski hali yenisiyle birleştirilir; sadece son durum yazılır.
+    """
+
+    def __init__(self):
+        self._pending = {}  # (id(store), strateji_id, sembol) -> (store, strateji_id, sembol, kayıt, deneme)
+        self._cond = threading.Condition()
+        self._writing = False
+        self._thread = None
+
+    def submit(self, store, strategy_id, symbol, record):
+        with self._cond:
+            self._pending[(id(store), strategy_id, symbol)] = (store, strategy_id, symbol, dict(record), 0)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="position-writer", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def pending(self):
+        with self._cond:
+            return len(self._pending) + self._writing
+
+    def flush(self, timeout=None):
+        """Bekleyen tüm yazımlar tamamlanana kadar bekler; süre dolarsa False döner."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending or self._writing:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                key = next(iter(self._pending))
+                store, strategy_id, symbol, record, attempt = self._pending.pop(key)
+                self._writing = True
+            try:
+                with get_metrics().timer('db_write', strategy_id, symbol):
+                    write_position(store, strategy_id, symbol, record)
+            except Exception as e:
+                attempt += 1
+                if attempt < WRITE_RETRIES:
+                    logging.warning(f"UYARI: {strategy_id}/{symbol} pozisyonu kaydedilemedi ({e}), tekrar denenecek.")
+                    time.sleep(WRITE_RETRY_DELAY)
+                    with self._cond:
+                        # Bu arada daha yeni bir durum geldiyse eskisini tekrar yazmaya gerek yok
+                        self._pending.setdefault(key, (store, strategy_id, symbol, record, attempt))
+                else:
+                    logging.error(f"HATA: {strategy_id}/{symbol} pozisyonu {WRITE_RETRIES} denemede kaydedilemedi: {e}")
+            finally:
+                with self._cond:
+                    self._writing = False
+                    self._cond.notify_all()
+
+
+def write_position(store, strategy_id, symbol, record):
+    """Pozisyon kaydını kayıt katmanına yazar (pozisyon yoksa kayıt temizlenir)."""
+    if not record.get('position'):
+        store.update_position(strategy_id, symbol, None, 0, 0, 0, 0, False, False)
+        return
+    store.update_position(strategy_id, symbol, record['position'], record['entry_price'],
+                          sl_price=record['stop_loss_price'], tp1_price=record['tp1_price'],
+                          tp2_price=record['tp2_price'], tp1_hit=record['tp1_hit'], tp2_hit=record['tp2_hit'])
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_position_writer():
+    """Süreç genelinde paylaşılan pozisyon yazıcısını döndürür."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = PositionWriter()
+        return _writer
+
+
+class PositionBook:
+    """
+    Bir stratejinin açık pozisyonlarının yetkili (authoritative) bellek içi kaydı.
+
+    - Okumalar (SL/TP kontrolü, kısmi kapanışlar) sadece bellekten yapılır; veritabanı okunmaz.
+    - Her değişiklik arka planda kayıt katmanına yazılır (async_persist=False ise aynı iş parçacığında).
+    - Borsadaki açık miktar da tutulur; `reconcile` ile borsanın bildirdiği pozisyonla eşitlenir.
+    """
+
+    def __init__(self, strategy_id, store, async_persist=True, writer=None):
+        self.strategy_id = strategy_id
+        self.store = store
+        self.async_persist = async_persist
+        self.writer = writer or get_position_writer()
+        self._positions = {}
+        # Defterin yönettiği semboller (None: hepsi); parçalı çalışmada sadece bu parçaya düşenler
+        self._owned = None
+        self._lock = threading.RLock()
+
+    def load(self, symbols=None):
+        """
+        Kayıt katmanındaki açık pozisyonları belleğe yükler (sadece başlangıçta).
+        symbols verilirse defter bu sembollerle sınırlanır: başka parçanın yönettiği pozisyonlar yüklenmez ve
+        borsa bildirimleriyle eşitlenmez (iki parçanın aynı pozisyonu kapatması önlenir).
+        """
+        loaded = self.store.get_positions_for_strategy(self.strategy_id)
+        with self._lock:
+            self._owned = set(symbols) if symbols is not None else None
+            self._positions = {}
+            for symbol, data in loaded.items():
+                if self._owns(symbol):
+                    self._load_record(symbol, data)
+        return self
+
+    def adopt(self, symbol):
+        """Deftere sonradan eklenen sembolün (ör. yeniden dağıtımda bu parçaya geçen) kayıtlı pozisyonunu yükler."""
+        data = self.store.get_positions_for_strategy(self.strategy_id).get(symbol) or {}
+        with self._lock:
+            if self._owned is not None:
+                self._owned.add(symbol)
+            if symbol not in self._positions:
+                self._load_record(symbol, data)
+
+    def _owns(self, symbol):
+        return self._owned is None or symbol in self._owned
+
+    def _load_record(self, symbol, data):
+        if data.get('position'):
+            record = dict(EMPTY_POSITION)
+            record.update({k: data[k] for k in EMPTY_POSITION if k in data})
+            self._positions[symbol] = record
+
+    def get(self, symbol):
+        """Sembolün pozisyon kaydının kopyasını döndürür; açık pozisyon yoksa boş sözlük."""
+        with self._lock:
+            record = self._positions.get(symbol)
+            return dict(record) if record else {}
+
+    def position(self, symbol):
+        """'Long', 'Short' veya None."""
+        record = self._positions.get(symbol)
+        return record['position'] if record else None
+
+    def symbols(self):
+        with self._lock:
+            return list(self._positions)
+
+    def open(self, symbol, position, entry_price, stop_loss_price=0, tp1_price=0, tp2_price=0, quantity=None):
+        with self._lock:
+            self._positions[symbol] = dict(EMPTY_POSITION, position=position, entry_price=entry_price,
+                                           stop_loss_price=stop_loss_price, tp1_price=tp1_price,
+                                           tp2_price=tp2_price, quantity=quantity)
+            self._persist(symbol)
+
+    def mark_take_profit(self, symbol, tp1_hit=None, tp2_hit=None):
+        with self._lock:
+            record = self._positions.get(symbol)
+            if not record:
+                return
+            if tp1_hit is not None:
+                record['tp1_hit'] = tp1_hit
+            if tp2_hit is not None:
+                record['tp2_hit'] = tp2_hit
+            self._persist(symbol)
+
+    def set_quantity(self, symbol, quantity):
+        """Borsadaki açık miktarı günceller (sadece bellekte tutulur, veritabanına yazılmaz)."""
+        with self._lock:
+            record = self._positions.get(symbol)
+            if record:
+                record['quantity'] = quantity
+
+    def close(self, symbol):
+        with self._lock:
+            self._positions.pop(symbol, None)
+            self._persist(symbol)
+
+    def forget(self, symbol):
+        """Sembolü kayıt katmanına dokunmadan bellekten çıkarır (ör. sembol stratejiden çıkarıldığında)."""
+        with self._lock:
+            self._positions.pop(symbol, None)
+            if self._owned is not None:
+                self._owned.discard(symbol)
+
+    def reconcile(self, symbol, exchange_amount):
+        """
+        Borsanın bildirdiği işaretli pozisyon miktarıyla defterdeki miktarı eşitler.
+        Dönüş: 'flat' (pozisyon borsada kapanmış, ör. borsadaki SL/TP emri doldu), 'updated' veya None
+        (defterde açık pozisyon yok veya sembol bu defterin değil). Kayıt silinmez; kapanışı strateji kendi
+        SL/TP mantığıyla işler.
+        """
+        with self._lock:
+            if not self._owns(symbol):
+                return None
+            record = self._positions.get(symbol)
+            if not record:
+                return None
+            record['quantity'] = abs(exchange_amount)
+            return 'flat' if record['quantity'] <= 0 else 'updated'
+
+    def flush(self, timeout=None):
+        """Bekleyen kayıtlar yazılana kadar bekler."""
+        return self.writer.flush(timeout)
+
+    def _persist(self, symbol):
+        record = self._positions.get(symbol) or EMPTY_POSITION
+        if self.async_persist:
+            self.writer.submit(self.store, self.strategy_id, symbol, record)
+        else:
+            write_position(self.store, self.strategy_id, symbol, record)
+
+
+if __name__ == '__main__':
+    # Yavaş bir veritabanını taklit eden kayıt katmanı ile kısmi kapanış senaryosu
+    class _SlowStore:
+        def __init__(self, delay=0.05):
+            self.delay = delay
+            self.rows = {}
+            self.writes = 0
+            self.reads = 0
+
+        def get_positions_for_strategy(self, strategy_id):
+            self.reads += 1
+            time.sleep(self.delay)
+            return {s: dict(r) for (sid, s), r in self.rows.items() if sid == strategy_id}
+
+        def update_position(self, strategy_id, symbol, position, entry_price, sl_price=0, tp1_price=0, tp2_price=0,
+                            tp1_hit=False, tp2_hit=False):
+            self.writes += 1
+            time.sleep(self.delay)
+            if position is None:
+                self.rows.pop((strategy_id, symbol), None)
+            else:
+                self.rows[(strategy_id, symbol)] = {
+                    'position': position, 'entry_price': entry_price, 'stop_loss_price': sl_price,
+                    'tp1_price': tp1_price, 'tp2_price': tp2_price, 'tp1_hit': tp1_hit, 'tp2_hit': tp2_hit}
+
+    store = _SlowStore()
+    book = PositionBook('demo', store)
+    start = time.perf_counter()
+    book.open('BTCUSDT', 'Long', 100000.0, 98000.0, 102000.0, 104000.0, quantity=0.01)
+    book.mark_take_profit('BTCUSDT', tp1_hit=True)
+    book.set_quantity('BTCUSDT', 0.005)
+    hot_path_ms = (time.perf_counter() - start) * 1000
+    book.flush()
+    print(f"Sıcak yol: {hot_path_ms:.2f} ms, DB okuma: {store.reads}, DB yazma: {store.writes}")
+    assert store.rows[('demo', 'BTCUSDT')]['tp1_hit'] is True
+
+    # Borsadaki TP2 emri dolmuş: akıştan gelen 0 miktar defterde görülür, kapanışta emir gönderilmez
+    assert book.reconcile('BTCUSDT', 0.0) == 'flat' and book.get('BTCUSDT')['quantity'] == 0
+    book.close('BTCUSDT')
+    book.flush()
+    assert not store.rows and not book.position('BTCUSDT')
+
+    # Yeniden başlatma: veritabanından tüm alanlarıyla yüklenir
+    book.open('ETHUSDT', 'Short', 3000.0, 3100.0, 2900.0, 2800.0)
+    book.flush()
+    restored = PositionBook('demo', store).load()
+    print(f"Yüklenen pozisyon: {restored.get('ETHUSDT')}")
+    assert restored.get('ETHUSDT')['stop_loss_price'] == 3100.0
@@ -0,0 +1,172 @@
+# profiling.py (Backtest ve Optimizasyon İçin İsteğe Bağlı Profil Modu)
+#
+# Profil modu kapalıyken `stage()` hiçbir şey yapmaz; açıkken (ProfileSession içinde) her aşamanın süresi toplanır
+# ve istenirse cProfile ile fonksiyon düzeyinde profil alınır. Arayüzde kenar çubuğundan, komut satırında
+# `streamlit run app.py -- --profile` veya KRIPTO_PROFILE=1 ortam değişkeniyle açılır.
+
+import cProfile
+import io
+import os
+import pstats
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+# Raporda gösterilen aşamalar (sırasıyla)
+STAGES = {
+    'data_fetch': "Veri İndirme",
+    'indicators': "Göstergeler",
+    'signals': "Sinyaller",
+    'mta_merge': "MTA Birleştirme",
+    'simulation': "Simülasyon Döngüsü",
+    'metrics': "Metrikler",
+}
+OTHER_STAGE = "Diğer"
+
+_active = None
+_active_lock = threading.Lock()
+
+
+def profiling_requested(argv=None, environ=None):
+    """Profil modu komut satırından (--profile) veya KRIPTO_PROFILE ortam değişkeniyle istendi mi?"""
+    argv = sys.argv if argv is None else argv
+    environ = os.environ if environ is None else environ
+    return '--profile' in argv or environ.get('KRIPTO_PROFILE', '').lower() in ('1', 'true', 'yes')
+
+
+@contextmanager
+def stage(name):
+    """Aktif profil oturumu varsa bloğun süresini `name` aşamasına ekler; yoksa ek yükü yoktur."""
+    session = _active
+    if session is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        session.add(name, time.perf_counter() - start)
+
+
+class ProfileSession:
+    """
+    Bir backtest/optimizasyon çalıştırmasını profiller.
+    use_cprofile=False ise sadece aşama süreleri toplanır (ek yük ihmal edilebilir); True ise cProfile
+    fonksiyon düzeyinde ayrıntı verir ancak Python döngülerini belirgin şekilde yavaşlatır.
+    """
+
+    def __init__(self, label, use_cprofile=True):
+        self.label = label
+        self.use_cprofile = use_cprofile
+        self.stage_times = {}
+        self.stage_calls = {}
+        self.wall_time = 0.0
+        self._profiler = cProfile.Profile() if use_cprofile else None
+        self._lock = threading.Lock()
+        self._started = None
+
+    def add(self, name, seconds):
+        with self._lock:
+            self.stage_times[name] = self.stage_times.get(name, 0.0) + seconds
+            self.stage_calls[name] = self.stage_calls.get(name, 0) + 1
+
+    def __enter__(self):
+        global _active
+        with _active_lock:
+            if _active is not None:
+                raise RuntimeError("Aynı anda yalnızca bir profil oturumu çalışabilir.")
+            _active = self
+        self._started = time.perf_counter()
+        if self._profiler is not None:
+            self._profiler.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        global _active
+        if self._profiler is not None:
+            self._profiler.disable()
+        self.wall_time = time.perf_counter() - self._started
+        with _active_lock:
+            _active = None
+        return False
+
+    def breakdown(self):
+        """Aşama bazında süre tablosu (satır listesi); aşamalara girmeyen süre 'Diğer' olarak eklenir."""
+        rows = []
+        names = list(STAGES) + [n for n in self.stage_times if n not in STAGES]
+        for name in names:
+            if name not in self.stage_times:
+                continue
+            seconds = self.stage_times[name]
+            rows.append({'Aşama': STAGES.get(name, name), 'Süre (sn)': round(seconds, 4),
+                         'Çağrı': self.stage_calls[name],
+                         'Pay (%)': round(seconds / self.wall_time * 100, 1) if self.wall_time else 0.0})
+        other = self.wall_time - sum(self.stage_times.values())
+        if other > 0:
+            rows.append({'Aşama': OTHER_STAGE, 'Süre (sn)': round(other, 4), 'Çağrı': None,
+                         'Pay (%)': round(other / self.wall_time * 100, 1) if self.wall_time else 0.0})
+        return rows
+
+    def top_functions(self, limit=25, sort='cumulative'):
+        """cProfile çıktısının en pahalı fonksiyonlarını metin olarak döndürür."""
+        if self._profiler is None:
+            return ""
+        stream = io.StringIO()
+        pstats.Stats(self._profiler, stream=stream).strip_dirs().sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+    def profile_bytes(self):
+        """pstats formatında profil dosyasının içeriği (snakeviz / `python -m pstats` ile açılabilir)."""
+        if self._profiler is None:
+            return b""
+        with tempfile.NamedTemporaryFile(suffix='.prof', delete=False) as f:
+            path = f.name
+        try:
+            self._profiler.dump_stats(path)
+            with open(path, 'rb') as f:
+                return f.read()
+        finally:
+            os.remove(path)
+
+    def report(self):
+        """Oturum durumuna (st.session_state) konabilecek, arayüzden bağımsız rapor sözlüğü."""
+        return {
+            'label': self.label,
+            'wall_time': round(self.wall_time, 3),
+            'breakdown': self.breakdown(),
+            'top_functions': self.top_functions(),
+            'profile_bytes': self.profile_bytes(),
+        }
+
+
+if __name__ == '__main__':
+    # Sentetik veride backtest ve küçük bir optimizasyon taramasını profiller (ağ erişimi gerekmez)
+    import random
+
+    import numpy as np
+    import pandas as pd
+
+    import profiling  # backtest_engine'in gördüğü modül (__main__ değil) üzerinden oturum açılır
+    from backtest_engine import build_param_grid, run_backtest, run_optimization, sample_combinations
+
+    rng = np.random.default_rng(0)
+    n = 1000
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    frames = {'DEMOUSDT': pd.DataFrame({'Open': close, 'High': close * 1.004, 'Low': close * 0.996, 'Close': close,
+                                        'Volume': rng.uniform(10, 100, n)},
+                                       index=pd.date_range('2024-01-01', periods=n, freq='1h'))}
+    params = {'use_rsi': True, 'use_macd': True, 'rsi_buy': 40, 'rsi_sell': 60, 'signal_mode': 'or',
+              'signal_direction': 'Both', 'stop_loss_pct': 0, 'atr_multiplier': 2.0, 'cooldown_bars': 3,
+              'commission_pct': 0.1, 'tp1_pct': 1.0, 'tp1_size_pct': 50, 'tp2_pct': 2.5, 'tp2_size_pct': 50,
+              'move_sl_to_be': True, 'use_mta': False}
+
+    for use_cprofile in (False, True):
+        with profiling.ProfileSession("Backtest + Optimizasyon", use_cprofile=use_cprofile) as session:
+            run_backtest(frames, params)
+            grid = build_param_grid((25, 35), (65, 75), (20, 30), (1.5, 2.5), (4.0, 8.0))
+            run_optimization(frames, params, sample_combinations(grid, max_tests=3, rng=random.Random(0)))
+        print(f"\n--- cProfile {'açık' if use_cprofile else 'kapalı'}: toplam {session.wall_time:.2f} sn ---")
+        print(pd.DataFrame(session.breakdown()).to_string(index=False))
+    print(session.top_functions(limit=10))
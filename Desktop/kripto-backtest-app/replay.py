@@ -0,0 +1,313 @@
+# replay.py (Canlı İşçi İçin Geçmiş Mum Verisi Tekrar Oynatma Sürücüsü)
+
+import argparse
+import hashlib
+import heapq
+import json
+import logging
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from kline_store import interval_to_timedelta, load_klines, resample_klines
+
+
+class InMemoryStore:
+    """
+    StrategyRunner'ın kullandığı veritabanı fonksiyonlarının bellek içi karşılığı.
+    Tekrar oynatmada pozisyonlar ve alarmlar burada tutulur; sonuçlar karşılaştırılabilir.
+    """
+
+    def __init__(self, strategies=None):
+        self.strategies = list(strategies or [])
+        self.positions = {}  # (strateji_id, sembol) -> pozisyon sözlüğü
+        self.alarms = []
+        self.pending_actions = []
+        self._lock = threading.Lock()
+
+    def get_all_strategies(self):
+        return list(self.strategies)
+
+    def get_positions_for_strategy(self, strategy_id):
+        with self._lock:
+            return {symbol: dict(pos) for (sid, symbol), pos in self.positions.items() if sid == strategy_id}
+
+    def update_position(self, strategy_id, symbol, position, entry_price, sl_price=0, tp1_price=0, tp2_price=0,
+                        tp1_hit=False, tp2_hit=False):
+        with self._lock:
+            if position is None:
+                self.positions.pop((strategy_id, symbol), None)
+                return
+            self.positions[(strategy_id, symbol)] = {
+                'position': position, 'entry_price': entry_price, 'stop_loss_price': sl_price,
+                'tp1_price': tp1_price, 'tp2_price': tp2_price, 'tp1_hit': tp1_hit, 'tp2_hit': tp2_hit
+            }
+
+    def log_alarm_db(self, strategy_id, symbol, signal, price):
+        with self._lock:
+            self.alarms.append({'strategy_id': strategy_id, 'symbol': symbol, 'signal': signal, 'price': float(price)})
+
+    def get_and_clear_pending_actions(self, strategy_id, symbols=None):
+        with self._lock:
+            def matches(action):
+                return action.get('strategy_id') == strategy_id and (symbols is None or action.get('symbol') in symbols)
+            actions = [a for a in self.pending_actions if matches(a)]
+            self.pending_actions = [a for a in self.pending_actions if not matches(a)]
+            return actions
+
+
+class HistoricalKlineSource:
+    """
+    get_binance_klines yerine geçen, geçmiş veriden okuyan kaynak.
+    Yalnızca tekrar oynatma saatine (`clock`) göre kapanmış mumları döndürür; böylece ileriye bakma
+    (look-ahead) olmaz. Saklanmayan üst zaman dilimleri (MTA için) temel veriden yeniden örneklenir.
+    """
+
+    def __init__(self, frames, base_interval):
+        self.frames = frames  # sembol -> temel zaman dilimindeki OHLCV
+        self.base_interval = base_interval
+        self.extra_frames = {}  # (sembol, zaman dilimi) -> OHLCV
+        self.clock = None
+
+    def add_frame(self, symbol, interval, df):
+        self.extra_frames[(symbol, interval)] = df
+
+    def __call__(self, symbol, interval, limit=1000):
+        if interval == self.base_interval:
+            df = self.frames.get(symbol)
+        else:
+            df = self.extra_frames.get((symbol, interval))
+            if df is None and symbol in self.frames:
+                df = resample_klines(self.frames[symbol], interval)
+        if df is None or df.empty:
+            return pd.DataFrame()
+        if self.clock is not None:
+            df = df[df.index + interval_to_timedelta(interval) <= self.clock]
+        return df.iloc[-limit:].copy()
+
+
+def _price_path(o, h, l, c, steps):
+    """Bir mum içindeki fiyat yolunu (yükselen mumda A-D-Y-K, düşende A-Y-D-K) `steps` noktada örnekler."""
+    waypoints = [o, l, h, c] if c >= o else [o, h, l, c]
+    positions = np.linspace(0, len(waypoints) - 1, steps + 2)[1:-1]
+    return np.interp(positions, np.arange(len(waypoints)), waypoints)
+
+
+def klines_to_messages(symbol, interval, df, intra_updates=0):
+    """
+    OHLCV verisini Binance kline WebSocket mesajlarına çevirir: her mum için `intra_updates` adet
+    ara güncelleme (x=false) ve bir kapanış mesajı (x=true). (olay_zamanı_ms, sembol, mesaj) üretir.
+    """
+    duration_ms = int(interval_to_timedelta(interval).total_seconds() * 1000)
+    for ts, (o, h, l, c, v) in zip(df.index, df[['Open', 'High', 'Low', 'Close', 'Volume']].itertuples(index=False)):
+        start_ms = int(pd.Timestamp(ts).value // 1_000_000)
+        if intra_updates:
+            running_high, running_low = o, o
+            for k, price in enumerate(_price_path(o, h, l, c, intra_updates), start=1):
+                running_high, running_low = max(running_high, price), min(running_low, price)
+                event_ms = start_ms + duration_ms * k // (intra_updates + 1)
+                yield event_ms, symbol, _kline_message(symbol, interval, start_ms, duration_ms, event_ms, o,
+                                                       running_high, running_low, price,
+                                                       v * k / (intra_updates + 1), False)
+        close_ms = start_ms + duration_ms - 1
+        yield close_ms, symbol, _kline_message(symbol, interval, start_ms, duration_ms, close_ms, o, h, l, c, v, True)
+
+
+def _kline_message(symbol, interval, start_ms, duration_ms, event_ms, o, h, l, c, v, closed):
+    return json.dumps({
+        'e': 'kline', 'E': event_ms, 's': symbol,
+        'k': {'t': start_ms, 'T': start_ms + duration_ms - 1, 's': symbol, 'i': interval,
+              'o': repr(float(o)), 'h': repr(float(h)), 'l': repr(float(l)), 'c': repr(float(c)),
+              'v': repr(float(v)), 'x': closed}
+    })
+
+
+class MessageRecorder:
+    """Canlı WebSocket mesajlarını JSONL dosyasına kaydeder (runner.message_recorder olarak atanır)."""
+
+    def __init__(self, path):
+        self._file = open(path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+
+    def record(self, symbol, message):
+        line = json.dumps({'time': int(time.time() * 1000), 'symbol': symbol, 'message': message})
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def load_recorded_messages(path):
+    """MessageRecorder ile kaydedilmiş mesajları (olay_zamanı_ms, sembol, mesaj) olarak okur."""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                yield record['time'], record['symbol'], record['message']
+
+
+class ReplayDriver:
+    """
+    Mesaj akışını runner'lara WebSocket yerine doğrudan verir.
+    speed=0: mümkün olan en hızlı şekilde; speed=N: gerçek zamanın N katı hızda.
+    """
+
+    def __init__(self, runners, messages, speed=0.0, kline_source=None):
+        self.runners = list(runners)
+        self.messages = messages
+        self.speed = speed
+        self.kline_source = kline_source
+        self._subscribers = {}
+        for runner in self.runners:
+            for symbol in runner.symbols:
+                self._subscribers.setdefault(symbol, []).append(runner)
+
+    def run(self):
+        latencies = []
+        n_messages = n_candles = 0
+        first_event = None
+        started = time.perf_counter()
+        for event_ms, symbol, message in self.messages:
+            if self.speed and first_event is not None:
+                delay = (event_ms - first_event) / 1000.0 / self.speed - (time.perf_counter() - started)
+                if delay > 0:
+                    time.sleep(delay)
+            if first_event is None:
+                first_event = event_ms
+            if self.kline_source is not None:
+                self.kline_source.clock = pd.Timestamp(event_ms + 1, unit='ms')
+            closed = '"x": true' in message
+            for runner in self._subscribers.get(symbol, ()):
+                t0 = time.perf_counter()
+                runner._on_message(None, message, symbol)
+                latencies.append(time.perf_counter() - t0)
+            n_messages += 1
+            n_candles += closed
+        elapsed = time.perf_counter() - started
+        latencies_ms = np.array(latencies) * 1000 if latencies else np.zeros(1)
+        return {
+            'messages': n_messages,
+            'candles': n_candles,
+            'elapsed_s': round(elapsed, 3),
+            'messages_per_s': round(n_messages / elapsed, 1) if elapsed else None,
+            'candles_per_s': round(n_candles / elapsed, 1) if elapsed else None,
+            'latency_p50_ms': round(float(np.percentile(latencies_ms, 50)), 3),
+            'latency_p99_ms': round(float(np.percentile(latencies_ms, 99)), 3),
+            'latency_max_ms': round(float(latencies_ms.max()), 3),
+        }
+
+
+def result_digest(store):
+    """Alarm (sinyal/kapanış) sırasının özetini döndürür; deterministik regresyon testi için kullanılır."""
+    payload = json.dumps([(a['symbol'], a['signal'], round(a['price'], 8)) for a in store.alarms])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def replay_strategies(configs, frames, interval, warmup=200, speed=0.0, intra_updates=0, executor=None):
+    """
+    Stratejileri geçmiş veri üzerinde canlı işçi kod yoluyla (StrategyRunner._on_message) çalıştırır.
+    İlk `warmup` mum başlangıç verisi olarak verilir, kalanı mesaj olarak oynatılır.
+    Varsayılan olarak emirler ağ kullanmayan simüle borsaya (paper_exchange) gider.
+    Dönüş: (istatistikler, bellek içi kayıt, borsa)
+    """
+    import native_indicators
+    from feature_hub import FeatureHub
+    from multi_worker import StrategyRunner
+    from paper_exchange import SimulatedFuturesExchange
+
+    configs = [dict(c, strategy_params=dict(_params(c), telegram_enabled=False), rl_model_id=c.get('rl_model_id'))
+               for c in configs]
+    store = InMemoryStore(configs)
+    source = HistoricalKlineSource(frames, interval)
+    first_replayed = min(df.index[min(warmup, len(df) - 1)] for df in frames.values())
+    source.clock = first_replayed
+    executor = executor or SimulatedFuturesExchange()
+    # JIT derlemesi ilk mumun gecikmesine yansımasın diye çekirdekler önceden derlenir
+    native_indicators.warmup()
+    # Her tekrar oynatma kendi mum tamponlarını kullanır (aynı süreçteki canlı/önceki çalıştırmalardan bağımsız)
+    feature_hub = FeatureHub()
+
+    runners = []
+    for config in configs:
+        runner = StrategyRunner(config, executor=executor, store=store, kline_source=source,
+                                feature_hub=feature_hub)
+        runner.start(stream=False)
+        runners.append(runner)
+
+    streams = [klines_to_messages(symbol, interval, df[df.index >= first_replayed], intra_updates)
+               for symbol, df in frames.items()]
+    messages = heapq.merge(*streams, key=lambda m: m[0])
+    stats = ReplayDriver(runners, messages, speed=speed, kline_source=source).run()
+    # Pozisyon defterleri kayıt katmanına arka planda yazar; sonuç okunmadan önce bekleyenler tamamlanır
+    for runner in runners:
+        runner.positions.flush()
+    return stats, store, executor
+
+
+def _params(config):
+    params = config.get('strategy_params') or {}
+    return json.loads(params) if isinstance(params, str) else params
+
+
+def _synthetic_frames(n_symbols, n_bars, interval, seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range('2024-01-01', periods=n_bars, freq=interval_to_timedelta(interval))
+    frames = {}
+    for i in range(n_symbols):
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n_bars)))
+        open_ = np.concatenate([[close[0]], close[:-1]])
+        spread = np.abs(rng.normal(0, 0.004, n_bars)) * close
+        frames[f"SYN{i:03d}USDT"] = pd.DataFrame({
+            'Open': open_, 'High': np.maximum(open_, close) + spread, 'Low': np.minimum(open_, close) - spread,
+            'Close': close, 'Volume': rng.uniform(100, 1000, n_bars)
+        }, index=index)
+    return frames
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Canlı işçi (StrategyRunner) için geçmiş veri tekrar oynatma")
+    parser.add_argument('--data', nargs='*', default=[], help="SEMBOL=dosya.parquet|csv çiftleri")
+    parser.add_argument('--synthetic-symbols', type=int, default=0, help="Veri yerine N sentetik sembol üret")
+    parser.add_argument('--bars', type=int, default=600, help="Sentetik veri için mum sayısı")
+    parser.add_argument('--interval', default='1h')
+    parser.add_argument('--params', help="Strateji parametrelerini içeren JSON dosyası")
+    parser.add_argument('--runners', type=int, default=1, help="Aynı semboller üzerinde çalışacak strateji sayısı")
+    parser.add_argument('--warmup', type=int, default=200)
+    parser.add_argument('--intra-updates', type=int, default=0, help="Mum başına ara güncelleme (x=false) sayısı")
+    parser.add_argument('--speed', type=float, default=0.0, help="0 = olabildiğince hızlı, N = gerçek zamanın N katı")
+    parser.add_argument('--expect-digest', help="Beklenen sonuç özeti (farklıysa çıkış kodu 1)")
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.INFO if args.verbose else logging.WARNING)
+
+    frames = {}
+    for item in args.data:
+        symbol, path = item.split('=', 1)
+        frames[symbol] = load_klines(path)
+    if args.synthetic_symbols:
+        frames.update(_synthetic_frames(args.synthetic_symbols, args.bars, args.interval))
+    if not frames:
+        parser.error("--data veya --synthetic-symbols verilmelidir.")
+
+    strategy_params = {}
+    if args.params:
+        with open(args.params, encoding='utf-8') as f:
+            strategy_params = json.load(f)
+
+    configs = [{'id': f"replay-{i}", 'name': f"Replay {i}", 'symbols': list(frames), 'interval': args.interval,
+                'strategy_params': strategy_params, 'status': 'running', 'orchestrator_status': 'active',
+                'is_trading_enabled': True, 'rl_model_id': None}
+               for i in range(args.runners)]
+    stats, store, exchange = replay_strategies(configs, frames, args.interval, warmup=args.warmup, speed=args.speed,
+                                               intra_updates=args.intra_updates)
+    digest = result_digest(store)
+    print(json.dumps(dict(stats, runners=args.runners, symbols=len(frames), alarms=len(store.alarms),
+                          digest=digest, exchange=exchange.summary()), indent=2, ensure_ascii=False))
+    if args.expect_digest and args.expect_digest != digest:
+        print("❌ Sonuç özeti beklenenden farklı.")
+        raise SystemExit(1)
@@ -0,0 +1,402 @@
+# rl_observation.py (RL Gözlem Özellikleri: Toplu Hesaplama ve Artımlı Güncelleme)
+
+import math
+import sys
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from indicators import generate_all_indicators
+
+# TradingEnv'in gösterge hesaplarken kullandığı varsayılan parametreler
+INDICATOR_PARAM_DEFAULTS = {
+    'sma': 50,
+    'ema': 20,
+    'bb_period': 20,
+    'bb_std': 2.0,
+    'rsi_period': 14,
+    'macd_fast': 12,
+    'macd_slow': 26,
+    'macd_signal': 9,
+    'adx_period': 14,
+    'stop_loss_pct': 0,
+    'atr_multiplier': 2.0,
+    'cooldown_bars': 3,
+    'signal_mode': 'and',
+    'signal_direction': 'Both',
+    'use_puzzle_bot': False,
+    'use_ml': False,
+    'use_mta': True,
+    'higher_timeframe': '4h',
+    'trend_ema_period': 50,
+    'commission_pct': 0.1,
+    'tp1_pct': 5.0,
+    'tp1_size_pct': 50,
+    'tp2_pct': 10.0,
+    'tp2_size_pct': 50,
+    'move_sl_to_be': True
+}
+
+# generate_all_indicators içinde RL gözlemine sabit değerlerle giren periyotlar
+MA_FAST_PERIOD = 20
+MA_SLOW_PERIOD = 50
+STOCH_K_PERIOD = 14
+STOCH_D_PERIOD = 3
+STOCH_SMOOTH_K = 3
+ATR_PERIOD = 14
+
+# Ham OHLCV verisinden üretilen gözlem sütunları (sıra, modelin eğitildiği sırayla aynıdır)
+OBSERVATION_COLUMNS = [
+    'Open', 'High', 'Low', 'Close', 'Volume',
+    'SMA_fast', 'SMA_slow', 'SMA', 'EMA',
+    'bb_lband', 'bb_mband', 'bb_hband',
+    'RSI', 'MACD', 'MACD_signal', 'ADX', 'Stoch_k', 'Stoch_d', 'VWAP', 'ATR',
+    'day_of_week', 'hour_of_day', 'volatility', 'trend_strength'
+]
+
+# trend_strength (ADX) kategorileri için sabit sınırlar
+TREND_STRENGTH_BINS = [0, 20, 30, 100]
+
+NAN = float('nan')
+
+
+def resolve_indicator_params(strategy_params=None):
+    """Strateji parametrelerini, eksik olanları varsayılanlarla doldurarak gösterge parametrelerine çevirir."""
+    strategy_params = strategy_params or {}
+    return {key: strategy_params.get(key, default) for key, default in INDICATOR_PARAM_DEFAULTS.items()}
+
+
+def build_observation_frame(df, strategy_params=None):
+    """
+    Veriyi hazırlar: Göstergeleri, piyasa rejimini ve zaman özelliklerini hesaplar,
+    NaN değerleri temizler. TradingEnv ve canlı gözlem üretimi aynı tanımları kullanır.
+    """
+    params = resolve_indicator_params(strategy_params)
+    df_with_indicators = generate_all_indicators(df.copy(), **params)
+
+    # Ham rejim özellikleri: Bollinger bant genişliği ve ADX zaten gösterge setinde aynı parametrelerle hesaplanıyor
+    if {'bb_lband', 'bb_mband', 'bb_hband'}.issubset(df_with_indicators.columns):
+        df_with_indicators['volatility_raw'] = (df_with_indicators['bb_hband'] - df_with_indicators['bb_lband']) / \
+                                               df_with_indicators['bb_mband']
+    else:
+        df_with_indicators['volatility_raw'] = np.nan
+    df_with_indicators['trend_strength_raw'] = df_with_indicators['ADX'] if 'ADX' in df_with_indicators.columns else np.nan
+
+    df_with_indicators['day_of_week'] = df_with_indicators.index.dayofweek
+    df_with_indicators['hour_of_day'] = df_with_indicators.index.hour
+
+    # Önce geriye doğru doldurarak en güncel veriyi koru, sonra kalanları sil.
+    df_with_indicators = df_with_indicators.bfill().dropna()
+
+    # NaN'ler temizlendikten sonra kategorizasyon ve tür dönüşümü
+    df_with_indicators['volatility'] = pd.cut(df_with_indicators['volatility_raw'], bins=3, labels=[-1, 0, 1],
+                                              include_lowest=True).astype(int)
+    df_with_indicators['trend_strength'] = pd.cut(df_with_indicators['trend_strength_raw'], bins=TREND_STRENGTH_BINS,
+                                                  labels=[-1, 0, 1], include_lowest=True).astype(int)
+
+    return df_with_indicators.drop(columns=['volatility_raw', 'trend_strength_raw'])
+
+
+# --- Artımlı (bar bar) gösterge hesaplayıcıları ---
+# Her biri pandas_ta'daki karşılığının özyinelemeli halidir; baştaki NaN girdileri atlanır.
+
+def _is_nan(x):
+    return x != x
+
+
+def _safe_div(a, b):
+    if _is_nan(a) or _is_nan(b) or b == 0:
+        return NAN
+    return a / b
+
+
+class _Sma:
+    def __init__(self, length):
+        self.length = length
+        self.values = deque(maxlen=length)
+
+    def update(self, x):
+        if _is_nan(x):
+            return NAN
+        self.values.append(x)
+        return sum(self.values) / self.length if len(self.values) == self.length else NAN
+
+
+class _Bands:
+    """Bollinger bantları (SMA ± std * popülasyon standart sapması)."""
+
+    def __init__(self, length, std):
+        self.length = length
+        self.std = std
+        self.values = deque(maxlen=length)
+
+    def update(self, x):
+        self.values.append(x)
+        if len(self.values) < self.length:
+            return NAN, NAN, NAN
+        mid = sum(self.values) / self.length
+        deviation = self.std * math.sqrt(sum((v - mid) ** 2 for v in self.values) / self.length)
+        return mid - deviation, mid, mid + deviation
+
+
+class _Ema:
+    """İlk değeri SMA ile tohumlanan, adjust=False üstel ortalama."""
+
+    def __init__(self, length):
+        self.length = length
+        self.alpha = 2.0 / (length + 1)
+        self.seed = []
+        self.value = NAN
+
+    def update(self, x):
+        if _is_nan(x):
+            return self.value
+        if len(self.seed) < self.length:
+            self.seed.append(x)
+            if len(self.seed) == self.length:
+                self.value = sum(self.seed) / self.length
+            return self.value
+        self.value = (1 - self.alpha) * self.value + self.alpha * x
+        return self.value
+
+
+class _Rma:
+    """Wilder ortalaması: ewm(alpha=1/length, adjust=True, min_periods=length)."""
+
+    def __init__(self, length):
+        self.length = length
+        self.decay = 1.0 - 1.0 / length
+        self.numerator = 0.0
+        self.denominator = 0.0
+        self.count = 0
+
+    def update(self, x):
+        if not _is_nan(x):
+            self.numerator = x + self.decay * self.numerator
+            self.denominator = 1.0 + self.decay * self.denominator
+            self.count += 1
+        return self.numerator / self.denominator if self.count >= self.length else NAN
+
+
+def _copy_component(obj):
+    """Gösterge hesaplayıcısının sığ kopyası; içindeki kısa deque/listeler de kopyalanır (derin kopya gerekmez)."""
+    clone = object.__new__(type(obj))
+    clone.__dict__ = {key: deque(value, value.maxlen) if isinstance(value, deque) else
+                      list(value) if isinstance(value, list) else value for key, value in obj.__dict__.items()}
+    return clone
+
+
+class _IndicatorState:
+    """Tek bir sembolün bar bar güncellenen gösterge durumu."""
+
+    def __init__(self, params, window):
+        self.sma_fast = _Sma(MA_FAST_PERIOD)
+        self.sma_slow = _Sma(MA_SLOW_PERIOD)
+        self.sma = _Sma(params['sma'])
+        self.ema = _Ema(params['ema'])
+        self.bands = _Bands(params['bb_period'], params['bb_std'])
+        self.rsi_gain = _Rma(params['rsi_period'])
+        self.rsi_loss = _Rma(params['rsi_period'])
+        self.macd_fast = _Ema(params['macd_fast'])
+        self.macd_slow = _Ema(params['macd_slow'])
+        self.macd_signal = _Ema(params['macd_signal'])
+        self.adx_atr = _Rma(params['adx_period'])
+        self.adx_plus = _Rma(params['adx_period'])
+        self.adx_minus = _Rma(params['adx_period'])
+        self.adx = _Rma(params['adx_period'])
+        self.atr = _Rma(ATR_PERIOD)
+        self.stoch_highs = deque(maxlen=STOCH_K_PERIOD)
+        self.stoch_lows = deque(maxlen=STOCH_K_PERIOD)
+        self.stoch_k = _Sma(STOCH_SMOOTH_K)
+        self.stoch_d = _Sma(STOCH_D_PERIOD)
+        self.vwap_day = None
+        self.vwap_pv = 0.0
+        self.vwap_volume = 0.0
+        self.volatility_history = deque(maxlen=window)
+        self.prev_bar = None
+        self.timestamp = None
+        self.row = None
+        self.volatility_raw = NAN
+
+    def update(self, timestamp, o, h, l, c, v):
+        prev = self.prev_bar
+        row = {'Open': o, 'High': h, 'Low': l, 'Close': c, 'Volume': v}
+
+        row['SMA_fast'] = self.sma_fast.update(c)
+        row['SMA_slow'] = self.sma_slow.update(c)
+        row['SMA'] = self.sma.update(c)
+        row['EMA'] = self.ema.update(c)
+        row['bb_lband'], row['bb_mband'], row['bb_hband'] = self.bands.update(c)
+
+        diff = NAN if prev is None else c - prev[3]
+        gain = self.rsi_gain.update(NAN if _is_nan(diff) else max(diff, 0.0))
+        loss = self.rsi_loss.update(NAN if _is_nan(diff) else min(diff, 0.0))
+        row['RSI'] = _safe_div(100 * gain, gain + abs(loss))
+
+        macd = self.macd_fast.update(c) - self.macd_slow.update(c)
+        row['MACD'] = macd
+        row['MACD_signal'] = self.macd_signal.update(macd)
+
+        if prev is None:
+            true_range = up_move = down_move = NAN
+        else:
+            prev_high, prev_low, prev_close = prev[1], prev[2], prev[3]
+            true_range = max(h - l, abs(h - prev_close), abs(prev_close - l))
+            up, down = h - prev_high, prev_low - l
+            up_move = up if (up > down and up > 0) else 0.0
+            down_move = down if (down > up and down > 0) else 0.0
+        adx_atr = self.adx_atr.update(true_range)
+        plus_di = _safe_div(100.0, adx_atr) * self.adx_plus.update(up_move)
+        minus_di = _safe_div(100.0, adx_atr) * self.adx_minus.update(down_move)
+        dx = _safe_div(100 * abs(plus_di - minus_di), plus_di + minus_di)
+        row['ADX'] = self.adx.update(dx)
+
+        self.stoch_highs.append(h)
+        self.stoch_lows.append(l)
+        stoch = NAN
+        if len(self.stoch_highs) == STOCH_K_PERIOD:
+            lowest, highest = min(self.stoch_lows), max(self.stoch_highs)
+            stoch = 100 * (c - lowest) / ((highest - lowest) or sys.float_info.epsilon)
+        row['Stoch_k'] = self.stoch_k.update(stoch)
+        row['Stoch_d'] = self.stoch_d.update(row['Stoch_k'])
+
+        day = timestamp.normalize()
+        if day != self.vwap_day:
+            self.vwap_day, self.vwap_pv, self.vwap_volume = day, 0.0, 0.0
+        self.vwap_pv += (h + l + c) / 3 * v
+        self.vwap_volume += v
+        row['VWAP'] = _safe_div(self.vwap_pv, self.vwap_volume)
+
+        row['ATR'] = self.atr.update(true_range)
+        row['day_of_week'] = timestamp.dayofweek
+        row['hour_of_day'] = timestamp.hour
+
+        self.volatility_raw = _safe_div(row['bb_hband'] - row['bb_lband'], row['bb_mband'])
+        self.volatility_history.append(self.volatility_raw)
+        self.prev_bar = (o, h, l, c, v)
+        self.timestamp = timestamp
+        self.row = row
+
+    def snapshot(self):
+        """
+        Bir sonraki `update` geri alınabilsin diye durumun ucuz kopyası: skalerler ve kısa pencereler kopyalanır;
+        uzun volatilite geçmişinden sadece bir ekleme ile düşecek ilk eleman saklanır.
+        """
+        saved = {}
+        for key, value in self.__dict__.items():
+            if key == 'volatility_history':
+                full = len(value) == value.maxlen
+                saved[key] = (len(value), value[0] if full and value else None)
+            elif isinstance(value, deque):
+                saved[key] = deque(value, value.maxlen)
+            elif hasattr(value, '__dict__') and not isinstance(value, pd.Timestamp):
+                saved[key] = _copy_component(value)
+            else:
+                saved[key] = value
+        return saved
+
+    def restore(self, saved):
+        """Son `update` çağrısını `snapshot` ile alınan duruma geri alır (anlık görüntü tekrar kullanılabilir)."""
+        for key, value in saved.items():
+            if key == 'volatility_history':
+                length, first = value
+                # update her çağrıda geçmişe tam bir eleman ekler
+                self.volatility_history.pop()
+                if first is not None and length == self.volatility_history.maxlen:
+                    self.volatility_history.appendleft(first)
+            elif isinstance(value, deque):
+                setattr(self, key, deque(value, value.maxlen))
+            elif hasattr(value, '__dict__') and not isinstance(value, pd.Timestamp):
+                setattr(self, key, _copy_component(value))
+            else:
+                setattr(self, key, value)
+
+
+def _equal_width_bin(history, value):
+    """pd.cut(bins=3, include_lowest=True) ile aynı kategoriyi (0, 1, 2) tek bir değer için bulur."""
+    values = [x for x in history if not _is_nan(x)]
+    low, high = min(values), max(values)
+    if low == high:
+        low -= 0.001 * abs(low) if low != 0 else 0.001
+        high += 0.001 * abs(high) if high != 0 else 0.001
+        edges = np.linspace(low, high, 4)
+    else:
+        edges = np.linspace(low, high, 4)
+        edges[0] -= (high - low) * 0.001
+    return int(min(max(np.searchsorted(edges, value, side='left') - 1, 0), 2))
+
+
+def _trend_strength_bin(adx):
+    if adx <= TREND_STRENGTH_BINS[1]:
+        return -1
+    if adx <= TREND_STRENGTH_BINS[2]:
+        return 0
+    return 1
+
+
+class ObservationBuilder:
+    """
+    Canlı RL kararları için gözlem satırı üretici.
+    Göstergeleri her mumda 200 satır üzerinden yeniden hesaplamak yerine son bardan artımlı olarak
+    günceller. Özellik tanımları `build_observation_frame` ile aynıdır; volatilite kategorisi son
+    `window` bar üzerinden hesaplanır (canlı veri penceresiyle aynı uzunlukta).
+    """
+
+    def __init__(self, strategy_params=None, window=201):
+        self.params = resolve_indicator_params(strategy_params)
+        self.window = window
+        self.columns = list(OBSERVATION_COLUMNS)
+        self._state = None
+        self._previous_state = None
+
+    def seed(self, df):
+        """Durumu sıfırlar ve verilen OHLCV geçmişini baştan işler."""
+        self._state = _IndicatorState(self.params, self.window)
+        self._previous_state = None
+        last = len(df) - 1
+        rows = df[['Open', 'High', 'Low', 'Close', 'Volume']].itertuples(index=False)
+        for i, (timestamp, row) in enumerate(zip(df.index, rows)):
+            if i == last:
+                # Son mum açık olabilir; kapanışı aynı zaman damgasıyla gelince onun yerine yazılabilsin diye
+                # anlık görüntü sadece son bardan önce alınır (tohumlama barlarında kopya yapılmaz)
+                self._previous_state = self._state.snapshot()
+            self._state.update(pd.Timestamp(timestamp), *(float(x) for x in row))
+        return self
+
+    def update(self, timestamp, open_price, high, low, close, volume):
+        """
+        Yeni bir kapanmış barı işler. Zaman damgası son barla aynıysa (ör. başlangıç verisindeki
+        açık mumun kapanışı) son bar yerine yazılır; daha eski barlar yok sayılır.
+        """
+        if self._state is None:
+            self._state = _IndicatorState(self.params, self.window)
+        timestamp = pd.Timestamp(timestamp)
+        last_timestamp = self._state.timestamp
+        if last_timestamp is not None and timestamp < last_timestamp:
+            return False
+        if last_timestamp is not None and timestamp == last_timestamp:
+            self._state.restore(self._previous_state)
+        else:
+            self._previous_state = self._state.snapshot()
+        self._state.update(timestamp, float(open_price), float(high), float(low), float(close), float(volume))
+        return True
+
+    @property
+    def ready(self):
+        """Son barın tüm gözlem özellikleri hesaplanabiliyor mu?"""
+        state = self._state
+        if state is None or state.row is None:
+            return False
+        return not any(_is_nan(state.row[col]) for col in OBSERVATION_COLUMNS[:-2]) and not _is_nan(state.volatility_raw)
+
+    def observation(self):
+        """Son bara ait piyasa özelliklerini (ek hesap bilgileri hariç) float32 dizi olarak döndürür."""
+        if not self.ready:
+            raise ValueError("Gözlem için yeterli geçmiş veri yok.")
+        state = self._state
+        row = dict(state.row)
+        row['volatility'] = [-1, 0, 1][_equal_width_bin(state.volatility_history, state.volatility_raw)]
+        row['trend_strength'] = _trend_strength_bin(row['ADX'])
+        return np.array([row[col] for col in self.columns], dtype=np.float32)
+
@@ -0,0 +1,180 @@
+# rl_registry.py (Süreç Genelinde Paylaşılan RL Modelleri ve Toplu Çıkarım)
+
+import hashlib
+import logging
+import threading
+import time
+
+import numpy as np
+from stable_baselines3 import PPO
+
+from database import get_rl_model_by_id, get_rl_model_fingerprint
+
+# Aynı mum kapanışına ait gözlemler için en fazla ne kadar beklenecek (saniye); sadece önceki mum sınırında
+# tahmin isteyen katılımcılar beklenir, gelmeyecek (kopmuş, erken dönen) semboller için bekleme yapılmaz
+DEFAULT_BATCH_WAIT = 0.1
+
+# (model_id, içerik özeti) -> SharedRLModel
+_models = {}
+_registry_lock = threading.Lock()
+
+
+class SharedRLModel:
+    """
+    Birden fazla stratejinin aynı ağırlıkları paylaştığı RL modeli.
+    Aynı zaman diliminde ve aynı mum sınırında kapanan tüm sembollerin gözlemlerini
+    tek bir politika ileri geçişinde (forward pass) değerlendirir.
+    """
+
+    def __init__(self, key, model, batch_wait=DEFAULT_BATCH_WAIT):
+        self.key = key
+        self.model = model
+        self.batch_wait = batch_wait
+        self.ref_count = 0
+        self._cond = threading.Condition()
+        self._predict_lock = threading.Lock()
+        self._participants = {}  # interval -> {(strateji_id, sembol), ...}
+        self._pending = {}  # (interval, mum_zamanı) -> toplanan gözlemler
+        # interval -> önceki mum sınırında tahmin isteyen katılımcılar (bu sınırda beklenenler)
+        self._active = {}
+        # interval -> (güncel mum sınırı, bu sınırda tahmin isteyen katılımcılar)
+        self._arrived = {}
+
+    def register(self, interval, participant):
+        """Bir sembolü bu modelin toplu çıkarımına katılımcı olarak ekler."""
+        with self._cond:
+            self._participants.setdefault(interval, set()).add(participant)
+
+    def unregister(self, interval, participant):
+        with self._cond:
+            self._participants.get(interval, set()).discard(participant)
+            self._active.get(interval, set()).discard(participant)
+            # Beklenen katılımcı sayısı düştüğü için bekleyen grupları tekrar kontrol et
+            self._cond.notify_all()
+
+    def _expected_arrived(self, interval, boundary):
+        """Bu sınırda beklenen (önceki sınırda aktif ve hâlâ kayıtlı) katılımcıların hepsi geldi mi?"""
+        current, arrived = self._arrived[interval]
+        if current != boundary:
+            # Yeni bir mum sınırı başladı; eski sınır için beklemeye gerek yok
+            return True
+        expected = self._active.get(interval, set()) & self._participants.get(interval, set())
+        return expected <= arrived
+
+    def predict(self, observation, deterministic=True, interval=None, boundary=None, participant=None):
+        """
+        stable-baselines3 `predict` ile aynı dönüşü verir: (aksiyon, durum).
+        `interval`, `boundary` (mumun açılış zamanı) ve `participant` verilirse gözlem, aynı sınırdaki diğer
+        sembollerin gözlemleriyle birlikte tek seferde değerlendirilir. Sadece önceki sınırda da tahmin isteyen
+        katılımcılar beklenir (en fazla batch_wait saniye).
+        """
+        if interval is None or boundary is None or participant is None or not deterministic:
+            with self._predict_lock:
+                return self.model.predict(observation, deterministic=deterministic)
+
+        batch_key = (interval, boundary)
+        with self._cond:
+            current, arrived = self._arrived.get(interval, (None, set()))
+            if current is None or boundary > current:
+                # Yeni mum sınırı: önceki sınırda gelenler bu sınırda beklenecek katılımcılardır
+                if current is not None:
+                    self._active[interval] = arrived
+                self._arrived[interval] = (boundary, {participant})
+            elif boundary == current:
+                arrived.add(participant)
+            else:
+                # Geçmiş bir sınıra ait geç gözlem: kimse beklenmez
+                batch_key = None
+            if batch_key is not None:
+                return self._join_batch(batch_key, observation)
+        with self._predict_lock:
+            return self.model.predict(observation, deterministic=deterministic)
+
+    def _join_batch(self, batch_key, observation):
+        """Gözlemi sınırın grubuna ekler ve grup değerlendirilene kadar bekler (kilit tutularak çağrılır)."""
+        interval, boundary = batch_key
+        batch = self._pending.get(batch_key)
+        if batch is None:
+            batch = {'obs': [], 'actions': None, 'running': False, 'error': None,
+                     'deadline': time.monotonic() + self.batch_wait}
+            self._pending[batch_key] = batch
+        index = len(batch['obs'])
+        batch['obs'].append(np.asarray(observation, dtype=np.float32))
+
+        # Yeni gelen katılımcı bekleyen grubu tamamlamış olabilir
+        self._cond.notify_all()
+        while batch['actions'] is None and batch['error'] is None:
+            remaining = batch['deadline'] - time.monotonic()
+            if not batch['running'] and (self._expected_arrived(interval, boundary) or remaining <= 0):
+                self._run_batch(batch_key, batch)
+                continue
+            self._cond.wait(None if batch['running'] else remaining)
+
+        if batch['error'] is not None:
+            raise batch['error']
+        return batch['actions'][index], None
+
+    def _run_batch(self, batch_key, batch):
+        """Grubu bekleyenler listesinden çıkarır ve tek bir ileri geçişle değerlendirir (kilit tutularak çağrılır)."""
+        batch['running'] = True
+        # Geç gelen gözlemler yeni bir grup başlatsın
+        if self._pending.get(batch_key) is batch:
+            del self._pending[batch_key]
+        observations = np.stack(batch['obs'])
+
+        self._cond.release()
+        try:
+            with self._predict_lock:
+                actions, _ = self.model.predict(observations, deterministic=True)
+            actions = np.asarray(actions).reshape(len(observations), -1)
+            result, error = [a[0] if a.size == 1 else a for a in actions], None
+        except Exception as e:
+            result, error = None, e
+        finally:
+            self._cond.acquire()
+
+        batch['actions'], batch['error'] = result, error
+        if error is None and len(observations) > 1:
+            logging.info(f"🤖 TOPLU ÇIKARIM ({self.key[0]}): {len(observations)} gözlem tek seferde değerlendirildi.")
+        self._cond.notify_all()
+
+
+def acquire_rl_model(model_id, batch_wait=DEFAULT_BATCH_WAIT):
+    """
+    Model ID'sine karşılık gelen paylaşımlı modeli döndürür (yoksa veritabanından yükler).
+    Model içerik özetiyle birlikte anahtarlanır; veritabanındaki model güncellenirse yeni sürüm
+    ayrı bir kayıt olarak yüklenir. Her `acquire` çağrısı bir `release_rl_model` ile eşlenmelidir.
+    """
+    fingerprint = get_rl_model_fingerprint(model_id)
+    if fingerprint:
+        with _registry_lock:
+            shared = _models.get((str(model_id), fingerprint))
+            if shared is not None:
+                shared.ref_count += 1
+                return shared
+
+    model_buffer = get_rl_model_by_id(model_id)
+    if not model_buffer:
+        return None
+
+    content_hash = hashlib.sha256(model_buffer.getvalue()).hexdigest()
+    key = (str(model_id), content_hash)
+    with _registry_lock:
+        shared = _models.get(key)
+        if shared is None:
+            shared = SharedRLModel(key, PPO.load(model_buffer, device='cpu'), batch_wait=batch_wait)
+            _models[key] = shared
+            logging.info(f"📦 RL MODEL ÖNBELLEĞİ: Model {model_id} yüklendi (özet: {content_hash[:12]}).")
+        shared.ref_count += 1
+        return shared
+
+
+def release_rl_model(shared):
+    """Bir stratejinin model kullanımını bırakır; kimse kullanmıyorsa model bellekten atılır."""
+    if shared is None:
+        return
+    with _registry_lock:
+        shared.ref_count -= 1
+        if shared.ref_count <= 0 and _models.get(shared.key) is shared:
+            del _models[shared.key]
+            logging.info(f"📦 RL MODEL ÖNBELLEĞİ: Model {shared.key[0]} artık kullanılmıyor, bellekten atıldı.")
@@ -2,44 +2,94 @@
 
 import pandas as pd
 from stable_baselines3 import PPO
+from stable_baselines3.common.callbacks import BaseCallback
 from stable_baselines3.common.vec_env import DummyVecEnv
 import io
 
 # Kendi oluşturduğumuz modülleri import ediyoruz
 from trading_env import TradingEnv
+from rl_observation import build_observation_frame
+from rl_vec_env import SharedMarketData, make_training_vec_env
 from utils import get_binance_klines
 # YENİ: Veritabanına model kaydetmek için fonksiyonumuzu import ediyoruz
 from database import save_rl_model
 
 
-def train_rl_agent(symbol="BTCUSDT", interval="1h", total_timesteps=20000, strategy_params=None):
+class ProgressCallback(BaseCallback):
+    """Eğitim ilerlemesini progress(tamamlanan_adım, toplam_adım) ile bildirir (ör. iş kuyruğuna)."""
+
+    def __init__(self, progress, total_timesteps):
+        super().__init__()
+        self.progress = progress
+        self.total_timesteps = total_timesteps
+
+    def _on_step(self):
+        self.progress(min(self.num_timesteps, self.total_timesteps), self.total_timesteps)
+        return True
+
+
+def train_rl_agent(symbol="BTCUSDT", interval="1h", total_timesteps=20000, strategy_params=None,
+                   symbols=None, n_envs=1, episode_length=None, use_subprocess=True, batched=False, progress=None):
     """
     Belirtilen sembol ve zaman aralığı için bir RL ajanını eğitir ve
     eğitilmiş modeli doğrudan veritabanına kaydeder.
+
+    `symbols` birden fazla sembol içeriyorsa veya `n_envs` > 1 ise ortamlar ayrı süreçlerde
+    (SubprocVecEnv) paralel çalışır; piyasa verisi süreçler arasında paylaşımlı bellekte tutulur.
+    `episode_length` verilirse her epizod verinin rastgele bir noktasından başlar.
+    `batched=True` ise tüm ortamlar tek süreçte BatchedTradingEnv ile dizi işlemleriyle adımlanır.
+    `progress(tamamlanan_adım, toplam_adım)` verilirse eğitim sırasında çağrılır.
+    Dönüş: kaydedilen modelin adı (eğitim veya kayıt başarısızsa None).
     """
-    print(f"--- {symbol} için RL Ajan Eğitimi Başlatılıyor ---")
+    symbols = list(symbols) if symbols else [symbol]
+    print(f"--- {', '.join(symbols)} için RL Ajan Eğitimi Başlatılıyor ---")
 
     # 1. Adım: Eğitim verisini çekme
     print("Geçmiş piyasa verileri indiriliyor...")
-    df = get_binance_klines(symbol=symbol, interval=interval, limit=1000)
-    if df.empty:
+    raw_frames = {}
+    for sym in symbols:
+        df = get_binance_klines(symbol=sym, interval=interval, limit=1000)
+        if df is None or df.empty:
+            print(f"UYARI: {sym} için veri indirilemedi, eğitimden çıkarıldı.")
+            continue
+        raw_frames[sym] = df
+    if not raw_frames:
         print(f"HATA: {symbol} için veri indirilemedi. Eğitim durduruldu.")
         return
 
     print("Veri başarıyla indirildi. Ortam hazırlanıyor...")
 
     # 2. Adım: Ticaret Ortamını Hazırlama
-    # DÜZELTME: strategy_params parametresini TradingEnv'e aktar
-    env = DummyVecEnv([lambda: TradingEnv(df, strategy_params=strategy_params)])
-
-
-    # 3. Adım: RL Modelini Oluşturma
-    model = PPO("MlpPolicy", env, verbose=1, tensorboard_log="./rl_tensorboard_logs/")
-    print("PPO modeli oluşturuldu. Eğitim süreci başlıyor...")
-    print(f"Tahmini eğitim süresi: {total_timesteps} adım.")
-
-    # 4. Adım: Modeli Eğitme
-    model.learn(total_timesteps=total_timesteps)
+    # Ortam veya model kurulurken hata olursa da paylaşımlı bellek silinir ve alt süreçler kapatılır
+    market_data = None
+    env = None
+    try:
+        if len(raw_frames) == 1 and n_envs <= 1 and not episode_length and not batched:
+            # DÜZELTME: strategy_params parametresini TradingEnv'e aktar
+            df = next(iter(raw_frames.values()))
+            env = DummyVecEnv([lambda: TradingEnv(df, strategy_params=strategy_params)])
+        else:
+            frames = {sym: build_observation_frame(df, strategy_params) for sym, df in raw_frames.items()}
+            market_data = SharedMarketData(frames)
+            n_envs = max(n_envs, len(frames))
+            env = make_training_vec_env(market_data, n_envs, episode_length=episode_length,
+                                        use_subprocess=use_subprocess, batched=batched)
+            print(f"{n_envs} {'toplu' if batched else 'paralel'} ortam hazırlandı ({len(frames)} sembol, epizod uzunluğu: {episode_length or 'tam veri'}).")
+
+
+        # 3. Adım: RL Modelini Oluşturma
+        model = PPO("MlpPolicy", env, verbose=1, tensorboard_log="./rl_tensorboard_logs/")
+        print("PPO modeli oluşturuldu. Eğitim süreci başlıyor...")
+        print(f"Tahmini eğitim süresi: {total_timesteps} adım.")
+
+        # 4. Adım: Modeli Eğitme
+        model.learn(total_timesteps=total_timesteps,
+                    callback=ProgressCallback(progress, total_timesteps) if progress else None)
+    finally:
+        if env is not None:
+            env.close()
+        if market_data is not None:
+            market_data.close()
     print("Eğitim tamamlandı!")
 
     # 5. Adım: Eğitilmiş Modeli Veritabanına Kaydetme
@@ -53,13 +103,15 @@ def train_rl_agent(symbol="BTCUSDT", interval="1h", total_timesteps=20000, strat
         model_buffer.seek(0)
 
         # Veritabanına kaydetmek için benzersiz bir isim ve açıklama oluştur
-        model_name = f"PPO_{symbol}_{interval}_{total_timesteps}steps"
-        model_description = f"{symbol} paritesi, {interval} zaman diliminde {total_timesteps} adım ile eğitilmiş PPO ajanı."
+        symbol_label = '-'.join(raw_frames.keys())
+        model_name = f"PPO_{symbol_label}_{interval}_{total_timesteps}steps"
+        model_description = f"{', '.join(raw_frames.keys())} paritesi, {interval} zaman diliminde {total_timesteps} adım ile eğitilmiş PPO ajanı."
 
         # Yeni veritabanı fonksiyonumuzu çağır
         save_rl_model(model_name, model_description, model_buffer)
 
         print(f"✅ Eğitilmiş model '{model_name}' ismiyle başarıyla veritabanına kaydedildi.")
+        return model_name
 
     except Exception as e:
         print(f"❌ KRİTİK HATA: Model veritabanına kaydedilirken bir sorun oluştu: {e}")
@@ -0,0 +1,332 @@
+# rl_vec_env.py (Paralel RL Eğitimi için Paylaşımlı Piyasa Verisi ve Vektörize Ortamlar)
+
+import uuid
+from multiprocessing import shared_memory
+
+import numpy as np
+from gymnasium import spaces
+from gymnasium.utils import seeding
+from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv, VecEnv
+
+from trading_env import TradingEnv
+
+# Bu süreçte bağlanılmış paylaşımlı bloklar (isim -> MarketDataView); her işçi blokları bir kez açar
+_attached = {}
+
+
+class MarketDataView:
+    """Paylaşımlı bellekteki birleşik gözlem matrisi ve fiyat vektörüne salt okunur erişim."""
+
+    def __init__(self, handle, blocks, obs_matrix, prices):
+        self.handle = handle
+        self.segments = handle['segments']
+        self.columns = handle['columns']
+        self.obs_matrix = obs_matrix
+        self.prices = prices
+        self._blocks = blocks
+
+    def segment(self, index):
+        """Bir sembolün (veya zaman diliminin) gözlem matrisi ve fiyatlarını kopyalamadan döndürür."""
+        _, start, end = self.segments[index]
+        return self.obs_matrix[start:end], self.prices[start:end]
+
+
+class SharedMarketData:
+    """
+    Birden fazla sembolün hazırlanmış RL verisini tek bir paylaşımlı bellek bloğunda tutar.
+    Semboller uç uca eklenir; `segments` her sembolün [başlangıç, bitiş) satır aralığını verir.
+    İşçi süreçlere yalnızca küçük `handle` sözlüğü gönderilir, diziler kopyalanmaz.
+    """
+
+    def __init__(self, frames):
+        if not frames:
+            raise ValueError("Paylaşılacak piyasa verisi yok.")
+        columns = list(next(iter(frames.values())).columns)
+        segments, start = [], 0
+        for name, frame in frames.items():
+            if list(frame.columns) != columns:
+                raise ValueError(f"{name} için gözlem sütunları diğer sembollerle uyuşmuyor.")
+            segments.append((name, start, start + len(frame)))
+            start += len(frame)
+        rows, cols = start, len(columns)
+
+        prefix = f"rl_{uuid.uuid4().hex[:12]}"
+        self._obs_block = shared_memory.SharedMemory(name=f"{prefix}_obs", create=True, size=max(rows * cols * 4, 1))
+        self._price_block = shared_memory.SharedMemory(name=f"{prefix}_px", create=True, size=max(rows * 8, 1))
+        obs_matrix = np.ndarray((rows, cols), dtype=np.float32, buffer=self._obs_block.buf)
+        prices = np.ndarray((rows,), dtype=np.float64, buffer=self._price_block.buf)
+        for (name, seg_start, seg_end), frame in zip(segments, frames.values()):
+            obs_matrix[seg_start:seg_end] = frame.to_numpy(dtype=np.float32)
+            prices[seg_start:seg_end] = frame['Close'].to_numpy(dtype=np.float64)
+
+        self.handle = {
+            'obs_name': self._obs_block.name, 'price_name': self._price_block.name,
+            'rows': rows, 'cols': cols, 'segments': segments, 'columns': columns
+        }
+        self.view = MarketDataView(self.handle, (self._obs_block, self._price_block), obs_matrix, prices)
+        _attached[self._obs_block.name] = self.view
+
+    def close(self):
+        """Blokları kapatır ve siler (yalnızca veriyi oluşturan süreç çağırmalıdır)."""
+        _attached.pop(self.handle['obs_name'], None)
+        self.view = None
+        for block in (self._obs_block, self._price_block):
+            try:
+                block.close()
+            except BufferError:
+                # Dizilere hâlâ referans varsa eşleme süreç kapanınca bırakılır
+                pass
+            try:
+                block.unlink()
+            except FileNotFoundError:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def attach_market_data(handle):
+    """Başka bir süreçte oluşturulmuş paylaşımlı piyasa verisine bağlanır (süreç başına bir kez)."""
+    view = _attached.get(handle['obs_name'])
+    if view is not None:
+        return view
+    # İşçiler, veriyi oluşturan sürecin kaynak takipçisini paylaşır; bloğu yalnızca o süreç siler
+    obs_block = shared_memory.SharedMemory(name=handle['obs_name'], create=False)
+    price_block = shared_memory.SharedMemory(name=handle['price_name'], create=False)
+    obs_matrix = np.ndarray((handle['rows'], handle['cols']), dtype=np.float32, buffer=obs_block.buf)
+    prices = np.ndarray((handle['rows'],), dtype=np.float64, buffer=price_block.buf)
+    obs_matrix.flags.writeable = False
+    prices.flags.writeable = False
+    view = MarketDataView(handle, (obs_block, price_block), obs_matrix, prices)
+    _attached[handle['obs_name']] = view
+    return view
+
+
+class SharedTradingEnvFactory:
+    """SubprocVecEnv işçilerine gönderilen, paylaşımlı veriden TradingEnv üreten çağrılabilir nesne."""
+
+    def __init__(self, handle, segment_index, episode_length=None, initial_balance=10000, commission=0.001):
+        self.handle = handle
+        self.segment_index = segment_index
+        self.episode_length = episode_length
+        self.initial_balance = initial_balance
+        self.commission = commission
+
+    def __call__(self):
+        obs_matrix, prices = attach_market_data(self.handle).segment(self.segment_index)
+        return TradingEnv.from_arrays(obs_matrix, prices, initial_balance=self.initial_balance,
+                                      commission=self.commission, episode_length=self.episode_length)
+
+
+class BatchedTradingEnv(VecEnv):
+    """
+    K adet sembol/epizod şeridini (lane) tek süreçte, NumPy dizi işlemleriyle aynı anda adımlayan ortam.
+    Ödül, bitiş ve gözlem mantığı `TradingEnv.step` ile birebir aynıdır; stable-baselines3 VecEnv
+    arayüzünü uygular (otomatik reset, `terminal_observation` ve `TimeLimit.truncated` bilgileri dahil).
+
+    Semboller farklı uzunlukta olabilir: veriler uç uca eklenmiş `obs_matrix`/`prices` dizilerinde,
+    her şeridin satır aralığı `segments` listesinden alınır.
+    """
+
+    def __init__(self, obs_matrix, prices, segments, n_envs=None, episode_length=None,
+                 initial_balance=10000, commission=0.001):
+        self._obs_matrix = np.ascontiguousarray(obs_matrix, dtype=np.float32)
+        self._prices = np.ascontiguousarray(prices, dtype=np.float64)
+        self._n_features = self._obs_matrix.shape[1]
+        n_envs = n_envs or len(segments)
+        self.initial_balance = initial_balance
+        self.commission = commission
+        self.episode_length = episode_length
+        self.render_mode = None
+
+        lane_segments = [segments[i % len(segments)] for i in range(n_envs)]
+        self._seg_start = np.array([seg[1] for seg in lane_segments], dtype=np.int64)
+        self._seg_len = np.array([seg[2] - seg[1] for seg in lane_segments], dtype=np.int64)
+        self.lane_symbols = [seg[0] for seg in lane_segments]
+
+        self._step = np.zeros(n_envs, dtype=np.int64)
+        self._last_step = np.zeros(n_envs, dtype=np.int64)
+        self._balance = np.full(n_envs, float(initial_balance))
+        self._net_worth = np.full(n_envs, float(initial_balance))
+        self._position = np.zeros(n_envs, dtype=np.int64)
+        self._entry_price = np.zeros(n_envs)
+        self._actions = np.zeros(n_envs, dtype=np.int64)
+        self._rngs = [None] * n_envs
+
+        observation_space = spaces.Box(low=-np.inf, high=np.inf, shape=(self._n_features + 4,), dtype=np.float32)
+        super().__init__(n_envs, observation_space, spaces.Discrete(3))
+
+    @classmethod
+    def from_market_data(cls, market_data, n_envs=None, **kwargs):
+        """SharedMarketData veya MarketDataView üzerinden (kopyalamadan) toplu ortam oluşturur."""
+        view = getattr(market_data, 'view', None) or market_data
+        return cls(view.obs_matrix, view.prices, view.segments, n_envs=n_envs, **kwargs)
+
+    def _rng(self, lane):
+        if self._rngs[lane] is None:
+            self._rngs[lane], _ = seeding.np_random()
+        return self._rngs[lane]
+
+    def _reset_lanes(self, lanes):
+        for lane in lanes:
+            seg_len = int(self._seg_len[lane])
+            if self.episode_length and self.episode_length < seg_len:
+                start = int(self._rng(lane).integers(0, seg_len - self.episode_length + 1))
+                last = start + self.episode_length - 1
+            else:
+                start, last = 0, seg_len - 1
+            self._step[lane] = self._seg_start[lane] + start
+            self._last_step[lane] = self._seg_start[lane] + last
+        self._balance[lanes] = self.initial_balance
+        self._net_worth[lanes] = self.initial_balance
+        self._position[lanes] = 0
+        self._entry_price[lanes] = 0
+
+    def _observations(self, lanes=slice(None)):
+        obs_matrix = self._obs_matrix[self._step[lanes]]
+        obs = np.empty((len(obs_matrix), self._n_features + 4), dtype=np.float32)
+        obs[:, :self._n_features] = obs_matrix
+        obs[:, self._n_features] = self._balance[lanes]
+        obs[:, self._n_features + 1] = self._position[lanes]
+        obs[:, self._n_features + 2] = self._entry_price[lanes]
+        obs[:, self._n_features + 3] = (self._net_worth[lanes] - self.initial_balance) / self.initial_balance
+        return obs
+
+    def reset(self):
+        for lane, seed in enumerate(self._seeds):
+            if seed is not None:
+                self._rngs[lane], _ = seeding.np_random(seed)
+        self._reset_lanes(np.arange(self.num_envs))
+        self._reset_seeds()
+        self._reset_options()
+        return self._observations()
+
+    def step_async(self, actions):
+        self._actions = np.asarray(actions).reshape(self.num_envs).astype(np.int64)
+
+    def step_wait(self):
+        actions = self._actions
+        initial_balance = self.initial_balance
+        self._step += 1
+        current_price = self._prices[self._step]
+        prev_net_worth = self._net_worth.copy()
+        transaction_cost = np.zeros(self.num_envs)
+        reward = np.zeros(self.num_envs)
+
+        # İşlem yapma (Al/Sat)
+        opening = (actions == 1) & (self._position == 0)
+        closing = (actions == 2) & (self._position == 1)
+        reward[closing] += (self._net_worth[closing] / prev_net_worth[closing] - 1) * 100
+        self._position[opening] = 1
+        self._entry_price[opening] = current_price[opening]
+        self._position[closing] = 0
+        self._entry_price[closing] = 0
+        transaction_cost[opening | closing] = self.commission
+
+        # Pozisyon açıksa (Tutma): anlık PnL ödülü, varlık güncellemesi ve drawdown cezası
+        holding = self._position == 1
+        price_ratio = current_price[holding] / self._entry_price[holding]
+        reward[holding] += (current_price[holding] - self._entry_price[holding]) / self._entry_price[holding] * 100
+        self._net_worth[holding] = self._balance[holding] * price_ratio
+        drawdown = holding & (self._net_worth < initial_balance)
+        reward[drawdown] -= (initial_balance - self._net_worth[drawdown]) / initial_balance * 5
+        self._balance[~holding] = self._net_worth[~holding]
+
+        # Komisyon cezası
+        charged = transaction_cost > 0
+        reward[charged] -= transaction_cost[charged] * 1000
+        self._net_worth *= (1 - transaction_cost)
+
+        # Bitirme koşulları ve kapatılmamış pozisyon cezası
+        dones = (self._step >= self._last_step) | (self._net_worth <= initial_balance / 2)
+        reward[dones & holding] -= 5.0
+
+        infos = [{"TimeLimit.truncated": False} for _ in range(self.num_envs)]
+        done_lanes = np.flatnonzero(dones)
+        if len(done_lanes):
+            for lane, terminal_obs in zip(done_lanes, self._observations(done_lanes)):
+                infos[lane]["terminal_observation"] = terminal_obs
+            self._reset_lanes(done_lanes)
+        return self._observations(), reward.astype(np.float32), dones, infos
+
+    def close(self):
+        pass
+
+    def get_attr(self, attr_name, indices=None):
+        lanes = self._get_indices(indices)
+        lane_attrs = {'current_step': self._step, 'balance': self._balance, 'net_worth': self._net_worth,
+                      'position': self._position, 'entry_price': self._entry_price}
+        if attr_name in lane_attrs:
+            values = lane_attrs[attr_name]
+            if attr_name == 'current_step':
+                values = values - self._seg_start
+            return [values[i].item() for i in lanes]
+        return [getattr(self, attr_name) for _ in lanes]
+
+    def set_attr(self, attr_name, value, indices=None):
+        setattr(self, attr_name, value)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        return [getattr(self, method_name)(*method_args, **method_kwargs) for _ in self._get_indices(indices)]
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False for _ in self._get_indices(indices)]
+
+
+def make_training_vec_env(market_data, n_envs, episode_length=None, use_subprocess=True, seed=None,
+                          initial_balance=10000, commission=0.001, batched=False):
+    """
+    Sembolleri ortamlar arasında sırayla dağıtarak N ortamlı bir VecEnv oluşturur.
+    `episode_length` verilirse her ortam epizodlarına rastgele başlangıç noktalarından başlar.
+    `batched=True` ise tüm ortamlar tek süreçte BatchedTradingEnv ile dizi işlemleriyle adımlanır.
+    """
+    if batched:
+        vec_env = BatchedTradingEnv.from_market_data(market_data, n_envs=n_envs, episode_length=episode_length,
+                                                     initial_balance=initial_balance, commission=commission)
+        if seed is not None:
+            vec_env.seed(seed)
+        return vec_env
+
+    n_segments = len(market_data.handle['segments'])
+    env_fns = [
+        SharedTradingEnvFactory(market_data.handle, i % n_segments, episode_length=episode_length,
+                                initial_balance=initial_balance, commission=commission)
+        for i in range(n_envs)
+    ]
+    if use_subprocess and n_envs > 1:
+        vec_env = SubprocVecEnv(env_fns)
+    else:
+        vec_env = DummyVecEnv(env_fns)
+    if seed is not None:
+        vec_env.seed(seed)
+    return vec_env
+
+
+if __name__ == '__main__':
+    import time
+
+    # Hız ölçümü (TradingEnv ile eşdeğerlik tests/test_rl_vec_env.py içinde doğrulanır)
+    rng = np.random.default_rng(7)
+    lengths = [400, 250, 600]
+    n_features = 24
+    close = np.concatenate([100 + np.cumsum(rng.normal(0, 1, n)) for n in lengths])
+    obs_matrix = rng.normal(0, 1, (len(close), n_features)).astype(np.float32)
+    obs_matrix[:, 3] = close
+    segments, start = [], 0
+    for i, n in enumerate(lengths):
+        segments.append((f"SYM{i}", start, start + n))
+        start += n
+    episode_length = 120
+
+    for k in (6, 1024):
+        env = BatchedTradingEnv(obs_matrix, close, segments, n_envs=k, episode_length=episode_length)
+        env.reset()
+        actions = rng.integers(0, 3, (200, k))
+        t0 = time.perf_counter()
+        for a in actions:
+            env.step(a)
+        elapsed = time.perf_counter() - t0
+        print(f"{k} şerit: {200 * k / elapsed:,.0f} ortam adımı/sn")
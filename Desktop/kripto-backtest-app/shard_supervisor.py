@@ -0,0 +1,170 @@
+# shard_supervisor.py (Çok Süreçli / Parçalı (Shard) Canlı İşçi Yönetimi)
+
+import bisect
+import hashlib
+import logging
+import os
+import signal
+import subprocess
+import sys
+import time
+
+# Her parça halka üzerinde bu kadar sanal düğümle temsil edilir (dağılımı dengeler)
+RING_REPLICAS = 128
+# Çöken parça işçisi en fazla bu kadar bekledikten sonra yeniden başlatılır (üstel artan bekleme)
+MAX_RESTART_BACKOFF = 60
+# Bu süreden uzun çalışmış bir işçi çökerse bekleme süresi sıfırlanır
+STABLE_RUN_SECONDS = 120
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.md5(value.encode('utf-8')).digest()[:8], 'big')
+
+
+class HashRing:
+    """
+    Tutarlı karma (consistent hashing) halkası.
+    Parça sayısı değiştiğinde (ör. yeni makine eklendiğinde) iş yüklerinin sadece ~1/N'i yer değiştirir.
+    """
+
+    def __init__(self, nodes, replicas=RING_REPLICAS):
+        self.nodes = list(nodes)
+        self._ring = sorted((_hash(f"{node}#{i}"), node) for node in self.nodes for i in range(replicas))
+        self._keys = [h for h, _ in self._ring]
+
+    def node_for(self, key: str):
+        if not self._ring:
+            return None
+        index = bisect.bisect(self._keys, _hash(key)) % len(self._ring)
+        return self._ring[index][1]
+
+
+def workload_key(strategy_id, symbol) -> str:
+    """Bir (strateji, sembol) iş yükünün halka üzerindeki anahtarı."""
+    return f"{strategy_id}:{symbol}"
+
+
+class ShardAssignment:
+    """Bu sürecin hangi (strateji, sembol) iş yüklerinden sorumlu olduğunu belirler."""
+
+    def __init__(self, shard_id: int, shard_count: int):
+        if not 0 <= shard_id < shard_count:
+            raise ValueError(f"Geçersiz parça numarası: {shard_id} (toplam {shard_count})")
+        self.shard_id = shard_id
+        self.shard_count = shard_count
+        self.ring = HashRing(range(shard_count))
+
+    def owns(self, strategy_id, symbol) -> bool:
+        return self.ring.node_for(workload_key(strategy_id, symbol)) == self.shard_id
+
+    def filter_config(self, strategy_config):
+        """Strateji yapılandırmasını bu parçaya düşen sembollerle sınırlar; hiç sembol düşmüyorsa None döner."""
+        symbols = [s for s in strategy_config.get('symbols') or [] if self.owns(strategy_config['id'], s)]
+        if not symbols:
+            return None
+        return dict(strategy_config, symbols=symbols)
+
+    def __str__(self):
+        return f"shard-{self.shard_id}/{self.shard_count}"
+
+
+class ShardSupervisor:
+    """
+    Parça işçilerini (her biri `multi_worker.py --shard i --shard-count N`) ayrı süreçler olarak çalıştırır,
+    çökenleri üstel artan beklemeyle yeniden başlatır ve kapanışta hepsini düzgünce durdurur.
+
+    Her işçi stratejileri veritabanından kendisi okur ve sadece kendine düşen (strateji, sembol) iş yüklerini
+    çalıştırır; yeni eklenen stratejiler ve semboller halka üzerinden otomatik olarak dağıtılır.
+    Birden fazla makinede: her makine aynı shard_count ile farklı shard_offset kullanır.
+    """
+
+    def __init__(self, workers: int, shard_count: int = None, shard_offset: int = 0, worker_args=(),
+                 script=None, poll_interval: float = 2.0):
+        self.shard_count = shard_count or workers
+        self.shard_ids = list(range(shard_offset, shard_offset + workers))
+        if self.shard_ids[-1] >= self.shard_count:
+            raise ValueError(f"Parçalar ({self.shard_ids}) toplam parça sayısını ({self.shard_count}) aşıyor.")
+        self.worker_args = list(worker_args)
+        self.script = script or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'multi_worker.py')
+        self.poll_interval = poll_interval
+        self._processes = {}  # parça -> Popen
+        self._started_at = {}
+        self._backoff = {}
+        self._restart_at = {}
+        self.restarts = 0
+        self._stopping = False
+
+    def _command(self, shard_id):
+        return [sys.executable, self.script, '--shard', str(shard_id), '--shard-count', str(self.shard_count),
+                *self.worker_args]
+
+    def _spawn(self, shard_id):
+        process = subprocess.Popen(self._command(shard_id))
+        self._processes[shard_id] = process
+        self._started_at[shard_id] = time.monotonic()
+        logging.info(f"🧩 Parça işçisi başlatıldı: shard-{shard_id}/{self.shard_count} (PID: {process.pid})")
+
+    def start(self):
+        for shard_id in self.shard_ids:
+            self._spawn(shard_id)
+
+    def check(self):
+        """Çöken işçileri tespit eder ve bekleme süresi dolanları yeniden başlatır."""
+        now = time.monotonic()
+        for shard_id in self.shard_ids:
+            process = self._processes.get(shard_id)
+            if process is not None and process.poll() is None:
+                continue
+            if process is not None:
+                code = process.returncode
+                self._processes[shard_id] = None
+                if now - self._started_at[shard_id] > STABLE_RUN_SECONDS:
+                    self._backoff[shard_id] = 1
+                delay = self._backoff.get(shard_id, 1)
+                self._backoff[shard_id] = min(delay * 2, MAX_RESTART_BACKOFF)
+                self._restart_at[shard_id] = now + delay
+                logging.error(f"❌ shard-{shard_id} işçisi sonlandı (çıkış kodu {code}); {delay} sn sonra "
+                              f"yeniden başlatılacak.")
+            if not self._stopping and now >= self._restart_at.get(shard_id, 0):
+                self.restarts += 1
+                self._spawn(shard_id)
+
+    def run(self):
+        self.start()
+        try:
+            while not self._stopping:
+                time.sleep(self.poll_interval)
+                self.check()
+        finally:
+            self.stop()
+
+    def stop(self, timeout: float = 15):
+        """Tüm işçilere SIGTERM gönderir; süre içinde kapanmayanları sonlandırır."""
+        self._stopping = True
+        running = [p for p in self._processes.values() if p is not None and p.poll() is None]
+        for process in running:
+            process.send_signal(signal.SIGTERM)
+        deadline = time.monotonic() + timeout
+        for process in running:
+            try:
+                process.wait(max(0.0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                logging.warning(f"⚠️ İşçi (PID: {process.pid}) zamanında kapanmadı, sonlandırılıyor.")
+                process.kill()
+        logging.info("🛑 Tüm parça işçileri durduruldu.")
+
+
+if __name__ == '__main__':
+    from collections import Counter
+
+    # Dağılım ve yeniden dengeleme: 200 strateji x 10 sembol
+    workloads = [(f"strategy-{i}", f"SYM{j}USDT") for i in range(200) for j in range(10)]
+    four = {w: ShardAssignment(0, 4).ring.node_for(workload_key(*w)) for w in workloads}
+    five = {w: ShardAssignment(0, 5).ring.node_for(workload_key(*w)) for w in workloads}
+    print("4 parça dağılımı:", dict(sorted(Counter(four.values()).items())))
+    moved = sum(four[w] != five[w] for w in workloads)
+    print(f"5. parça eklenince yer değiştiren iş yükü: {moved}/{len(workloads)} ({moved / len(workloads):.1%})")
+
+    assignment = ShardAssignment(1, 4)
+    config = {'id': 'strategy-7', 'symbols': [f"SYM{j}USDT" for j in range(10)]}
+    print(f"{assignment}: strategy-7 sembolleri ->", (assignment.filter_config(config) or {}).get('symbols'))
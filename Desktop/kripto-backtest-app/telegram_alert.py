@@ -1,35 +1,241 @@
 # telegram_alert.py (Güvenli ve Güncellenmiş Nihai Hali)
 
+import threading
+import time
+from collections import deque
+
 import requests
 import logging
 
+from metrics import get_metrics
+
 # Hata günlüğü için temel yapılandırma
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# --- Gönderim Ayarları ---
+TELEGRAM_TIMEOUT = 10  # saniye; yanıt vermeyen Telegram isteği iş parçacığını sonsuza kadar bekletmez
+PER_CHAT_INTERVAL = 1.0  # Telegram: aynı sohbete saniyede ~1 mesaj
+GLOBAL_RATE_PER_SECOND = 30  # Telegram: bot başına saniyede ~30 mesaj
+MAX_RETRIES = 3
+MAX_DIGEST_CHARS = 3500  # Telegram mesaj sınırı 4096 karakter
+MAX_QUEUE_PER_CHAT = 500
+DIGEST_SEPARATOR = "\n\n➖➖➖➖➖\n\n"
 
-def send_telegram_message(message: str, token: str, chat_id: str):
+# Tüm istekler için paylaşılan HTTP oturumu (bağlantılar yeniden kullanılır)
+_session = requests.Session()
+
+
+def _post_message(message: str, token: str, chat_id: str):
     """
-    Telegram'a parametre olarak verilen token ve chat_id ile mesaj gönderir.
-    Hata durumlarını loglar.
+    Tek bir sendMessage isteği gönderir.
+    Dönüş: ('ok' | 'retry' | 'fail', bekleme_süresi) — 429 yanıtında Telegram'ın istediği bekleme süresi döner.
     """
-    if not token or not chat_id:
-        logging.warning("Telegram token veya chat_id eksik. Mesaj gönderimi atlandı.")
-        return
-
     url = f"https://api.telegram.org/bot{token}/sendMessage"
     payload = {
         "chat_id": chat_id,
         "text": message,
         "parse_mode": "Markdown"
     }
-
     try:
-        response = requests.post(url, json=payload)
-        response.raise_for_status()  # HTTP hata kodları için bir exception fırlatır (4xx veya 5xx)
+        response = _session.post(url, json=payload, timeout=TELEGRAM_TIMEOUT)
     except requests.exceptions.RequestException as e:
         logging.error(f"Telegram mesajı gönderilemedi: {e}")
+        return 'retry', 0.0
+    if response.status_code == 429:
+        try:
+            retry_after = float(response.json().get('parameters', {}).get('retry_after', 1))
+        except ValueError:
+            retry_after = 1.0
+        logging.warning(f"Telegram hız sınırı aşıldı, {retry_after:.0f} sn sonra tekrar denenecek.")
+        return 'retry', retry_after
+    if response.status_code >= 500:
+        logging.error(f"Telegram sunucu hatası: {response.status_code}")
+        return 'retry', 0.0
+    if response.status_code >= 400:
+        # Hatalı istek (ör. Markdown biçim hatası, geçersiz chat_id): tekrar denemek sonucu değiştirmez
+        logging.error(f"Telegram mesajı reddedildi ({response.status_code}): {response.text[:200]}")
+        return 'fail', 0.0
+    return 'ok', 0.0
+
+
+def send_telegram_message(message: str, token: str, chat_id: str):
+    """
+    Telegram'a parametre olarak verilen token ve chat_id ile mesaj gönderir (çağıran iş parçacığında, zaman aşımlı).
+    Hata durumlarını loglar. İşlem döngülerinden `send_telegram_message_async` kullanılmalıdır.
+    """
+    if not token or not chat_id:
+        logging.warning("Telegram token veya chat_id eksik. Mesaj gönderimi atlandı.")
+        return False
+
+    try:
+        return _post_message(message, token, chat_id)[0] == 'ok'
     except Exception as e:
         logging.error(f"Telegram gönderimi sırasında beklenmedik bir hata oluştu: {e}")
+        return False
+
+
+class TelegramDispatcher:
+    """
+    Bildirimleri kuyruğa alıp arka plandaki tek bir iş parçacığıyla gönderir; çağıran taraf hiç beklemez.
+
+    - Sohbet başına en fazla saniyede 1, bot başına saniyede 30 mesaj gönderilir
+    - Bir sohbette biriken mesajlar tek bir özet (digest) mesajında birleştirilir
+    - Kuyrukta zaten bekleyen aynı metin tekrar eklenmez
+    - Ağ hatası, 5xx ve 429 yanıtlarında (Telegram'ın istediği süre beklenerek) tekrar denenir
+    - Reddedilen (4xx) özet mesajındaki bildirimler tek tek yeniden gönderilir; sadece kendisi reddedilen atılır
+    """
+
+    def __init__(self, post=_post_message, per_chat_interval=PER_CHAT_INTERVAL,
+                 global_rate=GLOBAL_RATE_PER_SECOND, max_retries=MAX_RETRIES, max_digest_chars=MAX_DIGEST_CHARS):
+        self.post = post
+        self.per_chat_interval = per_chat_interval
+        self.global_rate = global_rate
+        self.max_retries = max_retries
+        self.max_digest_chars = max_digest_chars
+        self._queues = {}  # (token, chat_id) -> deque[(mesaj, deneme)]
+        self._next_allowed = {}  # (token, chat_id) -> bir sonraki gönderim zamanı (monotonic)
+        self._solo = {}  # (token, chat_id) -> kuyruğun başında tek başına gönderilecek mesaj sayısı
+        self._recent_sends = {}  # token -> son 1 saniyedeki gönderim zamanları
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._thread = None
+        self.stats = {'queued': 0, 'sent': 0, 'digests': 0, 'duplicates': 0, 'dropped': 0, 'failed': 0,
+                      'split': 0}
+
+    def enqueue(self, message: str, token: str, chat_id: str):
+        """Mesajı gönderim kuyruğuna ekler ve hemen döner."""
+        if not token or not chat_id:
+            logging.warning("Telegram token veya chat_id eksik. Mesaj gönderimi atlandı.")
+            return False
+        key = (token, str(chat_id))
+        with self._cond:
+            queue = self._queues.setdefault(key, deque())
+            if any(text == message for text, _ in queue):
+                self.stats['duplicates'] += 1
+                return True
+            if len(queue) >= MAX_QUEUE_PER_CHAT:
+                queue.popleft()
+                self.stats['dropped'] += 1
+                logging.warning(f"Telegram kuyruğu dolu ({chat_id}); en eski bildirim atıldı.")
+            queue.append((message, 0))
+            self.stats['queued'] += 1
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="telegram-dispatcher", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+        return True
+
+    def flush(self, timeout=None):
+        """Kuyruktaki tüm mesajlar gönderilene (veya vazgeçilene) kadar bekler; süre dolarsa False döner."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._in_flight or any(self._queues.values()):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def pending(self):
+        with self._cond:
+            return sum(len(q) for q in self._queues.values())
+
+    def _run(self):
+        while True:
+            with self._cond:
+                key, wait = self._next_ready()
+                while key is None:
+                    self._cond.wait(wait)
+                    key, wait = self._next_ready()
+                batch, solo = self._take_batch(key)
+                now = time.monotonic()
+                self._next_allowed[key] = now + self.per_chat_interval
+                self._recent_sends.setdefault(key[0], deque()).append(now)
+                self._in_flight += 1
+
+            texts = [text for text, _ in batch]
+            message = texts[0] if len(texts) == 1 else (
+                f"🗂️ *{len(texts)} bildirim*" + DIGEST_SEPARATOR + DIGEST_SEPARATOR.join(texts))
+            started = time.perf_counter()
+            try:
+                status, retry_after = self.post(message, key[0], key[1])
+            except Exception as e:
+                logging.error(f"Telegram gönderimi sırasında beklenmedik bir hata oluştu: {e}")
+                status, retry_after = 'retry', 0.0
+            get_metrics().observe('telegram_send', time.perf_counter() - started)
+
+            with self._cond:
+                self._in_flight -= 1
+                attempts = max(attempt for _, attempt in batch) + 1
+                if status == 'ok':
+                    self.stats['sent'] += 1
+                    self.stats['digests'] += len(texts) > 1
+                elif status == 'retry' and attempts < self.max_retries:
+                    # Sıra korunarak kuyruğun başına geri konur; üstel bekleme veya Telegram'ın istediği süre
+                    self._queues[key].extendleft(reversed([(text, attempts) for text in texts]))
+                    self._solo[key] = self._solo.get(key, 0) + solo
+                    self._next_allowed[key] = time.monotonic() + max(retry_after, 2 ** (attempts - 1))
+                elif status == 'fail' and len(texts) > 1:
+                    # Tek bir hatalı bildirim (ör. dengesiz Markdown '_') tüm özeti reddettirir; bildirimler tek
+                    # tek gönderilsin ki sadece hatalı olan atılsın
+                    self._queues[key].extendleft(reversed(batch))
+                    self._solo[key] = self._solo.get(key, 0) + len(batch)
+                    self.stats['split'] += 1
+                    logging.warning(f"Telegram özet mesajı reddedildi; {len(texts)} bildirim tek tek gönderilecek.")
+                else:
+                    self.stats['failed'] += len(texts)
+                    logging.error(f"Telegram bildirimi {attempts} denemede gönderilemedi ({len(texts)} mesaj).")
+                self._cond.notify_all()
+
+    def _next_ready(self):
+        """Gönderime hazır sohbeti ve hazır olan yoksa beklenecek süreyi döndürür."""
+        now = time.monotonic()
+        wait = None
+        for key, queue in self._queues.items():
+            if not queue:
+                continue
+            ready_at = self._next_allowed.get(key, 0.0)
+            recent = self._recent_sends.get(key[0])
+            if recent:
+                while recent and now - recent[0] >= 1.0:
+                    recent.popleft()
+                if len(recent) >= self.global_rate:
+                    ready_at = max(ready_at, recent[0] + 1.0)
+            if ready_at <= now:
+                return key, None
+            wait = ready_at - now if wait is None else min(wait, ready_at - now)
+        return None, wait
+
+    def _take_batch(self, key):
+        """Sohbetin sıradaki gönderimini döndürür: (mesajlar, tek_başına_mı)."""
+        queue = self._queues[key]
+        if self._solo.get(key):
+            self._solo[key] -= 1
+            return [queue.popleft()], True
+        batch = [queue.popleft()]
+        size = len(batch[0][0])
+        while queue and size + len(DIGEST_SEPARATOR) + len(queue[0][0]) <= self.max_digest_chars:
+            size += len(DIGEST_SEPARATOR) + len(queue[0][0])
+            batch.append(queue.popleft())
+        return batch, False
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_telegram_dispatcher():
+    """Süreç genelinde paylaşılan bildirim kuyruğunu döndürür."""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = TelegramDispatcher()
+        return _dispatcher
+
+
+def send_telegram_message_async(message: str, token: str, chat_id: str):
+    """Mesajı arka planda gönderilmek üzere kuyruğa alır; ağ isteğini beklemeden döner."""
+    return get_telegram_dispatcher().enqueue(message, token, chat_id)
 
 
 def send_trade_signal(symbol: str, signal: str, price: float, token: str, chat_id: str):
@@ -47,4 +253,29 @@ def send_trade_signal(symbol: str, signal: str, price: float, token: str, chat_i
         f"💰 **Fiyat:** `{price:.4f} USDT`"
     )
 
-    send_telegram_message(msg, token, chat_id)
\ No newline at end of file
+    send_telegram_message(msg, token, chat_id)
+
+
+if __name__ == '__main__':
+    # Ağ yerine gecikmeli ve ara sıra 429 dönen sahte gönderici ile kuyruk davranışı
+    sent = []
+    calls = {'n': 0}
+
+    def fake_post(message, token, chat_id):
+        calls['n'] += 1
+        time.sleep(0.3)  # yavaş Telegram yanıtı
+        if calls['n'] == 2:
+            return 'retry', 0.5
+        sent.append((chat_id, message))
+        return 'ok', 0.0
+
+    dispatcher = TelegramDispatcher(post=fake_post)
+    start = time.perf_counter()
+    for i in range(40):
+        dispatcher.enqueue(f"🎯 Sinyal #{i % 20}", "token", "chat-1" if i % 2 else "chat-2")
+    enqueue_ms = (time.perf_counter() - start) * 1000
+    dispatcher.flush(timeout=30)
+    print(f"40 bildirim kuyruğa {enqueue_ms:.2f} ms içinde alındı; {len(sent)} Telegram mesajı gönderildi "
+          f"({time.perf_counter() - start:.1f} sn). İstatistik: {dispatcher.stats}")
+    delivered = sum(message.count("Sinyal #") for _, message in sent)
+    assert delivered == dispatcher.stats['queued'] and dispatcher.stats['failed'] == 0
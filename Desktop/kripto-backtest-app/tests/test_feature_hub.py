@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+from feature_hub import FeatureHub
+
+
+def _frame(n=5):
+    index = pd.date_range('2024-01-01', periods=n, freq='1h')
+    close = np.arange(100.0, 100.0 + n)
+    return pd.DataFrame({'Open': close, 'High': close + 1, 'Low': close - 1, 'Close': close,
+                         'Volume': np.full(n, 10.0)}, index=index)
+
+
+def _kline(timestamp, close):
+    return {'t': int(pd.Timestamp(timestamp).value // 10 ** 6), 'o': close, 'h': close + 1, 'l': close - 1,
+            'c': close, 'v': 10.0}
+
+
+def test_out_of_order_kline_does_not_overwrite_last_row():
+    hub = FeatureHub()
+    initial = _frame()
+    hub.subscribe('BTCUSDT', '1h', initial)
+
+    df = hub.apply_kline('BTCUSDT', '1h', _kline(initial.index[-3], 999.0))
+
+    pd.testing.assert_frame_equal(df, initial)
+    assert hub.stats['stale_candles'] == 1 and hub.stats['candles'] == 0
+
+
+def test_same_timestamp_kline_replaces_last_row():
+    hub = FeatureHub()
+    initial = _frame()
+    hub.subscribe('BTCUSDT', '1h', initial)
+
+    df = hub.apply_kline('BTCUSDT', '1h', _kline(initial.index[-1], 555.0))
+
+    assert len(df) == len(initial) and df['Close'].iloc[-1] == 555.0
+    pd.testing.assert_frame_equal(df.iloc[:-1], initial.iloc[:-1])
+
+
+def test_late_kline_after_unsubscribe_is_ignored():
+    hub = FeatureHub()
+    initial = _frame()
+    hub.subscribe('BTCUSDT', '1h', initial)
+    hub.unsubscribe('BTCUSDT', '1h')
+
+    assert hub.apply_kline('BTCUSDT', '1h', _kline(initial.index[-1] + pd.Timedelta('1h'), 200.0)) is None
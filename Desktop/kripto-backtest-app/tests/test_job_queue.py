@@ -0,0 +1,20 @@
+import time
+
+import job_queue
+from job_queue import JobQueue
+
+
+def test_requeued_job_cannot_be_finished_by_stale_worker(tmp_path, monkeypatch):
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    job_id = queue.submit('backtest', {'symbol': 'BTCUSDT'})
+    assert queue.claim('old')['id'] == job_id
+
+    # Eski işçi canlılık bildirmeyi bıraktı; iş yeniden kuyruğa alınıp yeni işçiye geçer
+    later = time.time() + job_queue.STALE_AFTER + 1
+    monkeypatch.setattr(job_queue.time, 'time', lambda: later)
+    assert queue.claim('new')['id'] == job_id
+    monkeypatch.undo()
+
+    assert queue.finish(job_id, 'new', 'done', result={'value': 2}) is True
+    assert queue.finish(job_id, 'old', 'done', result={'value': 1}) is False
+    assert queue.fetch_result(job_id) == {'value': 2}
@@ -0,0 +1,38 @@
+import time
+
+from multi_worker import shutdown_runners
+from position_book import PositionBook
+from replay import InMemoryStore
+
+
+class _SlowStore(InMemoryStore):
+    """Yazımı yavaş olan veritabanı: kapanış anında kuyrukta yazılmamış kayıt kalır."""
+
+    def update_position(self, *args, **kwargs):
+        time.sleep(0.2)
+        super().update_position(*args, **kwargs)
+
+
+class _Runner:
+    def __init__(self, name):
+        self.name = name
+        self.stopped = False
+
+    def stop(self):
+        self.stopped = True
+
+
+def test_queued_position_write_is_persisted_on_shutdown():
+    store = _SlowStore()
+    book = PositionBook('s1', store)
+    book.open('BTCUSDT', 'Long', 100.0, 95.0, 105.0, 110.0, quantity=1.0)
+    book.mark_take_profit('BTCUSDT', tp1_hit=True)
+    assert book.writer.pending() > 0
+
+    runner = _Runner('demo')
+    running = {'s1': runner}
+    assert shutdown_runners(running, timeout=5)
+
+    assert runner.stopped and not running
+    assert store.positions[('s1', 'BTCUSDT')]['tp1_hit'] is True
+    assert book.writer.pending() == 0
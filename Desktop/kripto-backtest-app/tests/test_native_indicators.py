@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from native_indicators import compare_with_pandas_ta
+
+pytest.importorskip('pandas_ta')
+
+TOLERANCE = 1e-9
+
+
+def _frame(seed, n, freq):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    spread = np.abs(rng.normal(0, 0.004, n)) * close
+    return pd.DataFrame({'Open': close, 'High': close + spread, 'Low': close - spread, 'Close': close,
+                         'Volume': rng.uniform(1, 100, n)}, index=pd.date_range('2024-01-01', periods=n, freq=freq))
+
+
+def _assert_equivalent(df, params=None):
+    differences = compare_with_pandas_ta(df, params)
+    worst = {name: diff for name, diff in differences.items() if not diff <= TOLERANCE}
+    assert not worst, f"Yerel göstergeler pandas_ta ile uyuşmuyor: {worst}"
+
+
+@pytest.mark.parametrize('seed, n, freq', [(1, 201, '1h'), (2, 1000, '15min'), (3, 3000, '5min')])
+def test_default_periods_match_pandas_ta(seed, n, freq):
+    _assert_equivalent(_frame(seed, n, freq))
+
+
+@pytest.mark.parametrize('params', [
+    dict(sma=7, ema=9, rsi=5, macd=(5, 13, 4), bbands=(10, 1.5), adx=7, stoch=(5, 2), atr=5),
+    dict(sma=100, ema=50, rsi=21, macd=(8, 21, 5), bbands=(30, 2.5), adx=21, stoch=(21, 5), atr=21),
+])
+def test_non_default_periods_match_pandas_ta(params):
+    _assert_equivalent(_frame(4, 800, '15min'), params)
+
+
+def test_flat_price_stretch_matches_pandas_ta():
+    # Sıfır aralıklı bölüm: Stoch paydası, ADX yön hareketleri ve RSI kazanç/kayıpları sıfırlanır
+    df = _frame(5, 600, '15min')
+    df.iloc[100:160, :4] = df['Close'].iloc[99]
+    _assert_equivalent(df)
+    _assert_equivalent(df, dict(rsi=5, adx=7, stoch=(5, 2)))
+
+
+def test_zero_volume_bars_match_pandas_ta():
+    df = _frame(6, 600, '15min')
+    df.iloc[200:230, df.columns.get_loc('Volume')] = 0.0
+    _assert_equivalent(df)
+
+
+def test_vwap_resets_each_session():
+    # Saatlik 5 günlük veri: VWAP her gün başında sıfırlanmalı
+    df = _frame(7, 24 * 5, '1h')
+    assert df.index.normalize().nunique() == 5
+    _assert_equivalent(df)
@@ -0,0 +1,60 @@
+import gc
+import threading
+import time
+import weakref
+
+from order_manager import _submitters, get_order_submitter
+from paper_exchange import SimulatedFuturesExchange
+
+
+def _protected(exchange, order_type):
+    return sum(o['origQty'] for o in exchange._orders.values() if o['type'] == order_type)
+
+
+def test_bracket_follows_partially_filled_entry():
+    exchange = SimulatedFuturesExchange(slippage_bps=0, max_volume_participation=0.05)
+    submitter = get_order_submitter(exchange)
+    exchange.on_bar('BTCUSDT', 100, 100, 100, 100, volume=40)
+
+    result = submitter.submit('BTCUSDT', 'BUY', 5.0, stop_loss_price=90, take_profits=[(110, 50), (120, 50)],
+                              quantity_precision=3)
+    assert result['entry']['status'] == 'PARTIALLY_FILLED' and result['quantity'] == 2.0
+
+    for _ in range(3):
+        exchange.on_bar('BTCUSDT', 100, 101, 99, 100, volume=40)
+    deadline = time.monotonic() + 5
+    while _protected(exchange, 'STOP_MARKET') < 5.0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert exchange._positions['BTCUSDT']['amount'] == 5.0
+    assert _protected(exchange, 'STOP_MARKET') == 5.0
+    assert _protected(exchange, 'TAKE_PROFIT_MARKET') == 5.0
+
+
+def test_submitter_is_released_with_its_executor():
+    before = len(_submitters)
+    exchange = SimulatedFuturesExchange()
+    get_order_submitter(exchange)
+    assert len(_submitters) == before + 1
+    ref = weakref.ref(exchange)
+    del exchange
+    gc.collect()
+
+    assert ref() is None
+    assert len(_submitters) == before
+
+
+def test_queue_depth_counts_pending_protective_orders():
+    exchange = SimulatedFuturesExchange()
+    submitter = get_order_submitter(exchange)
+    release = threading.Event()
+    futures = [submitter._run_in_pool(release.wait) for _ in range(3)]
+    assert submitter.queue_depth() == 3
+
+    release.set()
+    for future in futures:
+        future.result(timeout=5)
+    deadline = time.monotonic() + 5
+    while submitter.queue_depth() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert submitter.queue_depth() == 0
@@ -0,0 +1,28 @@
+from position_book import PositionBook
+from replay import InMemoryStore
+
+
+def _store_with_positions():
+    store = InMemoryStore()
+    store.update_position('s1', 'BTCUSDT', 'Long', 100.0, sl_price=95.0)
+    store.update_position('s1', 'ETHUSDT', 'Short', 50.0, sl_price=55.0)
+    return store
+
+
+def test_load_is_limited_to_owned_symbols():
+    book = PositionBook('s1', _store_with_positions(), async_persist=False).load(['BTCUSDT'])
+
+    assert book.symbols() == ['BTCUSDT']
+    assert book.reconcile('ETHUSDT', 0.0) is None
+    assert book.reconcile('BTCUSDT', 0.0) == 'flat'
+
+
+def test_adopt_loads_position_of_symbol_moved_to_this_book():
+    book = PositionBook('s1', _store_with_positions(), async_persist=False).load(['BTCUSDT'])
+    book.adopt('ETHUSDT')
+
+    assert book.position('ETHUSDT') == 'Short' and book.get('ETHUSDT')['stop_loss_price'] == 55.0
+    assert book.reconcile('ETHUSDT', -1.0) == 'updated'
+
+    book.forget('ETHUSDT')
+    assert book.reconcile('ETHUSDT', 0.0) is None
@@ -0,0 +1,24 @@
+from replay import _synthetic_frames, replay_strategies, result_digest
+
+PARAMS = {'signal_mode': 'or', 'use_rsi': True, 'rsi_buy': 40, 'rsi_sell': 60, 'stop_loss_pct': 1.5,
+          'tp1_pct': 1.0, 'tp2_pct': 2.5}
+
+
+def _replay():
+    frames = _synthetic_frames(1, 300, '1h')
+    configs = [{'id': 'replay-0', 'name': 'Replay 0', 'symbols': list(frames), 'interval': '1h',
+                'strategy_params': PARAMS, 'status': 'running', 'orchestrator_status': 'active',
+                'is_trading_enabled': True, 'rl_model_id': None}]
+    stats, store, exchange = replay_strategies(configs, frames, '1h', warmup=100, intra_updates=2)
+    return stats, store, exchange
+
+
+def test_replay_is_deterministic_and_trades():
+    first_stats, first_store, first_exchange = _replay()
+    _, second_store, second_exchange = _replay()
+
+    assert first_stats['candles'] == 200
+    assert len(first_store.alarms) > 0
+    assert first_exchange.summary()['fills'] > 0
+    assert result_digest(first_store) == result_digest(second_store)
+    assert first_exchange.summary() == second_exchange.summary()
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from rl_observation import OBSERVATION_COLUMNS, ObservationBuilder, build_observation_frame
+
+WINDOW = 201
+BAR_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+@pytest.fixture(scope='module')
+def df():
+    rng = np.random.default_rng(42)
+    n = WINDOW
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    return pd.DataFrame({
+        'Open': close + rng.normal(0, 0.3, n),
+        'High': close + np.abs(rng.normal(0, 1, n)),
+        'Low': close - np.abs(rng.normal(0, 1, n)),
+        'Close': close,
+        'Volume': rng.uniform(10, 1000, n)
+    }, index=pd.date_range('2024-01-01', periods=n, freq='h'))
+
+
+def _expected(df):
+    return build_observation_frame(df).iloc[-1][OBSERVATION_COLUMNS].values.astype(np.float32)
+
+
+def _update(builder, timestamp, bar):
+    return builder.update(timestamp, *(bar[col] for col in BAR_COLUMNS))
+
+
+def _intra_candle(bar):
+    # Aynı mumun kapanmadan önceki hali: aralık daha dar, hacim daha az
+    mid = (bar['Open'] + bar['Close']) / 2
+    return {'Open': bar['Open'], 'High': max(bar['Open'], mid), 'Low': min(bar['Open'], mid), 'Close': mid,
+            'Volume': bar['Volume'] / 3}
+
+
+def test_incremental_matches_batch_frame(df):
+    builder = ObservationBuilder(window=WINDOW).seed(df.iloc[:150])
+    for timestamp, bar in df.iloc[150:].iterrows():
+        assert _update(builder, timestamp, bar)
+
+    np.testing.assert_allclose(builder.observation(), _expected(df), rtol=1e-5, atol=1e-5)
+
+
+def test_intra_candle_update_is_replaced_by_close(df):
+    builder = ObservationBuilder(window=WINDOW).seed(df.iloc[:-1])
+    timestamp, bar = df.index[-1], df.iloc[-1]
+    _update(builder, timestamp, _intra_candle(bar))
+    _update(builder, timestamp, _intra_candle(_intra_candle(bar)))
+    _update(builder, timestamp, bar)
+
+    np.testing.assert_allclose(builder.observation(), _expected(df), rtol=1e-5, atol=1e-5)
+
+
+def test_open_candle_in_seed_is_replaced_by_close(df):
+    seed = df.copy()
+    seed.iloc[-1] = pd.Series(_intra_candle(df.iloc[-1]))
+    builder = ObservationBuilder(window=WINDOW).seed(seed)
+    _update(builder, df.index[-1], df.iloc[-1])
+
+    np.testing.assert_allclose(builder.observation(), _expected(df), rtol=1e-5, atol=1e-5)
+
+
+def test_older_bar_is_ignored(df):
+    builder = ObservationBuilder(window=WINDOW).seed(df)
+    before = builder.observation()
+
+    assert not _update(builder, df.index[-2], df.iloc[-2])
+    np.testing.assert_array_equal(builder.observation(), before)
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+from stable_baselines3.common.vec_env import DummyVecEnv
+
+from rl_vec_env import BatchedTradingEnv
+from trading_env import TradingEnv
+
+LENGTHS = [60, 40, 90]
+N_FEATURES = 6
+
+
+@pytest.fixture(scope='module')
+def market():
+    rng = np.random.default_rng(7)
+    close = np.concatenate([100 + np.cumsum(rng.normal(0, 1, n)) for n in LENGTHS])
+    obs_matrix = rng.normal(0, 1, (len(close), N_FEATURES)).astype(np.float32)
+    obs_matrix[:, 3] = close
+    segments, start = [], 0
+    for i, n in enumerate(LENGTHS):
+        segments.append((f"SYM{i}", start, start + n))
+        start += n
+    return obs_matrix, close, segments
+
+
+def _reference(obs_matrix, close, segments, n_envs, episode_length):
+    return DummyVecEnv([
+        (lambda seg=segments[i % len(segments)]: TradingEnv.from_arrays(
+            obs_matrix[seg[1]:seg[2]], close[seg[1]:seg[2]], episode_length=episode_length))
+        for i in range(n_envs)
+    ])
+
+
+@pytest.mark.parametrize('n_envs, episode_length', [(3, None), (5, 25)])
+def test_batched_env_matches_dummy_vec_env(market, n_envs, episode_length):
+    obs_matrix, close, segments = market
+    batched = BatchedTradingEnv(obs_matrix, close, segments, n_envs=n_envs, episode_length=episode_length)
+    reference = _reference(obs_matrix, close, segments, n_envs, episode_length)
+    batched.seed(123)
+    reference.seed(123)
+    assert np.array_equal(batched.reset(), reference.reset())
+
+    actions = np.random.default_rng(0).integers(0, 3, (300, n_envs))
+    resets = 0
+    for step_actions in actions:
+        obs_b, rew_b, done_b, info_b = batched.step(step_actions)
+        obs_r, rew_r, done_r, info_r = reference.step(step_actions)
+        assert np.array_equal(obs_b, obs_r)
+        assert np.array_equal(rew_b, rew_r)
+        assert np.array_equal(done_b, done_r)
+        for ib, ir in zip(info_b, info_r):
+            assert ('terminal_observation' in ib) == ('terminal_observation' in ir)
+            assert ib.get('TimeLimit.truncated', False) == ir.get('TimeLimit.truncated', False)
+            if 'terminal_observation' in ib:
+                assert np.array_equal(ib['terminal_observation'], ir['terminal_observation'])
+        resets += int(done_b.sum())
+
+    # Her şerit birden çok epizod tamamlamış olmalı (otomatik reset yolu da karşılaştırıldı)
+    assert resets >= 2 * n_envs
@@ -0,0 +1,22 @@
+from telegram_alert import TelegramDispatcher
+
+
+def test_rejected_digest_is_resent_one_by_one():
+    sent = []
+
+    def fake_post(message, token, chat_id):
+        # Dengesiz Markdown içeren bildirim (ve onu içeren özet) reddedilir
+        if 'BAD_' in message:
+            return 'fail', 0.0
+        sent.append(message)
+        return 'ok', 0.0
+
+    dispatcher = TelegramDispatcher(post=fake_post, per_chat_interval=0.0)
+    with dispatcher._cond:
+        # Tek özet mesajında birleşsinler diye gönderim iş parçacığı başlamadan kuyruğa alınır
+        for text in ["🟢 SL BTCUSDT", "🎯 TP1 BAD_STRATEGY", "🎯 TP2 ETHUSDT"]:
+            dispatcher.enqueue(text, "token", "chat")
+    assert dispatcher.flush(timeout=10)
+
+    assert sent == ["🟢 SL BTCUSDT", "🎯 TP2 ETHUSDT"]
+    assert dispatcher.stats['failed'] == 1 and dispatcher.stats['split'] == 1
@@ -0,0 +1,19 @@
+import numpy as np
+
+from trading_env import TradingEnv
+
+
+def test_observations_are_not_overwritten_by_later_steps():
+    rng = np.random.default_rng(0)
+    obs_matrix = rng.normal(size=(20, 5)).astype(np.float32)
+    prices = 100 + np.cumsum(rng.normal(size=20))
+    env = TradingEnv.from_arrays(obs_matrix, prices)
+
+    first, _ = env.reset()
+    kept = first.copy()
+    second, *_ = env.step(1)
+    env.step(0)
+
+    np.testing.assert_array_equal(first, kept)
+    assert second is not first
+    np.testing.assert_array_equal(first[:5], obs_matrix[0])
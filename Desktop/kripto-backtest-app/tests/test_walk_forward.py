@@ -0,0 +1,55 @@
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest_engine import (build_param_grid, resolve_strategy_params, sample_combinations,
+                             simulate_optimization_trades)
+from signals import generate_signals
+from walk_forward import _indicator_key, evaluate_slice, prepare_indicator_frames, run_walk_forward
+
+
+@pytest.fixture(scope='module')
+def setup():
+    rng = np.random.default_rng(0)
+    frames = {}
+    for symbol in ('DEMOUSDT', 'TESTUSDT'):
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 1200)))
+        frames[symbol] = pd.DataFrame({'Open': close, 'High': close * 1.004, 'Low': close * 0.996, 'Close': close,
+                                       'Volume': rng.uniform(10, 100, 1200)},
+                                      index=pd.date_range('2024-01-01', periods=1200, freq='1h'))
+    params = resolve_strategy_params({'rsi_buy': 40, 'rsi_sell': 60, 'use_mta': False})
+    combinations = sample_combinations(build_param_grid((30, 40), (60, 70), (20, 20), (1.5, 2.5), (3.0, 5.0)),
+                                       max_tests=4, rng=random.Random(0))
+    return frames, params, combinations
+
+
+def test_window_uses_indicators_warmed_on_earlier_history(setup):
+    frames, params, combinations = setup
+    combination = combinations[0]
+    prepared = prepare_indicator_frames(frames, params, [combination])[_indicator_key(combination)]
+    start, end = frames['DEMOUSDT'].index[[600, 1099]]
+
+    full = prepared['DEMOUSDT']
+    window = full.loc[start:end]
+    # Pencerenin ilk mumunda göstergeler zaten dolu (soğuk hesaplamada burada NaN olurdu)
+    assert not np.isnan(window['RSI'].iloc[0])
+
+    expected = simulate_optimization_trades(generate_signals(window, **dict(params, **combination, stop_loss_pct=0)),
+                                            dict(params, **combination, stop_loss_pct=0))
+    trades = evaluate_slice({'DEMOUSDT': full}, params, combination, start, end)
+    assert len(expected) > 0
+    assert trades.drop(columns='Sembol').equals(pd.DataFrame(expected))
+
+
+def test_result_does_not_depend_on_worker_count(setup):
+    frames, params, combinations = setup
+    kwargs = dict(train_bars=500, test_bars=200)
+    serial = run_walk_forward(frames, params, combinations, workers=1, **kwargs)
+    parallel = run_walk_forward(frames, params, combinations, workers=2, **kwargs)
+
+    assert len(serial[0]) == 3
+    pd.testing.assert_frame_equal(serial[0], parallel[0])
+    pd.testing.assert_frame_equal(serial[1], parallel[1])
+    assert serial[2] == parallel[2]
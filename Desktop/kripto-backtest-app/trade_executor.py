@@ -1,18 +1,61 @@
 # trade_executor.py (Orijinal Hali)
 
+import threading
+import time
+
 from binance.client import Client
 from binance.exceptions import BinanceAPIException
+from requests.adapters import HTTPAdapter
 import streamlit as st
 
+# Borsa bilgisi (lot büyüklüğü, hassasiyet vb.) ne sıklıkla yenilenecek (saniye)
+EXCHANGE_INFO_TTL = 3600
+# Arka plan yenileyicisi çalışırken son başarılı yenilemenin en fazla bu kadar eski olmasına izin verilir;
+# yenilemeler başarısız olmaya devam ederse emir anında yeniden indirilir (eski lot/fiyat filtreleri kullanılmaz)
+EXCHANGE_INFO_MAX_AGE = 2 * EXCHANGE_INFO_TTL
+# Başarısız arka plan yenilemesi bu kadar saniye sonra tekrar denenir
+EXCHANGE_INFO_RETRY = 60
+
+# Süreç boyunca paylaşılan istemci (tek HTTP oturumu, bağlantı havuzu ile)
+_client = None
+_client_lock = threading.Lock()
+
+# Sembol -> borsa bilgisi indeksi
+_symbol_index = {}
+_symbol_filters = {}
+_exchange_info_loaded_at = 0.0
+_exchange_info_lock = threading.Lock()
+_refresher_thread = None
+
+
 def get_binance_client():
-    """API anahtarlarını kullanarak Binance istemcisini oluşturur."""
-    try:
-        api_key = st.secrets["binance"]["api_key"]
-        api_secret = st.secrets["binance"]["api_secret"]
-        return Client(api_key, api_secret)
-    except Exception as e:
-        print(f"HATA: Binance API anahtarları okunamadı: {e}")
-        return None
+    """
+    API anahtarlarını kullanarak Binance istemcisini döndürür.
+    İstemci ilk çağrıda bir kez oluşturulur ve sonraki tüm emirlerde aynı HTTP oturumu kullanılır.
+    """
+    global _client
+    if _client is not None:
+        return _client
+    with _client_lock:
+        if _client is None:
+            try:
+                api_key = st.secrets["binance"]["api_key"]
+                api_secret = st.secrets["binance"]["api_secret"]
+                client = Client(api_key, api_secret)
+                # Eşzamanlı emirler için bağlantı havuzunu genişlet
+                client.session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=16))
+                _client = client
+            except Exception as e:
+                print(f"HATA: Binance istemcisi oluşturulamadı (API anahtarları veya bağlantı): {e}")
+                return None
+    return _client
+
+
+def reset_binance_client():
+    """Paylaşılan istemciyi bırakır; bir sonraki çağrıda yeniden oluşturulur (ör. anahtarlar değiştiğinde)."""
+    global _client
+    with _client_lock:
+        _client = None
 # ... (dosyanın geri kalan fonksiyonları aynı kalacak) ...
 
 def set_futures_leverage_and_margin(symbol: str, leverage: int, margin_type: str = 'ISOLATED'):
@@ -23,15 +66,18 @@ def set_futures_leverage_and_margin(symbol: str, leverage: int, margin_type: str
     try:
         # Önce marjin tipini ayarla
         client.futures_change_margin_type(symbol=symbol, marginType=margin_type)
+    except BinanceAPIException as e:
+        # -4046: Marjin tipi zaten istenen değerde; bu bir hata değildir, kaldıraç yine de ayarlanmalı.
+        if e.code != -4046:
+            print(f"HATA: {symbol} için marjin tipi ayarlanırken hata oluştu: {e}")
+            return False
+
+    try:
         # Sonra kaldıracı ayarla
         client.futures_change_leverage(symbol=symbol, leverage=leverage)
         print(f"BİLGİ: {symbol} için kaldıraç {leverage}x ve marjin tipi {margin_type} olarak ayarlandı.")
         return True
     except BinanceAPIException as e:
-        # Eğer kaldıraç zaten istenen değerdeyse, bu bir hata değildir.
-        if e.code == -4046:
-            print(f"BİLGİ: {symbol} için kaldıraç zaten {leverage}x olarak ayarlı.")
-            return True
         print(f"HATA: {symbol} için kaldıraç ayarlanırken hata oluştu: {e}")
         return False
 
@@ -117,18 +163,97 @@ def place_futures_take_profit_order(symbol: str, side: str, quantity: float, sto
         print(f"TAKE-PROFIT EMİR HATASI: {symbol} için {side} emri gönderilemedi: {e}")
         return None
 
-@st.cache_data(ttl=3600)  # Sembol bilgilerini 1 saat cache'le
+def place_futures_batch_orders(orders: list):
+    """
+    Birden fazla emri (en fazla 5) tek bir istekle gönderir (batchOrders uç noktası).
+    Her emir, futures_create_order ile aynı alanları içeren bir sözlüktür. Dönen listede her emir için
+    ya emir bilgisi ya da {'code': ..., 'msg': ...} şeklinde hata bulunur.
+    """
+    client = get_binance_client()
+    if not client: return None
+
+    try:
+        batch = [{key: str(value) for key, value in order.items()} for order in orders]
+        results = client.futures_place_batch_order(batchOrders=batch)
+        for order, result in zip(orders, results):
+            if 'orderId' in result:
+                print(f"TOPLU EMİR BAŞARILI: {order['symbol']} | {order['type']} | Taraf: {order['side']} | Miktar: {order['quantity']} | Emir ID: {result['orderId']}")
+            else:
+                print(f"TOPLU EMİR HATASI: {order['symbol']} | {order['type']} | {result.get('msg')}")
+        return results
+    except BinanceAPIException as e:
+        print(f"TOPLU EMİR HATASI: Emirler gönderilemedi: {e}")
+        return None
+
+
+def refresh_exchange_info():
+    """
+    Vadeli işlemler borsa bilgisini indirir ve sembol -> bilgi indeksini yeniler.
+    İndirme başarısız olursa mevcut (eski) indeks korunur.
+    """
+    global _symbol_index, _symbol_filters, _exchange_info_loaded_at
+    client = get_binance_client()
+    if not client: return False
+
+    try:
+        info = client.futures_exchange_info()
+    except Exception as e:
+        print(f"HATA: Borsa bilgisi alınamadı: {e}")
+        return False
+
+    symbol_index = {s['symbol']: s for s in info.get('symbols', [])}
+    symbol_filters = {
+        symbol: {f['filterType']: f for f in s.get('filters', [])}
+        for symbol, s in symbol_index.items()
+    }
+    _symbol_index, _symbol_filters = symbol_index, symbol_filters
+    _exchange_info_loaded_at = time.time()
+    print(f"BİLGİ: Borsa bilgisi yenilendi ({len(symbol_index)} sembol).")
+    return True
+
+
+def _exchange_info_is_fresh():
+    """İndeks, son başarılı yenilemenin yaşına göre hâlâ geçerli mi?"""
+    if not _symbol_index:
+        return False
+    refresher_alive = _refresher_thread is not None and _refresher_thread.is_alive()
+    max_age = EXCHANGE_INFO_MAX_AGE if refresher_alive else EXCHANGE_INFO_TTL
+    return time.time() - _exchange_info_loaded_at < max_age
+
+
+def _ensure_exchange_info():
+    """İndeks hiç yüklenmemişse veya son başarılı yenilemesi çok eskiyse emir anında yeniler."""
+    if _exchange_info_is_fresh():
+        return
+    with _exchange_info_lock:
+        # Aynı anda bekleyen diğer iş parçacıkları indeksi tekrar indirmesin
+        if not _exchange_info_is_fresh():
+            refresh_exchange_info()
+
+
+def start_exchange_info_refresher(interval: float = EXCHANGE_INFO_TTL):
+    """Borsa bilgisini arka planda belirli aralıklarla yenileyen iş parçacığını (bir kez) başlatır."""
+    global _refresher_thread
+    if _refresher_thread is not None and _refresher_thread.is_alive():
+        return _refresher_thread
+
+    def _loop():
+        while True:
+            ok = refresh_exchange_info()
+            time.sleep(interval if ok else min(interval, EXCHANGE_INFO_RETRY))
+
+    _refresher_thread = threading.Thread(target=_loop, daemon=True, name="exchange-info-refresher")
+    _refresher_thread.start()
+    return _refresher_thread
+
+
 def get_symbol_info(symbol: str):
-        """Binance'den bir sembol için lot büyüklüğü, hassasiyet gibi bilgileri çeker."""
-        client = get_binance_client()
-        if not client: return None
-
-        try:
-            info = client.futures_exchange_info()
-            for s in info['symbols']:
-                if s['symbol'] == symbol:
-                    return s
-            return None
-        except BinanceAPIException as e:
-            print(f"HATA: {symbol} için borsa bilgisi alınamadı: {e}")
-            return None
\ No newline at end of file
+    """Bir sembol için lot büyüklüğü, hassasiyet gibi bilgileri bellekteki indeksten döndürür."""
+    _ensure_exchange_info()
+    return _symbol_index.get(symbol)
+
+
+def get_symbol_filters(symbol: str):
+    """Bir sembolün filtrelerini tipine göre döndürür (ör. {'LOT_SIZE': {...}, 'PRICE_FILTER': {...}})."""
+    _ensure_exchange_info()
+    return _symbol_filters.get(symbol, {})
@@ -0,0 +1,304 @@
+# user_stream.py (Binance Vadeli İşlemler Kullanıcı Veri Akışı - Canlı Pozisyon ve Emir Durumu)
+
+import json
+import logging
+import threading
+import time
+import weakref
+
+import websocket
+
+import trade_executor
+
+FUTURES_USER_STREAM_URL = "wss://fstream.binance.com/ws/"
+# listenKey 60 dakika sonra geçersiz olur; Binance 30 dakikada bir yenilenmesini önerir
+LISTEN_KEY_KEEPALIVE = 30 * 60
+RECONNECT_DELAY = 5
+
+# Bu durumlara geçen emirler açık emir listesinden çıkarılır
+FINAL_ORDER_STATUSES = {'FILLED', 'CANCELED', 'EXPIRED', 'REJECTED', 'EXPIRED_IN_MATCH'}
+
+
+class AccountState:
+    """
+    Kullanıcı veri akışı olaylarıyla (ACCOUNT_UPDATE, ORDER_TRADE_UPDATE) güncellenen bellek içi hesap durumu.
+
+    - Sembol başına işaretli pozisyon miktarı ve giriş fiyatı
+    - Açık (bekleyen) emirler ve sembol başına son dolum
+    - `synced` True iken durum borsayla eşittir; kapanış kararları REST çağrısı olmadan verilebilir
+    """
+
+    def __init__(self):
+        self.positions = {}  # sembol -> {'amount', 'entry_price', 'updated'}
+        self.open_orders = {}  # emir ID -> emir özeti
+        self.last_fills = {}  # sembol -> son dolum özeti
+        self.balances = {}
+        self.synced = False
+        self._position_listeners = []
+        self._order_listeners = []
+        self._lock = threading.RLock()
+
+    # --- Abonelikler ---
+    def add_position_listener(self, callback):
+        """callback(sembol, işaretli_miktar, giriş_fiyatı): pozisyon değiştiğinde çağrılır."""
+        with self._lock:
+            self._position_listeners.append(callback)
+
+    def remove_position_listener(self, callback):
+        with self._lock:
+            if callback in self._position_listeners:
+                self._position_listeners.remove(callback)
+
+    def add_order_listener(self, callback):
+        """callback(emir_özeti): emir durumu değiştiğinde çağrılır."""
+        with self._lock:
+            self._order_listeners.append(callback)
+
+    # --- Sorgular ---
+    def position_amount(self, symbol):
+        """İşaretli pozisyon miktarı (Long > 0, Short < 0); durum borsayla eşit değilse None."""
+        if not self.synced:
+            return None
+        return self.positions.get(symbol, {}).get('amount', 0.0)
+
+    def last_fill(self, symbol):
+        return self.last_fills.get(symbol)
+
+    def orders_for(self, symbol):
+        with self._lock:
+            return [dict(o) for o in self.open_orders.values() if o['symbol'] == symbol]
+
+    # --- Olay işleme ---
+    def apply_event(self, event):
+        """Kullanıcı veri akışından gelen tek bir olayı (sözlük) işler."""
+        event_type = event.get('e')
+        if event_type == 'ORDER_TRADE_UPDATE':
+            self._apply_order_update(event['o'], event.get('E', 0))
+        elif event_type == 'ACCOUNT_UPDATE':
+            account = event.get('a', {})
+            for balance in account.get('B', []):
+                self.balances[balance['a']] = float(balance['wb'])
+            for position in account.get('P', []):
+                self._set_position(position['s'], float(position['pa']), float(position['ep']), event.get('E', 0))
+
+    def load_snapshot(self, positions, open_orders=()):
+        """
+        REST'ten alınan anlık görüntüyle durumu kurar (akış başlarken / yeniden bağlanınca kaçan olaylar için).
+        positions: futures_position_information() çıktısı, open_orders: futures_get_open_orders() çıktısı.
+        """
+        with self._lock:
+            self.open_orders = {}
+            for order in open_orders:
+                self._apply_order_update({
+                    's': order['symbol'], 'S': order['side'], 'o': order['type'], 'q': order['origQty'],
+                    'sp': order.get('stopPrice', 0), 'X': order['status'], 'x': 'NEW', 'i': order['orderId'],
+                    'z': order.get('executedQty', 0), 'ap': order.get('avgPrice', 0), 'l': 0, 'L': 0,
+                    'R': order.get('reduceOnly', False)}, notify=False)
+        now = int(time.time() * 1000)
+        for position in positions:
+            self._set_position(position['symbol'], float(position['positionAmt']), float(position['entryPrice']), now)
+
+    def _set_position(self, symbol, amount, entry_price, event_time):
+        with self._lock:
+            previous = self.positions.get(symbol)
+            self.positions[symbol] = {'amount': amount, 'entry_price': entry_price, 'updated': event_time}
+            listeners = list(self._position_listeners)
+        if previous and previous['amount'] == amount and previous['entry_price'] == entry_price:
+            return
+        for callback in listeners:
+            try:
+                callback(symbol, amount, entry_price)
+            except Exception as e:
+                logging.error(f"HATA: {symbol} pozisyon bildirimi işlenemedi: {e}")
+
+    def _apply_order_update(self, data, event_time=0, notify=True):
+        order = {
+            'symbol': data['s'], 'side': data['S'], 'type': data['o'], 'order_id': data['i'],
+            'quantity': float(data['q']), 'stop_price': float(data.get('sp') or 0), 'status': data['X'],
+            'executed_quantity': float(data.get('z') or 0), 'avg_price': float(data.get('ap') or 0),
+            'reduce_only': bool(data.get('R', False)), 'updated': event_time
+        }
+        with self._lock:
+            if order['status'] in FINAL_ORDER_STATUSES:
+                self.open_orders.pop(order['order_id'], None)
+            else:
+                self.open_orders[order['order_id']] = order
+            if data.get('x') == 'TRADE' and float(data.get('l') or 0) > 0:
+                self.last_fills[order['symbol']] = {
+                    'type': order['type'], 'side': order['side'], 'order_id': order['order_id'],
+                    'quantity': float(data['l']), 'price': float(data.get('L') or 0), 'time': event_time}
+            listeners = list(self._order_listeners) if notify else []
+        for callback in listeners:
+            try:
+                callback(order)
+            except Exception as e:
+                logging.error(f"HATA: {order['symbol']} emir bildirimi işlenemedi: {e}")
+
+
+class UserDataStream(AccountState):
+    """
+    Binance vadeli işlemler kullanıcı veri akışı (listenKey + WebSocket).
+    Bağlantı kurulurken ve her yeniden bağlanmada pozisyonlar ve açık emirler REST ile bir kez okunur;
+    sonrasında durum sadece akıştan gelen olaylarla güncellenir.
+    """
+
+    def __init__(self, client_factory=trade_executor.get_binance_client, keepalive_interval=LISTEN_KEY_KEEPALIVE):
+        super().__init__()
+        self.client_factory = client_factory
+        self.keepalive_interval = keepalive_interval
+        self.listen_key = None
+        self._ws = None
+        self._stop_event = threading.Event()
+        self._threads = []
+
+    def start(self):
+        """Akışı arka planda başlatır; API istemcisi oluşturulamazsa False döner."""
+        client = self.client_factory()
+        if client is None:
+            logging.warning("UYARI: Kullanıcı veri akışı başlatılamadı (Binance istemcisi yok); REST sorgularına devam.")
+            return False
+        self._stop_event.clear()
+        for target, name in ((self._run, "user-data-stream"), (self._keepalive_loop, "user-data-keepalive")):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return True
+
+    def stop(self):
+        self._stop_event.set()
+        self.synced = False
+        if self._ws is not None:
+            try:
+                self._ws.close()
+            except Exception:
+                pass
+        client = self.client_factory()
+        if client is not None and self.listen_key:
+            try:
+                client.futures_stream_close(listenKey=self.listen_key)
+            except Exception as e:
+                logging.warning(f"UYARI: listenKey kapatılamadı: {e}")
+
+    def _resync(self, client):
+        try:
+            self.load_snapshot(client.futures_position_information(), client.futures_get_open_orders())
+        except Exception as e:
+            logging.error(f"HATA: Kullanıcı veri akışı eşitlenemedi, REST sorgularına devam: {e}")
+            return
+        self.synced = True
+        logging.info(f"✅ Kullanıcı veri akışı eşitlendi: {sum(1 for p in self.positions.values() if p['amount'])} "
+                     f"açık pozisyon, {len(self.open_orders)} açık emir.")
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                client = self.client_factory()
+                self.listen_key = client.futures_stream_get_listen_key()
+                self._ws = websocket.WebSocketApp(
+                    FUTURES_USER_STREAM_URL + self.listen_key,
+                    on_open=lambda ws: self._resync(client),
+                    on_message=lambda ws, msg: self._on_message(msg),
+                    on_error=lambda ws, err: logging.error(f"❌ Kullanıcı veri akışı hatası: {err}"),
+                    on_close=lambda ws, code, msg: logging.warning("🔌 Kullanıcı veri akışı kapandı."))
+                self._ws.run_forever(ping_interval=60, ping_timeout=10)
+            except Exception as e:
+                logging.error(f"HATA: Kullanıcı veri akışı bağlantısı kurulamadı: {e}")
+            # Bağlantı yokken kaçan olaylar olabilir; yeniden eşitlenene kadar REST'e dönülür
+            self.synced = False
+            if not self._stop_event.is_set():
+                time.sleep(RECONNECT_DELAY)
+
+    def _keepalive_loop(self):
+        while not self._stop_event.wait(self.keepalive_interval):
+            if not self.listen_key:
+                continue
+            try:
+                self.client_factory().futures_stream_keepalive(listenKey=self.listen_key)
+            except Exception as e:
+                logging.warning(f"UYARI: listenKey yenilenemedi, akış yeniden bağlanacak: {e}")
+                self._reconnect()
+
+    def _reconnect(self):
+        self.synced = False
+        if self._ws is not None:
+            self._ws.close()
+
+    def _on_message(self, message):
+        event = json.loads(message)
+        if event.get('e') == 'listenKeyExpired':
+            logging.warning("UYARI: listenKey süresi doldu, kullanıcı veri akışı yeniden bağlanıyor.")
+            self._reconnect()
+            return
+        self.apply_event(event)
+
+
+class LocalUserDataStream(AccountState):
+    """
+    Simüle borsanın (paper_exchange) yayınladığı olaylarla beslenen yerel kullanıcı veri akışı.
+    Canlı akışla aynı olay işleme yolunu kullanır; ağ bağlantısı gerektirmez.
+    """
+
+    def __init__(self, exchange):
+        super().__init__()
+        self.exchange = exchange
+        exchange.add_user_data_listener(self.apply_event)
+        self.synced = True
+
+    def start(self):
+        return True
+
+    def stop(self):
+        self.exchange.remove_user_data_listener(self.apply_event)
+
+
+# Borsa (executor) -> paylaşılan kullanıcı veri akışı (borsa bittiğinde akış da serbest kalır)
+_streams = weakref.WeakKeyDictionary()
+_streams_lock = threading.Lock()
+
+
+def get_user_data_stream(executor=trade_executor):
+    """
+    Verilen borsa için süreç genelinde paylaşılan hesap durumu akışını döndürür.
+    Simüle borsada yerel akış hemen eşittir; canlı akış `start()` çağrılana kadar eşit sayılmaz.
+    """
+    with _streams_lock:
+        stream = _streams.get(executor)
+        if stream is None:
+            if getattr(executor, 'is_simulated', False):
+                # Akış borsayı güçlü referansla tutarsa sözlükteki kayıt hiç silinmez
+                stream = LocalUserDataStream(weakref.proxy(executor))
+            else:
+                stream = UserDataStream()
+            _streams[executor] = stream
+        return stream
+
+
+if __name__ == '__main__':
+    from order_manager import BracketOrderSubmitter
+    from paper_exchange import SimulatedFuturesExchange
+
+    # Simüle borsada korumalı Long pozisyon: borsadaki TP/SL dolumları akıştan izlenir, REST sorgusu yapılmaz
+    exchange = SimulatedFuturesExchange(slippage_bps=0)
+    stream = get_user_data_stream(exchange)
+    changes = []
+    stream.add_position_listener(lambda symbol, amount, entry: changes.append((symbol, amount)))
+
+    exchange.on_bar('BTCUSDT', 100.0, 100.0, 100.0, 100.0)
+    BracketOrderSubmitter(executor=exchange).submit('BTCUSDT', 'BUY', 1.0, stop_loss_price=95.0,
+                                                    take_profits=[(104.0, 50), (108.0, 50)], quantity_precision=3)
+    print(f"Giriş sonrası: miktar={stream.position_amount('BTCUSDT')}, açık emir={len(stream.orders_for('BTCUSDT'))}")
+    exchange.on_bar('BTCUSDT', 100.0, 105.0, 99.0, 104.5)
+    print(f"TP1 sonrası: miktar={stream.position_amount('BTCUSDT')}, son dolum={stream.last_fill('BTCUSDT')['type']}")
+    exchange.on_bar('BTCUSDT', 104.5, 104.6, 94.0, 95.5)
+    print(f"SL sonrası: miktar={stream.position_amount('BTCUSDT')}, açık emir={len(stream.orders_for('BTCUSDT'))}, "
+          f"son dolum={stream.last_fill('BTCUSDT')['type']}")
+    assert stream.position_amount('BTCUSDT') == 0 and not stream.orders_for('BTCUSDT')
+    assert stream.position_amount('BTCUSDT') == exchange.get_position('BTCUSDT')['amount']
+    print(f"Pozisyon değişiklikleri: {changes}, REST çağrısı: {exchange.api_calls} (hepsi emir)")
+
+    # Canlı akış mesajı biçimi (Binance dokümantasyonundaki örnek olay)
+    live = AccountState()
+    live.synced = True
+    live.apply_event(json.loads('{"e":"ACCOUNT_UPDATE","E":1564745798939,"a":{"m":"ORDER","B":[{"a":"USDT",'
+                                '"wb":"122624.12345678"}],"P":[{"s":"BTCUSDT","pa":"-0.020","ep":"9000","ps":"BOTH"}]}}'))
+    assert live.position_amount('BTCUSDT') == -0.02
@@ -0,0 +1,273 @@
+# walk_forward.py (Kayan Pencereli Walk-Forward / Örneklem Dışı Doğrulama)
+#
+# Geçmiş veri ardışık eğitim/test pencerelerine bölünür: her pencerede parametreler eğitim dilimi üzerinde
+# optimize edilir, seçilen en iyi kombinasyon hemen ardından gelen ve hiç görülmemiş test diliminde denenir.
+# Göstergeler (ve MTA trendi) tüm seri üzerinde bir kez hesaplanır, pencereler bu dizilerin dilimleri üzerinde
+# çalışır; pencereler ayrı süreçlerde paralel değerlendirilir. Streamlit'e bağımlı değildir.
+#
+# Not: Pencereler "ısınmış" göstergelerle başlar (EMA/RSI/ADX vb. pencereden önceki geçmişle hesaplanmıştır;
+# canlı işlemde olduğu gibi). Bu nedenle bir eğitim penceresinin skoru, aynı mumlar üzerinde tek başına çalışan
+# run_optimization (göstergeleri dilimin başından soğuk hesaplar) sonucuyla karşılaştırılamaz; işlem sayıları
+# tutsa da giriş zamanları ve getiriler farklı olabilir.
+
+import contextlib
+import inspect
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import reduce
+
+import pandas as pd
+
+from backtest_engine import metrics_row, rank_results, simulate_optimization_trades
+from indicators import generate_all_indicators, required_indicators
+from profiling import stage
+from signals import generate_signals, add_higher_timeframe_trend, filter_signals_with_trend
+from utils import analyze_backtest_results
+
+# Gösterge dizilerini değiştiren parametreler; taramada bunlardan biri değişiyorsa kombinasyonlar gruplanır ve
+# her grup için göstergeler ayrıca (yine tüm seri üzerinde bir kez) hesaplanır
+INDICATOR_PARAMS = frozenset(
+    name for name, parameter in inspect.signature(generate_all_indicators).parameters.items()
+    if name not in ('df', 'required') and parameter.kind is not inspect.Parameter.VAR_KEYWORD
+) | {'trend_ema_period'}
+
+# İşçi süreçlerinde bir kez kurulan hazır gösterge verisi (her pencerede yeniden gönderilmez)
+_WORKER_STATE = {}
+
+
+def walk_forward_windows(index, train_bars, test_bars, step_bars=None, anchored=False):
+    """
+    Zaman ekseninden eğitim/test pencerelerini üretir. step_bars verilmezse test uzunluğu kadar kaydırılır
+    (test dilimleri örtüşmez). anchored=True ise eğitim her zaman serinin başından başlar (genişleyen pencere).
+    Dönüş: [{'window', 'train_start', 'test_start', 'test_end'}] (zaman damgaları; test_end dahil).
+    """
+    if train_bars <= 0 or test_bars <= 0:
+        raise ValueError("Eğitim ve test uzunlukları pozitif olmalıdır.")
+    step = step_bars or test_bars
+    windows = []
+    start = 0
+    while start + train_bars + test_bars <= len(index):
+        test_start = start + train_bars
+        windows.append({
+            'window': len(windows) + 1,
+            'train_start': index[0 if anchored else start],
+            'test_start': index[test_start],
+            'test_end': index[test_start + test_bars - 1],
+        })
+        start += step
+    return windows
+
+
+def _indicator_key(params_to_test):
+    return tuple(sorted((k, v) for k, v in params_to_test.items() if k in INDICATOR_PARAMS))
+
+
+def prepare_indicator_frames(frames, strategy_params, combinations, higher_frames=None):
+    """
+    Göstergeleri ve (use_mta açıksa) üst zaman dilimi trendini tüm seri üzerinde bir kez hesaplar; her pencerenin
+    dilimi böylece kendinden önceki geçmişle ısınmış değerlerle başlar.
+    Kombinasyonlar gösterge parametrelerine göre gruplanır (varsayılan ızgarada tek grup vardır).
+    Dönüş: {gösterge anahtarı: {sembol: göstergeli DataFrame}}
+    """
+    higher_frames = higher_frames or {}
+    groups = {}
+    for params_to_test in combinations:
+        groups.setdefault(_indicator_key(params_to_test), []).append(params_to_test)
+
+    prepared = {}
+    for key, group in groups.items():
+        params = dict(strategy_params, **dict(key))
+        # Gruptaki tüm kombinasyonların okuduğu göstergeler (ör. ATR sadece bazı kombinasyonlarda gerekebilir)
+        required = set().union(*(required_indicators(dict(params, **c)) for c in group))
+        prepared[key] = {}
+        for symbol, df in frames.items():
+            with stage('indicators'):
+                full = generate_all_indicators(df, required=required, **params)
+            df_higher = higher_frames.get(symbol)
+            if params.get('use_mta', False) and df_higher is not None and not df_higher.empty:
+                with stage('mta_merge'):
+                    full = add_higher_timeframe_trend(full, df_higher.copy(), params['trend_ema_period'])
+            prepared[key][symbol] = full
+    return prepared
+
+
+def _slice(df, start, end):
+    """[start, end] zaman aralığındaki satırlar (konum tabanlı dilim; kopya oluşturmaz)."""
+    index = df.index
+    return df.iloc[index.searchsorted(start, 'left'):index.searchsorted(end, 'right')]
+
+
+def evaluate_slice(indicator_frames, strategy_params, params_to_test, start, end):
+    """
+    Bir kombinasyonu önceden hesaplanmış göstergelerin [start, end] dilimi üzerinde test eder.
+    Sinyaller ve simülasyon evaluate_combination ile aynıdır; göstergeler ise dilimden önceki geçmişle ısınmış
+    olduğundan sonuç, göstergeleri yalnızca [start, end] mumlarından hesaplayan bağımsız bir taramayla
+    karşılaştırılamaz. Dönüş: işlemler DataFrame'i (Sembol sütunlu).
+    """
+    current_params = strategy_params.copy()
+    current_params.update(params_to_test)
+    current_params['stop_loss_pct'] = 0
+
+    all_trades = []
+    for symbol, full in indicator_frames.items():
+        df = _slice(full, start, end)
+        if len(df) < 2:
+            continue
+        with stage('signals'):
+            df = generate_signals(df, **current_params)
+        if current_params.get('use_mta', False) and 'Trend' in df.columns:
+            with stage('mta_merge'):
+                df = filter_signals_with_trend(df)
+        with stage('simulation'):
+            trades = simulate_optimization_trades(df, current_params)
+        if trades:
+            trades_df = pd.DataFrame(trades)
+            trades_df['Sembol'] = symbol
+            all_trades.append(trades_df)
+    if not all_trades:
+        return pd.DataFrame()
+    return pd.concat(all_trades, ignore_index=True)
+
+
+def evaluate_window(prepared, strategy_params, combinations, window, optimization_target):
+    """
+    Tek pencere: eğitim diliminde tüm kombinasyonları dener, hedef metriğe göre en iyisini seçer ve test
+    diliminde çalıştırır. Dönüş: (pencere özeti sözlüğü, test işlemleri DataFrame'i)
+    """
+    train_end = window['test_start'] - pd.Timedelta(1, 'ns')
+    rows, row_combinations = [], []
+    for params_to_test in combinations:
+        trades = evaluate_slice(prepared[_indicator_key(params_to_test)], strategy_params, params_to_test,
+                                window['train_start'], train_end)
+        row = metrics_row(params_to_test, trades) if not trades.empty else None
+        if row is not None:
+            rows.append(row)
+            row_combinations.append(params_to_test)
+
+    summary = dict(window)
+    if not rows:
+        summary['best_params'] = None
+        return summary, pd.DataFrame()
+    best = rank_results(pd.DataFrame(rows), optimization_target, top=1)
+    best_row = best.iloc[0].to_dict()
+    # Parametreler tablodan değil orijinal kombinasyondan alınır (tipler ve gösterge grubu anahtarı korunur)
+    best_params = row_combinations[best.index[0]]
+    summary['best_params'] = best_params
+    summary['train_metrics'] = {k: v for k, v in best_row.items() if k not in best_params}
+
+    test_trades = evaluate_slice(prepared[_indicator_key(best_params)], strategy_params, best_params,
+                                 window['test_start'], window['test_end'])
+    test_row = metrics_row(best_params, test_trades) if not test_trades.empty else None
+    summary['test_metrics'] = {k: v for k, v in (test_row or {}).items() if k not in best_params}
+    if not test_trades.empty:
+        test_trades['Pencere'] = window['window']
+    return summary, test_trades
+
+
+def _init_worker(prepared, strategy_params, combinations, optimization_target, verbose):
+    _WORKER_STATE.update(prepared=prepared, strategy_params=strategy_params, combinations=combinations,
+                         optimization_target=optimization_target)
+    if not verbose:
+        # Sinyal fonksiyonlarının konsol çıktıları ve Streamlit uyarıları bastırılır
+        logging.disable(logging.WARNING)
+        sys.stdout = open(os.devnull, 'w')
+
+
+def _evaluate_window_task(window):
+    state = _WORKER_STATE
+    return evaluate_window(state['prepared'], state['strategy_params'], state['combinations'], window,
+                           state['optimization_target'])
+
+
+def run_walk_forward(frames, strategy_params, combinations, train_bars, test_bars, step_bars=None, anchored=False,
+                     higher_frames=None, optimization_target="Sharpe Oranı (Yıllık)", workers=1, progress=None,
+                     verbose=False):
+    """
+    Walk-forward analizi. Pencereler tüm sembollerin birleşik zaman ekseni üzerinde tanımlanır.
+    workers > 1 ise pencereler ayrı süreçlerde paralel değerlendirilir; sonuç işçi sayısından bağımsızdır.
+    progress(i, toplam) verilirse her pencereden sonra çağrılır.
+    Dönüş: (pencere tablosu DataFrame'i, tüm test işlemleri DataFrame'i, birleşik örneklem dışı metrikler)
+    """
+    if not frames or not combinations:
+        return pd.DataFrame(), pd.DataFrame(), {}
+    timeline = reduce(lambda a, b: a.union(b), (df.index for df in frames.values()))
+    windows = walk_forward_windows(timeline, train_bars, test_bars, step_bars, anchored)
+    if not windows:
+        raise ValueError(f"Veri ({len(timeline)} mum) bir eğitim ({train_bars}) + test ({test_bars}) penceresi "
+                         f"için yetersiz.")
+    prepared = prepare_indicator_frames(frames, strategy_params, combinations, higher_frames)
+
+    results = {}
+
+    def _done(result):
+        summary, trades = result
+        results[summary['window']] = (summary, trades)
+        if progress:
+            progress(len(results), len(windows))
+
+    if workers <= 1:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(sys.stdout if verbose else devnull):
+            for window in windows:
+                _done(evaluate_window(prepared, strategy_params, combinations, window, optimization_target))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(prepared, strategy_params, combinations, optimization_target,
+                                           verbose)) as executor:
+            futures = [executor.submit(_evaluate_window_task, window) for window in windows]
+            for future in as_completed(futures):
+                _done(future.result())
+
+    summaries = [results[i][0] for i in sorted(results)]
+    parts = [results[i][1] for i in sorted(results) if not results[i][1].empty]
+    oos_trades = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+    oos_metrics = {}
+    if not oos_trades.empty:
+        closed = oos_trades.dropna(subset=['Çıkış Zamanı'])
+        if not closed.empty:
+            with stage('metrics'):
+                oos_metrics, _, _ = analyze_backtest_results(closed)
+    return window_table(summaries, optimization_target), oos_trades, oos_metrics
+
+
+def window_table(summaries, optimization_target):
+    """Pencere özetlerini tabloya çevirir: tarihler, seçilen parametreler, eğitim ve test metrikleri."""
+    rows = []
+    for summary in summaries:
+        row = {'Pencere': summary['window'], 'Eğitim Başlangıç': summary['train_start'],
+               'Test Başlangıç': summary['test_start'], 'Test Bitiş': summary['test_end']}
+        row.update(summary.get('best_params') or {})
+        train_metrics = summary.get('train_metrics') or {}
+        test_metrics = summary.get('test_metrics') or {}
+        for metric in dict.fromkeys([optimization_target, 'Toplam Getiri (%)', 'Toplam İşlem']):
+            row[f"Eğitim {metric}"] = train_metrics.get(metric)
+            row[f"Test {metric}"] = test_metrics.get(metric)
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+if __name__ == '__main__':
+    # Sentetik veride küçük bir walk-forward örneği (ağ erişimi gerekmez)
+    import random
+    import time
+
+    import numpy as np
+
+    from backtest_engine import build_param_grid, resolve_strategy_params, sample_combinations
+
+    rng = np.random.default_rng(0)
+    frames = {}
+    for symbol in ('DEMOUSDT', 'TESTUSDT'):
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 3000)))
+        frames[symbol] = pd.DataFrame({'Open': close, 'High': close * 1.004, 'Low': close * 0.996, 'Close': close,
+                                       'Volume': rng.uniform(10, 100, 3000)},
+                                      index=pd.date_range('2024-01-01', periods=3000, freq='1h'))
+    params = resolve_strategy_params({'rsi_buy': 40, 'rsi_sell': 60, 'use_mta': False})
+    combinations = sample_combinations(build_param_grid((30, 40), (60, 70), (20, 20), (1.5, 2.5), (3.0, 5.0)),
+                                       max_tests=12, rng=random.Random(0))
+    started = time.perf_counter()
+    table, trades, metrics = run_walk_forward(frames, params, combinations, train_bars=1000, test_bars=500)
+    print(table.to_string(index=False))
+    print(f"\nÖrneklem dışı: {len(trades)} işlem, toplam getiri %{metrics.get('Toplam Getiri (%)', 0):.2f} "
+          f"({time.perf_counter() - started:.1f} sn)")
@@ -9,9 +9,9 @@ from datetime import datetime
 
 # Proje modüllerinden gerekli fonksiyonları import ediyoruz
 from utils import get_binance_klines
-from indicators import generate_all_indicators
+from indicators import generate_all_indicators, required_indicators
 from signals import generate_signals
-from telegram_alert import send_telegram_message
+from telegram_alert import send_telegram_message_async
 from alarm_log import log_alarm
 
 CONFIG_FILE = "config.json"
@@ -80,7 +80,8 @@ def on_message(ws, message, symbol):
             telegram_enabled = config.get("telegram_enabled", False)
 
             # 2. Göstergeleri hesapla
-            df_with_indicators = generate_all_indicators(df, **strategy_params)
+            df_with_indicators = generate_all_indicators(df, required=required_indicators(strategy_params),
+                                                         **strategy_params)
 
             # 3. Sinyalleri üret
             df_with_signals = generate_signals(df_with_indicators, **strategy_params)
@@ -102,8 +103,8 @@ def on_message(ws, message, symbol):
                     token = st.secrets.get("telegram", {}).get("token")
                     chat_id = st.secrets.get("telegram", {}).get("chat_id")
                     if token and chat_id:
-                        send_telegram_message(message_text, token, chat_id)
-                        print("-> Telegram bildirimi gönderildi.")
+                        send_telegram_message_async(message_text, token, chat_id)
+                        print("-> Telegram bildirimi gönderim kuyruğuna alındı.")
 
                 portfolio_data[symbol]['last_signal'] = current_signal
             else: